@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark extract_json_from_text on adversarial model outputs (1 KB - 500 KB).
+
+Compares the current string-aware, single-pass bracket scanner against the
+previous strategy 3, which restarted a depth scan from every { / [ after a
+failed parse and counted brackets inside string values.
+
+Usage:
+    cd lambda
+    python benchmarks/bench_extract_json.py
+    python benchmarks/bench_extract_json.py --sizes 1,10,100 --legacy-max-kb 10
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'functions'))
+
+from extract_json import extract_json_from_text  # noqa: E402
+
+
+def legacy_extract_json_from_text(text):
+    """Strategy 3 and 4 as they were before the linear scanner (for comparison)."""
+    text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]', '', text)
+    first_brace = text.find('{')
+    first_bracket = text.find('[')
+    if first_bracket != -1 and (first_brace == -1 or first_bracket < first_brace):
+        char_pairs = [('[', ']'), ('{', '}')]
+    else:
+        char_pairs = [('{', '}'), ('[', ']')]
+    for start_char, end_char in char_pairs:
+        search_from = 0
+        while True:
+            start_idx = text.find(start_char, search_from)
+            if start_idx == -1:
+                break
+            depth = 0
+            for i in range(start_idx, len(text)):
+                if text[i] == start_char:
+                    depth += 1
+                elif text[i] == end_char:
+                    depth -= 1
+                    if depth == 0:
+                        try:
+                            return json.loads(text[start_idx:i + 1])
+                        except json.JSONDecodeError:
+                            search_from = start_idx + 1
+                            break
+            else:
+                break
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Could not extract valid JSON from AI response: {e}")
+
+
+def _resume_text(size_bytes):
+    """Resume prose full of unbalanced braces (templating, code snippets)."""
+    line = "- Built {{ jinja }} templates and config parsers for {service: 'x' in {env}} and {unclosed\n"
+    return (line * (size_bytes // len(line) + 1))[:size_bytes]
+
+
+def braces_in_strings(size_bytes):
+    """Valid response whose tailoredResume contains unbalanced braces."""
+    doc = {
+        'tailoredResume': _resume_text(size_bytes),
+        'changesApplied': ['Reworded summary'],
+        'keywordOptimizations': ['Python'],
+    }
+    return doc, 'Here is the tailored resume:\n' + json.dumps(doc)
+
+
+def prose_braces(size_bytes):
+    """Preamble with many unclosed { before a small valid object."""
+    doc = {'atsScore': 88, 'optimizations': ['headers']}
+    preamble = ('I will reason about {the job and {the candidate ' * (size_bytes // 48 + 1))[:size_bytes]
+    return doc, preamble + '\n' + json.dumps(doc)
+
+
+def truncated(size_bytes):
+    """Response cut off at max_tokens mid-string (no valid JSON at all)."""
+    _, text = braces_in_strings(size_bytes)
+    return None, text[:-len('"], "keywordOptimizations": ["Python"]}') - 20]
+
+
+def nested_invalid(size_bytes):
+    """Deeply nested braces (template/code text); only the innermost {} is valid JSON."""
+    depth = size_bytes // 2
+    return {}, '{' * depth + '}' * depth
+
+
+SCENARIOS = {
+    'braces_in_strings': braces_in_strings,
+    'prose_braces': prose_braces,
+    'truncated': truncated,
+    'nested_invalid': nested_invalid,
+}
+
+
+def _time(func, text, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            result = func(text)
+        except ValueError:
+            result = None
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='1,10,50,100,250,500', help='comma-separated sizes in KB')
+    parser.add_argument('--legacy-max-kb', type=int, default=50,
+                        help='skip the quadratic legacy scanner above this size')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"{'scenario':<20} {'size':>7} {'current ms':>11} {'legacy ms':>11} {'speedup':>8}  correct (current/legacy)")
+    for name, build in SCENARIOS.items():
+        for kb in (int(s) for s in args.sizes.split(',')):
+            expected, text = build(kb * 1024)
+            current_ms, current = _time(extract_json_from_text, text, args.repeat)
+            if kb <= args.legacy_max_kb:
+                legacy_ms, legacy = _time(legacy_extract_json_from_text, text, 1)
+                legacy_col = f"{legacy_ms:>11.1f} {legacy_ms / max(current_ms, 1e-6):>7.0f}x"
+                legacy_ok = 'yes' if legacy == expected else 'no'
+            else:
+                legacy_col = f"{'skipped':>11} {'':>8}"
+                legacy_ok = '-'
+            current_ok = 'yes' if current == expected else 'no'
+            print(f"{name:<20} {kb:>5}KB {current_ms:>11.1f} {legacy_col}  {current_ok}/{legacy_ok}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark fixtures: wall time via pytest-benchmark, memory via tracemalloc,
+both checked against the JSON baselines in baselines.json.
+
+    cd lambda
+    pytest benchmarks --no-cov                               # check against baselines
+    pytest benchmarks --no-cov --bench-update-baselines      # accept current numbers
+    pytest benchmarks --no-cov --benchmark-autosave          # also keep pytest-benchmark history
+
+A benchmark fails when its peak traced memory grows more than
+--bench-memory-tolerance over baseline, or its median time grows more
+than --bench-time-tolerance. Time varies between machines, so its default
+tolerance is loose; compare runs on the same machine with
+--benchmark-compare for tighter checks.
+"""
+import gc
+import json
+import os
+import tracemalloc
+from typing import Any, Callable, Dict
+
+import pytest
+
+BASELINES_FILE = os.path.join(os.path.dirname(__file__), 'baselines.json')
+_results_key = pytest.StashKey[Dict[str, Dict[str, float]]]()
+
+# Ignore growth below this, so tiny benchmarks do not flap on allocator noise
+MEMORY_SLACK_KB = 16
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('resume-tailor benchmarks')
+    group.addoption('--bench-update-baselines', action='store_true',
+                    help='write this run\'s numbers to benchmarks/baselines.json')
+    group.addoption('--bench-time-tolerance', type=float, default=1.0,
+                    help='allowed median-time growth over baseline as a fraction (default: 1.0 = 2x)')
+    group.addoption('--bench-memory-tolerance', type=float, default=0.25,
+                    help='allowed peak-memory growth over baseline as a fraction (default: 0.25)')
+
+
+def pytest_configure(config):
+    config.stash[_results_key] = {}
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    results = config.stash.get(_results_key, {})
+    if not config.getoption('--bench-update-baselines', default=False) or not results:
+        return
+    baselines = _load_baselines()
+    baselines.update(results)
+    with open(BASELINES_FILE, 'w') as f:
+        json.dump(dict(sorted(baselines.items())), f, indent=2)
+        f.write('\n')
+
+
+def _load_baselines() -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(BASELINES_FILE):
+        return {}
+    with open(BASELINES_FILE) as f:
+        return json.load(f)
+
+
+def trace_memory(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Dict[str, float]:
+    """Peak and retained traced memory for one call."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = func(*args, **kwargs)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {'peak_kb': round((peak - before) / 1024, 1), 'retained_kb': round((current - before) / 1024, 1)}
+
+
+@pytest.fixture(autouse=True)
+def benchmark_env(monkeypatch):
+    """Handler settings for benchmarks; the response cache would turn repeat rounds into hits."""
+    monkeypatch.setenv('BUCKET_NAME', 'bench-bucket')
+    monkeypatch.setenv('TABLE_NAME', 'bench-table')
+    monkeypatch.setenv('MODEL_ID', 'us.anthropic.claude-opus-4-5-20251101-v1:0')
+    monkeypatch.setenv('LLM_CACHE_ENABLED', 'false')
+
+
+@pytest.fixture
+def measure(benchmark, request):
+    """Time func with pytest-benchmark, trace its memory, and check both against the baseline."""
+    config = request.config
+    name = request.node.name
+
+    def run(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        memory = trace_memory(func, *args, **kwargs)
+        benchmark.extra_info.update(memory)
+        result = benchmark(func, *args, **kwargs)
+
+        stats = getattr(benchmark, 'stats', None)
+        current = dict(memory)
+        if stats is not None:
+            current['median_ms'] = round(stats.stats.median * 1000, 3)
+        config.stash[_results_key][name] = current
+
+        if config.getoption('--bench-update-baselines'):
+            return result
+        baseline = _load_baselines().get(name)
+        if baseline is None:
+            pytest.skip(f"no baseline for {name}; run with --bench-update-baselines")
+
+        memory_limit = baseline['peak_kb'] * (1 + config.getoption('--bench-memory-tolerance')) + MEMORY_SLACK_KB
+        assert current['peak_kb'] <= memory_limit, (
+            f"{name}: peak memory {current['peak_kb']} KB exceeds baseline {baseline['peak_kb']} KB"
+        )
+        if 'median_ms' in current and 'median_ms' in baseline:
+            time_limit = baseline['median_ms'] * (1 + config.getoption('--bench-time-tolerance'))
+            assert current['median_ms'] <= time_limit, (
+                f"{name}: median {current['median_ms']} ms exceeds baseline {baseline['median_ms']} ms"
+            )
+        return result
+
+    return run
@@ -0,0 +1,88 @@
+"""
+End-to-end handler benchmarks against stub clients
+"""
+import pytest
+import workloads
+from devtools.clients import patch_clients
+
+import analyze_resume
+import ats_optimize
+import cover_letter
+import critical_review
+import generate_resume
+import parse_job
+import refine_resume
+import save_results
+
+
+def _resume_objects(versions):
+    return {f"uploads/user-1/resume-{i}.md": text.encode() for i, text in enumerate(workloads.resumes(versions))}
+
+
+def _run(measure, handler, event):
+    result = measure(handler, event, None)
+    assert result['statusCode'] == 200, result.get('error')
+    return result
+
+
+def test_parse_job_50kb(measure):
+    event = {'jobId': 'job-1', 'jobDescription': workloads.job_description()}
+
+    with patch_clients(bedrock=workloads.StubBedrock(workloads.PARSED_JOB)):
+        _run(measure, parse_job.handler, event)
+
+
+@pytest.mark.parametrize('versions', [2, 5])
+def test_analyze_resume(measure, versions):
+    objects = _resume_objects(versions)
+    event = {'jobId': 'job-1', 'resumeS3Keys': list(objects), 'parsedJob': workloads.PARSED_JOB}
+
+    with patch_clients(bedrock=workloads.StubBedrock(workloads.ANALYSIS), s3=workloads.StubS3(objects)):
+        _run(measure, analyze_resume.handler, event)
+
+
+@pytest.mark.parametrize('versions', [2, 5])
+def test_generate_resume_16k_stream(measure, versions):
+    objects = _resume_objects(versions)
+    event = {'jobId': 'job-1', 'userId': 'user-1', 'resumeS3Keys': list(objects),
+             'parsedJob': workloads.PARSED_JOB, 'analysis': workloads.ANALYSIS}
+
+    with patch_clients(bedrock=workloads.StubBedrock(workloads.tailored_resume_output()),
+                       s3=workloads.StubS3(objects)):
+        _run(measure, generate_resume.handler, event)
+
+
+def test_ats_optimize_16k_stream(measure):
+    event = {'tailoredResumeMarkdown': workloads.resume(0), 'parsedJob': workloads.PARSED_JOB}
+
+    with patch_clients(bedrock=workloads.StubBedrock(workloads.ats_output())):
+        _run(measure, ats_optimize.handler, event)
+
+
+def test_cover_letter(measure):
+    event = {'jobId': 'job-1', 'jobDescription': workloads.job_description(),
+             'tailoredResumeMarkdown': workloads.resume(0), 'parsedJob': workloads.PARSED_JOB,
+             'analysis': workloads.ANALYSIS}
+
+    with patch_clients(bedrock=workloads.StubBedrock(workloads.cover_letter_output()), s3=workloads.StubS3({})):
+        _run(measure, cover_letter.handler, event)
+
+
+def test_critical_review(measure):
+    event = {'tailoredResumeMarkdown': workloads.resume(0)}
+
+    with patch_clients(bedrock=workloads.StubBedrock(workloads.critical_review_output())):
+        _run(measure, critical_review.handler, event)
+
+
+def test_refine_resume_16k_stream(measure):
+    event = {'originalResume': workloads.resume(0), 'criticalReview': workloads.critical_review_output(),
+             'parsedJob': workloads.PARSED_JOB}
+
+    with patch_clients(bedrock=workloads.StubBedrock(workloads.long_markdown(workloads.STREAM_TOKENS))):
+        _run(measure, refine_resume.handler, event)
+
+
+def test_save_results(measure):
+    with patch_clients(dynamodb=workloads.StubDynamoDB()):
+        _run(measure, save_results.handler, workloads.results_item())
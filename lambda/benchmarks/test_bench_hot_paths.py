@@ -0,0 +1,92 @@
+"""
+Benchmarks for the hot paths shared by the handlers
+"""
+import json
+import time
+import pytest
+import workloads
+from aws_runtime import _collect_stream, build_request_body
+from claim_check import compress_fields, resolve
+from extract_json import extract_json_from_text, repair_truncated_json
+from json_stream import StreamingJSONParser
+from prompt_context import build_prompt, document_prefix, resume_versions_block
+from save_results import convert_floats_to_decimal
+from validation import safe_decode_s3_body
+
+MODEL = 'us.anthropic.claude-opus-4-5-20251101-v1:0'
+INSTRUCTIONS = 'Tailor the resume above to the job requirements. Return ONLY valid JSON.'
+
+
+@pytest.mark.parametrize('versions', [2, 5])
+def test_prompt_building(measure, versions):
+    """Resume/job prefix, instructions and the serialized Bedrock request"""
+    resumes = workloads.resumes(versions)
+
+    def build():
+        prompt = build_prompt(document_prefix(resume_versions_block(resumes), workloads.PARSED_JOB), INSTRUCTIONS)
+        return json.dumps(build_request_body(prompt, 8192, 0.4))
+
+    assert len(measure(build)) > versions * 8_000
+
+
+@pytest.mark.parametrize('incremental', [False, True], ids=['collect', 'collect_and_parse'])
+def test_stream_collection_16k_tokens(measure, incremental):
+    """Drain a 16K-token tool stream, optionally feeding the incremental JSON parser"""
+    output = workloads.tailored_resume_output()
+    events = workloads.stream_events(json.dumps(output))
+
+    def collect():
+        parser = StreamingJSONParser() if incremental else None
+        result = _collect_stream(iter(events), MODEL, time.perf_counter(),
+                                 on_text=parser.feed if parser else None, tool_json=True)
+        return parser.result() if parser else result.text
+
+    result = measure(collect)
+    assert (result if incremental else json.loads(result)) == output
+
+
+def test_extract_json_fenced_64kb(measure):
+    output = workloads.tailored_resume_output()
+    text = 'Here is the tailored resume:\n```json\n' + json.dumps(output, indent=2) + '\n```\nLet me know!'
+
+    assert measure(extract_json_from_text, text) == output
+
+
+def test_repair_truncated_json_64kb(measure):
+    text = json.dumps(workloads.tailored_resume_output())
+    cut = text[:len(text) * 3 // 4]
+
+    value, complete = measure(repair_truncated_json, cut)
+    assert value['tailoredResume'] and complete == []
+
+
+def test_convert_floats_to_decimal(measure):
+    item = workloads.results_item()
+
+    converted = measure(convert_floats_to_decimal, item)
+    assert str(converted['analysis']['fitScore']) == '87.5'
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'latin-1'])
+def test_safe_decode_s3_body(measure, encoding):
+    """Decode five resume versions; latin-1 exercises the fallback after a failed UTF-8 decode"""
+    text = '\n'.join(workloads.resumes(5)) + '\nCafé Zürich'
+    body = text.encode(encoding)
+
+    assert measure(safe_decode_s3_body, body) == text
+
+
+@pytest.mark.parametrize('codec', [None, 'gzip'], ids=['inline', 'gzip'])
+def test_parallel_results_hop(measure, codec):
+    """Three 30 KB resume versions from ParallelOptimization: pack, serialize, parse and unpack in save_results"""
+    outputs = [{'statusCode': 200, 'jobId': 'job-1', 'atsOptimizedResume': workloads.resume(i, size=30_000)}
+               for i in range(3)]
+
+    def hop():
+        packed = [compress_fields(dict(output), codec) if codec else output for output in outputs]
+        state = json.dumps({'parallelResults': packed})
+        return len(state), resolve(json.loads(state))
+
+    size, state = measure(hop)
+    assert state['parallelResults'] == outputs
+    assert size < 30_000 if codec else size > 90_000
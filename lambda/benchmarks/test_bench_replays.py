@@ -0,0 +1,41 @@
+"""
+Handler benchmarks on production payload shapes
+
+Every fixture saved under benchmarks/replays/ by `python -m devtools.replay
+pull` adds one benchmark per stage that calls Bedrock (and save_results):
+the stage's recorded event, run against stub clients that return its
+recorded response. Run with --bench-update-baselines after adding a fixture.
+"""
+import glob
+import os
+
+import pytest
+import workloads
+from devtools.clients import patch_clients
+from devtools.replay import bedrock_response, load_fixture
+from devtools.state_machine import import_handler
+
+REPLAYS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), 'replays', '*.json*')))
+
+
+def _cases():
+    for path in REPLAYS:
+        fixture = load_fixture(path)
+        name = os.path.basename(path).split('.')[0]
+        for stage in fixture['stages']:
+            response = bedrock_response(stage['module'], stage.get('output') or {})
+            if (response is not None or stage['module'] == 'save_results') and not stage.get('error'):
+                objects = {key: text.encode() for key, text in fixture.get('objects', {}).items()}
+                yield pytest.param(stage, response, objects, id=f"{name}-{stage['state']}")
+
+
+@pytest.mark.parametrize('stage,response,objects', list(_cases()))
+def test_replay(measure, stage, response, objects):
+    handler = import_handler(stage['module'])
+    clients = {'s3': workloads.StubS3(objects), 'dynamodb': workloads.StubDynamoDB()}
+    if response is not None:
+        clients['bedrock'] = workloads.StubBedrock(response)
+
+    with patch_clients(**clients):
+        result = measure(handler, stage['event'], None)
+    assert result['statusCode'] == 200, result.get('error')
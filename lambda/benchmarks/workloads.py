@@ -0,0 +1,202 @@
+"""
+Realistic, deterministic inputs and stub AWS clients for the benchmarks.
+
+Sizes follow what production sees at the top end:
+- 2-5 resume versions of about 8 KB each;
+- job descriptions close to the 50,000-character validation limit;
+- streamed outputs of about 16K tokens.
+The stub clients return pre-encoded responses, so a benchmark measures the
+handler's own work (prompt building, stream collection, parsing,
+serialization) and not the cost of faking AWS.
+"""
+import io
+import json
+import random
+from typing import Any, Dict, List
+
+CHARS_PER_TOKEN = 4
+STREAM_TOKENS = 16_000
+DELTA_CHARS = 12  # Bedrock text deltas are a few tokens each
+
+_rng = random.Random(2024)
+_SKILLS = ['Python', 'AWS Lambda', 'Step Functions', 'DynamoDB', 'TypeScript', 'React', 'Terraform', 'Kubernetes',
+           'PostgreSQL', 'Kafka', 'GraphQL', 'Docker', 'CI/CD', 'Observability', 'System design', 'Go']
+_VERBS = ['Led', 'Built', 'Designed', 'Scaled', 'Migrated', 'Automated', 'Optimized', 'Mentored', 'Shipped']
+
+
+def _sentence(rng: random.Random, words: int = 18) -> str:
+    picks = [rng.choice(_SKILLS).lower() if i % 4 == 0 else rng.choice(('services', 'pipelines', 'teams',
+             'latency', 'by 35%', 'across regions', 'customers', 'platform', 'reliability', 'with'))
+             for i in range(words)]
+    return f"{rng.choice(_VERBS)} {' '.join(picks)}."
+
+
+def resume(version: int, size: int = 8_000) -> str:
+    """One Markdown resume version of roughly size characters."""
+    rng = random.Random(version)
+    lines = [f"# Jordan Rivera (v{version})", "Senior Software Engineer | Seattle, WA", "",
+             "## Summary", _sentence(rng, 40), "", "## Experience"]
+    while sum(len(line) + 1 for line in lines) < size:
+        lines.append(f"### {rng.choice(['Acme', 'Globex', 'Initech', 'Umbrella'])} - Staff Engineer (2019-2024)")
+        lines.extend(f"- {_sentence(rng)}" for _ in range(6))
+    lines += ["", "## Skills", ', '.join(_SKILLS)]
+    return '\n'.join(lines)[:size]
+
+
+def resumes(count: int) -> List[str]:
+    return [resume(i) for i in range(count)]
+
+
+def job_description(size: int = 49_000) -> str:
+    """A job description just under the 50,000-character limit."""
+    rng = random.Random(7)
+    parts = ["Senior Backend Engineer, Platform\n\nAbout the role\n"]
+    while sum(len(p) for p in parts) < size:
+        parts.append(f"- {_sentence(rng, 24)}\n")
+    return ''.join(parts)[:size]
+
+
+PARSED_JOB = {
+    'requiredSkills': _SKILLS[:10],
+    'preferredSkills': _SKILLS[10:],
+    'keyResponsibilities': [_sentence(_rng) for _ in range(12)],
+    'experienceLevel': '7+ years',
+    'educationRequirements': "Bachelor's in Computer Science or equivalent",
+    'certifications': ['AWS Solutions Architect'],
+    'keywords': _SKILLS + ['serverless', 'event-driven', 'microservices'],
+}
+
+ANALYSIS = {
+    'fitScore': 87.5,
+    'matchedSkills': _SKILLS[:12],
+    'missingSkills': _SKILLS[12:],
+    'strengths': [_sentence(_rng) for _ in range(6)],
+    'gaps': [_sentence(_rng) for _ in range(4)],
+    'recommendations': [_sentence(_rng) for _ in range(6)],
+    'summary': _sentence(_rng, 40),
+}
+
+
+def long_markdown(tokens: int) -> str:
+    rng = random.Random(tokens)
+    lines = ['# Jordan Rivera', '']
+    while sum(len(line) + 1 for line in lines) < tokens * CHARS_PER_TOKEN:
+        lines.append(f"- {_sentence(rng)}")
+    return '\n'.join(lines)[:tokens * CHARS_PER_TOKEN]
+
+
+def tailored_resume_output(tokens: int = STREAM_TOKENS) -> Dict[str, Any]:
+    """generate_resume output whose resume field fills most of the token budget."""
+    return {
+        'tailoredResume': long_markdown(tokens - 400),
+        'changesApplied': [_sentence(_rng) for _ in range(8)],
+        'keywordOptimizations': _SKILLS,
+    }
+
+
+def ats_output(tokens: int = STREAM_TOKENS) -> Dict[str, Any]:
+    return {
+        'atsOptimizedResume': long_markdown(tokens - 400),
+        'atsScore': 91.5,
+        'optimizations': [_sentence(_rng) for _ in range(8)],
+        'keywordCoverage': {'included': _SKILLS[:12], 'missing': _SKILLS[12:]},
+    }
+
+
+def cover_letter_output(tokens: int = 1_500) -> Dict[str, Any]:
+    return {'coverLetter': long_markdown(tokens - 100), 'tone': 'professional', 'keyPoints': _SKILLS[:5]}
+
+
+def critical_review_output() -> Dict[str, Any]:
+    return {
+        'overallRating': 8.5,
+        'strengths': [_sentence(_rng) for _ in range(6)],
+        'weaknesses': [_sentence(_rng) for _ in range(6)],
+        'actionableSteps': [_sentence(_rng) for _ in range(8)],
+        'competitiveAnalysis': _sentence(_rng, 60),
+        'redFlags': [_sentence(_rng) for _ in range(2)],
+        'standoutElements': [_sentence(_rng) for _ in range(3)],
+        'summary': _sentence(_rng, 40),
+    }
+
+
+def results_item() -> Dict[str, Any]:
+    """save_results event with every stage's output (floats included)."""
+    return {
+        'jobId': 'job-1770764725413',
+        'userId': 'user-1',
+        'jobDescription': job_description(),
+        'parsedJob': PARSED_JOB,
+        'analysis': ANALYSIS,
+        'tailoredResume': {'tailoredResumeS3Key': 'tailored/job-1/resume.md',
+                           'tailoredResumeMarkdown': long_markdown(STREAM_TOKENS),
+                           'changesApplied': tailored_resume_output(2_000)['changesApplied']},
+        'parallelResults': [ats_output(4_000), cover_letter_output(), critical_review_output()],
+    }
+
+
+# --- Bedrock response encoding ---
+
+def stream_events(text: str, tool: bool = True, delta_chars: int = DELTA_CHARS) -> List[Dict[str, Any]]:
+    """Bedrock stream events for a response, as invoke_model_with_response_stream yields them."""
+    def chunk(event: Dict[str, Any]) -> Dict[str, Any]:
+        return {'chunk': {'bytes': json.dumps(event).encode()}}
+
+    output_tokens = len(text) // CHARS_PER_TOKEN
+    events = [chunk({'type': 'message_start', 'message': {'usage': {'input_tokens': 20_000, 'output_tokens': 1}}})]
+    for i in range(0, len(text), delta_chars):
+        piece = text[i:i + delta_chars]
+        delta = {'type': 'input_json_delta', 'partial_json': piece} if tool else {'type': 'text_delta', 'text': piece}
+        events.append(chunk({'type': 'content_block_delta', 'index': 0, 'delta': delta}))
+    events.append(chunk({'type': 'message_delta', 'delta': {'stop_reason': 'tool_use' if tool else 'end_turn'},
+                         'usage': {'output_tokens': output_tokens}}))
+    return events
+
+
+def invoke_body(output: Any, tool_name: str = 'record_output') -> bytes:
+    content = ([{'type': 'tool_use', 'id': 'toolu_1', 'name': tool_name, 'input': output}]
+               if not isinstance(output, str) else [{'type': 'text', 'text': output}])
+    return json.dumps({'content': content, 'stop_reason': 'tool_use' if content[0]['type'] == 'tool_use'
+                       else 'end_turn', 'usage': {'input_tokens': 15_000, 'output_tokens': 800}}).encode()
+
+
+class StubBedrock:
+    """bedrock-runtime stub that replays one pre-encoded response."""
+
+    def __init__(self, output: Any, tool: bool = True):
+        text = output if isinstance(output, str) else json.dumps(output)
+        self._events = stream_events(text, tool=tool and not isinstance(output, str))
+        self._body = invoke_body(output)
+
+    def invoke_model_with_response_stream(self, **kwargs) -> Dict[str, Any]:
+        return {'body': iter(self._events)}
+
+    def invoke_model(self, **kwargs) -> Dict[str, Any]:
+        return {'body': io.BytesIO(self._body)}
+
+
+class StubS3:
+    """S3 stub serving fixed objects; writes are accepted and dropped."""
+
+    class exceptions:  # noqa: N801 - mirrors client.exceptions
+        class NoSuchKey(Exception):
+            pass
+
+    def __init__(self, objects: Dict[str, bytes]):
+        self._objects = objects
+
+    def get_object(self, Bucket: str, Key: str, **kwargs) -> Dict[str, Any]:  # noqa: N803 - boto3 names
+        return {'Body': io.BytesIO(self._objects[Key])}
+
+    def put_object(self, **kwargs) -> Dict[str, Any]:
+        return {}
+
+
+class StubTable:
+    def put_item(self, **kwargs) -> Dict[str, Any]:
+        return {}
+
+
+class StubDynamoDB:
+    def Table(self, name: str) -> StubTable:  # noqa: N802 - boto3 resource API
+        return StubTable()
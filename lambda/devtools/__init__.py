@@ -0,0 +1 @@
+"""Developer tools for running and measuring the pipeline locally."""
@@ -0,0 +1,570 @@
+"""
+Record and replay the Bedrock, S3 and DynamoDB calls of a workflow run.
+
+Recording wraps the real clients. Every request/response pair is captured,
+with PII scrubbed, together with when each call started, how long it took
+and, for response streams, when each chunk arrived. Replaying serves those
+responses back to the handlers. time_scale=1 reproduces the recorded
+latency and time_scale=0 returns at once, so a handler change (prompt
+size, parsing, serialization) can be measured against real payloads
+without spending Bedrock tokens.
+
+Requests are matched by a hash of the normalized request:
+- JSON bodies are parsed and key-sorted;
+- other request bodies are hashed;
+- timestamps (createdAt, expiresAt, ...) are dropped, and epoch-millisecond
+  values inside strings such as S3 keys are masked;
+- the same scrubbing is applied as at record time.
+Identical requests replay in recorded order.
+
+Usage:
+    cd lambda
+    BUCKET_NAME=... TABLE_NAME=... MODEL_ID=... \\
+        python -m devtools.cassette record --input event.json --out run.cassette.json --scrub "Jane Doe"
+    python -m devtools.cassette replay run.cassette.json [--time-scale 0] [--timings timings.json]
+"""
+import argparse
+import base64
+import copy
+import gzip
+import hashlib
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from devtools.clients import patch_clients
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+SERVICES = ('bedrock', 's3', 'dynamodb')
+
+# Fields that change on every run and must not affect matching
+VOLATILE_KEYS = frozenset({'createdAt', 'updatedAt', 'completedAt', 'expiresAt', 'ttl', 'RequestId',
+                           'HostId', 'date', 'x-amz-request-id', 'x-amzn-requestid', 'x-amz-id-2'})
+# Epoch-millisecond timestamps embedded in S3 keys and IDs
+_EPOCH_MS = re.compile(r'(?<!\d)1\d{12}(?!\d)')
+
+
+class CassetteMiss(KeyError):
+    """A replayed request has no recorded counterpart."""
+
+
+# --- PII scrubbing ---
+
+# Matches may start right after a JSON escape such as \n (bodies are often JSON text)
+_AFTER_ESCAPE = r'(?<=\\[nrtbf])'
+_EMAIL = re.compile(r'(?:' + _AFTER_ESCAPE + r'|(?<![A-Za-z0-9._%+-]))[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}')
+_PHONE = re.compile(r'(?:' + _AFTER_ESCAPE + r'|(?<![\w-]))(?:\+?1[\s.-])?\(?\d{3}\)?[\s.-]\d{3}[\s.-]\d{4}(?![\w-])')
+_PROFILE_URL = re.compile(r'(?:https?://)?(?:www\.)?(linkedin\.com/in|github\.com)/[A-Za-z0-9_-]+', re.I)
+
+
+class Scrubber:
+    """Replace PII with stable placeholders.
+
+    Emails, phone numbers, LinkedIn/GitHub profile URLs and any extra terms
+    (e.g. the candidate's name) are replaced consistently: the same value
+    always maps to the same placeholder. Placeholders are left alone, so
+    scrubbing scrubbed text changes nothing.
+    """
+
+    def __init__(self, terms: Iterable[str] = ()):
+        self._lock = threading.Lock()
+        self._mapping: Dict[Tuple[str, str], str] = {}
+        self._terms = sorted({t for t in terms if t}, key=len, reverse=True)
+        self._terms_re = re.compile('|'.join(re.escape(t) for t in self._terms), re.I) if self._terms else None
+
+    def _placeholder(self, kind: str, value: str, template: str) -> str:
+        with self._lock:
+            key = (kind, value.lower())
+            if key not in self._mapping:
+                count = sum(1 for k in self._mapping if k[0] == kind) + 1
+                self._mapping[key] = template.format(n=count)
+            return self._mapping[key]
+
+    def text(self, text: str) -> str:
+        if self._terms_re:
+            text = self._terms_re.sub(lambda m: self._placeholder('term', m.group(), 'Candidate {n}'), text)
+        text = _EMAIL.sub(lambda m: m.group() if m.group().lower().endswith('@example.com')
+                          else self._placeholder('email', m.group(), 'person{n}@example.com'), text)
+        text = _PHONE.sub(lambda m: m.group() if re.sub(r'\D', '', m.group()).startswith('555010')
+                          else self._placeholder('phone', m.group(), '555-010-{n:04d}'), text)
+        text = _PROFILE_URL.sub(lambda m: m.group() if m.group().rstrip('/').rsplit('/', 1)[-1].startswith('person')
+                                else self._placeholder('url', m.group(), 'https://' + m.group(1).lower() + '/person{n}'),
+                                text)
+        return text
+
+    def value(self, value: Any) -> Any:
+        """Scrub every string (and UTF-8 bytes) inside a value."""
+        if isinstance(value, str):
+            return self.text(value)
+        if isinstance(value, bytes):
+            try:
+                return self.text(value.decode('utf-8')).encode('utf-8')
+            except UnicodeDecodeError:
+                return value
+        if isinstance(value, dict):
+            return {self.value(k) if isinstance(k, str) else k: self.value(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.value(v) for v in value]
+        return value
+
+
+# --- Serialization of boto3 values ---
+
+def encode(value: Any) -> Any:
+    """Make a boto3 request/response value JSON-serializable (see decode)."""
+    if isinstance(value, dict):
+        return {k: encode(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode(v) for v in value]
+    if isinstance(value, bytes):
+        try:
+            return {'__bytes__': value.decode('utf-8')}
+        except UnicodeDecodeError:
+            return {'__base64__': base64.b64encode(value).decode('ascii')}
+    if isinstance(value, Decimal):
+        return {'__decimal__': str(value)}
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, set):
+        return {'__set__': [encode(v) for v in sorted(value, key=str)]}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return {'__repr__': type(value).__name__}
+
+
+def decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if len(value) == 1:
+        tag, raw = next(iter(value.items()))
+        if tag == '__bytes__':
+            return raw.encode('utf-8')
+        if tag == '__base64__':
+            return base64.b64decode(raw)
+        if tag == '__decimal__':
+            return Decimal(raw)
+        if tag == '__datetime__':
+            return datetime.fromisoformat(raw)
+        if tag == '__set__':
+            return {decode(v) for v in raw}
+    return {k: decode(v) for k, v in value.items()}
+
+
+def _strip_volatile(value: Any) -> Any:
+    if isinstance(value, str):
+        return _EPOCH_MS.sub('{epochMs}', value)
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def normalize_request(params: Dict[str, Any], scrubber: Scrubber) -> Dict[str, Any]:
+    """Scrubbed, stable form of a request used for matching."""
+    normalized = {}
+    for name, value in params.items():
+        if name in ('body', 'Body') and isinstance(value, (str, bytes)):
+            try:
+                value = json.loads(value)
+            except (ValueError, UnicodeDecodeError):
+                raw = scrubber.value(value)
+                raw = raw.encode('utf-8') if isinstance(raw, str) else raw
+                value = {'sha256': hashlib.sha256(raw).hexdigest(), 'length': len(raw)}
+        normalized[name] = value
+    return _strip_volatile(encode(scrubber.value(normalized)))
+
+
+def request_key(service: str, operation: str, normalized: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps([service, operation, normalized], sort_keys=True).encode()).hexdigest()
+
+
+class _Body:
+    """Readable response body, like botocore's StreamingBody."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._offset = 0
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        end = len(self._data) if amt is None else self._offset + amt
+        chunk = self._data[self._offset:end]
+        self._offset += len(chunk)
+        return chunk
+
+    def iter_chunks(self, chunk_size: int = 1024) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self) -> None:
+        pass
+
+
+# --- Cassette ---
+
+class Cassette:
+    """Recorded interactions plus the execution they came from."""
+
+    def __init__(self, interactions: Optional[List[Dict[str, Any]]] = None,
+                 metadata: Optional[Dict[str, Any]] = None, scrubber: Optional[Scrubber] = None):
+        self.interactions = interactions or []
+        self.metadata = metadata or {}
+        self.scrubber = scrubber or Scrubber()
+        self.misses: List[Tuple[str, str]] = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._queues: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._exceptions: Dict[str, type] = {}
+
+    # -- persistence --
+
+    def save(self, path: str) -> None:
+        document = {'version': CASSETTE_VERSION, 'metadata': self.metadata, 'interactions': self.interactions}
+        data = json.dumps(document, indent=1, ensure_ascii=False).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(gzip.compress(data) if path.endswith('.gz') else data)
+
+    @classmethod
+    def load(cls, path: str) -> 'Cassette':
+        with open(path, 'rb') as f:
+            data = f.read()
+        if path.endswith('.gz'):
+            data = gzip.decompress(data)
+        document = json.loads(data)
+        if document.get('version') != CASSETTE_VERSION:
+            raise ValueError(f"Unsupported cassette version {document.get('version')!r} in {path}")
+        return cls(document['interactions'], document.get('metadata'))
+
+    # -- recording --
+
+    def _now_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def record(self, service: str, operation: str, params: Dict[str, Any], call: Callable[[], Any]) -> Any:
+        normalized = normalize_request(params, self.scrubber)
+        interaction: Dict[str, Any] = {
+            'service': service,
+            'operation': operation,
+            'key': request_key(service, operation, normalized),
+            'request': normalized,
+            'startedMs': round(self._now_ms(), 3),
+        }
+        started = time.perf_counter()
+        try:
+            response = call()
+        except ClientError as e:
+            interaction['elapsedMs'] = round((time.perf_counter() - started) * 1000, 3)
+            interaction['error'] = {
+                'code': e.response.get('Error', {}).get('Code'),
+                'message': self.scrubber.text(e.response.get('Error', {}).get('Message', '')),
+                'status': e.response.get('ResponseMetadata', {}).get('HTTPStatusCode'),
+            }
+            self._append(interaction)
+            raise
+        interaction['elapsedMs'] = round((time.perf_counter() - started) * 1000, 3)
+        response = self._capture_response(interaction, response, started)
+        self._append(interaction)
+        return response
+
+    def _append(self, interaction: Dict[str, Any]) -> None:
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def _capture_response(self, interaction: Dict[str, Any], response: Any, started: float) -> Any:
+        if not isinstance(response, dict):
+            interaction['response'] = encode(self.scrubber.value(response))
+            return response
+        live = dict(response)
+        recorded = {k: v for k, v in response.items() if k not in ('Body', 'body')}
+        for name in ('Body', 'body'):
+            body = response.get(name)
+            if body is None:
+                continue
+            if hasattr(body, 'read'):
+                data = body.read()
+                live[name] = _Body(data)
+                recorded[name] = self.scrubber.value(data)
+            elif interaction['operation'].endswith('WithResponseStream') or hasattr(body, '__iter__'):
+                chunks: List[Dict[str, Any]] = []
+                interaction['chunks'] = chunks
+                live[name] = self._record_stream(body, chunks, interaction, started)
+        interaction['response'] = encode(self.scrubber.value(recorded))
+        return live
+
+    def _record_stream(self, stream: Iterable[Dict[str, Any]], chunks: List[Dict[str, Any]],
+                       interaction: Dict[str, Any], started: float) -> Iterator[Dict[str, Any]]:
+        events: List[Tuple[float, Dict[str, Any]]] = []
+        try:
+            for event in stream:
+                chunk = event.get('chunk') if isinstance(event, dict) else None
+                if chunk and 'bytes' in chunk:
+                    events.append(((time.perf_counter() - started) * 1000, json.loads(chunk['bytes'].decode())))
+                yield event
+        finally:
+            interaction['elapsedMs'] = round((time.perf_counter() - started) * 1000, 3)
+            for offset, event in self._scrub_stream(events):
+                chunks.append({'offsetMs': round(offset, 3), 'bytes': json.dumps(event, ensure_ascii=False)})
+
+    def _scrub_stream(self, events: List[Tuple[float, Dict[str, Any]]]) -> List[Tuple[float, Dict[str, Any]]]:
+        """Scrub the streamed output as one text, so PII split across deltas is caught."""
+        deltas = []
+        for _, event in events:
+            delta = event.get('delta') if event.get('type') == 'content_block_delta' else None
+            field = next((f for f in ('text', 'partial_json') if isinstance((delta or {}).get(f), str)), None)
+            if field:
+                deltas.append((delta, field))
+        scrubbed = self.scrubber.text(''.join(delta[field] for delta, field in deltas))
+        position = 0
+        for index, (delta, field) in enumerate(deltas):
+            end = len(scrubbed) if index == len(deltas) - 1 else min(len(scrubbed), position + len(delta[field]))
+            delta[field] = scrubbed[position:end]
+            position = end
+        return [(offset, event if event.get('type') == 'content_block_delta' else self.scrubber.value(event))
+                for offset, event in events]
+
+    # -- replay --
+
+    def exception(self, code: str) -> type:
+        """ClientError subclass for an error code, as client.exceptions.<Code>."""
+        with self._lock:
+            if code not in self._exceptions:
+                self._exceptions[code] = type(code, (ClientError,), {})
+            return self._exceptions[code]
+
+    def replay(self, service: str, operation: str, params: Dict[str, Any], time_scale: float = 0.0,
+               sleep: Callable[[float], None] = time.sleep) -> Any:
+        normalized = normalize_request(params, self.scrubber)
+        key = request_key(service, operation, normalized)
+        with self._lock:
+            if self._queues is None:
+                self._queues = {}
+                for interaction in self.interactions:
+                    self._queues.setdefault(interaction['key'], []).append(interaction)
+            queue = self._queues.get(key)
+            if queue:
+                interaction = queue.pop(0)
+                self._last[key] = interaction
+            elif key in self._last:
+                interaction = self._last[key]
+            else:
+                self.misses.append((f"{service}.{operation}", key))
+                raise CassetteMiss(f"No recorded {service}.{operation} matches request {key[:12]}")
+
+        chunks = interaction.get('chunks')
+        if time_scale > 0 and not chunks:
+            sleep(interaction.get('elapsedMs', 0) / 1000 * time_scale)
+
+        error = interaction.get('error')
+        if error:
+            raise self.exception(error['code'])({
+                'Error': {'Code': error['code'], 'Message': error['message']},
+                'ResponseMetadata': {'HTTPStatusCode': error['status']},
+            }, operation)
+
+        response = decode(copy.deepcopy(interaction.get('response')))
+        if isinstance(response, dict):
+            for name in ('Body', 'body'):
+                if isinstance(response.get(name), bytes):
+                    response[name] = _Body(response[name])
+            if chunks is not None:
+                response['body'] = _replay_stream(chunks, interaction.get('elapsedMs', 0), time_scale, sleep)
+        return response
+
+    def unused(self) -> List[Dict[str, Any]]:
+        """Recorded interactions the replay never requested."""
+        with self._lock:
+            return [i for queue in (self._queues or {}).values() for i in queue]
+
+
+def _replay_stream(chunks: List[Dict[str, Any]], elapsed_ms: float, time_scale: float,
+                   sleep: Callable[[float], None]) -> Iterator[Dict[str, Any]]:
+    previous = 0.0
+    for chunk in chunks:
+        if time_scale > 0:
+            sleep(max(0.0, chunk['offsetMs'] - previous) / 1000 * time_scale)
+        previous = chunk['offsetMs']
+        yield {'chunk': {'bytes': chunk['bytes'].encode('utf-8')}}
+    if time_scale > 0 and elapsed_ms > previous:
+        sleep((elapsed_ms - previous) / 1000 * time_scale)
+
+
+# --- Client proxies ---
+
+class _ClientProxy:
+    """Routes boto3 client/resource calls through a cassette.
+
+    dynamodb.Table(name) returns a proxy whose calls are recorded as
+    Table.<method> with the table name in the request.
+    """
+
+    def __init__(self, cassette: Cassette, service: str, target: Any = None, table: Optional[str] = None,
+                 time_scale: float = 0.0, sleep: Callable[[float], None] = time.sleep):
+        self._cassette = cassette
+        self._service = service
+        self._target = target
+        self._table = table
+        self._time_scale = time_scale
+        self._sleep = sleep
+
+    @property
+    def exceptions(self) -> Any:
+        if self._target is not None:
+            return self._target.exceptions
+        cassette = self._cassette
+        return type('Exceptions', (), {'__getattr__': lambda _, code: cassette.exception(code)})()
+
+    def Table(self, name: str) -> '_ClientProxy':  # noqa: N802 - mirrors the boto3 resource API
+        target = self._target.Table(name) if self._target is not None else None
+        return _ClientProxy(self._cassette, self._service, target, name, self._time_scale, self._sleep)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._target is not None and not callable(getattr(self._target, name)):
+            return getattr(self._target, name)
+        operation = f"Table.{name}" if self._table else name
+
+        def call(**params: Any) -> Any:
+            request = dict(params, TableName=self._table) if self._table else params
+            if self._target is None:
+                return self._cassette.replay(self._service, operation, request, self._time_scale, self._sleep)
+            method = getattr(self._target, name)
+            return self._cassette.record(self._service, operation, request, lambda: method(**params))
+
+        return call
+
+
+def recording_client(cassette: Cassette, service: str, client: Any) -> _ClientProxy:
+    """Wrap a real client so its calls are recorded."""
+    return _ClientProxy(cassette, service, target=client)
+
+
+def replay_client(cassette: Cassette, service: str, time_scale: float = 0.0,
+                  sleep: Callable[[float], None] = time.sleep) -> _ClientProxy:
+    """A client that answers from the cassette."""
+    return _ClientProxy(cassette, service, time_scale=time_scale, sleep=sleep)
+
+
+@contextmanager
+def recording(cassette: Cassette, services: Iterable[str] = SERVICES):
+    """Record every handler call to the given services."""
+    import aws_runtime
+
+    real = {
+        'bedrock': aws_runtime.get_bedrock_client,
+        's3': aws_runtime.get_s3_client,
+        'dynamodb': aws_runtime.get_dynamodb_resource,
+    }
+    with patch_clients(**{s: recording_client(cassette, s, real[s]()) for s in services}):
+        yield cassette
+
+
+@contextmanager
+def replaying(cassette: Cassette, time_scale: float = 0.0, services: Iterable[str] = SERVICES,
+              sleep: Callable[[float], None] = time.sleep):
+    """Serve every handler call to the given services from the cassette."""
+    with patch_clients(**{s: replay_client(cassette, s, time_scale, sleep) for s in services}):
+        yield cassette
+
+
+# --- CLI ---
+
+def _comparable(value: Any) -> Any:
+    return _strip_volatile(json.loads(json.dumps(value, default=str)))
+
+
+def record_execution(execution_input: Dict[str, Any], definition: Dict[str, Any],
+                     scrub_terms: Iterable[str] = ()) -> Tuple[Cassette, Any]:
+    """Run the workflow locally against real AWS and record it."""
+    from devtools.state_machine import LocalStateMachine
+
+    terms = list(scrub_terms)
+    cassette = Cassette(scrubber=Scrubber(terms))
+    with recording(cassette):
+        result = LocalStateMachine(definition, time_scale=1.0).execute(execution_input)
+    cassette.metadata = {
+        'recordedAt': datetime.now(timezone.utc).isoformat(),
+        'input': cassette.scrubber.value(execution_input),
+        'status': result.status,
+        'output': cassette.scrubber.value(json.loads(json.dumps(result.output, default=str))),
+        'error': result.error,
+        'durationMs': round(result.duration_ms, 1),
+    }
+    return cassette, result
+
+
+def replay_execution(cassette: Cassette, definition: Dict[str, Any], time_scale: float = 0.0):
+    """Run the workflow against the cassette; returns the result and whether the output matched."""
+    from devtools.state_machine import LocalStateMachine
+
+    with replaying(cassette, time_scale=time_scale):
+        result = LocalStateMachine(definition, time_scale=0).execute(cassette.metadata['input'])
+    matched = (result.status == cassette.metadata.get('status')
+               and _comparable(cassette.scrubber.value(result.output)) == _comparable(cassette.metadata.get('output')))
+    return result, matched
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from devtools.state_machine import DEFAULT_DEFINITION, format_timings, load_definition
+
+    parser = argparse.ArgumentParser(description='Record or replay the AWS calls of a ResumeTailorWorkflow run.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    rec = sub.add_parser('record', help='run the workflow against real AWS and record it')
+    rec.add_argument('--input', required=True, help='execution input JSON file')
+    rec.add_argument('--out', required=True, help='cassette file (.json or .json.gz)')
+    rep = sub.add_parser('replay', help='run the workflow against a cassette')
+    rep.add_argument('cassette')
+    rep.add_argument('--time-scale', type=float, default=1.0,
+                     help='1 = recorded latency, 0 = zero-latency (default: 1)')
+    rep.add_argument('--timings', help='write the replayed execution with timings to this JSON file')
+    rec.add_argument('--scrub', action='append', default=[],
+                     help='extra PII term to scrub, e.g. the candidate name (repeatable)')
+    for command in (rec, rep):
+        command.add_argument('--definition', default=DEFAULT_DEFINITION)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(threadName)s %(levelname)s %(message)s')
+    definition = load_definition(args.definition)
+
+    if args.command == 'record':
+        with open(args.input) as f:
+            execution_input = json.load(f)
+        cassette, result = record_execution(execution_input, definition, args.scrub)
+        cassette.save(args.out)
+        print(format_timings(result))
+        print(f"Recorded {len(cassette.interactions)} interactions to {args.out}")
+        return 0 if result.status == 'SUCCEEDED' else 1
+
+    cassette = Cassette.load(args.cassette)
+    result, matched = replay_execution(cassette, definition, args.time_scale)
+    print(format_timings(result))
+    print(f"Recorded run: {cassette.metadata.get('durationMs')} ms, replay: {result.duration_ms:.1f} ms")
+    print(f"Output {'matches' if matched else 'DIFFERS from'} the recording; "
+          f"{len(cassette.misses)} unmatched requests, {len(cassette.unused())} recorded calls not replayed")
+    for operation, key in cassette.misses:
+        print(f"  miss: {operation} {key[:12]}")
+    if args.timings:
+        with open(args.timings, 'w') as f:
+            json.dump(result.to_dict(), f, indent=2, default=str)
+    return 0 if matched and not cassette.misses else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""
+Swap the AWS clients the handlers use.
+
+Handlers bind their clients at import (`bedrock = get_bedrock_client()`),
+and shared code fetches them from aws_runtime's client pool, so both have
+to be replaced for a stand-in to see every call.
+"""
+import sys
+from contextlib import contextmanager
+from typing import Any, Dict
+
+# Handler-module global -> aws_runtime client pool name
+CLIENT_GLOBALS = {
+    'bedrock': 'bedrock-runtime',
+    's3': 's3',
+    'dynamodb': 'dynamodb',
+    'ses': 'ses',
+}
+
+
+@contextmanager
+def patch_clients(**clients: Any):
+    """Replace clients by handler global name, e.g. patch_clients(bedrock=fake, s3=recorder).
+
+    Modules imported while patched bind the stand-in for good; import the
+    handlers first when that matters.
+    """
+    import aws_runtime
+
+    unknown = set(clients) - set(CLIENT_GLOBALS)
+    if unknown:
+        raise ValueError(f"Unknown clients: {sorted(unknown)}")
+
+    saved_pool: Dict[str, Any] = {}
+    patched = []
+    for name, client in clients.items():
+        pool_name = CLIENT_GLOBALS[name]
+        saved_pool[pool_name] = aws_runtime._clients.get(pool_name)
+        aws_runtime._clients[pool_name] = client
+        for module in list(sys.modules.values()):
+            if hasattr(module, 'handler') and getattr(module, name, None) is not None:
+                patched.append((module, name, getattr(module, name)))
+                setattr(module, name, client)
+    try:
+        yield
+    finally:
+        for module, name, original in patched:
+            setattr(module, name, original)
+        for pool_name, original in saved_pool.items():
+            if original is None:
+                aws_runtime._clients.pop(pool_name, None)
+            else:
+                aws_runtime._clients[pool_name] = original
@@ -0,0 +1,266 @@
+"""
+Cold-start profiler for the Lambda handlers.
+
+Each handler is imported in a fresh interpreter under `python -X importtime`,
+once with clients built at module load (eager, the default) and once with
+LAZY_INIT=true. For handlers that have an early-exit path (a validation
+failure, nothing to send), the profiler then makes one first invocation
+that takes it. The report gives, per function and mode:
+- init: the handler module's cumulative import time, client construction
+  included;
+- first invoke: the early-exit invocation, with any imports it triggers;
+- sdk: whether botocore was loaded by the time the first invocation returned.
+
+--breakdown lists where the import time goes, by top-level package and by
+module.
+
+Usage:
+    cd lambda
+    python -m devtools.coldstart                          # every handler, eager vs lazy
+    python -m devtools.coldstart notify save_results --breakdown 10
+    python -m devtools.coldstart --repeat 9 --json coldstart.json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from devtools.state_machine import FUNCTIONS_DIR
+
+MODES = {'eager': 'false', 'lazy': 'true'}
+
+# First invocations that exit before any AWS call
+EARLY_EXIT_EVENTS: Dict[str, Dict[str, Any]] = {
+    'notify': {'jobId': 'job-1'},
+    'parse_job': {'jobId': 'job-1', 'jobDescription': ''},
+    'analyze_resume': {'jobId': 'job-1', 'resumeS3Keys': ['../outside/resume.md'], 'parsedJob': {}},
+    'generate_resume': {'jobId': 'job-1', 'userId': 'user-1', 'resumeS3Keys': ['../outside/resume.md']},
+    'save_results': {'userId': 'user-1'},
+    'router': {'stage': 'notify', 'input': {'jobId': 'job-1'}},
+}
+
+INVOKE_MARKER = '@@coldstart-invoke'
+
+# Runs in the child interpreter; json is imported after the handler so the
+# handler pays for its own imports
+_CHILD = f"""
+import sys, time
+module_name, functions_dir = sys.argv[1], sys.argv[2]
+sys.path.insert(0, functions_dir)
+started = time.perf_counter()
+module = __import__(module_name)
+init_ms = (time.perf_counter() - started) * 1000
+sys.stderr.write('{INVOKE_MARKER}\\n')
+sys.stderr.flush()
+import json
+event = json.loads(sys.argv[3])
+invoke_ms = status = None
+if event is not None:
+    started = time.perf_counter()
+    result = module.handler(event, None)
+    invoke_ms = (time.perf_counter() - started) * 1000
+    status = result.get('statusCode') if isinstance(result, dict) else None
+print(json.dumps({{'initWallMs': init_ms, 'invokeMs': invoke_ms, 'status': status,
+                  'sdkLoaded': 'botocore' in sys.modules}}))
+"""
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (.*)$")
+
+
+@dataclass
+class ImportRow:
+    """One `-X importtime` line; times in microseconds."""
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> Tuple[List[ImportRow], List[ImportRow]]:
+    """Split -X importtime output into rows before and after the invoke marker."""
+    before: List[ImportRow] = []
+    after: List[ImportRow] = []
+    rows = before
+    for line in stderr.splitlines():
+        if line.strip() == INVOKE_MARKER:
+            rows = after
+            continue
+        match = _IMPORTTIME.match(line)
+        if not match or match.group(3).strip() == 'imported package':
+            continue
+        raw_name = match.group(3)
+        depth = (len(raw_name) - len(raw_name.lstrip(' '))) // 2
+        rows.append(ImportRow(raw_name.strip(), int(match.group(1)), int(match.group(2)), depth))
+    return before, after
+
+
+def import_subtree(rows: List[ImportRow], module_name: str) -> List[ImportRow]:
+    """The rows for module_name's import, itself last (importtime prints children first)."""
+    end = next((i for i in range(len(rows) - 1, -1, -1) if rows[i].name == module_name and rows[i].depth == 0), None)
+    if end is None:
+        return []
+    start = end
+    while start > 0 and rows[start - 1].depth > 0:
+        start -= 1
+    return rows[start:end + 1]
+
+
+def by_package(rows: List[ImportRow]) -> Dict[str, float]:
+    """Self time in ms summed by top-level package, largest first."""
+    totals: Dict[str, float] = defaultdict(float)
+    for row in rows:
+        totals[row.name.split('.')[0]] += row.self_us / 1000
+    return dict(sorted(((k, round(v, 1)) for k, v in totals.items()), key=lambda kv: -kv[1]))
+
+
+@dataclass
+class ColdStart:
+    """Median cold start of one handler in one mode."""
+    function: str
+    mode: str
+    init_ms: float
+    init_wall_ms: float
+    invoke_ms: Optional[float] = None
+    status: Optional[int] = None
+    sdk_loaded: bool = False
+    packages: Dict[str, float] = field(default_factory=dict)
+    top_modules: List[Tuple[str, float, float]] = field(default_factory=list)
+    deferred_imports_ms: float = 0.0
+
+    @property
+    def total_ms(self) -> float:
+        return self.init_ms + (self.invoke_ms or 0.0)
+
+
+def handler_modules(functions_dir: str = FUNCTIONS_DIR) -> List[str]:
+    """Modules in lambda/functions that define a Lambda handler."""
+    modules = []
+    for filename in sorted(os.listdir(functions_dir)):
+        if filename.endswith('.py'):
+            with open(os.path.join(functions_dir, filename)) as f:
+                if re.search(r"^def handler\(", f.read(), re.M):
+                    modules.append(filename[:-3])
+    return modules
+
+
+def _child_env(mode: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.pop('USER_EMAIL', None)
+    env.update({'LAZY_INIT': MODES[mode], 'AWS_EC2_METADATA_DISABLED': 'true', 'PYTHONPATH': FUNCTIONS_DIR})
+    # Lambda provides credentials and region in the environment; without them
+    # botocore would search config files and instance metadata
+    env.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    env.setdefault('AWS_ACCESS_KEY_ID', 'coldstart')
+    env.setdefault('AWS_SECRET_ACCESS_KEY', 'coldstart')
+    env.setdefault('BUCKET_NAME', 'coldstart-bucket')
+    env.setdefault('TABLE_NAME', 'coldstart-table')
+    return env
+
+
+def run_once(module_name: str, mode: str, python: str = sys.executable) -> Dict[str, Any]:
+    """Import and first-invoke one handler in a fresh interpreter."""
+    event = EARLY_EXIT_EVENTS.get(module_name)
+    proc = subprocess.run(
+        [python, '-X', 'importtime', '-c', _CHILD, module_name, FUNCTIONS_DIR, json.dumps(event)],
+        capture_output=True, text=True, env=_child_env(mode), cwd=FUNCTIONS_DIR, timeout=120,
+    )
+    if proc.returncode != 0 or not proc.stdout.strip():
+        raise RuntimeError(f"{module_name} ({mode}) failed:\n{proc.stderr[-2000:]}")
+    outcome = json.loads(proc.stdout.strip().splitlines()[-1])
+    init_rows, invoke_rows = parse_importtime(proc.stderr)
+    outcome['rows'] = import_subtree(init_rows, module_name)
+    outcome['deferredUs'] = sum(r.cumulative_us for r in invoke_rows if r.depth == 0)
+    return outcome
+
+
+def profile(module_name: str, mode: str, repeat: int = 5, python: str = sys.executable) -> ColdStart:
+    """Median cold start over repeat fresh interpreters (after one discarded run that writes .pyc files)."""
+    run_once(module_name, mode, python)
+    runs = [run_once(module_name, mode, python) for _ in range(max(1, repeat))]
+    inits = [run['rows'][-1].cumulative_us / 1000 if run['rows'] else run['initWallMs'] for run in runs]
+    median_run = runs[sorted(range(len(runs)), key=lambda i: inits[i])[len(runs) // 2]]
+    rows = median_run['rows']
+    invokes = [run['invokeMs'] for run in runs if run['invokeMs'] is not None]
+    return ColdStart(
+        function=module_name,
+        mode=mode,
+        init_ms=round(statistics.median(inits), 1),
+        init_wall_ms=round(statistics.median(run['initWallMs'] for run in runs), 1),
+        invoke_ms=round(statistics.median(invokes), 2) if invokes else None,
+        status=median_run['status'],
+        sdk_loaded=median_run['sdkLoaded'],
+        packages=by_package(rows),
+        top_modules=[(r.name, round(r.self_us / 1000, 2), round(r.cumulative_us / 1000, 2))
+                     for r in sorted(rows, key=lambda r: -r.self_us)[:25]],
+        deferred_imports_ms=round(median_run['deferredUs'] / 1000, 1),
+    )
+
+
+def format_comparison(results: List[ColdStart]) -> str:
+    """Before (eager) / after (lazy) cold start per function."""
+    by_function: Dict[str, Dict[str, ColdStart]] = defaultdict(dict)
+    for result in results:
+        by_function[result.function][result.mode] = result
+
+    def ms(value: Optional[float]) -> str:
+        return f"{value:.1f}" if value is not None else '-'
+
+    lines = [f"{'function':<18}{'eager init':>11}{'lazy init':>10}{'eager 1st':>10}{'lazy 1st':>9}"
+             f"{'eager total':>12}{'lazy total':>11}{'saved':>8}  lazy sdk at exit"]
+    for function, modes in by_function.items():
+        eager, lazy = modes.get('eager'), modes.get('lazy')
+        saved = eager.total_ms - lazy.total_ms if eager and lazy else None
+        lines.append(
+            f"{function:<18}{ms(eager and eager.init_ms):>11}{ms(lazy and lazy.init_ms):>10}"
+            f"{ms(eager and eager.invoke_ms):>10}{ms(lazy and lazy.invoke_ms):>9}"
+            f"{ms(eager and eager.total_ms):>12}{ms(lazy and lazy.total_ms):>11}{ms(saved):>8}  "
+            f"{'-' if not lazy or lazy.invoke_ms is None else ('loaded' if lazy.sdk_loaded else 'not loaded')}"
+        )
+    lines.append('ms; init = handler module import incl. client construction, 1st = early-exit invocation')
+    return '\n'.join(lines)
+
+
+def format_breakdown(result: ColdStart, top: int) -> str:
+    lines = [f"{result.function} ({result.mode}): init {result.init_ms:.1f} ms, "
+             f"deferred imports on first invoke {result.deferred_imports_ms:.1f} ms"]
+    lines += [f"  {package:<28}{ms:>9.1f} ms" for package, ms in list(result.packages.items())[:top]]
+    lines.append(f"  {'module':<44}{'self ms':>9}{'cumulative ms':>15}")
+    lines += [f"  {name:<44}{self_ms:>9.2f}{cumulative:>15.2f}" for name, self_ms, cumulative in result.top_modules[:top]]
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Cold-start import profile of each Lambda handler, eager vs lazy.')
+    parser.add_argument('functions', nargs='*', help='handler modules (default: all in lambda/functions)')
+    parser.add_argument('--modes', default='eager,lazy', help='comma-separated: eager, lazy (default: both)')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per measurement (default: 5)')
+    parser.add_argument('--breakdown', type=int, metavar='N', help='also list the top N packages and modules')
+    parser.add_argument('--json', help='write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+    results = [profile(function, mode, args.repeat)
+               for function in (args.functions or handler_modules()) for mode in modes]
+
+    print(format_comparison(results))
+    if args.breakdown:
+        for result in results:
+            print()
+            print(format_breakdown(result, args.breakdown))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([dict(asdict(r), total_ms=r.total_ms) for r in results], f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
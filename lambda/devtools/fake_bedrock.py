@@ -0,0 +1,468 @@
+"""
+Fake bedrock-runtime client with per-model latency, throughput and errors.
+
+A drop-in for the boto3 client in offline benchmarks and load tests. Both
+invoke_model and invoke_model_with_response_stream are supported, and the
+responses have the same shape as Bedrock's Anthropic Messages API. The
+stream yields message_start, content_block_* and message_delta chunks,
+paced by a time to first token and a tokens-per-second rate. Forced tools
+get a tool_use block, and responses that overrun max_tokens stop with
+max_tokens. Throttling, model timeouts and 5xx errors are raised as
+botocore ClientErrors.
+
+Profiles are keyed by model family and cover the models in
+lib/model-config.ts (Haiku 3, Haiku 4.5, Sonnet 4.5, Opus 4.5). With a seed,
+every request gets its timing, length and errors from a hash of the seed,
+the model ID, the request body and how many times that body has been sent.
+Runs are therefore reproducible, however threads interleave.
+
+Usage:
+    fake = FakeBedrockRuntime(seed=7, time_scale=0.1)
+    with install(fake):
+        handler(event, None)
+    print(fake.summary())
+"""
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from botocore.exceptions import ClientError
+
+from devtools.clients import patch_clients
+
+CHARS_PER_TOKEN = 4
+
+_WORDS = (
+    'led', 'designed', 'scalable', 'python', 'services', 'reduced', 'latency', 'by', '40%', 'across',
+    'distributed', 'teams', 'built', 'aws', 'lambda', 'pipelines', 'mentored', 'engineers', 'shipped',
+    'customer-facing', 'features', 'improved', 'reliability', 'and', 'automated', 'deployments', 'with',
+    'terraform', 'kubernetes', 'observability', 'owned', 'roadmap', 'for', 'data', 'platform',
+)
+
+
+@dataclass(frozen=True)
+class ModelProfile:
+    """Timing and failure behaviour of one model family."""
+    first_token_ms: float          # median time to first token
+    tokens_per_second: float       # median output throughput
+    jitter: float = 0.25           # lognormal sigma applied to both
+    output_tokens: Tuple[int, int] = (400, 1500)
+    max_concurrency: int = 0       # in-flight requests before throttling (0 = unlimited)
+    throttle_rate: float = 0.0     # ThrottlingException
+    timeout_rate: float = 0.0      # ModelTimeoutException
+    error_rate: float = 0.0        # ServiceUnavailableException / InternalServerException
+
+    def with_errors(self, scale: float) -> 'ModelProfile':
+        return replace(self, throttle_rate=self.throttle_rate * scale,
+                       timeout_rate=self.timeout_rate * scale, error_rate=self.error_rate * scale)
+
+
+# First match wins; ordered from most to least specific
+DEFAULT_PROFILES: List[Tuple[str, ModelProfile]] = [
+    ('claude-3-haiku', ModelProfile(first_token_ms=350, tokens_per_second=125, max_concurrency=40,
+                                    throttle_rate=0.005, error_rate=0.001)),
+    ('claude-haiku-4-5', ModelProfile(first_token_ms=500, tokens_per_second=100, max_concurrency=30,
+                                      throttle_rate=0.01, error_rate=0.002)),
+    ('claude-sonnet-4-5', ModelProfile(first_token_ms=900, tokens_per_second=60, max_concurrency=20,
+                                       throttle_rate=0.02, timeout_rate=0.002, error_rate=0.003)),
+    ('claude-opus-4-5', ModelProfile(first_token_ms=1800, tokens_per_second=35, jitter=0.35,
+                                     output_tokens=(600, 2500), max_concurrency=10,
+                                     throttle_rate=0.03, timeout_rate=0.005, error_rate=0.005)),
+    ('', ModelProfile(first_token_ms=800, tokens_per_second=60)),
+]
+
+_ERRORS = {
+    'ThrottlingException': (429, 'Too many requests, please wait before trying again.'),
+    'ModelTimeoutException': (408, 'Model has timed out in processing the request.'),
+    'ServiceUnavailableException': (503, 'Service is temporarily unavailable.'),
+    'InternalServerException': (500, 'The server encountered an internal error.'),
+}
+
+# A responder turns (model_id, request body) into output text, or a dict of
+# tool input when the request forces a tool
+Responder = Callable[[str, Dict[str, Any]], Union[str, Dict[str, Any]]]
+
+
+@dataclass
+class CallRecord:
+    """One simulated request."""
+    operation: str
+    model_id: str
+    input_tokens: int
+    output_tokens: int = 0
+    first_token_ms: float = 0.0
+    duration_ms: float = 0.0
+    stop_reason: Optional[str] = None
+    error: Optional[str] = None
+    retry_attempts: int = 0
+
+
+def _client_error(code: str, operation: str) -> ClientError:
+    status, message = _ERRORS[code]
+    return ClientError({
+        'Error': {'Code': code, 'Message': message},
+        'ResponseMetadata': {'HTTPStatusCode': status, 'RetryAttempts': 0},
+    }, operation)
+
+
+def _filler(rng: random.Random, tokens: int) -> str:
+    words: List[str] = []
+    length = 0
+    while length < tokens * CHARS_PER_TOKEN:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+
+def _instance(schema: Dict[str, Any], rng: random.Random, string_tokens: int) -> Any:
+    """A value matching a (simple) JSON schema; strings share the token budget."""
+    kind = schema.get('type')
+    if kind == 'object':
+        return {name: _instance(sub, rng, string_tokens) for name, sub in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [_instance(schema.get('items', {'type': 'string'}), rng, max(1, string_tokens // 3))
+                for _ in range(3)]
+    if kind in ('number', 'integer'):
+        return rng.randint(55, 95)
+    if kind == 'boolean':
+        return rng.random() < 0.5
+    return _filler(rng, string_tokens)
+
+
+def _count_strings(schema: Dict[str, Any]) -> int:
+    kind = schema.get('type')
+    if kind == 'object':
+        return sum(_count_strings(sub) for sub in schema.get('properties', {}).values())
+    if kind == 'array':
+        # Three items, each given a third of a string's share
+        return _count_strings(schema.get('items', {'type': 'string'}))
+    return 1 if kind == 'string' or kind is None else 0
+
+
+def forced_tool(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The tool a request's tool_choice forces, None when no tool may or must be called."""
+    name = (body.get('tool_choice') or {}).get('name')
+    return next((tool for tool in body.get('tools') or [] if tool.get('name') == name), None)
+
+
+def default_responder(model_id: str, body: Dict[str, Any], rng: random.Random, tokens: int) -> Union[str, Dict]:
+    """Schema-shaped tool input for forced tools, Markdown prose otherwise."""
+    tool = forced_tool(body)
+    if tool:
+        schema = tool.get('input_schema', {'type': 'object'})
+        return _instance(schema, rng, max(1, tokens // max(1, _count_strings(schema))))
+    lines = ['# Jane Doe', '', '## Experience']
+    while sum(len(line) + 1 for line in lines) < tokens * CHARS_PER_TOKEN:
+        lines.append('- ' + _filler(rng, 20).capitalize())
+    return '\n'.join(lines)
+
+
+def _prompt_tokens(body: Dict[str, Any]) -> int:
+    text = json.dumps([body.get('system'), body.get('messages'), body.get('tools')])
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class _EventStream:
+    """Iterable of Bedrock stream events, paced like the real service."""
+
+    def __init__(self, events: List[Dict[str, Any]], delays: List[float], sleep: Callable[[float], None],
+                 on_close: Callable[[], None]):
+        self._events = events
+        self._delays = delays
+        self._sleep = sleep
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        try:
+            for event, delay in zip(self._events, self._delays):
+                if self._closed:
+                    return
+                if delay > 0:
+                    self._sleep(delay)
+                yield {'chunk': {'bytes': json.dumps(event).encode()}}
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._on_close()
+
+
+class FakeBedrockRuntime:
+    """Stand-in for boto3.client('bedrock-runtime')."""
+
+    def __init__(self, seed: int = 0, profiles: Optional[Dict[str, ModelProfile]] = None,
+                 responder: Optional[Responder] = None, time_scale: float = 1.0, error_scale: float = 1.0,
+                 max_attempts: int = 1, stream_chunk_tokens: int = 8,
+                 sleep: Callable[[float], None] = time.sleep):
+        """
+        Args:
+            seed: Makes timings, lengths, content and errors reproducible
+            profiles: Model-ID substring -> profile, checked before the defaults
+            responder: Produces the response content instead of filler text
+            time_scale: Multiplier for simulated waits (0 = report but never sleep)
+            error_scale: Multiplier for the profile error rates (0 = never fail)
+            max_attempts: Emulate SDK retries of throttling and 5xx errors
+            stream_chunk_tokens: Output tokens per streamed delta
+            sleep: Injectable sleep, for tests
+        """
+        self.seed = seed
+        self.profiles = list((profiles or {}).items()) + DEFAULT_PROFILES
+        self.responder = responder
+        self.time_scale = time_scale
+        self.error_scale = error_scale
+        self.max_attempts = max(1, max_attempts)
+        self.stream_chunk_tokens = max(1, stream_chunk_tokens)
+        self.sleep = sleep
+        self.calls: List[CallRecord] = []
+        self._lock = threading.Lock()
+        self._sent: Dict[str, int] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._generated: Dict[str, str] = {}
+
+    def profile_for(self, model_id: str) -> ModelProfile:
+        profile = next(p for prefix, p in self.profiles if prefix in model_id)
+        return profile.with_errors(self.error_scale) if self.error_scale != 1.0 else profile
+
+    # --- boto3 surface ---
+
+    def invoke_model(self, modelId: str, body: Union[str, bytes], **kwargs) -> Dict[str, Any]:
+        plan, record = self._plan('InvokeModel', modelId, body)
+        try:
+            self._wait(plan['first_token_s'] + plan['generation_s'])
+        finally:
+            self._release(modelId)
+        record.duration_ms = (plan['first_token_s'] + plan['generation_s'] + plan['retry_s']) * 1000
+        content = [{'type': 'text', 'text': plan['text']}]
+        if plan['tool']:
+            content = [{'type': 'tool_use', 'id': plan['tool_use_id'], 'name': plan['tool'],
+                        'input': plan['tool_input']}]
+        response_body = {
+            'id': plan['message_id'], 'type': 'message', 'role': 'assistant', 'model': modelId,
+            'content': content, 'stop_reason': plan['stop_reason'], 'stop_sequence': None,
+            'usage': {'input_tokens': plan['input_tokens'], 'output_tokens': plan['output_tokens']},
+        }
+        return {
+            'body': io.BytesIO(json.dumps(response_body).encode()),
+            'contentType': 'application/json',
+            'ResponseMetadata': self._metadata(plan),
+        }
+
+    def invoke_model_with_response_stream(self, modelId: str, body: Union[str, bytes], **kwargs) -> Dict[str, Any]:
+        plan, record = self._plan('InvokeModelWithResponseStream', modelId, body)
+        record.duration_ms = (plan['first_token_s'] + plan['generation_s'] + plan['retry_s']) * 1000
+        chunk_chars = self.stream_chunk_tokens * CHARS_PER_TOKEN
+        text = plan['text']
+        pieces = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)] or ['']
+        per_piece = plan['generation_s'] / len(pieces)
+
+        if plan['tool']:
+            block = {'type': 'tool_use', 'id': plan['tool_use_id'], 'name': plan['tool'], 'input': {}}
+            delta = lambda piece: {'type': 'input_json_delta', 'partial_json': piece}  # noqa: E731
+        else:
+            block = {'type': 'text', 'text': ''}
+            delta = lambda piece: {'type': 'text_delta', 'text': piece}  # noqa: E731
+
+        events = [
+            {'type': 'message_start', 'message': {
+                'id': plan['message_id'], 'type': 'message', 'role': 'assistant', 'model': modelId, 'content': [],
+                'stop_reason': None, 'usage': {'input_tokens': plan['input_tokens'], 'output_tokens': 1},
+            }},
+            {'type': 'content_block_start', 'index': 0, 'content_block': block},
+        ]
+        delays = [plan['first_token_s'], 0.0]
+        for piece in pieces:
+            events.append({'type': 'content_block_delta', 'index': 0, 'delta': delta(piece)})
+            delays.append(per_piece)
+        events += [
+            {'type': 'content_block_stop', 'index': 0},
+            {'type': 'message_delta', 'delta': {'stop_reason': plan['stop_reason'], 'stop_sequence': None},
+             'usage': {'output_tokens': plan['output_tokens']}},
+            {'type': 'message_stop', 'amazon-bedrock-invocationMetrics': {
+                'inputTokenCount': plan['input_tokens'], 'outputTokenCount': plan['output_tokens'],
+                'invocationLatency': round(record.duration_ms), 'firstByteLatency': round(record.first_token_ms),
+            }},
+        ]
+        delays += [0.0, 0.0, 0.0]
+        stream = _EventStream(events, [d * self.time_scale for d in delays], self.sleep,
+                              lambda: self._release(modelId))
+        return {
+            'body': stream,
+            'contentType': 'application/json',
+            'ResponseMetadata': self._metadata(plan),
+        }
+
+    # --- simulation ---
+
+    def _plan(self, operation: str, model_id: str, raw_body: Union[str, bytes]) -> Tuple[Dict[str, Any], CallRecord]:
+        body = json.loads(raw_body)
+        profile = self.profile_for(model_id)
+        digest = hashlib.sha256(f"{model_id}\0{raw_body if isinstance(raw_body, str) else raw_body.decode()}"
+                                .encode()).hexdigest()
+        with self._lock:
+            occurrence = self._sent.get(digest, 0)
+            self._sent[digest] = occurrence + 1
+        rng = random.Random(f"{self.seed}:{digest}:{occurrence}")
+
+        record = CallRecord(operation=operation, model_id=model_id, input_tokens=_prompt_tokens(body))
+        with self._lock:
+            self.calls.append(record)
+
+        retry_s = 0.0
+        for attempt in range(self.max_attempts):
+            error = self._draw_error(model_id, profile, rng)
+            if error is None:
+                break
+            if attempt + 1 == self.max_attempts or error == 'ModelTimeoutException':
+                record.error = error
+                record.retry_attempts = attempt
+                # A model timeout is only reported after the service has waited on it
+                if error == 'ModelTimeoutException':
+                    self._wait(60.0)
+                raise _client_error(error, operation)
+            backoff = min(20.0, rng.uniform(0, 2 ** attempt))
+            retry_s += backoff
+            self._wait(backoff)
+        record.retry_attempts = attempt
+
+        plan = self._content(model_id, body, profile, rng)
+        plan['first_token_s'] = profile.first_token_ms / 1000 * rng.lognormvariate(0, profile.jitter)
+        tps = profile.tokens_per_second * rng.lognormvariate(0, profile.jitter)
+        plan['generation_s'] = plan['output_tokens'] / tps
+        plan['retry_s'] = retry_s
+        plan['retry_attempts'] = record.retry_attempts
+        plan['message_id'] = f"msg_bdrk_{digest[:24]}"
+        plan['tool_use_id'] = f"toolu_bdrk_{digest[24:48]}"
+        record.output_tokens = plan['output_tokens']
+        record.stop_reason = plan['stop_reason']
+        record.first_token_ms = (retry_s + plan['first_token_s']) * 1000
+        return plan, record
+
+    def _draw_error(self, model_id: str, profile: ModelProfile, rng: random.Random) -> Optional[str]:
+        roll = rng.random()
+        with self._lock:
+            in_flight = self._in_flight.get(model_id, 0)
+            if self.error_scale > 0 and profile.max_concurrency and in_flight >= profile.max_concurrency:
+                return 'ThrottlingException'
+            if roll < profile.throttle_rate:
+                return 'ThrottlingException'
+            if roll < profile.throttle_rate + profile.timeout_rate:
+                return 'ModelTimeoutException'
+            if roll < profile.throttle_rate + profile.timeout_rate + profile.error_rate:
+                return rng.choice(['ServiceUnavailableException', 'InternalServerException'])
+            self._in_flight[model_id] = in_flight + 1
+        return None
+
+    def _release(self, model_id: str) -> None:
+        with self._lock:
+            self._in_flight[model_id] = max(0, self._in_flight.get(model_id, 0) - 1)
+
+    def _content(self, model_id: str, body: Dict[str, Any], profile: ModelProfile,
+                 rng: random.Random) -> Dict[str, Any]:
+        """Decide the full output, then cut it at max_tokens."""
+        messages = body.get('messages') or []
+        prefill = ''
+        if messages and messages[-1].get('role') == 'assistant':
+            prefill = messages[-1]['content'] if isinstance(messages[-1]['content'], str) else ''
+        conversation_key = hashlib.sha256(json.dumps([model_id, body.get('system'), messages[:1]],
+                                                     sort_keys=True).encode()).hexdigest()
+        tool = forced_tool(body)
+        tool_name = tool['name'] if tool and not prefill else None
+
+        with self._lock:
+            full = self._generated.get(conversation_key) if prefill else None
+        if full is None or not full.startswith(prefill):
+            target = rng.randint(*profile.output_tokens)
+            if self.responder:
+                produced = self.responder(model_id, body)
+            else:
+                produced = default_responder(model_id, body, rng, target)
+            full = produced if isinstance(produced, str) else json.dumps(produced, ensure_ascii=False)
+            if prefill and not full.startswith(prefill):
+                full = prefill + full
+            with self._lock:
+                self._generated[conversation_key] = full
+
+        remaining = full[len(prefill):] if prefill else full
+        limit = body.get('max_tokens', 4096) * CHARS_PER_TOKEN
+        stop_reason = 'tool_use' if tool_name else 'end_turn'
+        if len(remaining) > limit:
+            remaining = remaining[:limit]
+            stop_reason = 'max_tokens'
+        plan = {
+            'text': remaining,
+            'output_tokens': max(1, -(-len(remaining) // CHARS_PER_TOKEN)),
+            'input_tokens': _prompt_tokens(body),
+            'stop_reason': stop_reason,
+            'tool': tool_name,
+            'tool_input': None,
+        }
+        if tool_name and stop_reason == 'tool_use':
+            plan['tool_input'] = json.loads(remaining)
+        elif tool_name:
+            # invoke_model cannot return half a tool call; report it as text
+            plan['tool'] = None
+        return plan
+
+    def _wait(self, seconds: float) -> None:
+        if self.time_scale > 0 and seconds > 0:
+            self.sleep(seconds * self.time_scale)
+
+    def _metadata(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'RequestId': plan['message_id'],
+            'HTTPStatusCode': 200,
+            'HTTPHeaders': {
+                'x-amzn-bedrock-input-token-count': str(plan['input_tokens']),
+                'x-amzn-bedrock-output-token-count': str(plan['output_tokens']),
+            },
+            'RetryAttempts': plan['retry_attempts'],
+        }
+
+    # --- reporting ---
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model call counts, errors and simulated latency percentiles."""
+        by_model: Dict[str, List[CallRecord]] = {}
+        for record in list(self.calls):
+            by_model.setdefault(record.model_id, []).append(record)
+        report = {}
+        for model_id, records in by_model.items():
+            ok = sorted(r.duration_ms for r in records if r.error is None)
+            first = sorted(r.first_token_ms for r in records if r.error is None)
+            errors: Dict[str, int] = {}
+            for r in records:
+                if r.error:
+                    errors[r.error] = errors.get(r.error, 0) + 1
+            report[model_id] = {
+                'calls': len(records),
+                'errors': errors,
+                'outputTokens': sum(r.output_tokens for r in records),
+                'p50Ms': _percentile(ok, 50),
+                'p95Ms': _percentile(ok, 95),
+                'p50FirstTokenMs': _percentile(first, 50),
+            }
+        return report
+
+    def records(self) -> List[Dict[str, Any]]:
+        return [asdict(r) for r in list(self.calls)]
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return round(values[index], 1)
+
+
+def install(fake: Any):
+    """Route every Bedrock call through fake: the shared client and handler globals."""
+    return patch_clients(bedrock=fake)
@@ -0,0 +1,235 @@
+"""
+Merge a job's per-stage profiles into one flame graph.
+
+Stages run with profiling on (PROFILING_ENABLED=true or `profile: true` in
+the execution input) write cProfile stats to
+profiles/{jobId}/{stage}/{timestamp}.prof in the resume bucket, next to
+a .tracemalloc.json memory summary. This tool reads them from the bucket
+or from a local copy, rebuilds call stacks from each profile's caller
+graph, puts every stack under its stage, and writes:
+- folded stacks ("stage;caller;callee microseconds" per line), the input
+  format of flamegraph.pl, speedscope and inferno;
+- a self-contained SVG flame graph.
+
+cProfile records caller/callee pairs, not whole stacks, so the time of a
+function called from several places is split between its callers in
+proportion to the calls' cumulative time. The shape is exact for call
+trees and an estimate otherwise.
+
+Usage:
+    cd lambda
+    python -m devtools.flamegraph --bucket <bucket> --job <jobId> --svg job.svg
+    python -m devtools.flamegraph --dir profiles/<jobId> --svg job.svg --folded job.folded
+"""
+import argparse
+import html
+import json
+import os
+import pstats
+import sys
+import tempfile
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+MAX_DEPTH = 64
+# Stack fragments shorter than this (seconds) are dropped
+MIN_TIME = 1e-6
+
+Func = Tuple[str, int, str]
+Stacks = Dict[Tuple[str, ...], float]
+
+
+def load_profiles(directory: str) -> Dict[str, List[str]]:
+    """.prof files under a directory by stage (the name of the directory holding them)."""
+    profiles: Dict[str, List[str]] = defaultdict(list)
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith('.prof'):
+                profiles[os.path.basename(root)].append(os.path.join(root, name))
+    return dict(profiles)
+
+
+def load_memory(directory: str) -> Dict[str, List[Dict[str, Any]]]:
+    """tracemalloc summaries under a directory by stage."""
+    memory: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith('.tracemalloc.json'):
+                with open(os.path.join(root, name)) as f:
+                    memory[os.path.basename(root)].append(json.load(f))
+    return dict(memory)
+
+
+def download_job(bucket: str, job_id: str, directory: str, s3: Any = None) -> str:
+    """Copy profiles/{jobId}/ from the bucket into a directory; returns the job's directory."""
+    if s3 is None:
+        import boto3
+        s3 = boto3.client('s3')
+    prefix = f"profiles/{job_id}/"
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            target = os.path.join(directory, obj['Key'])
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            s3.download_file(bucket, obj['Key'], target)
+    return os.path.join(directory, 'profiles', job_id)
+
+
+def frame_label(func: Func) -> str:
+    """'name (file.py:line)', or the builtin's name."""
+    filename, line, name = func
+    if filename == '~':
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{line})"
+    return label.replace(';', ',')
+
+
+def profile_stacks(stats: Dict[Func, tuple]) -> Stacks:
+    """
+    Self time (seconds) per call stack, rebuilt from a pstats caller graph
+
+    Roots are functions nothing in the profile called. A function's time on
+    a path is its cumulative time scaled by the share its caller's edge
+    contributed; recursion is cut at the first repeat.
+    """
+    children: Dict[Func, Dict[Func, float]] = defaultdict(dict)
+    for callee, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            children[caller][callee] = edge[3]
+
+    stacks: Stacks = defaultdict(float)
+
+    def visit(func: Func, path: Tuple[Func, ...], seconds: float) -> None:
+        cumulative = stats[func][3]
+        ratio = seconds / cumulative if cumulative > 0 else 0.0
+        labels = tuple(frame_label(f) for f in path)
+        own = stats[func][2] * ratio
+        if own >= MIN_TIME:
+            stacks[labels] += own
+        if len(path) >= MAX_DEPTH:
+            return
+        for child, edge_time in children.get(func, {}).items():
+            share = edge_time * ratio
+            if child in path or child not in stats or share < MIN_TIME:
+                continue
+            visit(child, path + (child,), share)
+
+    for func, (_, _, _, cumulative, callers) in stats.items():
+        if not callers:
+            visit(func, (func,), cumulative)
+    return dict(stacks)
+
+
+def merge_job(profiles: Dict[str, List[str]]) -> Stacks:
+    """All stages' stacks, each prefixed with its stage name."""
+    merged: Stacks = defaultdict(float)
+    for stage, paths in sorted(profiles.items()):
+        stats = pstats.Stats(*paths).stats  # type: ignore[attr-defined]
+        for stack, seconds in profile_stacks(stats).items():
+            merged[(stage,) + stack] += seconds
+    return dict(merged)
+
+
+def to_folded(stacks: Stacks) -> str:
+    """Folded stacks in microseconds, one per line."""
+    lines = [f"{';'.join(stack)} {int(round(seconds * 1_000_000))}"
+             for stack, seconds in sorted(stacks.items()) if seconds * 1_000_000 >= 0.5]
+    return '\n'.join(lines) + ('\n' if lines else '')
+
+
+def _tree(stacks: Stacks) -> Dict[str, Any]:
+    root: Dict[str, Any] = {'name': 'job', 'value': 0.0, 'children': {}}
+    for stack, seconds in stacks.items():
+        node = root
+        node['value'] += seconds
+        for frame in stack:
+            node = node['children'].setdefault(frame, {'name': frame, 'value': 0.0, 'children': {}})
+            node['value'] += seconds
+    return root
+
+
+def _color(name: str) -> str:
+    seed = sum(ord(c) for c in name)
+    return f"rgb({205 + seed % 50},{80 + seed * 7 % 120},{40 + seed * 3 % 50})"
+
+
+def to_svg(stacks: Stacks, title: str = 'Flame graph', width: int = 1200, frame_height: int = 16) -> str:
+    """A flame graph with the job at the bottom and each stage above it."""
+    root = _tree(stacks)
+    total = root['value'] or 1.0
+    rects: List[tuple] = []
+    depth_seen = [0]
+
+    def draw(node: Dict[str, Any], x: float, depth: int) -> None:
+        w = node['value'] / total * width
+        if w < 0.1:
+            return
+        depth_seen[0] = max(depth_seen[0], depth)
+        rects.append((depth, x, w, node['name'], node['value']))
+        child_x = x
+        for child in sorted(node['children'].values(), key=lambda n: n['name']):
+            draw(child, child_x, depth + 1)
+            child_x += child['value'] / total * width
+
+    draw(root, 0.0, 0)
+    top = 24
+    height = top + (depth_seen[0] + 1) * frame_height + 4
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+           f'font-family="monospace" font-size="11">',
+           f'<text x="4" y="16" font-size="14">{html.escape(title)} ({total * 1000:.1f} ms)</text>']
+    for depth, x, w, name, value in rects:
+        y = height - (depth + 1) * frame_height - 2
+        label = html.escape(name)
+        tip = f"{label} ({value * 1000:.2f} ms, {value / total * 100:.1f}%)"
+        chars = int(w / 7)
+        text = label if len(name) <= chars else html.escape(name[:max(chars - 2, 0)]) + '..'
+        out.append(f'<g><title>{tip}</title><rect x="{x:.2f}" y="{y}" width="{w:.2f}" '
+                   f'height="{frame_height - 1}" fill="{_color(name)}"/>'
+                   + (f'<text x="{x + 3:.2f}" y="{y + frame_height - 4}">{text}</text>' if chars >= 3 else '')
+                   + '</g>')
+    out.append('</svg>')
+    return '\n'.join(out) + '\n'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Merge a job's stage profiles into one flame graph.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--dir', help='local copy of profiles/<jobId>/ (one directory per stage)')
+    source.add_argument('--bucket', help='resume bucket to read profiles/<jobId>/ from (needs --job)')
+    parser.add_argument('--job', help='jobId of the profiled execution')
+    parser.add_argument('--svg', help='write the flame graph to this SVG file')
+    parser.add_argument('--folded', help='write folded stacks to this file')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.dir
+        if args.bucket:
+            if not args.job:
+                parser.error('--bucket needs --job')
+            directory = download_job(args.bucket, args.job, scratch)
+        profiles = load_profiles(directory)
+        if not profiles:
+            print(f"No .prof files under {directory}", file=sys.stderr)
+            return 1
+        memory = load_memory(directory)
+        stacks = merge_job(profiles)
+
+    print(f"{'stage':<18} {'profiles':>8} {'profiled ms':>12} {'wall ms':>10} {'peak KB':>10}")
+    for stage in sorted(profiles):
+        profiled_ms = sum(s for stack, s in stacks.items() if stack[0] == stage) * 1000
+        wall_ms = sum(m.get('wallMs', 0) for m in memory.get(stage, []))
+        peak_kb = max((m.get('peakKb', 0) for m in memory.get(stage, [])), default=0)
+        print(f"{stage:<18} {len(profiles[stage]):>8} {profiled_ms:>12.1f} {wall_ms:>10.1f} {peak_kb:>10.1f}")
+
+    if args.folded:
+        with open(args.folded, 'w') as f:
+            f.write(to_folded(stacks))
+    if args.svg:
+        with open(args.svg, 'w') as f:
+            f.write(to_svg(stacks, title=f"job {args.job or os.path.basename(os.path.normpath(directory))}"))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,840 @@
+"""
+Concurrent end-to-end load test for ResumeTailorWorkflow.
+
+simple-test.py runs one workflow and polls it. This driver submits N
+workflows at a fixed arrival rate. It then reports throughput,
+p50/p95/p99 latencies (end to end and per stage), throttles by source and
+failure causes, so a large run shows which limit gives way first.
+
+Targets:
+- local: the bundled state machine runs in-process with moto S3, DynamoDB
+  and SES and the fake Bedrock. The limits that shape a real run are
+  simulated:
+  - Bedrock: per-model concurrency and error profiles, and SDK retries
+    (BEDROCK_MAX_ATTEMPTS);
+  - Lambda: account concurrency (--lambda-concurrency). An invocation over
+    the limit fails with Lambda.TooManyRequestsException, as Step
+    Functions reports it;
+  - DynamoDB: a write-capacity token bucket (--ddb-wcu). A put that finds
+    it empty raises ProvisionedThroughputExceededException once the
+    client's retries run out.
+  Warm containers are simulated too. An invocation with no idle container
+  of its function pays --cold-start-ms, and --topology router puts every
+  stage behind one function (functions/router.py), so the two topologies'
+  cold-start counts and p95 latency can be compared.
+  Waits are scaled by --time-scale, and reported latencies are scaled
+  back to simulated time. Handler CPU time is not scaled, so keep the
+  scale well above 0 when CPU matters.
+- aws: the deployed stack, found from the CloudFormation outputs exactly as
+  simple-test.py finds it. Stage timings and failures are read from each
+  execution's history.
+Both targets report the largest input or output of each state, against the
+256 KB Step Functions limit.
+
+Usage:
+    cd lambda
+    python -m devtools.load_test -n 500 --rate 5                  # local, OPTIMIZED models
+    python -m devtools.load_test -n 200 --rates 1,2,5,10          # sweep to find the knee
+    python -m devtools.load_test -n 300 --rate 2 --topology both  # per-function vs router
+    python -m devtools.load_test --target aws -n 50 --rate 0.5 --json run.json
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from devtools.state_machine import (
+    DEFAULT_DEFINITION, PAYLOAD_LIMIT_BYTES, LocalStateMachine, StatesError, import_handler, load_definition,
+    module_for_function,
+)
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MODEL_CONFIG = os.path.join(REPO_ROOT, 'lib', 'model-config.ts')
+MODEL_PRICING = os.path.join(REPO_ROOT, 'lib', 'model-pricing.ts')
+DEMO_RESUME = os.path.join(REPO_ROOT, 'resumes', 'demo_resume.md')
+DEMO_JOB = os.path.join(REPO_ROOT, 'resumes', 'demo_job_description.md')
+
+LOCAL_BUCKET = 'resume-tailor-load-test'
+LOCAL_TABLE = 'ResumeTailorResults-load-test'
+SENDER = 'loadtest@example.com'
+USER_ID = 'load-test-user'
+
+# model-config.ts key -> handler module
+STAGE_MODULES = {
+    'parseJob': 'parse_job',
+    'analyzeResume': 'analyze_resume',
+    'generateResume': 'generate_resume',
+    'atsOptimize': 'ats_optimize',
+    'coverLetter': 'cover_letter',
+    'criticalReview': 'critical_review',
+}
+
+# Error codes counted as throttling, wherever they surface
+THROTTLE_CODES = ('ThrottlingException', 'TooManyRequestsException', 'ProvisionedThroughputExceededException',
+                  'RequestLimitExceeded', 'Throttling')
+
+
+def load_model_config(mode: str, path: str = MODEL_CONFIG) -> Dict[str, str]:
+    """Handler module -> model ID for a DeploymentMode in lib/model-config.ts."""
+    with open(path) as f:
+        source = f.read()
+    block = re.search(r"\[DeploymentMode\.%s\]\s*:\s*\{(.*?)\}" % re.escape(mode), source, re.S)
+    if block is None:
+        raise ValueError(f"Deployment mode {mode} not found in {path}")
+    models = dict(re.findall(r"(\w+)\s*:\s*'([^']+)'", block.group(1)))
+    return {STAGE_MODULES[key]: model for key, model in models.items() if key in STAGE_MODULES}
+
+
+def load_model_prices(path: str = MODEL_PRICING) -> Dict[str, Dict[str, float]]:
+    """MODEL_PRICING in lib/model-pricing.ts, in the form save_results reads from MODEL_PRICES."""
+    with open(path) as f:
+        source = f.read()
+    return {
+        model: {name: float(value) for name, value in re.findall(r"(\w+)\s*:\s*([\d.]+)", fields)}
+        for model, fields in re.findall(r"'([^']+)'\s*:\s*\{(.*?)\}", source, re.S)
+    }
+
+
+def _percentiles(values: List[float]) -> Dict[str, Optional[float]]:
+    ordered = sorted(values)
+
+    def pct(p: float) -> Optional[float]:
+        if not ordered:
+            return None
+        return round(ordered[min(len(ordered) - 1, int(math.ceil(p / 100 * len(ordered))) - 1)], 1)
+
+    return {'count': len(ordered), 'p50': pct(50), 'p95': pct(95), 'p99': pct(99),
+            'max': round(ordered[-1], 1) if ordered else None}
+
+
+def _is_throttle(code: str) -> bool:
+    return any(t in (code or '') for t in THROTTLE_CODES)
+
+
+@dataclass
+class ExecutionSample:
+    """What one workflow run contributes to the report. Times in simulated ms."""
+    name: str
+    status: str
+    submitted_ms: float = 0.0
+    duration_ms: float = 0.0
+    stages: Dict[str, float] = field(default_factory=dict)
+    stage_errors: List[Tuple[str, str]] = field(default_factory=list)
+    error: Optional[str] = None
+    cause: Optional[str] = None
+    # Largest input or output of each state, in bytes
+    payload_bytes: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class LoadReport:
+    """Aggregated results of one load run."""
+    target: str
+    executions: int
+    rate_per_s: float
+    wall_s: float = 0.0
+    samples: List[ExecutionSample] = field(default_factory=list)
+    topology: Optional[str] = None
+    throttles: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    peak_in_flight: Dict[str, int] = field(default_factory=dict)
+    cold_starts: Dict[str, int] = field(default_factory=dict)
+    bedrock: Dict[str, Any] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        succeeded = [s for s in self.samples if s.status == 'SUCCEEDED']
+        span_ms = max((s.submitted_ms + s.duration_ms for s in self.samples), default=0.0)
+        stages: Dict[str, List[float]] = defaultdict(list)
+        payloads: Dict[str, int] = defaultdict(int)
+        for sample in self.samples:
+            for name, duration in sample.stages.items():
+                stages[name].append(duration)
+            for name, size in sample.payload_bytes.items():
+                payloads[name] = max(payloads[name], size)
+        causes = Counter(f"{s.error}: {(s.cause or '')[:120]}" for s in self.samples if s.status != 'SUCCEEDED')
+        stage_errors = Counter(f"{stage}: {message[:120]}" for s in self.samples for stage, message in s.stage_errors)
+        return {
+            'target': self.target,
+            'topology': self.topology,
+            'submitted': len(self.samples),
+            'succeeded': len(succeeded),
+            'failed': len(self.samples) - len(succeeded),
+            'degraded': sum(1 for s in succeeded if s.stage_errors),
+            'arrivalRatePerS': self.rate_per_s,
+            'throughputPerMin': round(len(succeeded) / (span_ms / 60000), 2) if span_ms else 0.0,
+            'endToEndMs': _percentiles([s.duration_ms for s in succeeded]),
+            'stagesMs': {name: _percentiles(values) for name, values in stages.items()},
+            'payloadBytes': dict(payloads),
+            'throttles': self.throttles,
+            'peakInFlight': self.peak_in_flight,
+            'coldStarts': self.cold_starts,
+            'failureCauses': dict(causes.most_common()),
+            'stageErrors': dict(stage_errors.most_common()),
+            'bedrock': self.bedrock,
+            'bottleneck': self.bottleneck(),
+            'wallSeconds': round(self.wall_s, 1),
+        }
+
+    def bottleneck(self) -> Optional[str]:
+        """The throttle source with the most events, if any."""
+        totals = {source: sum(counts.values()) for source, counts in self.throttles.items()}
+        totals = {source: count for source, count in totals.items() if count}
+        return max(totals, key=totals.get) if totals else None
+
+
+def format_report(summary: Dict[str, Any]) -> str:
+    """Human-readable load report."""
+    def row(name: str, p: Dict[str, Any]) -> str:
+        cells = ''.join(f"{p[k]:>10.0f}" if p[k] is not None else f"{'-':>10}" for k in ('p50', 'p95', 'p99', 'max'))
+        return f"  {name:<26}{p['count']:>7}{cells}"
+
+    target = summary['target'] + (f" ({summary['topology']})" if summary.get('topology') else '')
+    lines = [
+        f"{target}: {summary['submitted']} submitted at {summary['arrivalRatePerS']}/s, "
+        f"{summary['succeeded']} succeeded, {summary['failed']} failed, {summary['degraded']} with stage errors",
+        f"throughput {summary['throughputPerMin']}/min (wall {summary['wallSeconds']}s)",
+        '',
+        f"  {'latency ms':<26}{'n':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}",
+        row('end to end', summary['endToEndMs']),
+    ]
+    lines += [row(name, p) for name, p in summary['stagesMs'].items()]
+    if summary.get('payloadBytes'):
+        lines.append('')
+        lines.append(f"  {'max payload bytes':<26}{'bytes':>10}{'of limit':>10}")
+        for name, size in sorted(summary['payloadBytes'].items(), key=lambda item: -item[1]):
+            lines.append(f"  {name:<26}{size:>10}{size / PAYLOAD_LIMIT_BYTES:>10.0%}")
+    lines.append('')
+    lines.append('throttles:')
+    for source, counts in summary['throttles'].items():
+        detail = ', '.join(f"{k} {v}" for k, v in sorted(counts.items())) or 'none'
+        lines.append(f"  {source:<10} {sum(counts.values()):>6}  {detail}")
+    if summary['peakInFlight']:
+        lines.append('peak in flight: ' + ', '.join(f"{k} {v}" for k, v in summary['peakInFlight'].items()))
+    if summary.get('coldStarts'):
+        cold = summary['coldStarts']
+        lines.append(f"cold starts: {sum(cold.values())} (" + ', '.join(f"{k} {v}" for k, v in cold.items()) + ')')
+    for title, key in (('failure causes', 'failureCauses'), ('stage errors', 'stageErrors')):
+        if summary[key]:
+            lines.append(f"{title}:")
+            lines += [f"  {count:>6}  {cause}" for cause, count in summary[key].items()]
+    lines.append(f"bottleneck: {summary['bottleneck'] or 'none observed'}")
+    return '\n'.join(lines)
+
+
+def format_sweep(summaries: List[Dict[str, Any]]) -> str:
+    """One line per run: rates and topologies side by side."""
+    lines = [f"{'rate/s':>8} {'topology':<13}{'ok':>6} {'failed':>6} {'thru/min':>9} {'e2e p95 ms':>11} "
+             f"{'cold':>6} {'bedrock':>8} {'lambda':>7} {'dynamodb':>9}  bottleneck"]
+    for s in summaries:
+        throttles = {k: sum(v.values()) for k, v in s['throttles'].items()}
+        p95 = s['endToEndMs']['p95']
+        lines.append(f"{s['arrivalRatePerS']:>8} {s.get('topology') or '-':<13}{s['succeeded']:>6} {s['failed']:>6} "
+                     f"{s['throughputPerMin']:>9} {f'{p95:.0f}' if p95 is not None else '-':>11} "
+                     f"{sum(s.get('coldStarts', {}).values()):>6} {throttles.get('bedrock', 0):>8} "
+                     f"{throttles.get('lambda', 0):>7} {throttles.get('dynamodb', 0):>9}  {s['bottleneck'] or '-'}")
+    return '\n'.join(lines)
+
+
+def read_inputs(resume_path: Optional[str], job_path: Optional[str]) -> Tuple[str, str]:
+    """Resume and job description: given files, else simple-test.py's demo files, else generated text."""
+    from benchmarks.workloads import job_description, resume
+
+    def read(path: Optional[str], default: str, fallback: Callable[[], str]) -> str:
+        path = path or default
+        if os.path.exists(path):
+            with open(path) as f:
+                return f.read()
+        if path != default:
+            raise FileNotFoundError(path)
+        return fallback()
+
+    return (read(resume_path, DEMO_RESUME, lambda: resume(0)),
+            read(job_path, DEMO_JOB, lambda: job_description(12_000)))
+
+
+def application(index: int, run_ms: int, job: str, resume_key: str) -> Dict[str, Any]:
+    """Execution input for the index-th application, shaped like simple-test.py's."""
+    # save_results takes the item's sort key from the digits after 'job-'
+    return {
+        'jobId': f"job-{run_ms + index}",
+        'userId': USER_ID,
+        'jobDescription': f"{job}\n\nRequisition {index}",
+        'resumeS3Keys': [resume_key],
+        'userEmail': SENDER,
+    }
+
+
+# --- local target: simulated limits ---
+
+class LambdaConcurrency:
+    """Account-level concurrent executions; invocations over the limit are rejected."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.peak = 0
+        self.throttles: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def wrap(self, module_name: str, handler: Callable) -> Callable:
+        def invoke(event: Dict[str, Any], context: Any) -> Any:
+            with self._lock:
+                if self.limit and self.in_flight >= self.limit:
+                    self.throttles[module_name] += 1
+                    raise StatesError('Lambda.TooManyRequestsException', 'Rate Exceeded.')
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+            try:
+                return handler(event, context)
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+        return invoke
+
+
+class WriteCapacity:
+    """Token bucket of DynamoDB write capacity units, refilled in simulated time."""
+
+    def __init__(self, wcu_per_second: float, time_scale: float, max_attempts: int = 3,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.rate = wcu_per_second
+        self.time_scale = time_scale
+        self.max_attempts = max_attempts
+        self.sleep = sleep
+        self.tokens = wcu_per_second
+        self.throttles: Counter = Counter()
+        self.consumed = 0
+        self._updated = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _take(self, units: int) -> bool:
+        if not self.rate or self.time_scale <= 0:
+            return True
+        with self._lock:
+            now = time.perf_counter()
+            elapsed = (now - self._updated) / self.time_scale
+            self.tokens = min(self.rate, self.tokens + elapsed * self.rate)
+            self._updated = now
+            if self.tokens < units:
+                return False
+            self.tokens -= units
+            self.consumed += units
+            return True
+
+    def write(self, table_name: str, operation: str, units: int, call: Callable[[], Any]) -> Any:
+        for attempt in range(self.max_attempts):
+            if self._take(units):
+                return call()
+            self.throttles[table_name] += 1
+            if attempt + 1 < self.max_attempts:
+                # Standard-mode retry backoff, in simulated seconds
+                self.sleep(min(20.0, 0.05 * 2 ** attempt) * self.time_scale)
+        raise ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException',
+                                     'Message': 'The level of configured provisioned throughput for the table '
+                                                'was exceeded.'},
+                           'ResponseMetadata': {'HTTPStatusCode': 400}}, operation)
+
+
+class ContainerFleet:
+    """Warm execution environments per function.
+
+    An invocation reuses an idle container of its function, or starts a new
+    one and pays the cold start first. Containers idle for longer than
+    idle_ttl_s (simulated) are reclaimed.
+    """
+
+    def __init__(self, cold_start_ms: float, idle_ttl_s: float, time_scale: float,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.cold_start_ms = cold_start_ms
+        self.idle_ttl_s = idle_ttl_s
+        self.time_scale = time_scale
+        self.sleep = sleep
+        self.cold_starts: Counter = Counter()
+        self._idle: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def wrap(self, function_name: str, handler: Callable) -> Callable:
+        def invoke(event: Dict[str, Any], context: Any) -> Any:
+            with self._lock:
+                now = time.perf_counter()
+                ttl = self.idle_ttl_s * self.time_scale if self.time_scale > 0 else float('inf')
+                idle = [t for t in self._idle[function_name] if now - t <= ttl]
+                cold = not idle
+                if cold:
+                    self.cold_starts[function_name] += 1
+                else:
+                    idle.pop()
+                self._idle[function_name] = idle
+            if cold and self.time_scale > 0:
+                self.sleep(self.cold_start_ms / 1000 * self.time_scale)
+            try:
+                return handler(event, context)
+            finally:
+                with self._lock:
+                    self._idle[function_name].append(time.perf_counter())
+        return invoke
+
+
+def _routed(stage: str) -> Callable:
+    """Call a stage through the router handler, as topology=router deploys it."""
+    import router
+
+    def invoke(event: Dict[str, Any], context: Any) -> Any:
+        return router.handler({'stage': stage, 'input': event}, context)
+    return invoke
+
+
+def write_units(item: Dict[str, Any], indexes: int = 1) -> int:
+    """WCUs for writing item: one per started KB, again for each index it projects into."""
+    size = len(json.dumps(item, default=str).encode())
+    return max(1, math.ceil(size / 1024)) * (1 + indexes)
+
+
+class _ThrottledTable:
+    def __init__(self, table: Any, capacity: WriteCapacity):
+        self._table = table
+        self._capacity = capacity
+
+    def put_item(self, **kwargs) -> Any:
+        return self._capacity.write(self._table.name, 'PutItem', write_units(kwargs.get('Item', {})),
+                                    lambda: self._table.put_item(**kwargs))
+
+    def update_item(self, **kwargs) -> Any:
+        return self._capacity.write(self._table.name, 'UpdateItem', 1, lambda: self._table.update_item(**kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._table, name)
+
+
+class ThrottledDynamoDB:
+    """DynamoDB resource whose tables draw writes from a shared WriteCapacity."""
+
+    def __init__(self, resource: Any, capacity: WriteCapacity):
+        self._resource = resource
+        self._capacity = capacity
+
+    def Table(self, name: str) -> _ThrottledTable:  # noqa: N802 - boto3 resource API
+        return _ThrottledTable(self._resource.Table(name), self._capacity)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resource, name)
+
+
+@contextmanager
+def stage_models(models: Dict[str, str]) -> Iterator[Callable[[str, Callable], Callable]]:
+    """Give each handler the MODEL_ID its function has in the stack.
+
+    All handlers share one process environment here, so the model is kept
+    per thread and aws_runtime.resolve_model_id is pointed at it.
+    """
+    import aws_runtime
+
+    current = threading.local()
+    resolve = aws_runtime.resolve_model_id
+
+    def resolve_for_stage(model_id: Optional[str] = None) -> str:
+        return model_id or getattr(current, 'model_id', None) or resolve(None)
+
+    def bind(module_name: str, handler: Callable) -> Callable:
+        model_id = models.get(module_name)
+
+        def invoke(event: Dict[str, Any], context: Any) -> Any:
+            current.model_id = model_id
+            try:
+                return handler(event, context)
+            finally:
+                current.model_id = None
+        return invoke
+
+    with mock.patch.object(aws_runtime, 'resolve_model_id', resolve_for_stage):
+        yield bind
+
+
+def local_stack() -> Tuple[Any, Any, Any]:
+    """moto bucket, results table and verified SES sender, as the stack creates them."""
+    import boto3
+
+    s3 = boto3.client('s3', region_name='us-east-1')
+    s3.create_bucket(Bucket=LOCAL_BUCKET)
+    dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+    # Same keys and index as ResultsTable in lib/resume-tailor-stack.ts
+    dynamodb.create_table(
+        TableName=LOCAL_TABLE,
+        KeySchema=[{'AttributeName': 'jobId', 'KeyType': 'HASH'}, {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}],
+        AttributeDefinitions=[{'AttributeName': 'jobId', 'AttributeType': 'S'},
+                              {'AttributeName': 'timestamp', 'AttributeType': 'N'},
+                              {'AttributeName': 'userId', 'AttributeType': 'S'}],
+        GlobalSecondaryIndexes=[{'IndexName': 'UserIndex',
+                                 'KeySchema': [{'AttributeName': 'userId', 'KeyType': 'HASH'},
+                                               {'AttributeName': 'timestamp', 'KeyType': 'RANGE'}],
+                                 'Projection': {'ProjectionType': 'ALL'}}],
+        BillingMode='PAY_PER_REQUEST',
+    )
+    ses = boto3.client('ses', region_name='us-east-1')
+    ses.verify_email_identity(EmailAddress=SENDER)
+    return s3, dynamodb, ses
+
+
+def _stage_failure(result: Any) -> Optional[str]:
+    if isinstance(result, dict) and result.get('statusCode', 200) >= 400:
+        return str(result.get('error') or result.get('message') or result.get('statusCode'))
+    return None
+
+
+def run_local(executions: int, rate: float, *, mode: str = 'OPTIMIZED', time_scale: float = 0.05,
+              lambda_concurrency: int = 1000, ddb_wcu: float = 4000, seed: int = 0, error_scale: float = 1.0,
+              topology: str = 'per-function', cold_start_ms: float = 800, idle_ttl_s: float = 600,
+              definition: str = DEFAULT_DEFINITION, resume_text: Optional[str] = None,
+              job_text: Optional[str] = None, sleep: Callable[[float], None] = time.sleep) -> LoadReport:
+    """Run executions workflows against moto and the fake Bedrock, arriving at rate per simulated second."""
+    from moto import mock_aws
+    from devtools.clients import patch_clients
+    from devtools.fake_bedrock import FakeBedrockRuntime
+
+    if resume_text is None or job_text is None:
+        resume_text, job_text = read_inputs(None, None)
+    models = load_model_config(mode)
+    env = {'BUCKET_NAME': LOCAL_BUCKET, 'TABLE_NAME': LOCAL_TABLE, 'MODEL_ID': models.get('parse_job', ''),
+           'LLM_CACHE_ENABLED': 'false', 'AWS_DEFAULT_REGION': 'us-east-1',
+           'MODEL_PRICES': json.dumps(load_model_prices())}
+
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.dict(os.environ, env))
+        stack.enter_context(mock_aws())
+        s3, dynamodb, ses = local_stack()
+        resume_key = f"uploads/{USER_ID}/demo_resume.md"
+        s3.put_object(Bucket=LOCAL_BUCKET, Key=resume_key, Body=resume_text.encode())
+
+        fake = FakeBedrockRuntime(seed=seed, time_scale=time_scale, error_scale=error_scale,
+                                  max_attempts=int(os.environ.get('BEDROCK_MAX_ATTEMPTS', 4)), sleep=sleep)
+        capacity = WriteCapacity(ddb_wcu, time_scale, int(os.environ.get('AWS_MAX_ATTEMPTS', 3)), sleep)
+        lambdas = LambdaConcurrency(lambda_concurrency)
+        fleet = ContainerFleet(cold_start_ms, idle_ttl_s, time_scale, sleep)
+        machine_definition = load_definition(definition)
+        module_names = sorted({module_for_function(ref) for ref in _function_refs(machine_definition)})
+        root_level = logging.getLogger().level
+        raw_handlers = {name: import_handler(name) for name in module_names}
+        # Handlers turn root logging up to INFO on import; per-call logs would drown the report
+        logging.getLogger().setLevel(root_level)
+        bind_model = stack.enter_context(stage_models(models))
+        # Fresh clients: handler globals bound outside mock_aws would go to AWS
+        stack.enter_context(patch_clients(bedrock=fake, s3=s3, ses=ses,
+                                          dynamodb=ThrottledDynamoDB(dynamodb, capacity)))
+
+        if topology == 'router':
+            handlers = {name: fleet.wrap('router', lambdas.wrap(name, bind_model(name, _routed(name))))
+                        for name in raw_handlers}
+        else:
+            handlers = {name: fleet.wrap(name, lambdas.wrap(name, bind_model(name, handler)))
+                        for name, handler in raw_handlers.items()}
+        machine = _LoadStateMachine(machine_definition, time_scale=time_scale, sleep=sleep, handlers=handlers)
+        scale = time_scale if time_scale > 0 else 1.0
+        run_ms = int(time.time() * 1000)
+        started = time.perf_counter()
+
+        def run_one(index: int) -> ExecutionSample:
+            name = f"load-{index:04d}"
+            submitted_ms = (time.perf_counter() - started) * 1000 / scale
+            result = machine.execute(application(index, run_ms, job_text, resume_key), name=name)
+            return ExecutionSample(
+                name=name, status=result.status, submitted_ms=submitted_ms, duration_ms=result.duration_ms / scale,
+                stages={t.name: t.duration_ms / scale for t in result.timings if t.type == 'Task'},
+                stage_errors=machine.stage_errors.pop(name, []), error=result.error, cause=result.cause,
+                payload_bytes={t.name: max(t.input_bytes, t.output_bytes) for t in result.timings})
+
+        samples = _drive(run_one, executions, rate, time_scale, sleep)
+        wall_s = time.perf_counter() - started
+
+    report = LoadReport(target='local', executions=executions, rate_per_s=rate, wall_s=wall_s, samples=samples,
+                        topology=topology, cold_starts=dict(fleet.cold_starts))
+    bedrock = fake.summary()
+    report.bedrock = bedrock
+    report.throttles = {
+        'bedrock': {model: stats['errors'].get('ThrottlingException', 0) for model, stats in bedrock.items()},
+        'lambda': dict(lambdas.throttles),
+        'dynamodb': dict(capacity.throttles),
+    }
+    bedrock_retries = Counter()
+    for record in fake.calls:
+        bedrock_retries[record.model_id] += record.retry_attempts
+    report.bedrock = {model: dict(stats, retries=bedrock_retries[model]) for model, stats in bedrock.items()}
+    report.peak_in_flight = {'lambda': lambdas.peak}
+    return report
+
+
+class _LoadStateMachine(LocalStateMachine):
+    """LocalStateMachine that also notes task outputs carrying an error statusCode.
+
+    Handlers report most failures in their output rather than by raising,
+    so the workflow succeeds with a degraded result; these are kept per
+    execution name.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.stage_errors: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+        self._current = threading.local()
+
+    def _state(self, name: str, state: Dict[str, Any], data: Any, context: Dict[str, Any], *args: Any):
+        # Tasks run synchronously on the thread that entered their state
+        self._current.execution = context['Execution']['Name']
+        return super()._state(name, state, data, context, *args)
+
+    def _task(self, name: str, state: Dict[str, Any], payload: Any) -> Any:
+        output = super()._task(name, state, payload)
+        failure = _stage_failure(output.get('Payload', output) if isinstance(output, dict) else None)
+        if failure:
+            with self._lock:
+                self.stage_errors[self._current.execution].append((name, failure))
+        return output
+
+
+def _function_refs(definition: Dict[str, Any]) -> Iterator[str]:
+    for state in definition['States'].values():
+        if state['Type'] == 'Task':
+            params = state.get('Parameters', {})
+            yield params.get('FunctionName', state['Resource'])
+        for branch in state.get('Branches', []):
+            yield from _function_refs(branch)
+
+
+def _drive(run_one: Callable[[int], ExecutionSample], executions: int, rate: float, time_scale: float,
+           sleep: Callable[[float], None]) -> List[ExecutionSample]:
+    """Start executions at rate per simulated second and wait for all of them."""
+    interval = (1.0 / rate) * time_scale if rate > 0 and time_scale > 0 else 0.0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, executions), thread_name_prefix='load') as pool:
+        futures = []
+        for index in range(executions):
+            delay = started + index * interval - time.perf_counter()
+            if delay > 0:
+                sleep(delay)
+            futures.append(pool.submit(run_one, index))
+        return [future.result() for future in futures]
+
+
+# --- aws target ---
+
+def stack_outputs(cfn: Any, stack_name: str) -> Tuple[str, str]:
+    """Bucket name and state machine ARN from the stack outputs, as simple-test.py reads them."""
+    response = cfn.describe_stacks(StackName=stack_name)
+    outputs = {o['OutputKey']: o['OutputValue'] for o in response['Stacks'][0]['Outputs']}
+    bucket, state_machine_arn = outputs.get('ResumeBucketName'), outputs.get('StateMachineArn')
+    if not bucket or not state_machine_arn:
+        raise ValueError(f"Stack {stack_name} is missing ResumeBucketName or StateMachineArn outputs")
+    return bucket, state_machine_arn
+
+
+def execution_history(sfn: Any, execution_arn: str) -> List[Dict[str, Any]]:
+    events, kwargs = [], {'executionArn': execution_arn, 'maxResults': 1000}
+    while True:
+        page = sfn.get_execution_history(**kwargs)
+        events += page['events']
+        if not page.get('nextToken'):
+            return events
+        kwargs['nextToken'] = page['nextToken']
+
+
+def sample_from_history(name: str, status: str, submitted_ms: float,
+                        events: List[Dict[str, Any]]) -> Tuple[ExecutionSample, Counter]:
+    """Stage timings, stage errors, throttles and the failure cause from an execution history."""
+    by_id = {e['id']: e for e in events}
+    entered: Dict[str, Any] = {}
+    sample = ExecutionSample(name=name, status=status, submitted_ms=submitted_ms)
+    throttles: Counter = Counter()
+
+    def state_of(event: Dict[str, Any]) -> Optional[str]:
+        while event is not None:
+            if event['type'] == 'TaskStateEntered':
+                return event['stateEnteredEventDetails']['name']
+            event = by_id.get(event.get('previousEventId'))
+        return None
+
+    for event in events:
+        kind = event['type']
+        details = event.get('stateEnteredEventDetails') or event.get('stateExitedEventDetails') or {}
+        payload = details.get('input', details.get('output'))
+        if payload is not None:
+            size = len(payload.encode('utf-8'))
+            sample.payload_bytes[details['name']] = max(sample.payload_bytes.get(details['name'], 0), size)
+        if kind == 'TaskStateEntered':
+            entered[event['stateEnteredEventDetails']['name']] = event['timestamp']
+        elif kind == 'TaskStateExited':
+            state = event['stateExitedEventDetails']['name']
+            if state in entered:
+                sample.stages[state] = (event['timestamp'] - entered[state]).total_seconds() * 1000
+        elif kind in ('TaskFailed', 'TaskTimedOut'):
+            details = event.get('taskFailedEventDetails') or event.get('taskTimedOutEventDetails') or {}
+            error = details.get('error', kind)
+            if _is_throttle(error):
+                throttles['lambda' if error.startswith('Lambda.') else 'states'] += 1
+            sample.stage_errors.append((state_of(event) or '?', f"{error}: {details.get('cause', '')[:200]}"))
+        elif kind == 'TaskSucceeded':
+            output = json.loads(event['taskSucceededEventDetails'].get('output') or '{}')
+            failure = _stage_failure(output.get('Payload', output) if isinstance(output, dict) else None)
+            if failure:
+                sample.stage_errors.append((state_of(event) or '?', failure))
+                if _is_throttle(failure):
+                    throttles['dynamodb' if 'ProvisionedThroughput' in failure else 'bedrock'] += 1
+        elif kind in ('ExecutionFailed', 'ExecutionTimedOut', 'ExecutionAborted'):
+            details = next((v for k, v in event.items() if k.endswith('EventDetails')), {})
+            sample.error, sample.cause = details.get('error', kind), details.get('cause', '')
+    if events:
+        sample.duration_ms = (events[-1]['timestamp'] - events[0]['timestamp']).total_seconds() * 1000
+    return sample, throttles
+
+
+def run_aws(executions: int, rate: float, *, stack_name: str = 'ResumeTailorStack', region: str = 'us-east-1',
+            resume_text: Optional[str] = None, job_text: Optional[str] = None, poll_seconds: float = 5.0,
+            timeout_seconds: float = 3600) -> LoadReport:
+    """Run executions workflows on the deployed stack, started at rate per second."""
+    import boto3
+    from botocore.config import Config
+
+    if resume_text is None or job_text is None:
+        resume_text, job_text = read_inputs(None, None)
+    config = Config(retries={'mode': 'standard', 'max_attempts': 10})
+    s3 = boto3.client('s3', region_name=region)
+    sfn = boto3.client('stepfunctions', region_name=region, config=config)
+    bucket, state_machine_arn = stack_outputs(boto3.client('cloudformation', region_name=region), stack_name)
+
+    resume_key = f"uploads/{USER_ID}/demo_resume.md"
+    s3.put_object(Bucket=bucket, Key=resume_key, Body=resume_text.encode('utf-8'), ContentType='text/markdown')
+
+    run_ms = int(time.time() * 1000)
+    run_id = uuid.uuid4().hex[:8]
+    started = time.perf_counter()
+    pending: Dict[str, Tuple[str, float]] = {}
+    start_throttles = 0
+    for index in range(executions):
+        delay = started + (index / rate if rate > 0 else 0) - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        name = f"load-{run_id}-{index:04d}"
+        execution_input = application(index, run_ms, job_text, resume_key)
+        while True:
+            try:
+                response = sfn.start_execution(stateMachineArn=state_machine_arn, name=name,
+                                               input=json.dumps(execution_input))
+                break
+            except ClientError as e:
+                if not _is_throttle(e.response['Error']['Code']):
+                    raise
+                start_throttles += 1
+                time.sleep(1)
+        pending[response['executionArn']] = (name, (time.perf_counter() - started) * 1000)
+    logger.info("Started %d executions in %.1fs", executions, time.perf_counter() - started)
+
+    samples: List[ExecutionSample] = []
+    throttles: Counter = Counter()
+    deadline = time.perf_counter() + timeout_seconds
+    while pending and time.perf_counter() < deadline:
+        for arn in list(pending):
+            status = sfn.describe_execution(executionArn=arn)['status']
+            if status == 'RUNNING':
+                continue
+            name, submitted_ms = pending.pop(arn)
+            sample, sample_throttles = sample_from_history(name, status, submitted_ms, execution_history(sfn, arn))
+            samples.append(sample)
+            throttles.update(sample_throttles)
+        if pending:
+            logger.info("%d executions still running", len(pending))
+            time.sleep(poll_seconds)
+    samples += [ExecutionSample(name=name, status='RUNNING', submitted_ms=submitted_ms, error='LoadTest.Timeout',
+                                cause=f"still running after {timeout_seconds}s")
+                for name, submitted_ms in pending.values()]
+
+    report = LoadReport(target='aws', executions=executions, rate_per_s=rate,
+                        wall_s=time.perf_counter() - started, samples=samples)
+    report.throttles = {
+        'bedrock': {'stage errors': throttles['bedrock']},
+        'lambda': {'invocations': throttles['lambda']},
+        'dynamodb': {'stage errors': throttles['dynamodb']},
+        'states': {'StartExecution': start_throttles, 'tasks': throttles['states']},
+    }
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Concurrent load test for ResumeTailorWorkflow.')
+    parser.add_argument('--target', choices=('local', 'aws'), default='local')
+    parser.add_argument('-n', '--executions', type=int, default=100, help='workflows to submit (default: 100)')
+    parser.add_argument('--rate', type=float, default=2.0, help='arrivals per second (default: 2)')
+    parser.add_argument('--rates', help='comma-separated arrival rates to sweep, one run each')
+    parser.add_argument('--resume', help=f"resume file (default: {os.path.relpath(DEMO_RESUME, REPO_ROOT)})")
+    parser.add_argument('--job', help=f"job description file (default: {os.path.relpath(DEMO_JOB, REPO_ROOT)})")
+    parser.add_argument('--json', help='write the report(s) to this JSON file')
+    local = parser.add_argument_group('local target')
+    local.add_argument('--mode', default='OPTIMIZED', help='DeploymentMode in lib/model-config.ts (default: OPTIMIZED)')
+    local.add_argument('--time-scale', type=float, default=0.05,
+                       help='wall seconds per simulated second (default: 0.05)')
+    local.add_argument('--lambda-concurrency', type=int, default=1000,
+                       help='account concurrent executions, 0 = unlimited (default: 1000)')
+    local.add_argument('--ddb-wcu', type=float, default=4000,
+                       help='table write capacity units per second, 0 = unlimited (default: 4000, on-demand start)')
+    local.add_argument('--error-scale', type=float, default=1.0, help='multiplier for Bedrock error rates')
+    local.add_argument('--seed', type=int, default=0)
+    local.add_argument('--topology', choices=('per-function', 'router', 'both'), default='per-function',
+                       help='one function per stage, one router function, or run both (default: per-function)')
+    local.add_argument('--cold-start-ms', type=float, default=800,
+                       help='simulated cold start per new container (default: 800)')
+    local.add_argument('--idle-ttl', type=float, default=600,
+                       help='seconds an idle container stays warm (default: 600)')
+    remote = parser.add_argument_group('aws target')
+    remote.add_argument('--stack-name', default=os.environ.get('STACK_NAME', 'ResumeTailorStack'))
+    remote.add_argument('--region', default='us-east-1')
+    remote.add_argument('--poll-seconds', type=float, default=5.0)
+    parser.add_argument('--verbose', action='store_true', help='show handler logs (local target)')
+    args = parser.parse_args(argv)
+
+    # Handlers log to the root logger; this module's progress lines still get through
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL,
+                        format='%(asctime)s %(threadName)s %(levelname)s %(message)s')
+    logger.setLevel(logging.INFO)
+    resume_text, job_text = read_inputs(args.resume, args.job)
+    rates = [float(r) for r in args.rates.split(',')] if args.rates else [args.rate]
+
+    topologies = ['per-function', 'router'] if args.topology == 'both' else [args.topology]
+    if args.target == 'aws':
+        topologies = [None]  # whatever is deployed
+
+    summaries = []
+    for rate in rates:
+        for topology in topologies:
+            if args.target == 'local':
+                report = run_local(args.executions, rate, mode=args.mode, time_scale=args.time_scale,
+                                   lambda_concurrency=args.lambda_concurrency, ddb_wcu=args.ddb_wcu, seed=args.seed,
+                                   error_scale=args.error_scale, topology=topology, cold_start_ms=args.cold_start_ms,
+                                   idle_ttl_s=args.idle_ttl, resume_text=resume_text, job_text=job_text)
+            else:
+                report = run_aws(args.executions, rate, stack_name=args.stack_name, region=args.region,
+                                 resume_text=resume_text, job_text=job_text, poll_seconds=args.poll_seconds)
+            summary = report.summary()
+            summaries.append(summary)
+            print(format_report(summary))
+            print()
+    if len(summaries) > 1:
+        print(format_sweep(summaries))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summaries if len(summaries) > 1 else summaries[0], f, indent=2, default=str)
+    return 0 if all(s['failed'] == 0 for s in summaries) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,493 @@
+"""
+Replay a completed ResumeTailorWorkflow execution stage by stage.
+
+`pull` reads a deployed execution's history and rebuilds the exact event
+each Lambda stage received and the output it returned. It adds the
+function's REPORT line (duration, memory) from CloudWatch Logs and the
+S3 objects the events point at (resumes, and the claim-check documents of
+executions that ran with CLAIM_CHECK_ENABLED), scrubs PII the way cassettes
+do, and writes it all to a fixture file.
+
+`run` replays every stage of a fixture against the current handler code
+in-process. S3, DynamoDB and SES are moto, and Bedrock is a fake that
+answers with the response the stage originally got, rebuilt from its
+recorded output. Each stage is reported against the original run:
+- payload sizes in and out;
+- CPU time, next to the original's handler time (duration minus Bedrock
+  latency);
+- peak traced memory, next to the original's max memory used.
+
+CPU time is the process's, so it includes moto's share of S3 and DynamoDB
+calls. Fixtures saved under benchmarks/replays/ also run as benchmarks
+(benchmarks/test_bench_replays.py), so production payload shapes are
+checked against baselines like the synthetic workloads.
+
+Usage:
+    cd lambda
+    python -m devtools.replay pull <execution ARN or name> [--stack ResumeTailorStack] [--scrub "Jane Doe"]
+        [--out benchmarks/replays/<name>.json] [--no-logs]
+    python -m devtools.replay run benchmarks/replays/<name>.json [--stage generate_resume] [--json report.json]
+"""
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+import sys
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from unittest import mock
+
+from devtools.cassette import Scrubber
+from devtools.state_machine import LambdaContext, import_handler, module_for_function
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_VERSION = 1
+# Reference to a document a stage offloaded (functions/claim_check.py)
+CLAIM_CHECK_KEY = '$claimCheck'
+REPLAYS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'replays')
+
+# The Bedrock response each stage got, rebuilt from the stage output:
+# an output key holding it whole, or the output keys the response had
+RESPONSE_FIELDS: Dict[str, Any] = {
+    'parse_job': 'parsedJob',
+    'analyze_resume': 'analysis',
+    'generate_resume': {'tailoredResume': 'tailoredResumeMarkdown', 'changesApplied': 'changesApplied',
+                        'keywordOptimizations': 'keywordOptimizations'},
+    'ats_optimize': ('atsOptimizedResume', 'atsScore', 'optimizations', 'keywordCoverage'),
+    'cover_letter': ('coverLetter', 'tone', 'keyPoints'),
+    'critical_review': 'criticalReview',
+    'refine_resume': 'refinedResumeMarkdown',
+}
+
+
+def payload_bytes(value: Any) -> int:
+    return len(json.dumps(value, default=str).encode('utf-8')) if value is not None else 0
+
+
+def bedrock_response(module: str, output: Dict[str, Any]) -> Optional[Any]:
+    """The model response behind a stage output (dict or text), None for stages without one."""
+    fields = RESPONSE_FIELDS.get(module)
+    if fields is None or not isinstance(output, dict):
+        return None
+    if isinstance(fields, str):
+        return output.get(fields)
+    if isinstance(fields, dict):
+        return {name: output[key] for name, key in fields.items() if key in output}
+    return {key: output[key] for key in fields if key in output}
+
+
+# --- pull ---
+
+def _details(event: Dict[str, Any]) -> Dict[str, Any]:
+    return next((v for k, v in event.items() if k.endswith('EventDetails')), {})
+
+
+def _invocation(function_ref: str, payload: Any) -> tuple:
+    """(module, event), unwrapping the router's {stage, input} envelope."""
+    module = module_for_function(function_ref)
+    if module == 'router' and isinstance(payload, dict) and 'stage' in payload:
+        return payload['stage'], payload.get('input', {})
+    return module, payload
+
+
+def stage_runs(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Each Lambda task of an execution history, in the order it was scheduled
+
+    The last attempt of a state is kept (a retried state's earlier failures
+    are counted in `attempts`). Times are epoch seconds.
+    """
+    by_id = {e['id']: e for e in events}
+
+    def scheduled_for(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        while event is not None and event['type'] != 'TaskScheduled':
+            event = by_id.get(event.get('previousEventId'))
+        return event
+
+    def state_of(event: Dict[str, Any]) -> Optional[str]:
+        while event is not None and event['type'] != 'TaskStateEntered':
+            event = by_id.get(event.get('previousEventId'))
+        return event['stateEnteredEventDetails']['name'] if event else None
+
+    runs: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        kind = event['type']
+        if kind == 'TaskScheduled':
+            details = event['taskScheduledEventDetails']
+            if details.get('resourceType') != 'lambda':
+                continue
+            parameters = json.loads(details.get('parameters') or '{}')
+            function_ref = parameters.get('FunctionName', details.get('resource', ''))
+            module, stage_event = _invocation(function_ref, parameters.get('Payload', {}))
+            state = state_of(event) or module
+            previous = runs.get(state)
+            runs[state] = {
+                'state': state, 'module': module, 'function': function_ref.split(':function:')[-1].split(':')[0],
+                'event': stage_event, 'output': None, 'error': None, 'requestId': None,
+                'scheduledAt': event['timestamp'].timestamp(), 'startedAt': None, 'endedAt': None,
+                'attempts': (previous['attempts'] + 1) if previous else 1,
+            }
+        elif kind in ('TaskStarted', 'TaskSucceeded', 'TaskFailed', 'TaskTimedOut'):
+            scheduled = scheduled_for(event)
+            run = runs.get(state_of(scheduled)) if scheduled else None
+            if run is None or run['scheduledAt'] != scheduled['timestamp'].timestamp():
+                continue
+            if kind == 'TaskStarted':
+                run['startedAt'] = event['timestamp'].timestamp()
+                continue
+            run['endedAt'] = event['timestamp'].timestamp()
+            details = _details(event)
+            if kind == 'TaskSucceeded':
+                output = json.loads(details.get('output') or '{}')
+                run['output'] = output.get('Payload', output) if isinstance(output, dict) else output
+                run['requestId'] = (output.get('SdkResponseMetadata') or {}).get('RequestId') \
+                    if isinstance(output, dict) else None
+            else:
+                cause = details.get('cause', '')[:500]
+                run['error'] = f"{details.get('error', kind)}: {cause}" if cause else details.get('error', kind)
+    return sorted(runs.values(), key=lambda r: r['scheduledAt'])
+
+
+def parse_report(message: str) -> Dict[str, float]:
+    """Duration, billed duration, memory size, max memory used and init duration from a REPORT line."""
+    names = {'Duration': 'durationMs', 'Billed Duration': 'billedMs', 'Memory Size': 'memorySizeMb',
+             'Max Memory Used': 'maxMemoryMb', 'Init Duration': 'initMs'}
+    report: Dict[str, float] = {}
+    for part in message.strip().split('\t'):
+        name, _, value = part.partition(': ')
+        if name in names and value:
+            report[names[name]] = float(value.split()[0])
+    return report
+
+
+def original_metrics(run: Dict[str, Any], report: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """What the stage cost in the original execution."""
+    report = report or {}
+    duration = report.get('durationMs')
+    if duration is None and run.get('startedAt') and run.get('endedAt'):
+        duration = (run['endedAt'] - run['startedAt']) * 1000
+    usage = (run.get('output') or {}).get('usage') if isinstance(run.get('output'), dict) else None
+    bedrock_ms = float(usage.get('latencyMs', 0) or 0) if isinstance(usage, dict) else 0.0
+    return {
+        'inputBytes': payload_bytes(run.get('event')),
+        'outputBytes': payload_bytes(run.get('output')),
+        'durationMs': round(duration, 1) if duration is not None else None,
+        'bedrockMs': round(bedrock_ms, 1),
+        'handlerMs': round(duration - bedrock_ms, 1) if duration is not None else None,
+        'maxMemoryMb': report.get('maxMemoryMb'),
+        'memorySizeMb': report.get('memorySizeMb'),
+        'initMs': report.get('initMs'),
+        'source': 'report' if report else 'history',
+    }
+
+
+def fetch_report(logs: Any, function: str, request_id: str, started: float, ended: float) -> Optional[Dict[str, float]]:
+    """The invocation's REPORT line from the function's log group."""
+    try:
+        response = logs.filter_log_events(
+            logGroupName=f"/aws/lambda/{function}",
+            filterPattern=f'"REPORT RequestId: {request_id}"',
+            startTime=int((started - 60) * 1000), endTime=int((ended + 300) * 1000))
+    except Exception as e:  # logs are optional; history timings are the fallback
+        logger.warning("No REPORT line for %s %s: %s", function, request_id, str(e))
+        return None
+    for event in response.get('events', []):
+        if event['message'].startswith('REPORT'):
+            return parse_report(event['message'])
+    return None
+
+
+def referenced_keys(runs: Iterable[Dict[str, Any]]) -> List[str]:
+    """S3 keys in the stage events (fields ending in S3Key / S3Keys) and claim-check documents."""
+    keys: List[str] = []
+
+    def claim_checks(value: Any) -> None:
+        if isinstance(value, dict):
+            if isinstance(value.get(CLAIM_CHECK_KEY), str):
+                keys.append(value[CLAIM_CHECK_KEY])
+            for item in value.values():
+                claim_checks(item)
+        elif isinstance(value, list):
+            for item in value:
+                claim_checks(item)
+
+    def walk(value: Any) -> None:
+        if isinstance(value, dict):
+            for name, item in value.items():
+                if name.endswith('S3Key') and isinstance(item, str):
+                    keys.append(item)
+                elif name.endswith('S3Keys') and isinstance(item, list):
+                    keys.extend(k for k in item if isinstance(k, str))
+                else:
+                    walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+
+    for run in runs:
+        walk(run.get('event'))
+        claim_checks(run.get('event'))
+        claim_checks(run.get('output'))
+    return list(dict.fromkeys(keys))
+
+
+def resolve_claim_checks(value: Any, objects: Dict[str, str]) -> Any:
+    """A recorded payload with its claim-check references and compressed fields unpacked."""
+    from claim_check import decode, is_encoded
+
+    if isinstance(value, dict):
+        if isinstance(value.get(CLAIM_CHECK_KEY), str) and value[CLAIM_CHECK_KEY] in objects:
+            return resolve_claim_checks(json.loads(objects[value[CLAIM_CHECK_KEY]]), objects)
+        if is_encoded(value):
+            return decode(value)
+        return {key: resolve_claim_checks(item, objects) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_claim_checks(item, objects) for item in value]
+    return value
+
+
+def build_fixture(execution: Dict[str, Any], runs: List[Dict[str, Any]], objects: Dict[str, bytes],
+                  reports: Optional[Dict[str, Dict[str, float]]] = None,
+                  scrub_terms: Iterable[str] = ()) -> Dict[str, Any]:
+    """A scrubbed fixture from an execution's stage runs and the S3 objects they read."""
+    reports = reports or {}
+    scrubber = Scrubber(list(scrub_terms))
+    stages = []
+    for run in runs:
+        stages.append({
+            'state': run['state'],
+            'module': run['module'],
+            'function': run['function'],
+            'attempts': run['attempts'],
+            'event': scrubber.value(run['event']),
+            'output': scrubber.value(run['output']),
+            'error': scrubber.value(run['error']),
+            'original': original_metrics(run, reports.get(run.get('requestId') or '')),
+        })
+    texts = {}
+    for key, body in objects.items():
+        try:
+            texts[scrubber.text(key)] = scrubber.text(body.decode('utf-8'))
+        except UnicodeDecodeError:
+            logger.warning("Skipping binary object %s", key)
+    return {
+        'version': FIXTURE_VERSION,
+        'pulledAt': datetime.now(timezone.utc).isoformat(),
+        'execution': {
+            'name': execution.get('name'),
+            'status': execution.get('status'),
+            'startDate': str(execution.get('startDate', '')),
+            'stopDate': str(execution.get('stopDate', '')),
+        },
+        'input': scrubber.value(json.loads(execution['input'])) if execution.get('input') else None,
+        'objects': texts,
+        'stages': stages,
+    }
+
+
+def pull(execution: str, *, stack_name: str = 'ResumeTailorStack', region: str = 'us-east-1',
+         scrub_terms: Iterable[str] = (), with_logs: bool = True) -> Dict[str, Any]:
+    """Fixture for a deployed execution, by ARN or by name on the stack's state machine."""
+    import boto3
+
+    from devtools.load_test import execution_history, stack_outputs
+
+    bucket, state_machine_arn = stack_outputs(boto3.client('cloudformation', region_name=region), stack_name)
+    arn = execution if execution.startswith('arn:') else \
+        state_machine_arn.replace(':stateMachine:', ':execution:') + ':' + execution
+    sfn = boto3.client('stepfunctions', region_name=region)
+    described = sfn.describe_execution(executionArn=arn)
+    runs = stage_runs(execution_history(sfn, arn))
+
+    reports: Dict[str, Dict[str, float]] = {}
+    if with_logs:
+        logs = boto3.client('logs', region_name=region)
+        for run in runs:
+            if run.get('requestId'):
+                report = fetch_report(logs, run['function'], run['requestId'],
+                                      run['startedAt'] or run['scheduledAt'], run['endedAt'] or time.time())
+                if report:
+                    reports[run['requestId']] = report
+
+    s3 = boto3.client('s3', region_name=region)
+    objects = {}
+    for key in referenced_keys(runs):
+        try:
+            objects[key] = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+        except s3.exceptions.NoSuchKey:
+            # Written by a later stage of the execution; the replay writes it again
+            continue
+    return build_fixture(described, runs, objects, reports, scrub_terms)
+
+
+def save_fixture(fixture: Dict[str, Any], path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt') as f:
+        json.dump(fixture, f, indent=2, default=str)
+        f.write('\n')
+
+
+def load_fixture(path: str) -> Dict[str, Any]:
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        return json.load(f)
+
+
+# --- run ---
+
+def _measure(handler: Callable, event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Run a handler twice: once for wall and CPU time, once under tracemalloc for peak memory."""
+    cpu, wall = time.process_time(), time.perf_counter()
+    output = handler(json.loads(json.dumps(event)), context)
+    cpu_ms, wall_ms = (time.process_time() - cpu) * 1000, (time.perf_counter() - wall) * 1000
+
+    tracemalloc.start()
+    try:
+        handler(json.loads(json.dumps(event)), context)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'output': output, 'cpuMs': round(cpu_ms, 1), 'wallMs': round(wall_ms, 1), 'peakKb': round(peak / 1024, 1)}
+
+
+def _same_shape(original: Any, replayed: Any) -> bool:
+    if not isinstance(original, dict) or not isinstance(replayed, dict):
+        return type(original) is type(replayed)
+    return set(original) == set(replayed) and original.get('statusCode') == replayed.get('statusCode')
+
+
+def replay(fixture: Dict[str, Any], stages: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """Run the fixture's stages against the current handlers; one report row per stage."""
+    from moto import mock_aws
+
+    from devtools.clients import patch_clients
+    from devtools.fake_bedrock import FakeBedrockRuntime
+    from devtools.load_test import LOCAL_BUCKET, LOCAL_TABLE, local_stack, stage_models
+
+    selected = set(stages) if stages else None
+    runs = [s for s in fixture['stages'] if selected is None or s['module'] in selected or s['state'] in selected]
+    models = {s['module']: s['output']['usage']['model'] for s in runs
+              if isinstance(s.get('output'), dict) and isinstance(s['output'].get('usage'), dict)
+              and s['output']['usage'].get('model')}
+    env = {'BUCKET_NAME': LOCAL_BUCKET, 'TABLE_NAME': LOCAL_TABLE, 'LLM_CACHE_ENABLED': 'false',
+           'AWS_DEFAULT_REGION': 'us-east-1', 'PROFILING_ENABLED': 'false',
+           'MODEL_ID': next(iter(models.values()), 'anthropic.claude-sonnet-4-5-20250929-v1:0')}
+    current: Dict[str, Any] = {}
+    fake = FakeBedrockRuntime(time_scale=0, error_scale=0,
+                              responder=lambda model_id, body: current.get('response') or '')
+
+    rows = []
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.dict(os.environ, env))
+        stack.enter_context(mock_aws())
+        s3, dynamodb, ses = local_stack()
+        for key, text in fixture.get('objects', {}).items():
+            s3.put_object(Bucket=LOCAL_BUCKET, Key=key, Body=text.encode('utf-8'))
+        root_level = logging.getLogger().level
+        handlers = {s['module']: import_handler(s['module']) for s in runs}
+        logging.getLogger().setLevel(root_level)
+        bind_model = stack.enter_context(stage_models(models))
+        stack.enter_context(patch_clients(bedrock=fake, s3=s3, dynamodb=dynamodb, ses=ses))
+
+        for stage in runs:
+            module = stage['module']
+            output = resolve_claim_checks(stage.get('output') or {}, fixture.get('objects', {}))
+            current['response'] = bedrock_response(module, output)
+            handler = bind_model(module, handlers[module])
+            row: Dict[str, Any] = {'state': stage['state'], 'module': module, 'original': stage.get('original', {}),
+                                   'originalError': stage.get('error')}
+            try:
+                measured = _measure(handler, stage['event'], LambdaContext(module))
+            except Exception as e:
+                row['replay'] = {'error': f"{type(e).__name__}: {e}"}
+                rows.append(row)
+                continue
+            output = json.loads(json.dumps(measured.pop('output'), default=str))
+            measured['inputBytes'] = payload_bytes(stage['event'])
+            measured['outputBytes'] = payload_bytes(output)
+            measured['sameShape'] = _same_shape(stage.get('output'), output)
+            if isinstance(output, dict) and output.get('statusCode', 200) >= 400:
+                measured['error'] = str(output.get('error') or output.get('statusCode'))
+            row['replay'] = measured
+            rows.append(row)
+    return rows
+
+
+def _delta(before: Optional[float], after: Optional[float]) -> str:
+    if not before or after is None:
+        return ''
+    return f"{(after - before) / before * 100:+.0f}%"
+
+
+def format_report(rows: List[Dict[str, Any]]) -> str:
+    """Per-stage table of the replay against the original run."""
+    def num(value: Optional[float], fmt: str = '.1f') -> str:
+        return format(value, fmt) if value is not None else '-'
+
+    lines = [f"{'stage':<24} {'in KB':>8} {'out KB':>8} {'Δout':>6} {'orig ms':>9} {'cpu ms':>9} {'wall ms':>9} "
+             f"{'orig MB':>8} {'peak KB':>9}  note"]
+    for row in rows:
+        original, replayed = row['original'], row['replay']
+        if 'cpuMs' not in replayed:
+            lines.append(f"{row['state']:<24} {'':>8} {'':>8} {'':>6} {num(original.get('handlerMs')):>9} "
+                         f"{'':>9} {'':>9} {'':>8} {'':>9}  {replayed.get('error')}")
+            continue
+        notes = [f"original failed: {row['originalError'][:40]}"] if row.get('originalError') else []
+        if not replayed['sameShape'] and not row.get('originalError'):
+            notes.append('output keys differ')
+        if replayed.get('error'):
+            notes.append(replayed['error'][:60])
+        lines.append(
+            f"{row['state']:<24} {replayed['inputBytes'] / 1024:>8.1f} {replayed['outputBytes'] / 1024:>8.1f} "
+            f"{_delta(original.get('outputBytes'), replayed['outputBytes']):>6} {num(original.get('handlerMs')):>9} "
+            f"{replayed['cpuMs']:>9.1f} {replayed['wallMs']:>9.1f} {num(original.get('maxMemoryMb'), '.0f'):>8} "
+            f"{replayed['peakKb']:>9.1f}  {'; '.join(notes)}")
+    lines.append("orig ms: original duration minus Bedrock latency; orig MB: Lambda max memory used (RSS)")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Pull a workflow execution into a fixture, or replay one locally.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    pull_cmd = sub.add_parser('pull', help='build a fixture from a completed execution')
+    pull_cmd.add_argument('execution', help='execution ARN, or execution name on the stack\'s state machine')
+    pull_cmd.add_argument('--stack', default='ResumeTailorStack', help='CloudFormation stack name')
+    pull_cmd.add_argument('--region', default=os.environ.get('AWS_REGION', 'us-east-1'))
+    pull_cmd.add_argument('--out', help='fixture file (default: benchmarks/replays/<execution name>.json)')
+    pull_cmd.add_argument('--scrub', action='append', default=[],
+                          help='extra PII term to scrub, e.g. the candidate name (repeatable)')
+    pull_cmd.add_argument('--no-logs', action='store_true',
+                          help='skip CloudWatch REPORT lines; time stages from the history instead')
+    run_cmd = sub.add_parser('run', help='replay a fixture against the current handlers')
+    run_cmd.add_argument('fixture')
+    run_cmd.add_argument('--stage', action='append', help='only this stage (module or state name, repeatable)')
+    run_cmd.add_argument('--json', help='write the report rows to this JSON file')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    if args.command == 'pull':
+        fixture = pull(args.execution, stack_name=args.stack, region=args.region, scrub_terms=args.scrub,
+                       with_logs=not args.no_logs)
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', fixture['execution']['name'] or 'execution')
+        out = args.out or os.path.join(REPLAYS_DIR, f"{name}.json")
+        save_fixture(fixture, out)
+        print(f"Saved {len(fixture['stages'])} stages and {len(fixture['objects'])} objects to {out}")
+        return 0
+
+    rows = replay(load_fixture(args.fixture), args.stage)
+    print(format_report(rows))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=2, default=str)
+    return 0 if all('cpuMs' in row['replay'] for row in rows) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,398 @@
+"""
+Lambda memory right-sizing from measured handler footprints.
+
+Each function's handler runs over a fixture corpus in its own interpreter,
+so the numbers are per container, like Lambda's REPORT lines:
+- peak RSS: the process's max resident set after importing the handler,
+  building its AWS clients and running every case (Lambda's "Max Memory
+  Used" counts the same things);
+- CPU time per case, with AWS calls answered by in-process stubs;
+- wait time per case: the recorded Bedrock latency for replay fixtures,
+  or the fake Bedrock model profile's estimate for synthetic cases.
+
+Lambda gives a function CPU in proportion to its memory, one full vCPU at
+1,769 MB. A single-threaded handler's duration at memory size M is
+therefore estimated as cpu * max(1, 1769 / M) + wait: memory above
+1,769 MB buys nothing, and waiting costs the same at any size. The init
+phase (imports and client construction, measured the same way) scales
+like CPU time and is paid by --cold-start-rate of the invocations. Sizes
+below peak RSS plus headroom are ruled out. For each function the report lists
+every candidate size with its estimated duration and cost per 1,000
+invocations. It recommends the cheapest size whose expected latency
+(warm p95 plus the cold-start share of init) is within --max-slowdown
+(plus --slack-ms) of the fastest candidate's.
+
+The corpus is the replay fixtures in benchmarks/replays/ (see
+devtools/replay.py), or the synthetic benchmark workloads when there are
+none. Local CPU time is taken to equal Lambda's at one vCPU; scale it
+with --cpu-scale when the machine is faster or slower.
+
+Usage:
+    cd lambda
+    python -m devtools.rightsizing                               # every function, replay fixtures or synthetic
+    python -m devtools.rightsizing generate_resume refine_resume --fixtures benchmarks/replays/*.json
+    python -m devtools.rightsizing --synthetic --json rightsizing.json
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+# The worker times the handler's imports, so this module imports nothing
+# that loads the AWS SDK at module level
+LAMBDA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STACK_FILE = os.path.join(os.path.dirname(LAMBDA_DIR), 'lib', 'resume-tailor-stack.ts')
+BENCHMARKS_DIR = os.path.join(LAMBDA_DIR, 'benchmarks')
+REPLAYS_DIR = os.path.join(BENCHMARKS_DIR, 'replays')
+
+# Memory at which a function gets one full vCPU
+FULL_VCPU_MB = 1769
+CANDIDATE_SIZES_MB = (128, 256, 512, 768, 1024, 1536, 1769, 2048, 3008)
+# x86_64 on-demand prices (us-east-1), the stack's default architecture
+PRICE_PER_GB_SECOND = 0.0000166667
+PRICE_PER_REQUEST = 0.0000002
+# Headroom over measured peak RSS before a size is considered safe
+MEMORY_HEADROOM = 0.25
+# Slowdown always accepted, so millisecond-scale functions are not sized on noise
+SLACK_MS = 50.0
+# Share of invocations that start a new container and pay the init phase
+COLD_START_RATE = 0.05
+
+# Stages the harness can run with stub clients
+MODULES = ('parse_job', 'analyze_resume', 'generate_resume', 'ats_optimize', 'cover_letter', 'critical_review',
+           'save_results', 'refine_resume', 'notify')
+
+
+@dataclass
+class Footprint:
+    """What one function's handler used over the corpus."""
+    module: str
+    cases: int
+    import_rss_mb: float
+    peak_rss_mb: float
+    init_cpu_ms: float
+    cpu_ms: List[float] = field(default_factory=list)
+    wall_ms: List[float] = field(default_factory=list)
+    wait_ms: List[float] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Candidate:
+    memory_mb: int
+    duration_ms: float
+    cold_start_ms: float
+    cost_per_1k: float
+    fits: bool
+
+
+def _p(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+# --- corpus ---
+
+def current_memory_sizes(path: str = STACK_FILE) -> Dict[str, int]:
+    """Handler module -> memorySize of its function in the stack."""
+    with open(path) as f:
+        source = f.read()
+    sizes = {}
+    for block in re.split(r'new lambda\.Function\(', source)[1:]:
+        handler = re.search(r"handler:\s*'(\w+)\.handler'", block)
+        memory = re.search(r'memorySize:\s*(\d+)', block)
+        if handler and memory:
+            sizes[handler.group(1)] = int(memory.group(1))
+    return sizes
+
+
+def fixture_cases(paths: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Stage cases from replay fixtures: event, recorded Bedrock response and wait, S3 objects."""
+    from devtools.replay import bedrock_response, load_fixture
+
+    cases: Dict[str, List[Dict[str, Any]]] = {}
+    for path in paths:
+        fixture = load_fixture(path)
+        objects = fixture.get('objects', {})
+        for stage in fixture['stages']:
+            if stage['module'] not in MODULES or stage.get('error'):
+                continue
+            cases.setdefault(stage['module'], []).append({
+                'event': stage['event'],
+                'response': bedrock_response(stage['module'], stage.get('output') or {}),
+                'waitMs': (stage.get('original') or {}).get('bedrockMs') or 0.0,
+                'objects': objects,
+            })
+    return cases
+
+
+def _estimated_wait_ms(model_id: str, response: Any) -> float:
+    """Time to first token plus generation time under the fake Bedrock profile."""
+    from devtools.fake_bedrock import CHARS_PER_TOKEN, DEFAULT_PROFILES
+
+    profile = next(p for prefix, p in DEFAULT_PROFILES if prefix in model_id)
+    text = response if isinstance(response, str) else json.dumps(response)
+    return profile.first_token_ms + len(text) / CHARS_PER_TOKEN / profile.tokens_per_second * 1000
+
+
+def synthetic_cases(mode: str = 'OPTIMIZED') -> Dict[str, List[Dict[str, Any]]]:
+    """The benchmark workloads (benchmarks/workloads.py) as cases."""
+    if BENCHMARKS_DIR not in sys.path:
+        sys.path.insert(0, BENCHMARKS_DIR)
+    import workloads
+
+    from devtools.load_test import load_model_config
+
+    models = load_model_config(mode)
+    resumes = {f"uploads/user-1/resume-{i}.md": text for i, text in enumerate(workloads.resumes(3))}
+    resume = workloads.resume(0)
+    stages = {
+        'parse_job': ({'jobId': 'job-1', 'jobDescription': workloads.job_description()}, workloads.PARSED_JOB),
+        'analyze_resume': ({'jobId': 'job-1', 'resumeS3Keys': list(resumes), 'parsedJob': workloads.PARSED_JOB},
+                           workloads.ANALYSIS),
+        'generate_resume': ({'jobId': 'job-1', 'userId': 'user-1', 'resumeS3Keys': list(resumes),
+                             'parsedJob': workloads.PARSED_JOB, 'analysis': workloads.ANALYSIS},
+                            workloads.tailored_resume_output()),
+        'ats_optimize': ({'tailoredResumeMarkdown': resume, 'parsedJob': workloads.PARSED_JOB},
+                         workloads.ats_output()),
+        'cover_letter': ({'jobId': 'job-1', 'jobDescription': workloads.job_description(),
+                          'tailoredResumeMarkdown': resume, 'parsedJob': workloads.PARSED_JOB,
+                          'analysis': workloads.ANALYSIS}, workloads.cover_letter_output()),
+        'critical_review': ({'tailoredResumeMarkdown': resume}, workloads.critical_review_output()),
+        'refine_resume': ({'originalResume': resume, 'criticalReview': workloads.critical_review_output(),
+                           'parsedJob': workloads.PARSED_JOB}, workloads.long_markdown(workloads.STREAM_TOKENS)),
+        'save_results': (workloads.results_item(), None),
+        'notify': ({'jobId': 'job-1', 'userEmail': 'user@example.com', 'results': {'fitScore': 87.5}}, None),
+    }
+    cases = {}
+    for module, (event, response) in stages.items():
+        wait = _estimated_wait_ms(models.get(module, ''), response) if response is not None else 0.0
+        cases[module] = [{'event': event, 'response': response, 'waitMs': round(wait, 1), 'objects': resumes}]
+    return cases
+
+
+# --- measurement ---
+
+def _max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+class _StubSES:
+    def send_email(self, **kwargs: Any) -> Dict[str, Any]:
+        return {'MessageId': 'stub'}
+
+
+def _worker(module: str, cases_path: str, repeat: int) -> Dict[str, Any]:
+    """Run in a fresh interpreter: import the handler, build its clients, run every case."""
+    from devtools.state_machine import LambdaContext, import_handler
+
+    # Init phase: the handler's imports and its AWS clients, as in a cold start
+    started_cpu = time.process_time()
+    handler = import_handler(module)
+    import aws_runtime
+    # Real clients hold the SDK's service models; build them so their memory counts
+    for build in (aws_runtime.get_bedrock_client, aws_runtime.get_s3_client, aws_runtime.get_dynamodb_resource,
+                  aws_runtime.get_ses_client):
+        build()
+    init_cpu_ms = (time.process_time() - started_cpu) * 1000
+    import_rss = _max_rss_mb()
+
+    if BENCHMARKS_DIR not in sys.path:
+        sys.path.insert(0, BENCHMARKS_DIR)
+    import workloads
+
+    from devtools.clients import patch_clients
+
+    with open(cases_path) as f:
+        cases = json.load(f)
+
+    runs = []
+    for case in cases:
+        objects = {key: text.encode('utf-8') for key, text in case.get('objects', {}).items()}
+        clients: Dict[str, Any] = {'s3': workloads.StubS3(objects), 'dynamodb': workloads.StubDynamoDB(),
+                                   'ses': _StubSES()}
+        if case.get('response') is not None:
+            clients['bedrock'] = workloads.StubBedrock(case['response'])
+        cpu, wall, error = [], [], None
+        with patch_clients(**clients):
+            for _ in range(repeat):
+                event = json.loads(json.dumps(case['event']))
+                started_cpu, started_wall = time.process_time(), time.perf_counter()
+                result = handler(event, LambdaContext(module))
+                cpu.append((time.process_time() - started_cpu) * 1000)
+                wall.append((time.perf_counter() - started_wall) * 1000)
+                if isinstance(result, dict) and result.get('statusCode', 200) >= 400:
+                    error = str(result.get('error') or result.get('statusCode'))
+        runs.append({'cpuMs': statistics.median(cpu), 'wallMs': statistics.median(wall), 'error': error})
+    return {'importRssMb': import_rss, 'peakRssMb': _max_rss_mb(), 'initCpuMs': init_cpu_ms, 'runs': runs}
+
+
+def measure(module: str, cases: List[Dict[str, Any]], repeat: int = 3, cpu_scale: float = 1.0) -> Footprint:
+    """Footprint of one function's handler over its cases, measured in a child interpreter."""
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(cases, f)
+        cases_path = f.name
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'),
+               AWS_ACCESS_KEY_ID='testing', AWS_SECRET_ACCESS_KEY='testing', BUCKET_NAME='rightsizing-bucket',
+               TABLE_NAME='rightsizing-table', LLM_CACHE_ENABLED='false', PROFILING_ENABLED='false',
+               METRICS_ENABLED='false', LAZY_INIT='false')
+    env.pop('TRACE_FILE', None)
+    try:
+        completed = subprocess.run(
+            [sys.executable, '-m', 'devtools.rightsizing', '--worker', module, cases_path, '--repeat', str(repeat)],
+            cwd=os.path.dirname(BENCHMARKS_DIR), env=env, capture_output=True, text=True, check=False)
+    finally:
+        os.unlink(cases_path)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{module} worker failed:\n{completed.stderr[-2000:]}")
+    data = json.loads(completed.stdout.strip().splitlines()[-1])
+    runs = data['runs']
+    return Footprint(
+        module=module, cases=len(runs), import_rss_mb=round(data['importRssMb'], 1),
+        peak_rss_mb=round(data['peakRssMb'], 1), init_cpu_ms=round(data['initCpuMs'] * cpu_scale, 1),
+        cpu_ms=[round(r['cpuMs'] * cpu_scale, 2) for r in runs],
+        wall_ms=[round(r['wallMs'], 2) for r in runs],
+        wait_ms=[float(case.get('waitMs') or 0.0) for case in cases],
+        errors=[r['error'] for r in runs if r['error']],
+    )
+
+
+# --- recommendation ---
+
+def duration_at(memory_mb: int, cpu_ms: float, wait_ms: float) -> float:
+    """Estimated duration at a memory size: CPU time scales with the vCPU share, waiting does not."""
+    return cpu_ms * max(1.0, FULL_VCPU_MB / memory_mb) + wait_ms
+
+
+def cost_per_1k(memory_mb: int, duration_ms: float) -> float:
+    """USD per 1,000 invocations: billed duration (1 ms steps) times GB, plus request charges."""
+    billed_s = -(-duration_ms // 1) / 1000
+    return 1000 * (memory_mb / 1024 * billed_s * PRICE_PER_GB_SECOND + PRICE_PER_REQUEST)
+
+
+def candidates(footprint: Footprint, sizes: Iterable[int] = CANDIDATE_SIZES_MB,
+               headroom: float = MEMORY_HEADROOM, cold_start_rate: float = COLD_START_RATE) -> List[Candidate]:
+    """
+    Each size's warm p95 duration, cold-start init time and mean cost over the corpus
+
+    Cost includes the init phase for cold_start_rate of the invocations.
+    Sizes without headroom over peak RSS do not fit.
+    """
+    floor = footprint.peak_rss_mb * (1 + headroom)
+    rows = []
+    for size in sizes:
+        durations = [duration_at(size, cpu, wait) for cpu, wait in zip(footprint.cpu_ms, footprint.wait_ms)]
+        cold_start = duration_at(size, footprint.init_cpu_ms, 0.0)
+        cost = statistics.mean(cost_per_1k(size, d + cold_start_rate * cold_start)
+                               for d in durations) if durations else 0.0
+        rows.append(Candidate(size, round(_p(durations, 95), 1), round(cold_start, 1), round(cost, 6),
+                              size >= floor))
+    return rows
+
+
+def expected_latency(row: Candidate, cold_start_rate: float = COLD_START_RATE) -> float:
+    """Warm p95 duration plus the cold-start share of the init time."""
+    return row.duration_ms + cold_start_rate * row.cold_start_ms
+
+
+def recommend(rows: List[Candidate], max_slowdown: float = 0.1, slack_ms: float = SLACK_MS,
+              cold_start_rate: float = COLD_START_RATE) -> Optional[Candidate]:
+    """Cheapest fitting size whose expected latency is within max_slowdown (plus slack_ms) of the fastest."""
+    fitting = [row for row in rows if row.fits]
+    if not fitting:
+        return None
+    fastest = min(expected_latency(row, cold_start_rate) for row in fitting)
+    within = [row for row in fitting
+              if expected_latency(row, cold_start_rate) <= fastest * (1 + max_slowdown) + slack_ms]
+    return min(within, key=lambda row: (row.cost_per_1k, row.memory_mb))
+
+
+def format_function(footprint: Footprint, rows: List[Candidate], current_mb: Optional[int],
+                    choice: Optional[Candidate]) -> str:
+    lines = [f"{footprint.module}: {footprint.cases} cases, peak RSS {footprint.peak_rss_mb:.0f} MB "
+             f"(after import {footprint.import_rss_mb:.0f} MB), CPU p50 {_p(footprint.cpu_ms, 50):.1f} ms "
+             f"p95 {_p(footprint.cpu_ms, 95):.1f} ms, init CPU {footprint.init_cpu_ms:.0f} ms, "
+             f"wait p50 {_p(footprint.wait_ms, 50):.0f} ms"]
+    if footprint.errors:
+        lines.append(f"  ! {len(footprint.errors)} cases returned errors, e.g. {footprint.errors[0][:100]}")
+    current = next((row for row in rows if row.memory_mb == current_mb), None)
+    lines.append(f"  {'memory MB':>9} {'p95 ms':>10} {'init ms':>9} {'$/1k inv':>10} {'vs current':>11}")
+    for row in rows:
+        versus = f"{(row.cost_per_1k / current.cost_per_1k - 1) * 100:+.0f}%" if current and current.cost_per_1k else ''
+        marks = ' <- current' if row.memory_mb == current_mb else ''
+        if choice and row.memory_mb == choice.memory_mb:
+            marks += ' <- recommended'
+        if not row.fits:
+            marks += ' (below peak RSS + headroom)'
+        lines.append(f"  {row.memory_mb:>9} {row.duration_ms:>10.1f} {row.cold_start_ms:>9.0f} "
+                     f"{row.cost_per_1k:>10.5f} {versus:>11}{marks}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Recommend a Lambda memory size per function from measured use.')
+    parser.add_argument('functions', nargs='*', help=f"handler modules (default: {', '.join(MODULES)})")
+    parser.add_argument('--fixtures', nargs='*', help='replay fixtures (default: benchmarks/replays/*.json*)')
+    parser.add_argument('--synthetic', action='store_true', help='use the synthetic benchmark workloads')
+    parser.add_argument('--mode', default='OPTIMIZED', help='DeploymentMode for synthetic wait estimates')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case; the median is used (default: 3)')
+    parser.add_argument('--cpu-scale', type=float, default=1.0,
+                        help='Lambda vCPU time per local CPU second (default: 1.0)')
+    parser.add_argument('--max-slowdown', type=float, default=0.1,
+                        help='accepted slowdown over the fastest size, as a fraction (default: 0.1)')
+    parser.add_argument('--slack-ms', type=float, default=SLACK_MS,
+                        help=f'slowdown always accepted, in ms (default: {SLACK_MS:.0f})')
+    parser.add_argument('--headroom', type=float, default=MEMORY_HEADROOM,
+                        help=f'required memory over peak RSS, as a fraction (default: {MEMORY_HEADROOM})')
+    parser.add_argument('--cold-start-rate', type=float, default=COLD_START_RATE,
+                        help=f'share of invocations paying the init phase (default: {COLD_START_RATE})')
+    parser.add_argument('--json', help='write footprints, candidates and recommendations to this file')
+    parser.add_argument('--worker', nargs=2, metavar=('MODULE', 'CASES'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(_worker(args.worker[0], args.worker[1], args.repeat)))
+        return 0
+
+    paths = args.fixtures if args.fixtures is not None else sorted(glob.glob(os.path.join(REPLAYS_DIR, '*.json*')))
+    corpus = synthetic_cases(args.mode) if args.synthetic or not paths else fixture_cases(paths)
+    print(f"Corpus: {'synthetic workloads' if args.synthetic or not paths else f'{len(paths)} replay fixtures'}")
+    sizes = current_memory_sizes()
+    report = []
+    for module in args.functions or MODULES:
+        if not corpus.get(module):
+            print(f"{module}: no cases in the corpus\n")
+            continue
+        footprint = measure(module, corpus[module], args.repeat, args.cpu_scale)
+        current = sizes.get(module)
+        rows = candidates(footprint, sorted(set(CANDIDATE_SIZES_MB) | ({current} if current else set())),
+                          args.headroom, args.cold_start_rate)
+        choice = recommend(rows, args.max_slowdown, args.slack_ms, args.cold_start_rate)
+        print(format_function(footprint, rows, current, choice) + '\n')
+        report.append({'footprint': asdict(footprint), 'currentMb': current,
+                       'candidates': [asdict(row) for row in rows],
+                       'recommendedMb': choice.memory_mb if choice else None})
+
+    print(f"{'function':<18} {'current MB':>10} {'recommended MB':>15}")
+    for entry in report:
+        print(f"{entry['footprint']['module']:<18} {entry['currentMb'] or '-':>10} {entry['recommendedMb'] or '-':>15}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,512 @@
+"""
+Local interpreter for the ResumeTailorWorkflow state machine.
+
+Runs an Amazon States Language definition in-process: Lambda tasks call
+the Python handlers in lambda/functions directly, Parallel branches run on
+threads, and InputPath / Parameters (payload templates) / ResultSelector /
+ResultPath / OutputPath, Retry, Catch and task timeouts follow the Step
+Functions semantics. Every state entered is timed and its input and
+output sizes are recorded, so the whole pipeline can be benchmarked and
+profiled without deploying, and a state that inlines a large document
+shows up before it reaches the 256 KB payload limit.
+
+The definition can be the synthesized CloudFormation template
+(cdk.out/ResumeTailorStack.template.json, handlers are taken from the
+Lambda resources), a plain ASL file, or the snapshot bundled next to this
+module. Supported state types: Task, Parallel, Pass, Wait, Succeed, Fail.
+
+Usage:
+    cd lambda
+    python -m devtools.state_machine --input event.json [--definition cdk.out/...template.json]
+        [--time-scale 0] [--timings timings.json]
+"""
+import argparse
+import copy
+import importlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FUNCTIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'functions')
+DEFAULT_DEFINITION = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resume_tailor_workflow.asl.json')
+LAMBDA_INVOKE = 'arn:aws:states:::lambda:invoke'
+LOCAL_FUNCTION_PREFIX = 'local:function:'
+# Step Functions rejects state input or output larger than this
+PAYLOAD_LIMIT_BYTES = 256 * 1024
+
+Handler = Callable[[Dict[str, Any], Any], Any]
+
+
+class StatesError(Exception):
+    """A Step Functions error (States.* or a task error name) with its cause."""
+
+    def __init__(self, error: str, cause: str = ''):
+        super().__init__(f"{error}: {cause}" if cause else error)
+        self.error = error
+        self.cause = cause
+
+
+@dataclass
+class StateTiming:
+    """One attempt-inclusive visit to a state."""
+    name: str
+    type: str
+    branch: str
+    started_ms: float
+    duration_ms: float = 0.0
+    attempts: int = 1
+    retry_delay_ms: float = 0.0
+    error: Optional[str] = None
+    input_bytes: int = 0
+    output_bytes: int = 0
+
+
+@dataclass
+class ExecutionResult:
+    """Outcome of a local execution."""
+    status: str
+    output: Any = None
+    error: Optional[str] = None
+    cause: Optional[str] = None
+    duration_ms: float = 0.0
+    timings: List[StateTiming] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# --- JSONPath subset used by ASL paths: $, $.a.b, $.a[0], $['a'], $$.Context ---
+
+_PATH_TOKEN = re.compile(r"\.([^.\[]+)|\[(\d+)\]|\['([^']*)'\]")
+
+
+def _path_tokens(path: str) -> List[Any]:
+    if path.startswith('$$'):
+        path = path[1:]
+    if not path.startswith('$'):
+        raise StatesError('States.Runtime', f"Invalid path {path!r}")
+    tokens, pos = [], 1
+    while pos < len(path):
+        match = _PATH_TOKEN.match(path, pos)
+        if not match:
+            raise StatesError('States.Runtime', f"Unsupported path {path!r}")
+        name, index, quoted = match.groups()
+        tokens.append(int(index) if index is not None else (name if name is not None else quoted))
+        pos = match.end()
+    return tokens
+
+
+def read_path(data: Any, path: str, context: Optional[Dict[str, Any]] = None) -> Any:
+    """Select a value by reference path; $$ paths read the context object."""
+    value = context if path.startswith('$$') else data
+    for token in _path_tokens(path):
+        try:
+            value = value[token]
+        except (KeyError, IndexError, TypeError):
+            raise StatesError('States.Runtime', f"Path {path!r} did not match the input")
+    return value
+
+
+def write_path(data: Any, path: Optional[str], result: Any) -> Any:
+    """Apply ResultPath: place result into a copy of data."""
+    if path is None:
+        return data
+    tokens = _path_tokens(path)
+    if not tokens:
+        return result
+    root = copy.copy(data) if isinstance(data, dict) else {}
+    node = root
+    for token in tokens[:-1]:
+        child = node.get(token)
+        child = copy.copy(child) if isinstance(child, dict) else {}
+        node[token] = child
+        node = child
+    node[tokens[-1]] = result
+    return root
+
+
+def render_template(template: Any, data: Any, context: Dict[str, Any]) -> Any:
+    """Evaluate a Parameters/ResultSelector payload template."""
+    if isinstance(template, dict):
+        rendered = {}
+        for key, value in template.items():
+            if key.endswith('.$'):
+                if not isinstance(value, str) or not value.startswith('$'):
+                    raise StatesError('States.Runtime', f"Intrinsic functions are not supported: {value!r}")
+                rendered[key[:-2]] = read_path(data, value, context)
+            else:
+                rendered[key] = render_template(value, data, context)
+        return rendered
+    if isinstance(template, list):
+        return [render_template(item, data, context) for item in template]
+    return template
+
+
+def payload_bytes(value: Any) -> int:
+    """Serialized size of a state's input or output, as Step Functions counts it."""
+    return len(json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8'))
+
+
+def inline_documents(value: Any, min_bytes: int, path: str = '$') -> Dict[str, int]:
+    """Paths of the strings of min_bytes or more (UTF-8) in a payload, with their sizes."""
+    found: Dict[str, int] = {}
+    if isinstance(value, str):
+        size = len(value.encode('utf-8'))
+        if size >= min_bytes:
+            found[path] = size
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            found.update(inline_documents(item, min_bytes, f"{path}.{key}"))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            found.update(inline_documents(item, min_bytes, f"{path}[{index}]"))
+    return found
+
+
+# --- Handler resolution ---
+
+def _snake_case(name: str) -> str:
+    name = re.sub(r'([A-Z]+)([A-Z][a-z])', r'\1_\2', name)
+    return re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', name).lower()
+
+
+def module_for_function(function_ref: str) -> str:
+    """Handler module for a Lambda reference.
+
+    local:function:parse_job.handler -> parse_job; an ARN or function name
+    such as ResumeTailor-dev-ATSOptimize -> ats_optimize.
+    """
+    if function_ref.startswith(LOCAL_FUNCTION_PREFIX):
+        return function_ref[len(LOCAL_FUNCTION_PREFIX):].rsplit('.', 1)[0]
+    name = function_ref.split(':function:')[-1].split(':')[0]
+    return _snake_case(name.rsplit('-', 1)[-1])
+
+
+def import_handler(module_name: str) -> Handler:
+    if FUNCTIONS_DIR not in sys.path:
+        sys.path.insert(0, FUNCTIONS_DIR)
+    return importlib.import_module(module_name).handler
+
+
+class LambdaContext:
+    """Enough of the Lambda context object for the handlers."""
+
+    def __init__(self, function_name: str, timeout_seconds: Optional[float] = None, memory_mb: int = 1024):
+        self.function_name = function_name
+        self.function_version = '$LATEST'
+        self.memory_limit_in_mb = memory_mb
+        self.aws_request_id = str(uuid.uuid4())
+        self.invoked_function_arn = f"arn:aws:lambda:local:000000000000:function:{function_name}"
+        self._deadline = time.monotonic() + timeout_seconds if timeout_seconds else None
+
+    def get_remaining_time_in_millis(self) -> int:
+        if self._deadline is None:
+            return 900_000
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+# --- Definition loading ---
+
+def _resolve_intrinsics(value: Any, handlers_by_logical_id: Dict[str, str]) -> Any:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict) and 'Fn::Join' in value:
+        separator, parts = value['Fn::Join']
+        return separator.join(_resolve_intrinsics(part, handlers_by_logical_id) for part in parts)
+    if isinstance(value, dict) and 'Fn::GetAtt' in value:
+        logical_id = value['Fn::GetAtt'][0]
+        if logical_id in handlers_by_logical_id:
+            return LOCAL_FUNCTION_PREFIX + handlers_by_logical_id[logical_id]
+        return logical_id
+    if isinstance(value, dict) and 'Ref' in value:
+        return {'AWS::Partition': 'aws', 'AWS::Region': 'us-east-1',
+                'AWS::AccountId': '000000000000'}.get(value['Ref'], value['Ref'])
+    raise ValueError(f"Unsupported CloudFormation expression in definition: {value!r}")
+
+
+def load_definition(path: str = DEFAULT_DEFINITION, state_machine: Optional[str] = None) -> Dict[str, Any]:
+    """Load ASL from a plain definition file or a synthesized CloudFormation template."""
+    with open(path) as f:
+        document = json.load(f)
+    if 'States' in document:
+        return document
+
+    resources = document.get('Resources', {})
+    handlers = {
+        logical_id: resource['Properties']['Handler']
+        for logical_id, resource in resources.items()
+        if resource.get('Type') == 'AWS::Lambda::Function' and 'Handler' in resource.get('Properties', {})
+    }
+    machines = {
+        logical_id: resource for logical_id, resource in resources.items()
+        if resource.get('Type') == 'AWS::StepFunctions::StateMachine'
+    }
+    if state_machine:
+        machines = {k: v for k, v in machines.items() if k.startswith(state_machine)}
+    if len(machines) != 1:
+        raise ValueError(f"Expected one state machine in {path}, found {sorted(machines)}")
+    properties = next(iter(machines.values()))['Properties']
+    definition = properties.get('Definition') or _resolve_intrinsics(properties['DefinitionString'], handlers)
+    return definition if isinstance(definition, dict) else json.loads(definition)
+
+
+# --- Interpreter ---
+
+def _error_matches(error: str, equals: List[str]) -> bool:
+    if 'States.ALL' in equals or error in equals:
+        return True
+    return 'States.TaskFailed' in equals and error != 'States.Timeout' and not error.startswith('States.Runtime')
+
+
+class LocalStateMachine:
+    """Execute an ASL definition against in-process Lambda handlers."""
+
+    def __init__(self, definition: Dict[str, Any],
+                 handlers: Optional[Dict[str, Handler]] = None,
+                 time_scale: float = 1.0,
+                 sleep: Callable[[float], None] = time.sleep,
+                 max_parallel_branches: int = 10):
+        self.definition = definition
+        self.handlers = dict(handlers or {})
+        self.time_scale = time_scale
+        self.sleep = sleep
+        self.max_parallel_branches = max_parallel_branches
+        self._lock = threading.Lock()
+
+    def handler_for(self, function_ref: str) -> Handler:
+        module_name = module_for_function(function_ref)
+        with self._lock:
+            if module_name not in self.handlers:
+                self.handlers[module_name] = import_handler(module_name)
+            return self.handlers[module_name]
+
+    def execute(self, execution_input: Any, name: Optional[str] = None) -> ExecutionResult:
+        """Run the state machine to completion."""
+        name = name or str(uuid.uuid4())
+        context = {
+            'Execution': {
+                'Id': f"arn:aws:states:local:000000000000:execution:ResumeTailorWorkflow:{name}",
+                'Name': name,
+                'Input': execution_input,
+                'StartTime': datetime.now(timezone.utc).isoformat(),
+            },
+            'StateMachine': {'Name': 'ResumeTailorWorkflow'},
+        }
+        timings: List[StateTiming] = []
+        started = time.perf_counter()
+        result = ExecutionResult(status='RUNNING', timings=timings)
+        try:
+            result.output = self._run(self.definition, execution_input, context, timings, started, '')
+            result.status = 'SUCCEEDED'
+        except StatesError as e:
+            result.status = 'FAILED'
+            result.error, result.cause = e.error, e.cause
+        result.duration_ms = (time.perf_counter() - started) * 1000
+        timings.sort(key=lambda t: t.started_ms)
+        return result
+
+    def _run(self, machine: Dict[str, Any], data: Any, context: Dict[str, Any],
+             timings: List[StateTiming], started: float, branch: str) -> Any:
+        states = machine['States']
+        state_name = machine['StartAt']
+        while True:
+            state = states[state_name]
+            timing = StateTiming(name=state_name, type=state['Type'], branch=branch,
+                                 started_ms=(time.perf_counter() - started) * 1000)
+            with self._lock:
+                timings.append(timing)
+            state_context = dict(context, State={'Name': state_name,
+                                                 'EnteredTime': datetime.now(timezone.utc).isoformat()})
+            timing.input_bytes = payload_bytes(data)
+            entered = time.perf_counter()
+            try:
+                data, next_state = self._state(state_name, state, data, state_context, timings, started, timing)
+                timing.output_bytes = payload_bytes(data)
+            except StatesError as e:
+                timing.error = e.error
+                raise
+            finally:
+                timing.duration_ms = (time.perf_counter() - entered) * 1000
+            if next_state is None:
+                return data
+            state_name = next_state
+
+    def _state(self, name: str, state: Dict[str, Any], data: Any, context: Dict[str, Any],
+               timings: List[StateTiming], started: float, timing: StateTiming):
+        state_type = state['Type']
+        if state_type == 'Succeed':
+            return self._filter(state, 'OutputPath', self._filter(state, 'InputPath', data, context), context), None
+        if state_type == 'Fail':
+            raise StatesError(state.get('Error', 'States.Fail'), state.get('Cause', ''))
+
+        effective = self._filter(state, 'InputPath', data, context)
+        if 'Parameters' in state:
+            effective = render_template(state['Parameters'], effective, context)
+
+        try:
+            if state_type == 'Pass':
+                result = state.get('Result', effective)
+            elif state_type == 'Wait':
+                seconds = state.get('Seconds') or read_path(data, state['SecondsPath'], context)
+                self._sleep(seconds)
+                result = effective
+            elif state_type == 'Task':
+                result = self._with_retries(state, lambda: self._task(name, state, effective), timing)
+            elif state_type == 'Parallel':
+                result = self._with_retries(
+                    state, lambda: self._parallel(name, state, effective, context, timings, started), timing)
+            else:
+                raise StatesError('States.Runtime', f"State type {state_type} is not supported locally")
+        except StatesError as e:
+            handler = next((c for c in state.get('Catch', []) if _error_matches(e.error, c['ErrorEquals'])), None)
+            if handler is None:
+                raise
+            logger.info("State %s caught %s, continuing at %s", name, e.error, handler['Next'])
+            data = write_path(data, handler.get('ResultPath', '$'), {'Error': e.error, 'Cause': e.cause})
+            return data, handler['Next']
+
+        if 'ResultSelector' in state:
+            result = render_template(state['ResultSelector'], result, context)
+        data = write_path(data, state['ResultPath'], result) if 'ResultPath' in state else result
+        data = self._filter(state, 'OutputPath', data, context)
+        return data, None if state.get('End') else state.get('Next')
+
+    def _filter(self, state: Dict[str, Any], key: str, data: Any, context: Dict[str, Any]) -> Any:
+        if key not in state:
+            return data
+        if state[key] is None:
+            return {}
+        return read_path(data, state[key], context)
+
+    def _sleep(self, seconds: float) -> None:
+        if self.time_scale > 0 and seconds > 0:
+            self.sleep(seconds * self.time_scale)
+
+    def _with_retries(self, state: Dict[str, Any], attempt: Callable[[], Any], timing: StateTiming) -> Any:
+        retriers = state.get('Retry', [])
+        retry_counts = [0] * len(retriers)
+        while True:
+            try:
+                return attempt()
+            except StatesError as e:
+                index = next((i for i, r in enumerate(retriers) if _error_matches(e.error, r['ErrorEquals'])), None)
+                if index is None:
+                    raise
+                retrier = retriers[index]
+                if retry_counts[index] >= retrier.get('MaxAttempts', 3):
+                    raise
+                delay = retrier.get('IntervalSeconds', 1) * retrier.get('BackoffRate', 2.0) ** retry_counts[index]
+                delay = min(delay, retrier.get('MaxDelaySeconds', delay))
+                retry_counts[index] += 1
+                timing.attempts += 1
+                timing.retry_delay_ms += delay * 1000
+                logger.info("Retrying %s after %s (attempt %d, %.1fs)", timing.name, e.error,
+                            timing.attempts, delay)
+                self._sleep(delay)
+
+    def _task(self, name: str, state: Dict[str, Any], payload: Any) -> Any:
+        resource = state['Resource']
+        if resource.startswith(LAMBDA_INVOKE):
+            function_ref = payload['FunctionName']
+            event = payload.get('Payload', {})
+            wrap = True
+        elif ':lambda:' in resource or resource.startswith(LOCAL_FUNCTION_PREFIX):
+            function_ref, event, wrap = resource, payload, False
+        else:
+            raise StatesError('States.Runtime', f"Task resource {resource} is not supported locally")
+
+        handler = self.handler_for(function_ref)
+        timeout = state.get('TimeoutSeconds')
+        lambda_context = LambdaContext(module_for_function(function_ref), timeout)
+        # Handlers get their own copy, as they would from a JSON round trip
+        event = json.loads(json.dumps(event))
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"task-{name}")
+        try:
+            future = pool.submit(handler, event, lambda_context)
+            try:
+                output = future.result(timeout=timeout * self.time_scale if timeout and self.time_scale > 0 else None)
+            except FutureTimeout:
+                raise StatesError('States.Timeout', f"{name} exceeded {timeout}s")
+            except StatesError:
+                raise
+            except Exception as e:
+                raise StatesError(type(e).__name__, str(e))
+        finally:
+            pool.shutdown(wait=False)
+
+        output = json.loads(json.dumps(output, default=str))
+        if not wrap:
+            return output
+        return {
+            'ExecutedVersion': '$LATEST',
+            'Payload': output,
+            'SdkHttpMetadata': {'HttpStatusCode': 200},
+            'SdkResponseMetadata': {'RequestId': lambda_context.aws_request_id},
+            'StatusCode': 200,
+        }
+
+    def _parallel(self, name: str, state: Dict[str, Any], data: Any, context: Dict[str, Any],
+                  timings: List[StateTiming], started: float) -> List[Any]:
+        branches = state['Branches']
+        with ThreadPoolExecutor(max_workers=min(len(branches), self.max_parallel_branches),
+                                thread_name_prefix=f"parallel-{name}") as pool:
+            futures = [
+                pool.submit(self._run, branch, data, context, timings, started, f"{name}[{i}]")
+                for i, branch in enumerate(branches)
+            ]
+            return [future.result() for future in futures]
+
+
+def format_timings(result: ExecutionResult) -> str:
+    """Human-readable per-state timing table."""
+    lines = [f"{'state':<28} {'branch':<26} {'start ms':>9} {'duration ms':>12} {'attempts':>8} "
+             f"{'in bytes':>9} {'out bytes':>9}  error"]
+    for t in result.timings:
+        lines.append(f"{t.name:<28} {t.branch:<26} {t.started_ms:>9.1f} {t.duration_ms:>12.1f} "
+                     f"{t.attempts:>8} {t.input_bytes:>9} {t.output_bytes:>9}  {t.error or ''}")
+    lines.append(f"{result.status} in {result.duration_ms:.1f} ms")
+    largest = max(result.timings, key=lambda t: max(t.input_bytes, t.output_bytes), default=None)
+    if largest is not None:
+        size = max(largest.input_bytes, largest.output_bytes)
+        lines.append(f"largest state payload: {size} bytes ({largest.name}, "
+                     f"{size / PAYLOAD_LIMIT_BYTES:.0%} of the Step Functions limit)")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Run ResumeTailorWorkflow locally against the Python handlers.')
+    parser.add_argument('--definition', default=DEFAULT_DEFINITION,
+                        help='ASL JSON or synthesized CloudFormation template (default: bundled snapshot)')
+    parser.add_argument('--state-machine', help='logical ID prefix when the template has several')
+    parser.add_argument('--input', required=True, help='execution input JSON file')
+    parser.add_argument('--time-scale', type=float, default=0.0,
+                        help='multiplier for retry/wait delays and task timeouts (0 = no waiting)')
+    parser.add_argument('--timings', help='write the execution result with timings to this JSON file')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(threadName)s %(levelname)s %(message)s')
+    with open(args.input) as f:
+        execution_input = json.load(f)
+
+    machine = LocalStateMachine(load_definition(args.definition, args.state_machine), time_scale=args.time_scale)
+    result = machine.execute(execution_input)
+    print(format_timings(result))
+    if args.timings:
+        with open(args.timings, 'w') as f:
+            json.dump(result.to_dict(), f, indent=2, default=str)
+    return 0 if result.status == 'SUCCEEDED' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Offline view of the spans the handlers export to TRACE_FILE.
+
+Lists the traces in a JSON-lines span file (one per job), prints a text
+waterfall of one trace with each span nested under its parent and drawn
+on the job's timeline, and can convert a trace to the Chrome trace-event
+format for chrome://tracing or ui.perfetto.dev.
+
+Usage:
+    cd lambda
+    TRACE_FILE=trace.jsonl python -m devtools.state_machine --input event.json
+    python -m devtools.traces trace.jsonl                         # list traces
+    python -m devtools.traces trace.jsonl --trace <traceId|jobId> [--width 80]
+    python -m devtools.traces trace.jsonl --trace <traceId> --chrome trace.json
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+Span = Dict[str, Any]
+
+
+def load_spans(path: str) -> List[Span]:
+    """Spans from a JSON-lines file, skipping lines that are not JSON."""
+    spans = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return spans
+
+
+def group_traces(spans: List[Span]) -> Dict[str, List[Span]]:
+    """Spans by trace ID, each trace in start order."""
+    grouped: Dict[str, List[Span]] = defaultdict(list)
+    for span in spans:
+        grouped[span['trace_id']].append(span)
+    return {trace_id: sorted(group, key=lambda s: s['start']) for trace_id, group in grouped.items()}
+
+
+def find_trace(traces: Dict[str, List[Span]], key: str) -> Optional[str]:
+    """Trace ID for a trace ID or a jobId attribute."""
+    if key in traces:
+        return key
+    for trace_id, spans in traces.items():
+        if any(span.get('attributes', {}).get('jobId') == key for span in spans):
+            return trace_id
+    return None
+
+
+def summarize(traces: Dict[str, List[Span]]) -> List[Dict[str, Any]]:
+    rows = []
+    for trace_id, spans in traces.items():
+        start = min(s['start'] for s in spans)
+        end = max(s['end'] for s in spans)
+        job_ids = {s.get('attributes', {}).get('jobId') for s in spans} - {None}
+        rows.append({
+            'traceId': trace_id,
+            'jobId': ', '.join(sorted(job_ids)),
+            'stages': len({s['stage'] for s in spans}),
+            'spans': len(spans),
+            'errors': sum(1 for s in spans if s.get('error')),
+            'durationMs': round((end - start) * 1000, 1),
+            'start': start,
+        })
+    return sorted(rows, key=lambda r: r['start'])
+
+
+def _ordered_tree(spans: List[Span]) -> List[tuple]:
+    """(depth, span) in depth-first order, children by start time."""
+    ids = {s['span_id'] for s in spans}
+    children: Dict[Optional[str], List[Span]] = defaultdict(list)
+    for span in spans:
+        parent = span.get('parent_id') if span.get('parent_id') in ids else None
+        children[parent].append(span)
+
+    ordered: List[tuple] = []
+
+    def visit(parent: Optional[str], depth: int) -> None:
+        for child in sorted(children.get(parent, []), key=lambda s: s['start']):
+            ordered.append((depth, child))
+            visit(child['span_id'], depth + 1)
+
+    visit(None, 0)
+    return ordered
+
+
+def format_waterfall(spans: List[Span], width: int = 60) -> str:
+    """Text waterfall: span tree on the left, timeline bars on the right."""
+    if not spans:
+        return '(no spans)'
+    start = min(s['start'] for s in spans)
+    total = max(max(s['end'] for s in spans) - start, 1e-9)
+    rows = _ordered_tree(spans)
+    label_width = min(48, max(len('  ' * depth + span['name']) for depth, span in rows) + 2)
+
+    lines = [f"trace {spans[0]['trace_id']}: {len(spans)} spans, {total * 1000:.1f} ms"]
+    for depth, span in rows:
+        offset = int((span['start'] - start) / total * width)
+        length = max(1, int(round((span['end'] - span['start']) / total * width)))
+        bar = ' ' * offset + '█' * min(length, width - offset)
+        label = ('  ' * depth + span['name'])[:label_width]
+        duration = (span['end'] - span['start']) * 1000
+        flag = '  !' + span['error'] if span.get('error') else ''
+        lines.append(f"{label:<{label_width}}{(span['start'] - start) * 1000:>9.1f} {duration:>9.1f} ms "
+                     f"|{bar:<{width}}|{flag}")
+    return '\n'.join(lines)
+
+
+def to_chrome_trace(spans: List[Span]) -> Dict[str, Any]:
+    """Chrome trace-event JSON: one track per stage, complete events in microseconds."""
+    stages = {stage: i for i, stage in enumerate(dict.fromkeys(s['stage'] for s in spans))}
+    events = [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': stage}}
+              for stage, tid in stages.items()]
+    for span in spans:
+        args = dict(span.get('attributes') or {})
+        if span.get('error'):
+            args['error'] = span['error']
+        events.append({
+            'name': span['name'],
+            'ph': 'X',
+            'pid': 1,
+            'tid': stages[span['stage']],
+            'ts': span['start'] * 1_000_000,
+            'dur': (span['end'] - span['start']) * 1_000_000,
+            'args': args,
+        })
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='List traces in a span file or show one as a waterfall.')
+    parser.add_argument('file', help='JSON-lines span file written via TRACE_FILE')
+    parser.add_argument('--trace', help='trace ID or jobId to show')
+    parser.add_argument('--width', type=int, default=60, help='timeline width in characters (default: 60)')
+    parser.add_argument('--chrome', help='write the trace in Chrome trace-event format to this file')
+    args = parser.parse_args(argv)
+
+    traces = group_traces(load_spans(args.file))
+    if not args.trace:
+        print(f"{'trace':<36} {'job':<24} {'stages':>6} {'spans':>6} {'errors':>6} {'ms':>10}")
+        for row in summarize(traces):
+            print(f"{row['traceId']:<36} {row['jobId']:<24} {row['stages']:>6} {row['spans']:>6} "
+                  f"{row['errors']:>6} {row['durationMs']:>10.1f}")
+        return 0
+
+    trace_id = find_trace(traces, args.trace)
+    if trace_id is None:
+        print(f"No trace matches {args.trace}", file=sys.stderr)
+        return 1
+    print(format_waterfall(traces[trace_id], args.width))
+    if args.chrome:
+        with open(args.chrome, 'w') as f:
+            json.dump(to_chrome_trace(traces[trace_id]), f)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
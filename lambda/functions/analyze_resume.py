@@ -2,20 +2,29 @@
 Analyze Resume Fit Lambda Function
 Compares resume against job requirements and provides fit analysis
 """
-import json
 import logging
 import os
-import boto3
-from extract_json import extract_json_from_text
+from aws_runtime import get_bedrock_client, get_s3_client, invoke_claude
+from claim_check import claim_checked
+from metrics import instrumented
+from profiling import profiled
+from tracing import span, traced
+from response_cache import cache_enabled
+from prompt_context import build_prompt, document_prefix, resume_versions_block
+from output_schemas import output_tool
 from validation import validate_s3_key, validate_resume_content, safe_decode_s3_body
 from typing import Dict, Any
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-s3 = boto3.client('s3')
-bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+s3 = get_s3_client()
+bedrock = get_bedrock_client()
 
+@instrumented('analyze_resume')
+@traced('analyze_resume')
+@profiled('analyze_resume')
+@claim_checked('analyze_resume')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Analyze how well resume matches job requirements
@@ -45,27 +54,19 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
 
         # Download all resumes from S3
         resumes = []
-        for key in resume_keys:
-            if key:
-                validated_key = validate_s3_key(key)
-                response = s3.get_object(Bucket=bucket_name, Key=validated_key)
-                content = safe_decode_s3_body(response['Body'].read(), source=validated_key)
-                content = validate_resume_content(content, source=validated_key)
-                resumes.append(content)
+        with span('load_resumes', count=len(resume_keys)):
+            for key in resume_keys:
+                if key:
+                    validated_key = validate_s3_key(key)
+                    response = s3.get_object(Bucket=bucket_name, Key=validated_key)
+                    content = safe_decode_s3_body(response['Body'].read(), source=validated_key)
+                    content = validate_resume_content(content, source=validated_key)
+                    resumes.append(content)
         
-        resume_content = '\n\n---RESUME VERSION---\n\n'.join(resumes)
-        
-        # Prepare analysis prompt
-        prompt = f"""You are an expert resume analyst. Analyze this resume against the job requirements.
-
-Job Requirements:
-{json.dumps(parsed_job, indent=2)}
-
-Resume:
-{resume_content}
+        instructions = """You are an expert resume analyst. Analyze the candidate's resume above against the job requirements.
 
 Provide a detailed analysis in JSON format:
-{{
+{
   "fitScore": <0-100 percentage>,
   "matchedSkills": [<array of skills that match>],
   "missingSkills": [<array of required skills not found>],
@@ -73,31 +74,18 @@ Provide a detailed analysis in JSON format:
   "gaps": [<array of areas where candidate falls short>],
   "recommendations": [<array of specific suggestions>],
   "summary": "<brief 2-3 sentence summary of fit>"
-}}
+}
 
 Be honest and thorough. Return ONLY valid JSON."""
+        prompt = build_prompt(document_prefix(resume_versions_block(resumes), parsed_job), instructions)
 
-        # Call Claude 4.5 Opus for detailed analysis
-        response = bedrock.invoke_model(
-            modelId=os.environ.get('MODEL_ID', 'us.anthropic.claude-opus-4-5-20251101-v1:0'),
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 8192,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.2
-            })
-        )
-        
-        response_body = json.loads(response['body'].read())
-        analysis_content = response_body['content'][0]['text']
+        # Call Claude for detailed analysis
+        response = invoke_claude(prompt, max_tokens=8192, temperature=0.2, client=bedrock,
+                                 cache=cache_enabled('analyze_resume'),
+                                 tool=output_tool('analyze_resume'))
         
         # Parse analysis
-        analysis = extract_json_from_text(analysis_content)
+        analysis = response.parsed_json()
         
         return {
             'statusCode': 200,
@@ -110,7 +98,9 @@ Be honest and thorough. Return ONLY valid JSON."""
             'strengths': analysis.get('strengths', []),
             'gaps': analysis.get('gaps', []),
             'recommendations': analysis.get('recommendations', []),
-            'summary': analysis.get('summary', '')
+            'summary': analysis.get('summary', ''),
+            'promptCache': response.prompt_cache_usage(),
+            'usage': response.usage_record()
         }
         
     except ValueError as e:
@@ -2,17 +2,24 @@
 ATS Optimization Lambda Function
 Ensures resume is 100% compatible with Applicant Tracking Systems
 """
-import json
 import logging
-import os
-import boto3
-from extract_json import extract_json_from_text
+from aws_runtime import get_bedrock_client, stream_claude, stream_deadline_seconds
+from claim_check import claim_checked
+from metrics import instrumented
+from profiling import profiled
+from tracing import traced
+from response_cache import cache_enabled
+from prompt_context import build_prompt, document_prefix, tailored_resume_block
+from json_stream import StreamingJSONParser
+from output_schemas import output_tool
 from typing import Dict, Any
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+# Streaming reads give up no later than the stage deadline
+STREAM_DEADLINE_SECONDS = stream_deadline_seconds(540, 'ats_optimize')
+bedrock = get_bedrock_client(read_timeout=STREAM_DEADLINE_SECONDS)
 
 ATS_OPTIMIZATION_PROMPT = """Optimize this resume so it's 100% compatible with Applicant Tracking Systems. Add keywords matching the job title and requirements for 2025. Focus on:
 1. Keyword density and placement
@@ -21,6 +28,10 @@ ATS_OPTIMIZATION_PROMPT = """Optimize this resume so it's 100% compatible with A
 4. Skills section optimization
 5. Action verbs and industry terminology"""
 
+@instrumented('ats_optimize')
+@traced('ats_optimize')
+@profiled('ats_optimize')
+@claim_checked('ats_optimize')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Optimize resume for ATS compatibility
@@ -39,17 +50,11 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         parsed_job = event.get('parsedJob', {})
         keywords = parsed_job.get('keywords', [])
         
-        prompt = f"""{ATS_OPTIMIZATION_PROMPT}
-
-TAILORED RESUME:
-{tailored_resume}
+        instructions = f"""{ATS_OPTIMIZATION_PROMPT}
 
 TARGET KEYWORDS:
 {', '.join(keywords)}
 
-JOB REQUIREMENTS:
-{json.dumps(parsed_job, indent=2)}
-
 Return JSON with:
 {{
   "atsOptimizedResume": "<ATS-optimized resume in Markdown>",
@@ -62,34 +67,28 @@ Return JSON with:
 }}
 
 Return ONLY valid JSON."""
+        prompt = build_prompt(document_prefix(tailored_resume_block(tailored_resume), parsed_job), instructions)
 
-        # Call Claude 4.5 Haiku for fast ATS optimization
-        response = bedrock.invoke_model(
-            modelId=os.environ.get('MODEL_ID', 'us.anthropic.claude-opus-4-5-20251101-v1:0'),
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 8192,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.3
-            })
-        )
-        
-        response_body = json.loads(response['body'].read())
-        result_content = response_body['content'][0]['text']
+        # Stream Claude output for ATS optimization
+        parser = StreamingJSONParser()
+        response = stream_claude(prompt, max_tokens=8192, temperature=0.3, client=bedrock,
+                                 cache=cache_enabled('ats_optimize'),
+                                 deadline_seconds=STREAM_DEADLINE_SECONDS,
+                                 on_text=parser.feed,
+                                 tool=output_tool('ats_optimize'))
         
-        result = extract_json_from_text(result_content)
+        result = parser.result(truncated=response.stop_reason == 'max_tokens')
         
         return {
             'statusCode': 200,
             'atsOptimizedResume': result.get('atsOptimizedResume', ''),
             'atsScore': result.get('atsScore', 0),
             'optimizations': result.get('optimizations', []),
-            'keywordCoverage': result.get('keywordCoverage', {})
+            'keywordCoverage': result.get('keywordCoverage', {}),
+            'partial': parser.partial,
+            'completeFields': parser.complete_fields,
+            'promptCache': response.prompt_cache_usage(),
+            'usage': response.usage_record()
         }
         
     except Exception as e:
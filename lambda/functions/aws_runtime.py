@@ -0,0 +1,712 @@
+"""
+Shared AWS runtime for Lambda functions.
+Owns the pooled boto3 clients and the single Bedrock invocation path
+(invoke_claude / stream_claude) used by every handler.
+
+boto3 is imported on first client construction. With LAZY_INIT=true the
+getters hand out LazyClient placeholders until a client is first used,
+so a cold start that exits early (validation failure, nothing to send)
+never pays for boto3 or client setup.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
+
+import concurrency_limiter
+import metrics
+import response_cache
+import tracing
+from extract_json import extract_json_from_text
+from output_schemas import request_tools
+
+if TYPE_CHECKING:
+    import boto3
+    from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+ANTHROPIC_VERSION = "bedrock-2023-05-31"
+DEFAULT_MODEL_ID = "us.anthropic.claude-opus-4-5-20251101-v1:0"
+DEFAULT_REGION = "us-east-1"
+
+# Models that reject cache_control markers on Bedrock
+PROMPT_CACHING_UNSUPPORTED = (
+    'anthropic.claude-3-haiku',
+    'anthropic.claude-3-sonnet',
+    'anthropic.claude-3-opus',
+    'anthropic.claude-3-5-sonnet',
+)
+
+# A prompt is either plain text or a list of Messages API content blocks
+Prompt = Union[str, List[Dict[str, Any]]]
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer tuning knob from the environment."""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        logger.warning("Ignoring non-integer %s=%r", name, os.environ.get(name))
+        return default
+
+
+def bedrock_config(read_timeout: Optional[int] = None) -> 'Config':
+    """Client config for bedrock-runtime: long reads, keep-alive, adaptive retries.
+
+    read_timeout caps BEDROCK_READ_TIMEOUT, so a streaming client never
+    waits on a stalled connection for longer than its stage's deadline.
+    """
+    from botocore.config import Config
+
+    default_read_timeout = _env_int('BEDROCK_READ_TIMEOUT', 600)
+    return Config(
+        region_name=os.environ.get('BEDROCK_REGION', DEFAULT_REGION),
+        connect_timeout=_env_int('BEDROCK_CONNECT_TIMEOUT', 10),
+        read_timeout=min(default_read_timeout, read_timeout) if read_timeout else default_read_timeout,
+        max_pool_connections=_env_int('AWS_MAX_POOL_CONNECTIONS', 50),
+        tcp_keepalive=True,
+        retries={
+            'mode': 'adaptive',
+            'max_attempts': _env_int('BEDROCK_MAX_ATTEMPTS', 4),
+        },
+    )
+
+
+def aws_config() -> 'Config':
+    """Client config for S3, DynamoDB and SES."""
+    from botocore.config import Config
+
+    return Config(
+        connect_timeout=_env_int('AWS_CONNECT_TIMEOUT', 5),
+        read_timeout=_env_int('AWS_READ_TIMEOUT', 30),
+        max_pool_connections=_env_int('AWS_MAX_POOL_CONNECTIONS', 50),
+        tcp_keepalive=True,
+        retries={
+            'mode': 'standard',
+            'max_attempts': _env_int('AWS_MAX_ATTEMPTS', 3),
+        },
+    )
+
+
+_lock = threading.Lock()
+_session: Optional['boto3.session.Session'] = None
+_clients: Dict[str, Any] = {}
+
+SessionFactory = Callable[['boto3.session.Session'], Any]
+
+
+def lazy_init_enabled() -> bool:
+    """LAZY_INIT=true defers client construction from module load to first use."""
+    return os.environ.get('LAZY_INIT', 'false').lower() == 'true'
+
+
+def _get_session() -> 'boto3.session.Session':
+    global _session
+    if _session is None:
+        import boto3
+
+        _session = boto3.session.Session()
+    return _session
+
+
+def _cached(name: str, factory: SessionFactory) -> Any:
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = factory(_get_session())
+                _clients[name] = client
+    return client
+
+
+class LazyClient:
+    """Placeholder for a pooled client, built on first attribute access.
+
+    Every access goes through the pool, so a client swapped into _clients
+    (tests, devtools) is seen even by placeholders handed out earlier.
+    """
+    __slots__ = ('_name', '_factory')
+
+    def __init__(self, name: str, factory: SessionFactory):
+        self._name = name
+        self._factory = factory
+
+    def resolve(self) -> Any:
+        return _clients.get(self._name) or _cached(self._name, self._factory)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.resolve(), attr)
+
+    def __repr__(self) -> str:
+        state = 'built' if self._name in _clients else 'deferred'
+        return f"<LazyClient {self._name} ({state})>"
+
+
+def _client(name: str, factory: SessionFactory) -> Any:
+    if name in _clients or not lazy_init_enabled():
+        return _cached(name, factory)
+    return LazyClient(name, factory)
+
+
+def get_bedrock_client(read_timeout: Optional[float] = None):
+    """Get or create the shared Bedrock runtime client
+
+    Streaming handlers pass their stream deadline as read_timeout and get
+    a separate pooled client whose reads give up no later than that.
+    """
+    if not read_timeout:
+        return _client('bedrock-runtime', lambda s: s.client('bedrock-runtime', config=bedrock_config()))
+    seconds = max(1, math.ceil(read_timeout))
+    return _client(f'bedrock-runtime:{seconds}',
+                   lambda s: s.client('bedrock-runtime', config=bedrock_config(read_timeout=seconds)))
+
+
+def get_s3_client():
+    """Get or create the shared S3 client"""
+    return _client('s3', lambda s: tracing.register_aws_hooks(
+        metrics.register_s3_hooks(s.client('s3', config=aws_config()))))
+
+
+def get_dynamodb_resource():
+    """Get or create the shared DynamoDB resource"""
+    return _client('dynamodb', lambda s: tracing.register_aws_hooks(s.resource('dynamodb', config=aws_config())))
+
+
+def get_ses_client():
+    """Get or create the shared SES client"""
+    return _client(
+        'ses',
+        lambda s: tracing.register_aws_hooks(
+            s.client('ses', region_name=os.environ.get('SES_REGION', DEFAULT_REGION), config=aws_config())),
+    )
+
+
+def reset_clients() -> None:
+    """Drop cached clients so the next getter call rebuilds them (tests, config changes)."""
+    global _session
+    with _lock:
+        _clients.clear()
+        _session = None
+
+
+@dataclass
+class ClaudeResult:
+    """Outcome of one Claude invocation."""
+    text: str
+    model_id: str
+    stop_reason: Optional[str] = None
+    usage: Dict[str, int] = field(default_factory=dict)
+    latency_ms: float = 0.0
+    first_token_ms: Optional[float] = None
+    cache_tier: Optional[str] = None
+    continuations: int = 0
+    tool_input: Optional[Any] = None
+
+    def parsed_json(self) -> Any:
+        """Structured output from the forced tool, else JSON recovered from the text."""
+        if self.tool_input is not None:
+            return self.tool_input
+        with metrics.timed('JsonExtractionTime'), tracing.span('json.extract', chars=len(self.text)):
+            return extract_json_from_text(self.text)
+
+    def prompt_cache_usage(self) -> Dict[str, int]:
+        """Bedrock prompt-cache token counts in stage-output form."""
+        return {
+            'cacheReadInputTokens': int(self.usage.get('cache_read_input_tokens', 0) or 0),
+            'cacheWriteInputTokens': int(self.usage.get('cache_creation_input_tokens', 0) or 0),
+        }
+
+    def usage_record(self) -> Dict[str, Any]:
+        """Compact billing record for the stage output (see usage_ledger).
+
+        A response-cache hit reports the tier it came from and no tokens,
+        since nothing was billed for it.
+        """
+        billed = {} if self.cache_tier else self.usage
+        record: Dict[str, Any] = {
+            'model': self.model_id,
+            'inputTokens': int(billed.get('input_tokens', 0) or 0),
+            'outputTokens': int(billed.get('output_tokens', 0) or 0),
+            'cacheReadInputTokens': int(billed.get('cache_read_input_tokens', 0) or 0),
+            'cacheWriteInputTokens': int(billed.get('cache_creation_input_tokens', 0) or 0),
+            'latencyMs': int(round(self.latency_ms)),
+        }
+        if self.cache_tier:
+            record['responseCache'] = self.cache_tier
+        return record
+
+    @property
+    def output_tokens_per_second(self) -> Optional[float]:
+        """Generation throughput after the first token (streaming only)."""
+        output_tokens = self.usage.get('output_tokens')
+        if self.first_token_ms is None or not output_tokens:
+            return None
+        generation_ms = self.latency_ms - self.first_token_ms
+        if generation_ms <= 0:
+            return None
+        return output_tokens / (generation_ms / 1000)
+
+
+class StreamDeadlineExceeded(TimeoutError):
+    """A streamed response did not finish within the stage's read deadline."""
+
+
+def stream_deadline_seconds(default: float, stage: Optional[str] = None) -> float:
+    """Per-stage stream deadline.
+
+    STREAM_DEADLINE_SECONDS_<STAGE> (e.g. STREAM_DEADLINE_SECONDS_ATS_OPTIMIZE)
+    wins, then the shared STREAM_DEADLINE_SECONDS, then the handler default.
+    """
+    names = [f'STREAM_DEADLINE_SECONDS_{stage.upper()}'] if stage else []
+    for name in names + ['STREAM_DEADLINE_SECONDS']:
+        value = os.environ.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            logger.warning("Ignoring non-numeric %s=%r", name, value)
+    return default
+
+
+def _read_timeout_errors() -> tuple:
+    """Exceptions a stalled response stream raises once the client read timeout expires."""
+    from botocore.exceptions import ReadTimeoutError
+    from urllib3.exceptions import ReadTimeoutError as Urllib3ReadTimeoutError
+
+    return (ReadTimeoutError, Urllib3ReadTimeoutError, TimeoutError)
+
+
+# Truncated generations are not worth replaying from cache
+CACHEABLE_STOP_REASONS = (None, 'end_turn', 'stop_sequence', 'tool_use')
+
+
+def _cache_lookup(key: str) -> Optional[ClaudeResult]:
+    started = time.perf_counter()
+    with tracing.span('response_cache.get') as lookup_span:
+        record, tier = response_cache.get_response_cache().get(key)
+        if lookup_span:
+            lookup_span.set(hit=tier)
+    if record is None:
+        return None
+    logger.info("Response cache hit (%s) for model=%s", tier, record.get('model_id'))
+    return ClaudeResult(
+        text=record['text'],
+        model_id=record['model_id'],
+        stop_reason=record.get('stop_reason'),
+        usage=record.get('usage') or {},
+        latency_ms=(time.perf_counter() - started) * 1000,
+        cache_tier=tier,
+        tool_input=record.get('tool_input'),
+    )
+
+
+def _cache_store(key: str, result: ClaudeResult) -> None:
+    if result.stop_reason not in CACHEABLE_STOP_REASONS:
+        return
+    response_cache.get_response_cache().put(key, {
+        'text': result.text,
+        'model_id': result.model_id,
+        'stop_reason': result.stop_reason,
+        'usage': result.usage,
+        'tool_input': result.tool_input,
+    })
+
+
+def _trace_request(request_span: 'tracing.Span', request_wall: float, first_token_ms: Optional[float],
+                   usage: Dict[str, Any], stop_reason: Optional[str]) -> None:
+    """Annotate a Bedrock request span; a stream is split at its first token."""
+    request_span.set(slotWaitMs=round((request_wall - request_span.start) * 1000, 1), stopReason=stop_reason,
+                     inputTokens=usage.get('input_tokens'), outputTokens=usage.get('output_tokens'))
+    if first_token_ms is not None:
+        first_token = request_wall + first_token_ms / 1000
+        request_span.set(ttftMs=round(first_token_ms, 1))
+        tracing.record_span('bedrock.time_to_first_token', request_wall, first_token)
+        tracing.record_span('bedrock.streaming', first_token, time.time())
+
+
+def _record_metrics(result: ClaudeResult) -> None:
+    metrics.record_bedrock(result.model_id, result.latency_ms, result.first_token_ms,
+                           result.usage, result.cache_tier)
+
+
+def text_block(text: str) -> Dict[str, Any]:
+    """A plain text content block."""
+    return {"type": "text", "text": text}
+
+
+def cached_block(text: str) -> Dict[str, Any]:
+    """A text content block that ends a Bedrock prompt-cache prefix."""
+    return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+
+
+def prompt_text(prompt: Prompt) -> str:
+    """Flatten a prompt to text (for hashing and logging)."""
+    if isinstance(prompt, str):
+        return prompt
+    return '\n\n'.join(block.get('text', '') for block in prompt)
+
+
+def prompt_caching_supported(model_id: str) -> bool:
+    """Whether cache_control markers should be sent for this model."""
+    if os.environ.get('PROMPT_CACHING', 'true').lower() in ('false', '0', 'no', 'off'):
+        return False
+    base_id = model_id.split('.', 1)[1] if model_id.startswith(('us.', 'eu.', 'apac.', 'global.')) else model_id
+    return not base_id.startswith(PROMPT_CACHING_UNSUPPORTED)
+
+
+def build_request_body(prompt: Prompt, max_tokens: int, temperature: float,
+                       system: Optional[str] = None,
+                       prompt_caching: bool = True,
+                       prefill: Optional[str] = None,
+                       tool: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Build the Anthropic Messages request body for Bedrock.
+
+    prefill, when given, is sent as the start of the assistant turn and the
+    model continues from where it ends. tool, when given, is the tool the
+    model is required to call (structured output). When the prompt carries
+    a cached prefix, the tool is offered alongside every other stage's tool
+    (see output_schemas.request_tools) so the tools block ahead of that
+    prefix is the same for all stages; otherwise it is sent alone. With
+    both, the tools are still sent but none may be called, since the
+    prefill is the tool input so far and the model continues it as text.
+    """
+    if not isinstance(prompt, str) and not prompt_caching:
+        prompt = [{k: v for k, v in block.items() if k != 'cache_control'} for block in prompt]
+    body: Dict[str, Any] = {
+        "anthropic_version": ANTHROPIC_VERSION,
+        "max_tokens": max_tokens,
+        "messages": [
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "temperature": temperature
+    }
+    if prefill:
+        body["messages"].append({"role": "assistant", "content": prefill})
+    if tool:
+        cached_prefix = not isinstance(prompt, str) and any('cache_control' in block for block in prompt)
+        body["tools"] = request_tools(tool) if cached_prefix else [tool]
+        body["tool_choice"] = {"type": "none"} if prefill else {"type": "tool", "name": tool["name"]}
+    if system:
+        body["system"] = system
+    return body
+
+
+def resolve_model_id(model_id: Optional[str] = None) -> str:
+    """Explicit model ID, else the function's MODEL_ID, else the default."""
+    return model_id or os.environ.get('MODEL_ID', DEFAULT_MODEL_ID)
+
+
+def _text_from_content(content: List[Dict[str, Any]]) -> str:
+    return ''.join(block.get('text', '') for block in content if block.get('type', 'text') == 'text')
+
+
+def _tool_input_from_content(content: List[Dict[str, Any]]) -> Optional[Any]:
+    for block in content:
+        if block.get('type') == 'tool_use':
+            return block.get('input')
+    return None
+
+
+def _tool_input_from_text(text: str) -> Optional[Any]:
+    """Decode streamed tool input (input_json_delta fragments joined)."""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
+def _collect_stream(stream: Any, model_id: str, started: float,
+                    on_text: Optional[Callable[[str], None]] = None,
+                    deadline_seconds: Optional[float] = None,
+                    tool_json: bool = False) -> ClaudeResult:
+    """Drain a Bedrock response stream into a ClaudeResult.
+
+    With tool_json set, tool-input fragments (input_json_delta) are
+    collected as text alongside any text deltas.
+    """
+    deadline = started + deadline_seconds if deadline_seconds else None
+    parts: List[str] = []
+    length = 0
+    next_progress = 1000
+    first_token_ms = None
+    stop_reason = None
+    usage: Dict[str, int] = {}
+
+    if stream:
+        try:
+            for event in stream:
+                if deadline and time.perf_counter() > deadline:
+                    close = getattr(stream, 'close', None)
+                    if close:
+                        close()
+                    raise StreamDeadlineExceeded(
+                        f"{model_id} stream exceeded {deadline_seconds:.0f}s after {length} characters"
+                    )
+                chunk = event.get('chunk')
+                if not chunk:
+                    continue
+                chunk_obj = json.loads(chunk.get('bytes').decode())
+                chunk_type = chunk_obj.get('type')
+
+                if chunk_type == 'content_block_delta':
+                    delta = chunk_obj.get('delta', {})
+                    delta_type = delta.get('type', 'text_delta')
+                    if delta_type == 'input_json_delta' and tool_json:
+                        text = delta.get('partial_json', '')
+                    elif delta_type == 'text_delta':
+                        text = delta.get('text', '')
+                    else:
+                        continue
+                    if not text:
+                        continue
+                    if first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - started) * 1000
+                    parts.append(text)
+                    length += len(text)
+                    if on_text:
+                        on_text(text)
+                    if length >= next_progress:
+                        logger.info("Generated %d characters...", length)
+                        next_progress = length + 1000
+                elif chunk_type == 'message_start':
+                    usage.update(chunk_obj.get('message', {}).get('usage') or {})
+                elif chunk_type == 'message_delta':
+                    stop_reason = chunk_obj.get('delta', {}).get('stop_reason') or stop_reason
+                    usage.update(chunk_obj.get('usage') or {})
+        except StreamDeadlineExceeded:
+            raise
+        except _read_timeout_errors() as exc:
+            # The client read timeout is bounded by the deadline, so a stall ends here
+            raise StreamDeadlineExceeded(
+                f"{model_id} stream stalled after {length} characters: {exc}"
+            ) from exc
+
+    return ClaudeResult(
+        text=''.join(parts),
+        model_id=model_id,
+        stop_reason=stop_reason,
+        usage=usage,
+        latency_ms=(time.perf_counter() - started) * 1000,
+        first_token_ms=first_token_ms,
+    )
+
+
+def invoke_claude(prompt: Prompt, model_id: Optional[str] = None, max_tokens: int = 4096,
+                  temperature: float = 0.7, system: Optional[str] = None,
+                  client: Any = None, cache: bool = False,
+                  tool: Optional[Dict[str, Any]] = None) -> ClaudeResult:
+    """
+    Invoke Claude via Bedrock and wait for the complete response
+
+    Args:
+        prompt: The user prompt, as text or content blocks (see cached_block)
+        model_id: Bedrock model ID (defaults to the MODEL_ID env var)
+        max_tokens: Maximum tokens in response
+        temperature: Sampling temperature
+        system: Optional system prompt
+        client: bedrock-runtime client to use (defaults to the shared client)
+        cache: Serve and store the response through the response cache
+        tool: Structured-output tool the model must call (see output_schemas)
+
+    Returns:
+        ClaudeResult with the response text, stop reason and usage; with a
+        tool, tool_input holds the parsed output and text its JSON
+    """
+    model_id = resolve_model_id(model_id)
+    key = None
+    if cache:
+        key = response_cache.cache_key(model_id, prompt_text(prompt), temperature, max_tokens, system, tool)
+        cached = _cache_lookup(key)
+        if cached:
+            _record_metrics(cached)
+            return cached
+
+    client = client or get_bedrock_client()
+    body = build_request_body(prompt, max_tokens, temperature, system,
+                              prompt_caching=prompt_caching_supported(model_id), tool=tool)
+
+    with tracing.span('bedrock.invoke_model', model=model_id) as request_span:
+        with concurrency_limiter.bedrock_slot(model_id) as slot:
+            request_wall = time.time()
+            started = time.perf_counter()
+            response = client.invoke_model(modelId=model_id, body=json.dumps(body))
+            slot.observe(response)
+            response_body = json.loads(response['body'].read())
+            latency_ms = (time.perf_counter() - started) * 1000
+        if request_span:
+            _trace_request(request_span, request_wall, None, response_body.get('usage') or {},
+                           response_body.get('stop_reason'))
+
+    content = response_body.get('content', [])
+    tool_input = _tool_input_from_content(content) if tool else None
+    result = ClaudeResult(
+        text=_text_from_content(content) if tool_input is None else json.dumps(tool_input, ensure_ascii=False),
+        model_id=model_id,
+        stop_reason=response_body.get('stop_reason'),
+        usage=response_body.get('usage') or {},
+        latency_ms=latency_ms,
+        tool_input=tool_input,
+    )
+    _record_metrics(result)
+    if key:
+        _cache_store(key, result)
+    return result
+
+
+def _merge_usage(total: Dict[str, int], usage: Dict[str, int]) -> None:
+    for name, count in usage.items():
+        if isinstance(count, (int, float)):
+            total[name] = total.get(name, 0) + count
+
+
+def _skip_leading_whitespace(on_text: Callable[[str], None]) -> Callable[[str], None]:
+    """on_text for a continuation, minus its leading whitespace (however many deltas it spans)."""
+    leading = [True]
+
+    def emit(delta: str) -> None:
+        if leading[0]:
+            delta = delta.lstrip()
+            leading[0] = not delta
+        if delta:
+            on_text(delta)
+    return emit
+
+
+def stream_claude(prompt: Prompt, model_id: Optional[str] = None, max_tokens: int = 4096,
+                  temperature: float = 0.7, system: Optional[str] = None,
+                  client: Any = None,
+                  on_text: Optional[Callable[[str], None]] = None,
+                  cache: bool = False,
+                  deadline_seconds: Optional[float] = None,
+                  max_continuations: int = 0,
+                  max_total_tokens: Optional[int] = None,
+                  tool: Optional[Dict[str, Any]] = None) -> ClaudeResult:
+    """
+    Invoke Claude via Bedrock with response streaming and collect the output
+
+    Args:
+        prompt: The user prompt, as text or content blocks (see cached_block)
+        model_id: Bedrock model ID (defaults to the MODEL_ID env var)
+        max_tokens: Maximum tokens in response (per request when continuing)
+        temperature: Sampling temperature
+        system: Optional system prompt
+        client: bedrock-runtime client to use (defaults to the shared client)
+        on_text: Optional callback invoked with each text delta as it arrives
+        cache: Serve and store the response through the response cache
+        deadline_seconds: Abort with StreamDeadlineExceeded if the stream is
+            still running this long after the request; a stall between chunks
+            ends when the client read timeout does, so pass a client from
+            get_bedrock_client(read_timeout=deadline_seconds)
+        max_continuations: When the model stops on max_tokens, send the text
+            so far back as an assistant prefill and continue, up to this many
+            times, stitching the pieces into one result
+        max_total_tokens: Overall output-token budget across continuations
+            (defaults to max_tokens * (max_continuations + 1))
+        tool: Structured-output tool the model must call (see output_schemas).
+            The tool input is streamed to on_text as JSON fragments; a
+            continuation prefills the partial JSON as text, since a forced
+            tool call cannot be resumed, and keeps the tools list
+
+    Returns:
+        ClaudeResult with the concatenated text, stop reason, usage and
+        time to first token; with a tool, tool_input holds the parsed output
+    """
+    model_id = resolve_model_id(model_id)
+    key = None
+    if cache:
+        key = response_cache.cache_key(model_id, prompt_text(prompt), temperature, max_tokens, system, tool)
+        cached = _cache_lookup(key)
+        if cached:
+            _record_metrics(cached)
+            if on_text and cached.text:
+                on_text(cached.text)
+            return cached
+
+    client = client or get_bedrock_client()
+    prompt_caching = prompt_caching_supported(model_id)
+    budget = max_total_tokens or max_tokens * (max_continuations + 1)
+    started = time.perf_counter()
+    text = ''
+    usage: Dict[str, int] = {}
+    first_token_ms = None
+    continuations = 0
+
+    while True:
+        # The assistant turn may not end in whitespace. text and on_text
+        # already have it, so whatever whitespace the model opens the
+        # continuation with (all, some or none of it again) is dropped
+        prefill = text.rstrip()
+        trimmed = prefill != text
+        request_tokens = min(max_tokens, budget - usage.get('output_tokens', 0))
+        body = build_request_body(prompt, request_tokens, temperature, system,
+                                  prompt_caching=prompt_caching, prefill=prefill, tool=tool)
+        remaining = None
+        if deadline_seconds:
+            remaining = deadline_seconds - (time.perf_counter() - started)
+            if remaining <= 0:
+                raise StreamDeadlineExceeded(
+                    f"{model_id} stream exceeded {deadline_seconds:.0f}s after {len(text)} characters"
+                )
+
+        with tracing.span('bedrock.invoke_model_with_response_stream', model=model_id,
+                          continuation=continuations) as request_span:
+            with concurrency_limiter.bedrock_slot(model_id) as slot:
+                request_wall = time.time()
+                request_started = time.perf_counter()
+                response = client.invoke_model_with_response_stream(modelId=model_id, body=json.dumps(body))
+                slot.observe(response)
+                part = _collect_stream(response.get('body'), model_id, request_started,
+                                       _skip_leading_whitespace(on_text) if on_text and trimmed else on_text,
+                                       remaining, tool_json=tool is not None)
+            if request_span:
+                _trace_request(request_span, request_wall, part.first_token_ms, part.usage, part.stop_reason)
+
+        text += part.text.lstrip() if trimmed else part.text
+        _merge_usage(usage, part.usage)
+        if first_token_ms is None and part.first_token_ms is not None:
+            first_token_ms = (request_started - started) * 1000 + part.first_token_ms
+        stop_reason = part.stop_reason
+
+        if stop_reason != 'max_tokens' or not part.text or continuations >= max_continuations:
+            break
+        if usage.get('output_tokens', 0) >= budget:
+            logger.warning("Output token budget of %d exhausted after %d continuation(s)", budget, continuations)
+            break
+        continuations += 1
+        logger.info("Stopped on max_tokens at %d characters, continuing (%d/%d)",
+                    len(text), continuations, max_continuations)
+
+    result = ClaudeResult(
+        text=text,
+        model_id=model_id,
+        stop_reason=stop_reason,
+        usage=usage,
+        latency_ms=(time.perf_counter() - started) * 1000,
+        first_token_ms=first_token_ms,
+        continuations=continuations,
+        tool_input=_tool_input_from_text(text) if tool and stop_reason != 'max_tokens' else None,
+    )
+
+    tokens_per_second = result.output_tokens_per_second
+    logger.info(
+        "Claude stream complete: model=%s chars=%d ttft_ms=%s tokens_per_second=%s stop_reason=%s continuations=%d",
+        model_id, len(result.text),
+        f"{result.first_token_ms:.0f}" if result.first_token_ms is not None else 'n/a',
+        f"{tokens_per_second:.1f}" if tokens_per_second is not None else 'n/a',
+        result.stop_reason, continuations,
+    )
+
+    _record_metrics(result)
+    if key:
+        _cache_store(key, result)
+    return result
@@ -0,0 +1,306 @@
+"""
+Claim-check and compressed payloads between workflow states.
+
+Step Functions passes every stage's output on inline, so the tailored
+resume, parsed job and review text are re-serialized on each hop and a
+large resume pushes an execution toward the 256 KB payload limit. With
+CLAIM_CHECK_ENABLED=true, @claim_checked(stage) writes each output field
+of CLAIM_CHECK_MIN_BYTES or more (serialized) to the resume bucket and
+returns a reference in its place:
+
+    {"$claimCheck": "payloads/job-1/3f2a...c9.json", "bytes": 18234}
+
+Keys are content hashes under payloads/{jobId}/, so a document passed on
+unchanged is stored once. Identifiers, status and bookkeeping fields stay
+inline, because the workflow's JSONPaths read them.
+
+Without the S3 round trip, PAYLOAD_COMPRESSION=gzip or zstd compresses
+output string fields of PAYLOAD_COMPRESSION_MIN_BYTES or more in place:
+
+    {"$encoding": "zstd", "data": "<base64>", "bytes": 30512}
+
+Markdown shrinks to a third or less even after base64, so three resume
+versions reaching save_results stay far from the limit. Compression runs
+before claim checks, so a field still too large once compressed goes to
+S3 as its (smaller) envelope. zstd comes from the standard library
+(compression.zstd, Python 3.14, the Lambda runtime) or the zstandard
+package; without either, fields are gzip-compressed instead.
+
+Reading does not depend on either flag: a stage whose event holds
+references or envelopes gets a dict that fetches or decodes each field
+the first time the handler reads it, so fields a stage never looks at
+are never downloaded. Fetched and stored documents are kept in an
+in-container LRU, which lets a warm container (or the router function)
+skip the download.
+
+Environment:
+    CLAIM_CHECK_ENABLED: "true" to offload large output fields (default false)
+    CLAIM_CHECK_MIN_BYTES: smallest field to offload (default 4096)
+    CLAIM_CHECK_CACHE_MB: in-container cache size (default 32)
+    PAYLOAD_COMPRESSION: "gzip" or "zstd" to compress large string fields (default none)
+    PAYLOAD_COMPRESSION_MIN_BYTES: smallest string to compress (default 2048)
+"""
+import base64
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import tracing
+from aws_runtime import get_s3_client
+from prompt_context import BOOKKEEPING_KEYS
+from response_cache import MemoryTier
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_PREFIX = 'payloads'
+REFERENCE_KEY = '$claimCheck'
+ENCODING_KEY = '$encoding'
+CODECS = ('gzip', 'zstd')
+DEFAULT_MIN_BYTES = 4096
+DEFAULT_CACHE_MB = 32
+DEFAULT_COMPRESSION_MIN_BYTES = 2048
+ENVELOPE_OVERHEAD = 64
+# Level 3 compresses markdown ~15% worse than the default 9 at a quarter of the CPU
+GZIP_LEVEL = 3
+# Fields the state machine reads by path or that say how the stage went
+INLINE_KEYS = ('statusCode', 'jobId', 'userId', 'error', 'message') + BOOKKEEPING_KEYS
+
+_cache: Optional[MemoryTier] = None
+
+
+def claim_check_enabled() -> bool:
+    """CLAIM_CHECK_ENABLED=true offloads large output fields to S3."""
+    return os.environ.get('CLAIM_CHECK_ENABLED', 'false').lower() == 'true'
+
+
+def min_bytes() -> int:
+    return int(os.environ.get('CLAIM_CHECK_MIN_BYTES', DEFAULT_MIN_BYTES))
+
+
+def compression_min_bytes() -> int:
+    return int(os.environ.get('PAYLOAD_COMPRESSION_MIN_BYTES', DEFAULT_COMPRESSION_MIN_BYTES))
+
+
+@functools.lru_cache(maxsize=None)
+def _zstd() -> Optional[Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]:
+    """(compress, decompress) from compression.zstd or zstandard, None without either."""
+    try:
+        from compression import zstd  # type: ignore[import-not-found]  # Python 3.14+
+        return zstd.compress, zstd.decompress
+    except ImportError:
+        pass
+    try:
+        import zstandard  # type: ignore[import-not-found]
+    except ImportError:
+        return None
+    return zstandard.ZstdCompressor().compress, zstandard.ZstdDecompressor().decompress
+
+
+def payload_compression() -> Optional[str]:
+    """The codec PAYLOAD_COMPRESSION asks for, gzip where zstd is unavailable, None when off."""
+    codec = os.environ.get('PAYLOAD_COMPRESSION', 'none').lower()
+    if codec not in CODECS:
+        return None
+    if codec == 'zstd' and _zstd() is None:
+        return 'gzip'
+    return codec
+
+
+def document_cache() -> MemoryTier:
+    """The container's cache of serialized documents by key."""
+    global _cache
+    if _cache is None:
+        max_bytes = int(float(os.environ.get('CLAIM_CHECK_CACHE_MB', DEFAULT_CACHE_MB)) * 1024 * 1024)
+        _cache = MemoryTier(max_entries=1024, max_bytes=max_bytes)
+    return _cache
+
+
+def is_reference(value: Any) -> bool:
+    return isinstance(value, dict) and isinstance(value.get(REFERENCE_KEY), str)
+
+
+def is_encoded(value: Any) -> bool:
+    return isinstance(value, dict) and value.get(ENCODING_KEY) in CODECS and isinstance(value.get('data'), str)
+
+
+def has_packed_fields(event: Dict[str, Any]) -> bool:
+    """
+    Whether an event holds references or encoded fields
+
+    Both only replace a stage output's own fields, and the workflow passes
+    outputs on as event fields (parsedJob) or lists of them
+    (parallelResults), so only those places are looked at.
+    """
+    for value in event.values():
+        for output in (value if isinstance(value, list) else (value,)):
+            if not isinstance(output, dict):
+                continue
+            if REFERENCE_KEY in output or ENCODING_KEY in output:
+                return True
+            for field in output.values():
+                if isinstance(field, dict) and (REFERENCE_KEY in field or ENCODING_KEY in field):
+                    return True
+    return False
+
+
+def encode(text: str, codec: str) -> Dict[str, Any]:
+    """A compressed, base64 envelope for a string field."""
+    raw = text.encode('utf-8')
+    if codec == 'zstd' and _zstd() is not None:
+        packed = _zstd()[0](raw)
+    else:
+        # mtime=0 keeps the bytes, and so claim-check keys, stable for equal text
+        codec, packed = 'gzip', gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0)
+    return {ENCODING_KEY: codec, 'data': base64.b64encode(packed).decode('ascii'), 'bytes': len(raw)}
+
+
+def decode(envelope: Dict[str, Any]) -> str:
+    """The string an envelope holds."""
+    packed = base64.b64decode(envelope['data'])
+    if envelope[ENCODING_KEY] == 'gzip':
+        return gzip.decompress(packed).decode('utf-8')
+    zstd = _zstd()
+    if zstd is None:
+        raise ValueError("Payload field is zstd-compressed, but neither compression.zstd nor zstandard is available")
+    return zstd[1](packed).decode('utf-8')
+
+
+def compress_fields(result: Dict[str, Any], codec: str, threshold: Optional[int] = None) -> Dict[str, Any]:
+    """Replace the result's large string fields with compressed envelopes where that is smaller, in place."""
+    threshold = compression_min_bytes() if threshold is None else threshold
+    for key, value in list(result.items()):
+        if key in INLINE_KEYS or not isinstance(value, str):
+            continue
+        size = len(value.encode('utf-8'))
+        if size < threshold:
+            continue
+        envelope = encode(value, codec)
+        # data plus the envelope's own keys against the string's bytes
+        if len(envelope['data']) + ENVELOPE_OVERHEAD < size:
+            result[key] = envelope
+    return result
+
+
+def payload_key(job_id: str, body: str) -> str:
+    """payloads/{jobId}/{sha256 of the document}.json"""
+    digest = hashlib.sha256(body.encode('utf-8')).hexdigest()
+    return f"{PAYLOAD_PREFIX}/{job_id or 'unknown'}/{digest}.json"
+
+
+def store(value: Any, job_id: str) -> Dict[str, Any]:
+    """Write a document to the bucket (unless this container already has) and return its reference."""
+    body = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    key = payload_key(job_id, body)
+    size = len(body.encode('utf-8'))
+    cache = document_cache()
+    if cache.get(key) is None:
+        with tracing.span('claim_check.store', key=key, bytes=size):
+            get_s3_client().put_object(Bucket=os.environ['BUCKET_NAME'], Key=key, Body=body.encode('utf-8'),
+                                       ContentType='application/json')
+        cache.put(key, body, float('inf'))
+    return {REFERENCE_KEY: key, 'bytes': size}
+
+
+def fetch(reference: Dict[str, Any]) -> Any:
+    """The document a reference points to, from the container cache or the bucket."""
+    key = reference[REFERENCE_KEY]
+    cache = document_cache()
+    body = cache.get(key)
+    if body is None:
+        with tracing.span('claim_check.fetch', key=key, bytes=reference.get('bytes')):
+            response = get_s3_client().get_object(Bucket=os.environ['BUCKET_NAME'], Key=key)
+            body = response['Body'].read().decode('utf-8')
+        cache.put(key, body, float('inf'))
+    # Each reader gets its own copy; handlers may modify what they read
+    return json.loads(body)
+
+
+def _lazy(value: Any) -> Any:
+    if is_reference(value):
+        value = fetch(value)
+    if is_encoded(value):
+        return decode(value)
+    if isinstance(value, dict) and not isinstance(value, ClaimCheckedEvent):
+        return ClaimCheckedEvent(value)
+    if isinstance(value, list):
+        return [_lazy(item) for item in value]
+    return value
+
+
+class ClaimCheckedEvent(dict):
+    """
+    A payload dict whose references and envelopes are unpacked on first read
+
+    Reading a field (by [], get, items or values, which json.dumps and
+    deepcopy use) replaces its reference or envelope with the document in
+    place.
+    Nested dicts are wrapped the same way when they are read.
+    """
+
+    def __getitem__(self, key: Any) -> Any:
+        value = super().__getitem__(key)
+        resolved = _lazy(value)
+        if resolved is not value:
+            super().__setitem__(key, resolved)
+        return resolved
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def items(self):  # type: ignore[override]
+        return [(key, self[key]) for key in list(self)]
+
+    def values(self):  # type: ignore[override]
+        return [self[key] for key in list(self)]
+
+
+def resolve(value: Any) -> Any:
+    """A payload with every reference and envelope replaced by its document (plain dicts and lists)."""
+    if is_reference(value):
+        value = fetch(value)
+    if is_encoded(value):
+        return decode(value)
+    if isinstance(value, dict):
+        return {key: resolve(item) for key, item in dict.items(value)}
+    if isinstance(value, list):
+        return [resolve(item) for item in value]
+    return value
+
+
+def offload(result: Dict[str, Any], job_id: str, threshold: Optional[int] = None) -> Dict[str, Any]:
+    """Replace the result's large fields with references, in place."""
+    threshold = min_bytes() if threshold is None else threshold
+    for key, value in list(result.items()):
+        if key in INLINE_KEYS or is_reference(value) or value is None or isinstance(value, (bool, int, float)):
+            continue
+        size = len(json.dumps(value, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8'))
+        if size >= threshold:
+            result[key] = store(value, job_id)
+    return result
+
+
+def claim_checked(stage: str) -> Callable[[Callable], Callable]:
+    """Decorate a Lambda handler to unpack its event lazily and compress or offload large output fields."""
+    def decorate(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]]) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+            if isinstance(event, dict) and has_packed_fields(event):
+                event = ClaimCheckedEvent(event)
+            result = handler(event, context)
+            codec = payload_compression()
+            if isinstance(result, dict) and (codec or claim_check_enabled()):
+                job_id = result.get('jobId') or (event.get('jobId') if isinstance(event, dict) else None)
+                try:
+                    if codec:
+                        compress_fields(result, codec)
+                    if claim_check_enabled():
+                        offload(result, str(job_id or ''))
+                except Exception as e:  # inline is still a valid payload
+                    logger.warning("Payload packing for %s skipped: %s", stage, str(e))
+            return result
+        return wrapper
+    return decorate
@@ -0,0 +1,296 @@
+"""
+Distributed AIMD concurrency limiter for Bedrock calls.
+
+Every Lambda that calls a model first takes a slot from a per-model counter
+in DynamoDB and gives it back when the call finishes. The allowed
+concurrency grows by one slot per window of successful calls (additive
+increase) and is halved when Bedrock throttles (multiplicative decrease),
+so concurrent workflows converge on the account quota instead of failing
+stages and re-running them through the Step Functions retry.
+
+Each held slot is also recorded on the counter as a lease token carrying
+its expiry (the longest a Lambda can run), so slots leaked by crashed
+invocations are reclaimed one by one while other calls keep the counter
+busy, and a slot that is still in use is never taken back.
+
+The limiter fails open: if DynamoDB is unavailable the call proceeds
+without a slot.
+
+Environment:
+    BEDROCK_LIMITER_TABLE: DynamoDB table holding the counters (unset = disabled)
+    BEDROCK_LIMITER_INITIAL / _MIN / _MAX: concurrency bounds per model
+    BEDROCK_LIMITER_MAX_WAIT_SECONDS: how long to wait for a slot
+"""
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'limiter#'
+# Expired leases reclaimed per update, keeping the condition expression small
+RECLAIM_BATCH = 25
+# Lower-cased: event-stream errors arrive as e.g. "throttlingException"
+THROTTLING_ERROR_CODES = {
+    'throttlingexception',
+    'toomanyrequestsexception',
+    'serviceunavailableexception',
+    'modelnotreadyexception',
+}
+
+
+def _number(value: float) -> Decimal:
+    return Decimal(str(round(value, 4)))
+
+
+class ConcurrencyLimitTimeout(Exception):
+    """No Bedrock slot became available within the wait budget."""
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """Whether an exception means Bedrock is over capacity."""
+    # botocore is imported late so a cold start that never calls AWS skips it
+    from botocore.exceptions import ClientError
+
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code') or ''
+    else:
+        code = type(error).__name__
+    return code.lower() in THROTTLING_ERROR_CODES
+
+
+class Lease:
+    """A held slot. Call observe() with the Bedrock response to report retries."""
+
+    def __init__(self, model_id: str, limit: float, acquired: bool = True, token: str = ''):
+        self.model_id = model_id
+        self.limit = limit
+        self.acquired = acquired
+        self.token = token              # '<id>:<expiry>' entry in the counter's leases set
+        self.congested = False
+        self.wait_ms = 0.0
+
+    def observe(self, response: Any) -> None:
+        """Treat SDK-level retries as a congestion signal."""
+        try:
+            if response.get('ResponseMetadata', {}).get('RetryAttempts', 0) > 0:
+                self.congested = True
+        except AttributeError:
+            pass
+
+
+class ConcurrencyLimiter:
+    """AIMD concurrency limit per model, stored in DynamoDB."""
+
+    def __init__(self, table, initial_limit: float = 4, min_limit: float = 1, max_limit: float = 64,
+                 decrease_factor: float = 0.5, lease_seconds: int = 900,
+                 max_wait_seconds: float = 120, poll_interval: float = 0.25,
+                 sleep: Callable[[float], None] = time.sleep, clock: Callable[[], float] = time.time):
+        self.table = table
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.lease_seconds = lease_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.poll_interval = poll_interval
+        self.sleep = sleep
+        self.clock = clock
+
+    def _key(self, model_id: str):
+        return {'jobId': KEY_PREFIX + model_id, 'timestamp': 0}
+
+    def acquire(self, model_id: str) -> Lease:
+        """Block until a slot is free, then take it."""
+        from botocore.exceptions import ClientError
+
+        started = self.clock()
+        deadline = started + self.max_wait_seconds
+        delay = self.poll_interval
+
+        while True:
+            now = int(self.clock())
+            token = f"{uuid.uuid4().hex}:{now + self.lease_seconds}"
+            try:
+                response = self.table.update_item(
+                    Key=self._key(model_id),
+                    UpdateExpression=(
+                        'SET inFlight = if_not_exists(inFlight, :zero) + :one, '
+                        '#limit = if_not_exists(#limit, :initial), updatedAt = :now '
+                        'ADD leases :lease'
+                    ),
+                    ConditionExpression='attribute_not_exists(inFlight) OR inFlight < #limit',
+                    ExpressionAttributeNames={'#limit': 'limit'},
+                    ExpressionAttributeValues={
+                        ':zero': 0,
+                        ':one': 1,
+                        ':initial': _number(self.initial_limit),
+                        ':now': _number(now),
+                        ':lease': {token},
+                    },
+                    ReturnValues='ALL_NEW',
+                )
+                lease = Lease(model_id, float(response['Attributes']['limit']), token=token)
+                lease.wait_ms = (self.clock() - started) * 1000
+                return lease
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    logger.warning("Concurrency limiter unavailable, proceeding without a slot: %s", str(e))
+                    return Lease(model_id, self.initial_limit, acquired=False)
+
+            self._reclaim_expired(model_id)
+            if self.clock() >= deadline:
+                raise ConcurrencyLimitTimeout(
+                    f"No Bedrock capacity for {model_id} after {self.max_wait_seconds:.0f}s"
+                )
+            self.sleep(delay * (0.5 + random.random()))
+            delay = min(delay * 2, 5.0)
+
+    def release(self, lease: Lease, throttled: bool = False, succeeded: bool = True) -> None:
+        """Give the slot back and adjust the limit from the call outcome.
+
+        Throttles (and SDK retries) shrink the limit, successful calls grow
+        it, and calls that failed for any other reason leave it alone.
+        """
+        if not lease.acquired:
+            return
+        if throttled or lease.congested:
+            new_limit = max(self.min_limit, lease.limit * self.decrease_factor)
+            logger.warning("Bedrock throttling for %s, reducing concurrency %.2f -> %.2f",
+                           lease.model_id, lease.limit, new_limit)
+            # Only the first throttle seen at this limit halves it
+            if self._release(lease, ':limit', '#limit > :limit',
+                             {':limit': _number(new_limit)}):
+                return
+        elif succeeded and lease.limit < self.max_limit:
+            # One extra slot per window of `limit` successful calls
+            step = 1.0 / max(math.floor(lease.limit), 1)
+            if self._release(lease, '#limit + :step', '#limit < :max',
+                             {':step': _number(step), ':max': _number(self.max_limit)}):
+                return
+        self._release(lease)
+
+    def _release(self, lease: Lease, limit_expression: Optional[str] = None,
+                 limit_condition: Optional[str] = None,
+                 limit_values: Optional[Dict[str, Decimal]] = None) -> bool:
+        from botocore.exceptions import ClientError
+
+        # A lease already reclaimed as expired has been taken off inFlight
+        update = 'SET inFlight = inFlight - :one, updatedAt = :now'
+        condition = 'contains(leases, :token)'
+        values: Dict[str, Any] = {':one': 1, ':now': _number(int(self.clock())),
+                                  ':lease': {lease.token}, ':token': lease.token}
+        kwargs: Dict[str, Any] = {}
+        if limit_expression:
+            update += ', #limit = ' + limit_expression
+            condition += ' AND ' + limit_condition
+            values.update(limit_values or {})
+            kwargs['ExpressionAttributeNames'] = {'#limit': 'limit'}
+        try:
+            self.table.update_item(
+                Key=self._key(lease.model_id),
+                UpdateExpression=update + ' DELETE leases :lease',
+                ConditionExpression=condition,
+                ExpressionAttributeValues=values,
+                **kwargs,
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                logger.warning("Failed to release Bedrock slot for %s: %s", lease.model_id, str(e))
+                return True
+            return False
+
+    def _reclaim_expired(self, model_id: str) -> None:
+        """Take back slots whose lease outlived the longest a Lambda can run (leaked by crashes)."""
+        from botocore.exceptions import ClientError
+
+        try:
+            item = self.table.get_item(Key=self._key(model_id), ConsistentRead=True).get('Item') or {}
+            now = int(self.clock())
+            expired = [token for token in item.get('leases') or ()
+                       if int(token.rsplit(':', 1)[1]) < now][:RECLAIM_BATCH]
+            if not expired:
+                return
+            values: Dict[str, Any] = {':count': len(expired), ':now': _number(now), ':expired': set(expired)}
+            values.update({f':t{i}': token for i, token in enumerate(expired)})
+            # Only if every expired lease is still held, so none is counted off twice
+            self.table.update_item(
+                Key=self._key(model_id),
+                UpdateExpression='SET inFlight = inFlight - :count, updatedAt = :now DELETE leases :expired',
+                ConditionExpression=' AND '.join(f'contains(leases, :t{i})' for i in range(len(expired))),
+                ExpressionAttributeValues=values,
+            )
+            logger.warning("Reclaimed %d expired Bedrock slot(s) for %s", len(expired), model_id)
+        except ClientError:
+            pass
+
+    @contextmanager
+    def slot(self, model_id: str) -> Iterator[Lease]:
+        """Hold a slot for the duration of a Bedrock call."""
+        lease = self.acquire(model_id)
+        throttled = succeeded = False
+        try:
+            yield lease
+            succeeded = True
+        except Exception as e:
+            throttled = is_throttling_error(e)
+            raise
+        finally:
+            self.release(lease, throttled=throttled, succeeded=succeeded)
+
+
+_limiter: Optional[ConcurrencyLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_limiter() -> Optional[ConcurrencyLimiter]:
+    """Get or create the process-wide limiter, or None when disabled"""
+    global _limiter
+    table_name = os.environ.get('BEDROCK_LIMITER_TABLE')
+    if not table_name:
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                from aws_runtime import get_dynamodb_resource
+                _limiter = ConcurrencyLimiter(
+                    get_dynamodb_resource().Table(table_name),
+                    initial_limit=_env_float('BEDROCK_LIMITER_INITIAL', 4),
+                    min_limit=_env_float('BEDROCK_LIMITER_MIN', 1),
+                    max_limit=_env_float('BEDROCK_LIMITER_MAX', 64),
+                    max_wait_seconds=_env_float('BEDROCK_LIMITER_MAX_WAIT_SECONDS', 120),
+                )
+    return _limiter
+
+
+def reset_limiter() -> None:
+    """Drop the process-wide limiter so it is rebuilt from the environment."""
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
+
+
+@contextmanager
+def bedrock_slot(model_id: str) -> Iterator[Lease]:
+    """Hold a slot from the shared limiter, or a no-op lease when disabled."""
+    limiter = get_limiter()
+    if limiter is None:
+        yield Lease(model_id, 0, acquired=False)
+        return
+    with limiter.slot(model_id) as lease:
+        yield lease
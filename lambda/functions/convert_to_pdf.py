@@ -4,11 +4,17 @@ Converts markdown resume to professional PDF format
 """
 import json
 import os
-import boto3
+from aws_runtime import get_s3_client
+from metrics import instrumented
+from profiling import profiled
+from tracing import traced
 from typing import Dict, Any
 
-s3 = boto3.client('s3')
+s3 = get_s3_client()
 
+@instrumented('convert_to_pdf')
+@traced('convert_to_pdf')
+@profiled('convert_to_pdf')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Convert markdown resume to PDF
@@ -2,18 +2,26 @@
 Cover Letter Generation Lambda Function
 Creates personalized cover letter that tells candidate's story
 """
-import json
 import logging
 import os
-import boto3
-from extract_json import extract_json_from_text
+from aws_runtime import get_bedrock_client, get_s3_client, stream_claude, stream_deadline_seconds
+from claim_check import claim_checked
+from metrics import instrumented
+from profiling import profiled
+from tracing import traced
+from response_cache import cache_enabled
+from prompt_context import build_prompt, document_prefix, tailored_resume_block
+from json_stream import StreamingJSONParser
+from output_schemas import output_tool
 from typing import Dict, Any
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-s3 = boto3.client('s3')
-bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+s3 = get_s3_client()
+# Streaming reads give up no later than the stage deadline
+STREAM_DEADLINE_SECONDS = stream_deadline_seconds(300, 'cover_letter')
+bedrock = get_bedrock_client(read_timeout=STREAM_DEADLINE_SECONDS)
 
 COVER_LETTER_PROMPT = """Create a personalized cover letter that tells the candidate's story, shows passion, and makes them stand out. The letter should:
 1. Open with a compelling hook
@@ -22,6 +30,10 @@ COVER_LETTER_PROMPT = """Create a personalized cover letter that tells the candi
 4. Highlight 2-3 key achievements relevant to the position
 5. Close with a strong call to action"""
 
+@instrumented('cover_letter')
+@traced('cover_letter')
+@profiled('cover_letter')
+@claim_checked('cover_letter')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Generate personalized cover letter
@@ -40,19 +52,15 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         bucket_name = os.environ['BUCKET_NAME']
         job_description = event.get('jobDescription', '')
         tailored_resume = event.get('tailoredResumeMarkdown', '')
+        parsed_job = event.get('parsedJob', {})
         analysis = event.get('analysis', {})
         company_name = event.get('companyName', '[Company Name]')
         
         strengths = analysis.get('strengths', [])
         
-        prompt = f"""{COVER_LETTER_PROMPT}
-
-JOB DESCRIPTION:
-{job_description}
-
-CANDIDATE'S RESUME:
-{tailored_resume}
-
+        # The parse_job payload in the cached prefix already carries the posting
+        instructions = f"""{COVER_LETTER_PROMPT}
+{'' if parsed_job.get('jobDescription') else f'{chr(10)}JOB DESCRIPTION:{chr(10)}{job_description}{chr(10)}'}
 KEY STRENGTHS FOR THIS ROLE:
 {chr(10).join(f'- {s}' for s in strengths)}
 
@@ -60,7 +68,7 @@ COMPANY: {company_name}
 
 Generate a compelling cover letter that:
 - Is 3-4 paragraphs (250-400 words)
-- Uses specific examples from the resume
+- Uses specific examples from the candidate's resume above
 - Addresses the company and role specifically
 - Shows personality while remaining professional
 - Demonstrates understanding of the role's challenges
@@ -73,27 +81,17 @@ Return JSON with:
 }}
 
 Return ONLY valid JSON."""
+        prompt = build_prompt(document_prefix(tailored_resume_block(tailored_resume), parsed_job), instructions)
 
-        # Call Claude 4.5 Sonnet for creative writing
-        response = bedrock.invoke_model(
-            modelId=os.environ.get('MODEL_ID', 'us.anthropic.claude-opus-4-5-20251101-v1:0'),
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 4096,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.7
-            })
-        )
-        
-        response_body = json.loads(response['body'].read())
-        result_content = response_body['content'][0]['text']
+        # Stream Claude output for creative writing
+        parser = StreamingJSONParser()
+        response = stream_claude(prompt, max_tokens=4096, temperature=0.7, client=bedrock,
+                                 cache=cache_enabled('cover_letter'),
+                                 deadline_seconds=STREAM_DEADLINE_SECONDS,
+                                 on_text=parser.feed,
+                                 tool=output_tool('cover_letter'))
         
-        result = extract_json_from_text(result_content)
+        result = parser.result(truncated=response.stop_reason == 'max_tokens')
         cover_letter = result.get('coverLetter', '')
         
         # Save cover letter to S3
@@ -112,7 +110,11 @@ Return ONLY valid JSON."""
             'coverLetter': cover_letter,
             'coverLetterS3Key': cover_letter_key,
             'tone': result.get('tone', 'professional'),
-            'keyPoints': result.get('keyPoints', [])
+            'keyPoints': result.get('keyPoints', []),
+            'partial': parser.partial,
+            'completeFields': parser.complete_fields,
+            'promptCache': response.prompt_cache_usage(),
+            'usage': response.usage_record()
         }
         
     except Exception as e:
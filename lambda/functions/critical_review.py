@@ -2,17 +2,24 @@
 Critical Review Lambda Function
 Provides brutally honest feedback on resume quality
 """
-import json
 import logging
-import os
-import boto3
-from extract_json import extract_json_from_text
+from aws_runtime import get_bedrock_client, stream_claude, stream_deadline_seconds
+from claim_check import claim_checked
+from metrics import instrumented
+from profiling import profiled
+from tracing import traced
+from response_cache import cache_enabled
+from prompt_context import build_prompt, tailored_resume_block
+from json_stream import StreamingJSONParser
+from output_schemas import output_tool
 from typing import Dict, Any
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+# Streaming reads give up no later than the stage deadline
+STREAM_DEADLINE_SECONDS = stream_deadline_seconds(420, 'critical_review')
+bedrock = get_bedrock_client(read_timeout=STREAM_DEADLINE_SECONDS)
 
 CRITICAL_REVIEW_PROMPT = """Give unfiltered feedback on this resume. Tell me what's weak, what's okay, and how to make it impossible to ignore. Be brutally honest but constructive. Focus on:
 1. Content quality and impact
@@ -21,6 +28,10 @@ CRITICAL_REVIEW_PROMPT = """Give unfiltered feedback on this resume. Tell me wha
 4. Professional presentation
 5. Competitive positioning"""
 
+@instrumented('critical_review')
+@traced('critical_review')
+@profiled('critical_review')
+@claim_checked('critical_review')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Provide critical review of tailored resume
@@ -40,15 +51,10 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         tailored_resume = event.get('tailoredResumeMarkdown', '')
         ats_resume = event.get('atsOptimizedResume', tailored_resume)
         
-        prompt = f"""{CRITICAL_REVIEW_PROMPT}
+        ats_section = f"ATS-OPTIMIZED VERSION:\n{ats_resume}\n\n" if ats_resume != tailored_resume else ""
+        instructions = f"""{CRITICAL_REVIEW_PROMPT}
 
-TAILORED RESUME:
-{tailored_resume}
-
-ATS-OPTIMIZED VERSION:
-{ats_resume}
-
-Provide a critical analysis in JSON format:
+{ats_section}Provide a critical analysis in JSON format:
 {{
   "overallRating": <1-10 score>,
   "strengths": [<array of what works well>],
@@ -61,27 +67,17 @@ Provide a critical analysis in JSON format:
 }}
 
 Be direct and honest. Return ONLY valid JSON."""
+        prompt = build_prompt([tailored_resume_block(tailored_resume)], instructions)
 
-        # Call Claude 4.5 Opus for thorough critical analysis
-        response = bedrock.invoke_model(
-            modelId=os.environ.get('MODEL_ID', 'us.anthropic.claude-opus-4-5-20251101-v1:0'),
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 8192,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.3
-            })
-        )
-        
-        response_body = json.loads(response['body'].read())
-        result_content = response_body['content'][0]['text']
+        # Stream Claude output for thorough critical analysis
+        parser = StreamingJSONParser()
+        response = stream_claude(prompt, max_tokens=8192, temperature=0.3, client=bedrock,
+                                 cache=cache_enabled('critical_review'),
+                                 deadline_seconds=STREAM_DEADLINE_SECONDS,
+                                 on_text=parser.feed,
+                                 tool=output_tool('critical_review'))
         
-        result = extract_json_from_text(result_content)
+        result = parser.result(truncated=response.stop_reason == 'max_tokens')
         
         return {
             'statusCode': 200,
@@ -93,7 +89,11 @@ Be direct and honest. Return ONLY valid JSON."""
             'competitiveAnalysis': result.get('competitiveAnalysis', ''),
             'redFlags': result.get('redFlags', []),
             'standoutElements': result.get('standoutElements', []),
-            'summary': result.get('summary', '')
+            'summary': result.get('summary', ''),
+            'partial': parser.partial,
+            'completeFields': parser.complete_fields,
+            'promptCache': response.prompt_cache_usage(),
+            'usage': response.usage_record()
         }
         
     except Exception as e:
@@ -4,23 +4,78 @@ import re
 
 logger = logging.getLogger()
 
+# Control characters except newline (\n), carriage return (\r), and tab (\t)
+_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]')
+_JSON_FENCE = re.compile(r'```json\s*\n(.*?)\n```', re.DOTALL)
+_ANY_FENCE = re.compile(r'```\s*\n(.*?)\n```', re.DOTALL)
+# Characters the bracket scanner has to look at; everything else is skipped
+_BRACKETS = re.compile(r'[{}\[\]]')
+_BRACKETS_AND_STRINGS = re.compile(r'[{}\[\]"\\]')
+_PAIRS = {'}': '{', ']': '['}
+# A JSON object opens with a key or closes straight away; skips {placeholders}
+_OBJECT_START = re.compile(r'\{\s*["}]')
+# Where a cut-off response starts: an object or array (possibly cut right after
+# the bracket) opening with something JSON; skips {placeholders} and [notes]
+_TRUNCATED_ROOT = re.compile(r'\{\s*(?:["}]|$)|\[\s*(?:["{\[\]\d-]|true|false|null|$)')
+_JSON_TOKENS = re.compile(r'[{}\[\]",:\\]')
+_PARTIAL_UNICODE_ESCAPE = re.compile(r'u[0-9a-fA-F]{0,3}')
+
+
+def _candidate_spans(text, string_aware=True):
+    """Balanced { ... } / [ ... ] spans in text, ordered by start position.
+
+    Single left-to-right pass with a stack of open brackets, so the cost is
+    linear in the length of the text. When string_aware is set, brackets
+    inside JSON string literals (including escaped quotes) are ignored once
+    a bracket is open; quotes in surrounding prose are not tracked. A
+    closing bracket that does not match the innermost open one is skipped.
+    Returns (start, end) pairs suitable for text[start:end].
+    """
+    pattern = _BRACKETS_AND_STRINGS if string_aware else _BRACKETS
+    stack = []
+    spans = []
+    in_string = False
+    pos = 0
+    while True:
+        match = pattern.search(text, pos)
+        if match is None:
+            break
+        i = match.start()
+        ch = text[i]
+        pos = i + 1
+        if in_string:
+            if ch == '\\':
+                pos = i + 2
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = bool(stack)
+        elif ch == '\\':
+            continue
+        elif ch in '{[':
+            stack.append((ch, i))
+        elif stack and stack[-1][0] == _PAIRS[ch]:
+            spans.append((stack.pop()[1], i + 1))
+    spans.sort()
+    return spans
+
 def extract_json_from_text(text):
     """Extract JSON from text, handling markdown code blocks and control characters.
 
     Tries multiple extraction strategies in order:
     1. JSON inside ```json code blocks
     2. JSON inside ``` code blocks
-    3. First valid { ... } or [ ... ] substring with proper brace matching
+    3. First valid { ... } or [ ... ] substring (string-aware bracket matching)
     4. Direct parse of full text
 
     Raises ValueError if no valid JSON can be extracted.
     """
     # Remove control characters except newline (\n), carriage return (\r), and tab (\t)
-    text = re.sub(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]', '', text)
+    text = _CONTROL_CHARS.sub('', text)
 
     # Strategy 1: JSON in ```json code blocks
     if '```json' in text:
-        match = re.search(r'```json\s*\n(.*?)\n```', text, re.DOTALL)
+        match = _JSON_FENCE.search(text)
         if match:
             try:
                 return json.loads(match.group(1))
@@ -30,7 +85,7 @@ def extract_json_from_text(text):
 
     # Strategy 2: JSON in ``` code blocks
     if '```' in text:
-        match = re.search(r'```\s*\n(.*?)\n```', text, re.DOTALL)
+        match = _ANY_FENCE.search(text)
         if match:
             try:
                 return json.loads(match.group(1))
@@ -38,44 +93,151 @@ def extract_json_from_text(text):
                 logger.warning("Found ``` block but content was not valid JSON")
                 # Continue to next strategy
 
-    # Strategy 3: Find first valid { ... } or [ ... ] in the text with proper brace matching
-    # Check which comes first: { or [
-    first_brace = text.find('{')
-    first_bracket = text.find('[')
-    
-    # Determine order to try based on which appears first
-    if first_bracket != -1 and (first_brace == -1 or first_bracket < first_brace):
-        char_pairs = [('[', ']'), ('{', '}')]
-    else:
-        char_pairs = [('{', '}'), ('[', ']')]
-    
-    for start_char, end_char in char_pairs:
-        search_from = 0
-        while True:
-            start_idx = text.find(start_char, search_from)
-            if start_idx == -1:
-                break
-            
-            # Find matching closing brace/bracket using depth tracking
-            depth = 0
-            for i in range(start_idx, len(text)):
-                if text[i] == start_char:
-                    depth += 1
-                elif text[i] == end_char:
-                    depth -= 1
-                    if depth == 0:
-                        try:
-                            return json.loads(text[start_idx:i + 1])
-                        except json.JSONDecodeError:
-                            # This JSON object didn't work, try next occurrence
-                            search_from = start_idx + 1
-                            break
-            else:
-                # No matching closing bracket found
-                break
+    # Strategy 3: First valid { ... } or [ ... ] in the text, in order of position
+    seen = set()
+    for string_aware in (True, False):
+        for start_idx, end_idx in _candidate_spans(text, string_aware):
+            if (start_idx, end_idx) in seen:
+                continue
+            if text[start_idx] == '{' and not _OBJECT_START.match(text, start_idx):
+                continue
+            seen.add((start_idx, end_idx))
+            try:
+                return json.loads(text[start_idx:end_idx])
+            except json.JSONDecodeError:
+                # This candidate didn't work, try the next one
+                continue
 
     # Strategy 4: Direct parse
     try:
         return json.loads(text)
     except json.JSONDecodeError as e:
         raise ValueError(f"Could not extract valid JSON from AI response: {e}")
+
+
+def repair_truncated_json(text):
+    """Recover the JSON a response had written before it was cut off.
+
+    For output that stopped at max_tokens: closes the open string and any
+    open arrays and objects, and drops a trailing element that cannot be
+    completed (a half-written key, a number or literal with nothing after
+    it, a container that was opened but holds nothing yet). A string value
+    that was cut off is kept with the text written so far.
+
+    Bracketed spans that close before the cut ("the [updated] resume") are
+    skipped; one that is complete JSON is returned only when no cut-off
+    root follows it.
+
+    Returns (value, complete_fields), where complete_fields lists the
+    top-level keys of an object root whose values were fully written.
+    Raises ValueError if no JSON can be recovered.
+    """
+    text = _CONTROL_CHARS.sub('', text)
+    closed = None
+    found = False
+    pos = 0
+    while True:
+        match = _TRUNCATED_ROOT.search(text, pos)
+        if match is None:
+            break
+        found = True
+        repaired, pos, is_closed = _repair_from(text, match.start())
+        if repaired is None:
+            continue
+        if not is_closed:
+            return repaired
+        if closed is None:
+            closed = repaired
+    if closed is not None:
+        return closed
+    if not found:
+        raise ValueError("Could not find JSON in truncated AI response")
+    raise ValueError("Could not repair truncated JSON in AI response")
+
+
+def _repair_from(text, start):
+    """Repair the root value starting at text[start].
+
+    Returns (repaired, resume_at, closed): repaired is (value,
+    complete_fields) or None, resume_at is where to look for the next root,
+    and closed says the root was complete before the text ended.
+    """
+    stack = []              # [opener, offset just after its last separator]
+    in_string = False
+    escape_at = -1          # offset of the last backslash seen in a string
+    after_colon = False     # root object: a value is being written
+    root_value_end = -1     # root object: end of the last fully written value
+    pos = start
+    while True:
+        match = _JSON_TOKENS.search(text, pos)
+        if match is None:
+            break
+        i = match.start()
+        ch = text[i]
+        pos = i + 1
+        if in_string:
+            if ch == '\\':
+                escape_at = i
+                pos = i + 2
+            elif ch == '"':
+                in_string = False
+                if len(stack) == 1 and after_colon:
+                    root_value_end = pos
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append([ch, i + 1])
+        elif ch in '}]':
+            if not stack or stack[-1][0] != _PAIRS[ch]:
+                return None, start + 1, False
+            stack.pop()
+            if not stack:
+                try:
+                    value = json.loads(text[start:i + 1])
+                except json.JSONDecodeError:
+                    return None, i + 1, True
+                return (value, list(value) if isinstance(value, dict) else []), i + 1, True
+            if len(stack) == 1:
+                root_value_end = pos
+        elif len(stack) == 1:
+            if ch == ',':
+                after_colon = False
+            elif ch == ':':
+                after_colon = True
+        if ch == ',' and stack:
+            stack[-1][1] = i + 1
+
+    # Cheapest repair first: close everything where the text stops, then
+    # fall back to cutting at the last separator of each open container
+    body = text[start:]
+    candidates = []
+    if in_string:
+        tail = body[escape_at - start + 1:] if escape_at >= 0 else ''
+        if escape_at >= 0 and (pos > len(text) or _PARTIAL_UNICODE_ESCAPE.fullmatch(tail)):
+            body = body[:escape_at - start]
+        candidates.append((body + '"', len(stack), True))
+    elif body.rstrip().endswith(('"', '}', ']')):
+        # Otherwise the text stops in a number, literal, key or empty container
+        candidates.append((body, len(stack), True))
+    for depth in range(len(stack), 0, -1):
+        cut = text[start:stack[depth - 1][1]].rstrip().rstrip(',')
+        if depth > 1 and cut.endswith(('{', '[')):
+            continue        # nothing written in this container yet
+        candidates.append((cut, depth, False))
+
+    for candidate, depth, whole in candidates:
+        closers = ''.join('}' if opener == '{' else ']' for opener, _ in reversed(stack[:depth]))
+        try:
+            value = json.loads(candidate + closers)
+        except json.JSONDecodeError:
+            continue
+        if not isinstance(value, dict):
+            return (value, []), len(text), False
+        # The root-level value being written at the cut is incomplete, unless
+        # the cut dropped it or fell just after a finished value
+        ends_on_value = root_value_end >= 0 and not text[root_value_end:].strip()
+        cut_inside_last = depth > 1 or (whole and not ends_on_value)
+        fields = list(value)
+        return (value, fields[:-1] if cut_inside_last else fields), len(text), False
+
+    return None, start + 1, False
@@ -2,29 +2,45 @@
 Generate Tailored Resume Lambda Function
 Creates customized resume optimized for specific job posting
 """
-import json
 import logging
 import os
-import boto3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from botocore.config import Config
-from extract_json import extract_json_from_text
+from aws_runtime import get_bedrock_client, get_s3_client, stream_claude
+from claim_check import claim_checked
+from metrics import instrumented
+from profiling import profiled
+from tracing import span, traced
+from response_cache import cache_enabled
+from prompt_context import build_prompt, document_prefix, resume_versions_block
+from json_stream import StreamingJSONParser
+from output_schemas import output_tool
 from validation import validate_s3_key, validate_resume_content, safe_decode_s3_body
 from typing import Dict, Any
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-s3 = boto3.client('s3')
-bedrock = boto3.client(
-    'bedrock-runtime',
-    region_name='us-east-1',
-    config=Config(read_timeout=600, connect_timeout=60)
-)
+s3 = get_s3_client()
+bedrock = get_bedrock_client()
 
 # Load resume optimization prompts
 PROFESSIONAL_REWRITE_PROMPT = """You're a top recruiter. Rewrite this resume for the specific job role, using strong, measurable language that grabs attention. Focus on achievements with quantifiable results."""
 
+def _save_tailored_resume(bucket_name: str, tailored_key: str, reusable_key: str,
+                          tailored_resume: str) -> None:
+    """Save the tailored resume for this job and a reusable copy in the user's uploads"""
+    body = tailored_resume.encode('utf-8')
+    with span('save_tailored_resume', bytes=len(body)):
+        s3.put_object(Bucket=bucket_name, Key=tailored_key, Body=body, ContentType='text/markdown')
+        logger.info("Saved tailored resume to S3: %s", tailored_key)
+        s3.put_object(Bucket=bucket_name, Key=reusable_key, Body=body, ContentType='text/markdown')
+        logger.info("Saved reusable copy to: %s", reusable_key)
+
+@instrumented('generate_resume')
+@traced('generate_resume')
+@profiled('generate_resume')
+@claim_checked('generate_resume')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Generate tailored resume based on job requirements and fit analysis
@@ -59,41 +75,28 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Download all resumes
         resumes = []
-        for key in resume_keys:
-            if key:
-                validated_key = validate_s3_key(key)
-                response = s3.get_object(Bucket=bucket_name, Key=validated_key)
-                content = safe_decode_s3_body(response['Body'].read(), source=validated_key)
-                content = validate_resume_content(content, source=validated_key)
-                resumes.append(content)
-        
-        primary_resume = resumes[0] if resumes else ''
-        additional_context = '\n\n---ADDITIONAL RESUME VERSION---\n\n'.join(resumes[1:]) if len(resumes) > 1 else ''
-        context_section = f"\n\nADDITIONAL RESUME VERSIONS FOR CONTEXT:\n{additional_context}\n" if additional_context else ""
-        
-        # Prepare tailoring prompt with steering doc approach
-        prompt = f"""You are an expert resume writer. Create a tailored version of this resume for the specific job posting.
-
-PRIMARY RESUME TO TAILOR:
-{primary_resume}
-{context_section}
-
-JOB DESCRIPTION:
-{job_description}
+        with span('load_resumes', count=len(resume_keys)):
+            for key in resume_keys:
+                if key:
+                    validated_key = validate_s3_key(key)
+                    response = s3.get_object(Bucket=bucket_name, Key=validated_key)
+                    content = safe_decode_s3_body(response['Body'].read(), source=validated_key)
+                    content = validate_resume_content(content, source=validated_key)
+                    resumes.append(content)
+        
+        job_description_section = f"JOB DESCRIPTION:\n{job_description}\n\n" if job_description else ""
+        custom_section = f"CUSTOM INSTRUCTIONS FROM USER:\n{custom_instructions}\n\n" if custom_instructions else ""
+        
+        instructions = f"""You are an expert resume writer. Create a tailored version of the primary resume above for the specific job posting. Any additional resume versions are context only.
 
-JOB REQUIREMENTS:
-{json.dumps(parsed_job, indent=2)}
-
-FIT ANALYSIS:
+{job_description_section}FIT ANALYSIS:
 - Fit Score: {analysis.get('fitScore', 0)}%
 - Matched Skills: {', '.join(analysis.get('matchedSkills', []))}
 - Missing Skills: {', '.join(analysis.get('missingSkills', []))}
 - Strengths: {', '.join(analysis.get('strengths', []))}
 - Gaps: {', '.join(analysis.get('gaps', []))}
 
-{'CUSTOM INSTRUCTIONS FROM USER:\n' + custom_instructions + '\n' if custom_instructions else ''}
-
-INSTRUCTIONS:
+{custom_section}INSTRUCTIONS:
 {PROFESSIONAL_REWRITE_PROMPT}
 
 1. Emphasize matched skills and strengths prominently
@@ -112,75 +115,52 @@ Return a JSON object with:
 }}
 
 Return ONLY valid JSON."""
+        prompt = build_prompt(document_prefix(resume_versions_block(resumes), parsed_job), instructions)
 
-        logger.info("Starting resume generation with %d resume(s)...", len(resumes))
-        
-        # Call Claude 4.5 Sonnet with streaming for resume generation
-        response = bedrock.invoke_model_with_response_stream(
-            modelId=os.environ.get('MODEL_ID', 'us.anthropic.claude-opus-4-5-20251101-v1:0'),
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 16384,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.4
-            })
-        )
-        
-        # Collect streamed response
-        result_content = ""
-        stream = response.get('body')
-        if stream:
-            for event in stream:
-                chunk = event.get('chunk')
-                if chunk:
-                    chunk_obj = json.loads(chunk.get('bytes').decode())
-                    if chunk_obj['type'] == 'content_block_delta':
-                        delta = chunk_obj['delta'].get('text', '')
-                        result_content += delta
-                        if len(result_content) % 1000 < 100:  # Log progress every ~1000 chars
-                            logger.info("Generated %d characters...", len(result_content))
-        
-        logger.info("Resume generation complete. Total length: %d characters", len(result_content))
-        
-        # Parse result
-        result = extract_json_from_text(result_content)
-        tailored_resume = result.get('tailoredResume', '')
-        
-        logger.info("Extracted tailored resume length: %d characters", len(tailored_resume))
-        
-        if not tailored_resume:
-            logger.warning("No tailored resume content extracted from response")
-            logger.warning("First 500 chars of response: %s", result_content[:500])
-        
-        # Save tailored resume to S3
         tailored_key = f"tailored/{job_id}/resume.md"
-        
-        s3.put_object(
-            Bucket=bucket_name,
-            Key=tailored_key,
-            Body=tailored_resume.encode('utf-8'),
-            ContentType='text/markdown'
-        )
-        
-        logger.info("Saved tailored resume to S3: %s", tailored_key)
-        
-        # Also save to uploads folder for reuse (use captured user_id from start)
         timestamp = int(datetime.now().timestamp() * 1000)
         reusable_key = f"uploads/{user_id}/{timestamp}-tailored-{job_id[:13]}.md"
+
+        # Save the resume to S3 as soon as its field closes, while the model
+        # is still writing changesApplied/keywordOptimizations
+        uploader = ThreadPoolExecutor(max_workers=1)
+        early_upload = []
+
+        def on_field(name, value):
+            if name == 'tailoredResume' and value:
+                early_upload.append((value, uploader.submit(
+                    _save_tailored_resume, bucket_name, tailored_key, reusable_key, value)))
+
+        logger.info("Starting resume generation with %d resume(s)...", len(resumes))
         
-        s3.put_object(
-            Bucket=bucket_name,
-            Key=reusable_key,
-            Body=tailored_resume.encode('utf-8'),
-            ContentType='text/markdown'
-        )
-        
-        logger.info("Saved reusable copy to: %s", reusable_key)
+        # Call Claude with streaming for resume generation. Most resumes fit in
+        # 8K tokens; longer ones continue from where the model stopped
+        parser = StreamingJSONParser(on_field=on_field)
+        try:
+            response = stream_claude(prompt, max_tokens=8192, temperature=0.4, client=bedrock,
+                                     cache=cache_enabled('generate_resume'), on_text=parser.feed,
+                                     max_continuations=2, max_total_tokens=24576,
+                                     tool=output_tool('generate_resume'))
+            result_content = response.text
+            
+            logger.info("Resume generation complete. Total length: %d characters", len(result_content))
+            
+            # Parse result (already decoded field by field during the stream)
+            result = parser.result(truncated=response.stop_reason == 'max_tokens')
+            tailored_resume = result.get('tailoredResume', '')
+            
+            logger.info("Extracted tailored resume length: %d characters", len(tailored_resume))
+            
+            if not tailored_resume:
+                logger.warning("No tailored resume content extracted from response")
+                logger.warning("First 500 chars of response: %s", result_content[:500])
+            
+            if early_upload and early_upload[0][0] == tailored_resume:
+                early_upload[0][1].result()
+            else:
+                _save_tailored_resume(bucket_name, tailored_key, reusable_key, tailored_resume)
+        finally:
+            uploader.shutdown(wait=True)
         
         return {
             'statusCode': 200,
@@ -189,7 +169,11 @@ Return ONLY valid JSON."""
             'tailoredResumeS3Key': tailored_key,
             'tailoredResumeMarkdown': tailored_resume,
             'changesApplied': result.get('changesApplied', []),
-            'keywordOptimizations': result.get('keywordOptimizations', [])
+            'keywordOptimizations': result.get('keywordOptimizations', []),
+            'partial': parser.partial,
+            'completeFields': parser.complete_fields,
+            'promptCache': response.prompt_cache_usage(),
+            'usage': response.usage_record()
         }
         
     except ValueError as e:
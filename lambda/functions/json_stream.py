@@ -0,0 +1,275 @@
+"""
+Incremental JSON parser for streamed Claude output.
+
+Feed it the text deltas as they arrive from Bedrock (stream_claude's
+on_text callback). It skips prose and code fences before the JSON, tracks
+string literals and escapes, and decodes each top-level field of the root
+object as soon as that field closes. The finished object is therefore ready
+when the stream ends, and handlers can act on large fields such as
+tailoredResume before the model has finished the rest of the response.
+As in extract_json_from_text, a brace opens the root only when a key or
+the closing brace follows it, and an empty root is passed over like prose.
+
+If the output does not contain a well-formed root value, result() falls
+back to extract_json_from_text on the full text, or to
+repair_truncated_json when the model stopped at max_tokens.
+"""
+import json
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+import tracing
+from extract_json import extract_json_from_text, repair_truncated_json
+
+logger = logging.getLogger(__name__)
+
+# Same characters extract_json_from_text strips before parsing
+_CONTROL_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_WHITESPACE = ' \t\r\n'
+
+_SEEK, _JSON, _DONE, _FAILED = 'seek', 'json', 'done', 'failed'
+
+
+class StreamingJSONParser:
+    """Parse one JSON value out of text that arrives in chunks."""
+
+    def __init__(self, on_field: Optional[Callable[[str, Any], None]] = None):
+        self.on_field = on_field
+        self.fields: Dict[str, Any] = {}
+        self.fenced = False             # root value started inside a ``` fence
+        self.partial = False            # result() repaired a truncated response
+        self.complete_fields: List[str] = []
+
+        self.parse_ms = 0.0             # time spent parsing, fallback included
+
+        self._chunks: List[str] = []    # everything fed, for the fallback path
+        self._window: List[str] = []    # unparsed text from _window_start onwards
+        self._window_start = 0
+        self._pos = 0                   # absolute offset of the next chunk
+
+        self._state = _SEEK
+        self._backticks = 0
+        self._root = ''
+        self._root_start = -1
+        self._value: Any = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+
+        # Top-level field of the root object currently being read
+        self._expect = 'key'            # key -> colon -> value -> end
+        self._key: Optional[str] = None
+        self._key_start = -1
+        self._value_start = -1
+        self._value_is_string = False
+
+    @property
+    def done(self) -> bool:
+        """Whether the root value has closed."""
+        return self._state == _DONE
+
+    @property
+    def text(self) -> str:
+        """All text fed so far."""
+        return ''.join(self._chunks)
+
+    def feed(self, text: str) -> None:
+        """Consume the next chunk of streamed text."""
+        if not text:
+            return
+        self._chunks.append(text)
+        base = self._pos
+        self._pos += len(text)
+        if self._state in (_DONE, _FAILED):
+            return
+        self._window.append(text)
+        started = time.perf_counter()
+        try:
+            self._scan(text, base)
+        except ValueError as e:
+            logger.info("Incremental JSON parse abandoned, falling back: %s", str(e))
+            self._state = _FAILED
+            self._window = []
+        self.parse_ms += (time.perf_counter() - started) * 1000
+
+    def result(self, truncated: bool = False) -> Any:
+        """The parsed root value, or extract_json_from_text on the full text.
+
+        Pass truncated=True when the model stopped at max_tokens. A root
+        value that never closed is then repaired rather than rejected, and
+        partial/complete_fields describe what was recovered.
+        """
+        started = time.perf_counter()
+        try:
+            with tracing.span('json.extract', chars=self._pos, incrementalMs=round(self.parse_ms, 3)):
+                return self._result(truncated)
+        finally:
+            self.parse_ms += (time.perf_counter() - started) * 1000
+            metrics.record('JsonExtractionTime', self.parse_ms, 'Milliseconds')
+
+    def _result(self, truncated: bool) -> Any:
+        if self._state == _DONE:
+            value = self._value
+        elif truncated:
+            value, self.complete_fields = repair_truncated_json(self.text)
+            self.partial = True
+            logger.warning("Response stopped at max_tokens, recovered partial JSON; complete fields: %s",
+                           self.complete_fields)
+            return value
+        else:
+            value = extract_json_from_text(self.text)
+        self.complete_fields = list(value) if isinstance(value, dict) else []
+        return value
+
+    def _slice(self, start: int, end: int) -> str:
+        if len(self._window) > 1:
+            self._window = [''.join(self._window)]
+        return self._window[0][start - self._window_start:end - self._window_start]
+
+    def _discard_before(self, offset: int) -> None:
+        """Drop buffered text that has already been parsed."""
+        if len(self._window) > 1:
+            self._window = [''.join(self._window)]
+        if self._window:
+            self._window[0] = self._window[0][offset - self._window_start:]
+        self._window_start = offset
+
+    def _scan(self, text: str, base: int) -> None:
+        i, n = 0, len(text)
+        if self._state == _SEEK:
+            i = self._seek(text, base, 0)
+        top_level = self._root == '{'
+
+        while i < n and self._state == _JSON:
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = _STRING_SPECIAL.search(text, i)
+                if match is None:
+                    return
+                i = match.start()
+                if text[i] == '\\':
+                    self._escape = True
+                else:
+                    self._in_string = False
+                    if top_level and len(self._stack) == 1:
+                        self._string_closed(base + i)
+                i += 1
+                continue
+
+            ch = text[i]
+            depth_one = top_level and len(self._stack) == 1
+            if (depth_one and self._expect == 'key' and not self.fields
+                    and ch not in _WHITESPACE and ch != '"' and ch != '}'):
+                # Not an object after all ("the {result}:"); look for the root past it
+                self._restart()
+                i = self._seek(text, base, i)
+                top_level = self._root == '{'
+                continue
+            if depth_one and self._expect == 'value' and ch not in _WHITESPACE:
+                self._value_start = base + i
+                self._value_is_string = ch == '"'
+                self._expect = 'end'
+
+            if ch == '"':
+                self._in_string = True
+                if depth_one and self._expect == 'key':
+                    self._key_start = base + i
+            elif ch == '{' or ch == '[':
+                self._stack.append(ch)
+            elif ch == '}' or ch == ']':
+                if (ch == '}') != (self._stack[-1] == '{'):
+                    raise ValueError(f"unbalanced {ch!r} at offset {base + i}")
+                self._stack.pop()
+                if not self._stack:
+                    self._close_root(base + i)
+                    if self._state == _SEEK:
+                        i = self._seek(text, base, i + 1)
+                        top_level = self._root == '{'
+                        continue
+                    return
+                if top_level and len(self._stack) == 1:
+                    # A nested object/array value just closed
+                    self._close_field(base + i + 1)
+            elif depth_one:
+                if ch == ',':
+                    self._close_field(base + i)
+                    self._expect = 'key'
+                elif ch == ':' and self._expect == 'colon':
+                    self._expect = 'value'
+            i += 1
+
+    def _seek(self, text: str, base: int, start: int) -> int:
+        """Skip prose and code fences from text[start] up to the next { or [."""
+        for i in range(start, len(text)):
+            ch = text[i]
+            if ch == '`':
+                self._backticks += 1
+                if self._backticks == 3:
+                    self.fenced = not self.fenced
+                    self._backticks = 0
+                continue
+            self._backticks = 0
+            if ch == '{' or ch == '[':
+                self._state = _JSON
+                self._root = ch
+                self._root_start = base + i
+                self._stack.append(ch)
+                self._discard_before(self._root_start)
+                return i + 1
+        self._discard_before(base + len(text))
+        return len(text)
+
+    def _string_closed(self, end: int) -> None:
+        if self._expect == 'key' and self._key_start >= 0:
+            self._key = json.loads(self._slice(self._key_start, end + 1))
+            self._key_start = -1
+            self._expect = 'colon'
+        elif self._expect == 'end' and self._value_is_string:
+            self._close_field(end + 1)
+
+    def _close_field(self, end: int) -> None:
+        """Decode the current field's value, which ends just before `end`."""
+        if self._key is None or self._value_start < 0:
+            return
+        key, raw = self._key, self._slice(self._value_start, end)
+        self._key, self._value_start = None, -1
+        try:
+            value = json.loads(_CONTROL_CHARS.sub('', raw))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"field {key!r} is not valid JSON: {e}")
+        self.fields[key] = value
+        self._discard_before(end)
+        if self.on_field:
+            self.on_field(key, value)
+
+    def _restart(self) -> None:
+        """Go back to seeking: what looked like the root was prose."""
+        self._state = _SEEK
+        self._root, self._root_start = '', -1
+        self._stack = []
+        self._expect = 'key'
+        self._key, self._key_start, self._value_start = None, -1, -1
+
+    def _close_root(self, end: int) -> None:
+        if self._root == '{':
+            self._close_field(end)
+            if not self.fields:
+                # "{}" in prose; a bare {} response comes back through the fallback
+                self._restart()
+                return
+            self._value = dict(self.fields)
+        else:
+            raw = self._slice(self._root_start, end + 1)
+            try:
+                self._value = json.loads(_CONTROL_CHARS.sub('', raw))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"root array is not valid JSON: {e}")
+        self._state = _DONE
+        self._window = []
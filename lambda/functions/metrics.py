@@ -0,0 +1,207 @@
+"""
+Per-invocation metrics in CloudWatch Embedded Metric Format (EMF).
+
+Each handler is wrapped with @instrumented(stage). While it runs, the
+Bedrock invocation path, the S3 client and the JSON parsers add to the
+invocation's metrics (Bedrock latency, time to first token, tokens,
+cache hits, S3 bytes, JSON extraction time). When the handler returns,
+one EMF document is printed to stdout. Lambda ships stdout to CloudWatch
+Logs, which extracts the metrics, so flushing makes no network call.
+
+Metrics are emitted with METRICS_ENABLED=true (the default inside Lambda)
+under METRICS_NAMESPACE, dimensioned by Stage and by Stage and ModelId.
+"""
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAMESPACE = 'ResumeTailor'
+
+# CloudWatch allows at most 100 metrics per EMF document
+MAX_METRICS = 100
+
+
+def metrics_enabled() -> bool:
+    """METRICS_ENABLED=true emits EMF on flush; defaults to true inside Lambda only."""
+    default = 'true' if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else 'false'
+    return os.environ.get('METRICS_ENABLED', default).lower() == 'true'
+
+
+class InvocationMetrics:
+    """Metrics and properties collected during one handler invocation."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.model_id: Optional[str] = None
+        self.values: Dict[str, float] = {}
+        self.units: Dict[str, str] = {}
+        self.properties: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, value: float, unit: str = 'Count') -> None:
+        """Add value to the metric (metrics are summed over the invocation)."""
+        with self._lock:
+            self.values[name] = self.values.get(name, 0) + value
+            self.units[name] = unit
+
+    def set(self, name: str, value: float, unit: str = 'Count') -> None:
+        """Set the metric, replacing any earlier value."""
+        with self._lock:
+            self.values[name] = value
+            self.units[name] = unit
+
+    def to_emf(self, namespace: str, timestamp_ms: Optional[int] = None) -> Dict[str, Any]:
+        """The invocation as one EMF document."""
+        names = list(self.values)[:MAX_METRICS]
+        dimensions: List[List[str]] = [['Stage']]
+        if self.model_id:
+            dimensions.append(['Stage', 'ModelId'])
+        document: Dict[str, Any] = dict(self.properties)
+        document.update({name: round(self.values[name], 3) for name in names})
+        document['Stage'] = self.stage
+        if self.model_id:
+            document['ModelId'] = self.model_id
+        document['_aws'] = {
+            'Timestamp': timestamp_ms if timestamp_ms is not None else int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': namespace,
+                'Dimensions': dimensions,
+                'Metrics': [{'Name': name, 'Unit': self.units[name]} for name in names],
+            }],
+        }
+        return document
+
+
+_current: ContextVar[Optional[InvocationMetrics]] = ContextVar('invocation_metrics', default=None)
+# Worker threads (e.g. generate_resume's uploader) do not inherit the
+# context; Lambda runs one invocation per process, so they fall back to it
+_latest: Optional[InvocationMetrics] = None
+
+
+def current() -> Optional[InvocationMetrics]:
+    """Metrics of the invocation in progress, if any."""
+    return _current.get() or _latest
+
+
+def record(name: str, value: float, unit: str = 'Count') -> None:
+    """Add to a metric of the invocation in progress (no-op outside one)."""
+    metrics = current()
+    if metrics is not None:
+        metrics.add(name, value, unit)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Add the block's wall time in milliseconds to a metric."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - started) * 1000, 'Milliseconds')
+
+
+def record_bedrock(model_id: str, latency_ms: float, first_token_ms: Optional[float],
+                   usage: Dict[str, Any], cache_tier: Optional[str] = None) -> None:
+    """Record one Claude call: latency, time to first token, tokens and cache hits."""
+    metrics = current()
+    if metrics is None:
+        return
+    metrics.model_id = model_id
+    metrics.add('BedrockCalls', 1)
+    metrics.add('ResponseCacheHits', 1 if cache_tier else 0)
+    if cache_tier:
+        return
+    metrics.add('BedrockLatency', latency_ms, 'Milliseconds')
+    if first_token_ms is not None and 'TimeToFirstToken' not in metrics.values:
+        metrics.set('TimeToFirstToken', first_token_ms, 'Milliseconds')
+    for name, key in (('InputTokens', 'input_tokens'), ('OutputTokens', 'output_tokens'),
+                      ('CacheReadInputTokens', 'cache_read_input_tokens'),
+                      ('CacheWriteInputTokens', 'cache_creation_input_tokens')):
+        metrics.add(name, int(usage.get(key, 0) or 0))
+
+
+def _payload_bytes(value: Any) -> int:
+    try:
+        return len(json.dumps(value, default=str).encode('utf-8'))
+    except (TypeError, ValueError):
+        return 0
+
+
+def flush(metrics: InvocationMetrics, stream: Any = None) -> None:
+    """Print the invocation's EMF document as one stdout line."""
+    if not metrics_enabled():
+        return
+    namespace = os.environ.get('METRICS_NAMESPACE', DEFAULT_NAMESPACE)
+    out = stream or sys.stdout
+    out.write(json.dumps(metrics.to_emf(namespace), default=str) + '\n')
+    out.flush()
+
+
+def instrumented(stage: str) -> Callable[[Callable], Callable]:
+    """Decorate a Lambda handler to collect and flush its invocation's metrics."""
+    def decorate(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]]) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+            global _latest
+            metrics = InvocationMetrics(stage)
+            # Sizing a payload serializes it; skip that when nothing is emitted
+            sized = metrics_enabled()
+            if isinstance(event, dict) and event.get('jobId'):
+                metrics.properties['jobId'] = event['jobId']
+            request_id = getattr(context, 'aws_request_id', None)
+            if request_id:
+                metrics.properties['requestId'] = request_id
+            if sized:
+                metrics.add('PayloadBytesIn', _payload_bytes(event), 'Bytes')
+
+            token = _current.set(metrics)
+            _latest = metrics
+            started = time.perf_counter()
+            result: Any = None
+            try:
+                result = handler(event, context)
+                return result
+            finally:
+                metrics.set('Duration', (time.perf_counter() - started) * 1000, 'Milliseconds')
+                if sized:
+                    metrics.add('PayloadBytesOut', _payload_bytes(result), 'Bytes')
+                status = result.get('statusCode') if isinstance(result, dict) else None
+                metrics.properties['statusCode'] = status
+                metrics.set('Errors', 0 if result is not None and (status or 200) < 400 else 1)
+                _current.reset(token)
+                if _latest is metrics:
+                    _latest = None
+                try:
+                    flush(metrics)
+                except Exception as e:  # metrics must never fail the invocation
+                    logger.warning("Failed to emit metrics: %s", str(e))
+        return wrapper
+    return decorate
+
+
+def _count_s3_write(params: Dict[str, Any], **kwargs: Any) -> None:
+    body = params.get('Body')
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if isinstance(body, (bytes, bytearray)):
+        record('S3BytesWritten', len(body), 'Bytes')
+
+
+def _count_s3_read(parsed: Dict[str, Any], **kwargs: Any) -> None:
+    record('S3BytesRead', int(parsed.get('ContentLength', 0) or 0), 'Bytes')
+
+
+def register_s3_hooks(client: Any) -> Any:
+    """Count S3 object bytes read and written through client."""
+    client.meta.events.register('provide-client-params.s3.PutObject', _count_s3_write)
+    client.meta.events.register('after-call.s3.GetObject', _count_s3_read)
+    return client
@@ -5,14 +5,22 @@ Sends email notification when resume analysis is complete
 import json
 import logging
 import os
-import boto3
+from aws_runtime import get_ses_client
+from claim_check import claim_checked
+from metrics import instrumented
+from profiling import profiled
+from tracing import traced
 from typing import Dict, Any
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-ses = boto3.client('ses', region_name='us-east-1')
+ses = get_ses_client()
 
+@instrumented('notify')
+@traced('notify')
+@profiled('notify')
+@claim_checked('notify')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Send email notification with results summary
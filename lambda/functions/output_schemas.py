@@ -0,0 +1,138 @@
+"""
+JSON schemas for every JSON-returning stage, declared once.
+
+Each schema is a Bedrock tool the stage forces with tool_choice, so the
+model returns the stage output as tool input (already-parsed JSON) instead
+of free text that has to be recovered with extract_json_from_text. Stages
+whose prompt starts with the shared, cached resume and job prefix send the
+same tools list (OUTPUT_TOOLS, all stages in a fixed order): Bedrock
+caches tools ahead of the system prompt and messages, so a per-stage list
+would put a different block in front of that prefix. Requests without a
+cached prefix send their own tool only. The same field names are
+described in the stage prompts for when structured output is switched
+off.
+
+Environment:
+    STRUCTURED_OUTPUT: set to false to fall back to free-text JSON
+"""
+import os
+from typing import Any, Dict, List, Optional
+
+
+def _strings(description: str) -> Dict[str, Any]:
+    return {'type': 'array', 'items': {'type': 'string'}, 'description': description}
+
+
+PARSED_JOB_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'requiredSkills': _strings('Required technical skills'),
+        'preferredSkills': _strings('Preferred or desired skills'),
+        'keyResponsibilities': _strings('Main job responsibilities'),
+        'experienceLevel': {'type': 'string', 'description': 'Required years of experience'},
+        'educationRequirements': {'type': 'string', 'description': 'Required education or degrees'},
+        'certifications': _strings('Certifications mentioned in the posting'),
+        'keywords': _strings('Important keywords for ATS optimization'),
+    },
+    'required': ['requiredSkills', 'preferredSkills', 'keyResponsibilities', 'keywords'],
+}
+
+ANALYSIS_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'fitScore': {'type': 'number', 'description': 'Overall fit, 0-100'},
+        'matchedSkills': _strings('Skills that match the job'),
+        'missingSkills': _strings('Required skills not found in the resume'),
+        'strengths': _strings('Key strengths for this role'),
+        'gaps': _strings('Areas where the candidate falls short'),
+        'recommendations': _strings('Specific suggestions'),
+        'summary': {'type': 'string', 'description': 'Brief 2-3 sentence summary of fit'},
+    },
+    'required': ['fitScore', 'matchedSkills', 'missingSkills', 'strengths', 'gaps', 'summary'],
+}
+
+TAILORED_RESUME_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'tailoredResume': {'type': 'string', 'description': 'Complete resume in Markdown'},
+        'changesApplied': _strings('Specific changes made'),
+        'keywordOptimizations': _strings('Keywords added or emphasized'),
+    },
+    'required': ['tailoredResume', 'changesApplied'],
+}
+
+ATS_RESULT_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'atsOptimizedResume': {'type': 'string', 'description': 'ATS-optimized resume in Markdown'},
+        'atsScore': {'type': 'number', 'description': 'ATS compatibility score, 0-100'},
+        'optimizations': _strings('Specific ATS improvements made'),
+        'keywordCoverage': {
+            'type': 'object',
+            'properties': {
+                'included': _strings('Keywords successfully included'),
+                'missing': _strings("Keywords that couldn't be naturally included"),
+            },
+        },
+    },
+    'required': ['atsOptimizedResume', 'atsScore', 'optimizations'],
+}
+
+COVER_LETTER_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'coverLetter': {'type': 'string', 'description': 'Complete cover letter text'},
+        'tone': {'type': 'string', 'description': 'professional, enthusiastic or confident'},
+        'keyPoints': _strings('Main points covered'),
+    },
+    'required': ['coverLetter', 'tone'],
+}
+
+CRITICAL_REVIEW_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'overallRating': {'type': 'number', 'description': 'Overall rating, 1-10'},
+        'strengths': _strings('What works well'),
+        'weaknesses': _strings('What needs improvement'),
+        'actionableSteps': _strings('Specific improvements'),
+        'competitiveAnalysis': {'type': 'string', 'description': 'How this resume compares to typical candidates'},
+        'redFlags': _strings('Potential concerns for recruiters'),
+        'standoutElements': _strings('Elements that make the candidate memorable'),
+        'summary': {'type': 'string', 'description': '2-3 sentence honest assessment'},
+    },
+    'required': ['overallRating', 'strengths', 'weaknesses', 'actionableSteps', 'summary'],
+}
+
+# Stage name -> (tool name, description, schema)
+STAGE_OUTPUTS = {
+    'parse_job': ('record_parsed_job', 'Record the structured job requirements.', PARSED_JOB_SCHEMA),
+    'analyze_resume': ('record_fit_analysis', 'Record the resume fit analysis.', ANALYSIS_SCHEMA),
+    'generate_resume': ('record_tailored_resume', 'Record the tailored resume.', TAILORED_RESUME_SCHEMA),
+    'ats_optimize': ('record_ats_result', 'Record the ATS-optimized resume.', ATS_RESULT_SCHEMA),
+    'cover_letter': ('record_cover_letter', 'Record the cover letter.', COVER_LETTER_SCHEMA),
+    'critical_review': ('record_critical_review', 'Record the critical review.', CRITICAL_REVIEW_SCHEMA),
+}
+
+# Every stage's tool, in STAGE_OUTPUTS order; sent unchanged ahead of a cached prefix
+OUTPUT_TOOLS: List[Dict[str, Any]] = [
+    {'name': name, 'description': description, 'input_schema': schema}
+    for name, description, schema in STAGE_OUTPUTS.values()
+]
+_TOOLS_BY_STAGE = dict(zip(STAGE_OUTPUTS, OUTPUT_TOOLS))
+
+
+def structured_output_enabled() -> bool:
+    """Whether stages should request tool-use structured output."""
+    return os.environ.get('STRUCTURED_OUTPUT', 'true').lower() not in ('false', '0', 'no', 'off')
+
+
+def output_tool(stage: str) -> Optional[Dict[str, Any]]:
+    """Bedrock tool definition for a stage's output, or None when disabled."""
+    if not structured_output_enabled():
+        return None
+    return _TOOLS_BY_STAGE[stage]
+
+
+def request_tools(tool: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The tools list to send with a forced tool: OUTPUT_TOOLS for a stage's tool, else the tool alone."""
+    return OUTPUT_TOOLS if tool in OUTPUT_TOOLS else [tool]
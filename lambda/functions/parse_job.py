@@ -2,19 +2,26 @@
 Parse Job Description Lambda Function
 Extracts key requirements, skills, and qualifications from job posting
 """
-import json
 import logging
-import os
-import boto3
-from extract_json import extract_json_from_text
+from aws_runtime import get_bedrock_client, invoke_claude
+from claim_check import claim_checked
+from metrics import instrumented
+from profiling import profiled
+from tracing import traced
+from response_cache import cache_enabled
+from output_schemas import output_tool
 from validation import validate_job_description
 from typing import Dict, Any
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+bedrock = get_bedrock_client()
 
+@instrumented('parse_job')
+@traced('parse_job')
+@profiled('parse_job')
+@claim_checked('parse_job')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Parse job description and extract structured information
@@ -52,28 +59,13 @@ Please provide a JSON response with:
 
 Return ONLY valid JSON, no other text."""
 
-        # Call Claude 4.5 Sonnet via Bedrock
-        response = bedrock.invoke_model(
-            modelId=os.environ.get('MODEL_ID', 'us.anthropic.claude-opus-4-5-20251101-v1:0'),
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 4096,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.3
-            })
-        )
-        
-        # Parse response
-        response_body = json.loads(response['body'].read())
-        parsed_content = response_body['content'][0]['text']
+        # Call Claude via Bedrock
+        response = invoke_claude(prompt, max_tokens=4096, temperature=0.3, client=bedrock,
+                                 cache=cache_enabled('parse_job'),
+                                 tool=output_tool('parse_job'))
         
         # Extract JSON from response
-        parsed_job = extract_json_from_text(parsed_content)
+        parsed_job = response.parsed_json()
         
         return {
             'statusCode': 200,
@@ -83,7 +75,8 @@ Return ONLY valid JSON, no other text."""
             'requiredSkills': parsed_job.get('requiredSkills', []),
             'preferredSkills': parsed_job.get('preferredSkills', []),
             'keyResponsibilities': parsed_job.get('keyResponsibilities', []),
-            'keywords': parsed_job.get('keywords', [])
+            'keywords': parsed_job.get('keywords', []),
+            'usage': response.usage_record()
         }
         
     except ValueError as e:
@@ -0,0 +1,122 @@
+"""
+Opt-in handler profiling.
+
+@profiled(stage) runs the handler under cProfile and tracemalloc when
+PROFILING_ENABLED=true, or when the event has `profile: true`. The flag
+is returned in the stage output, so the workflow passes it on to later
+stages the same way it passes traceId. Two objects are written to the
+resume bucket afterwards:
+- profiles/{jobId}/{stage}/{timestamp}.prof: the cProfile stats (pstats format);
+- profiles/{jobId}/{stage}/{timestamp}.tracemalloc.json: peak traced memory
+  and the top allocation sites.
+
+python -m devtools.flamegraph merges a job's per-stage profiles into one
+flame graph. cProfile only sees the handler's thread; work handed to
+worker threads shows up as the wait for it.
+"""
+import cProfile
+import functools
+import json
+import logging
+import marshal
+import os
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from aws_runtime import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PREFIX = 'profiles'
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 25
+
+
+def profiling_enabled() -> bool:
+    """PROFILING_ENABLED=true profiles every invocation of the function."""
+    return os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+
+
+def profile_requested(event: Any) -> bool:
+    """Whether the event asks for profiling (`profile: true`)."""
+    return isinstance(event, dict) and event.get('profile') is True
+
+
+def profile_prefix(event: Dict[str, Any], stage: str) -> str:
+    """profiles/{jobId}/{stage}; stages without a jobId fall back to the traceId."""
+    job = event.get('jobId') or event.get('traceId') or 'unknown'
+    return f"{PROFILE_PREFIX}/{job}/{stage}"
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, limit: int = TOP_ALLOCATIONS) -> List[Dict[str, Any]]:
+    """Largest allocation sites by size, with their innermost frames."""
+    rows = []
+    for stat in snapshot.statistics('traceback')[:limit]:
+        rows.append({
+            'sizeKb': round(stat.size / 1024, 1),
+            'count': stat.count,
+            'traceback': [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+        })
+    return rows
+
+
+def _upload(prefix: str, stats: bytes, memory: Dict[str, Any]) -> None:
+    s3 = get_s3_client()
+    bucket = os.environ['BUCKET_NAME']
+    base = f"{prefix}/{int(time.time() * 1000)}"
+    s3.put_object(Bucket=bucket, Key=f"{base}.prof", Body=stats, ContentType='application/octet-stream')
+    s3.put_object(Bucket=bucket, Key=f"{base}.tracemalloc.json", Body=json.dumps(memory, indent=2),
+                  ContentType='application/json')
+    logger.info("Saved profile to s3://%s/%s.prof", bucket, base)
+
+
+def _tag(result: Any, requested: bool) -> Any:
+    """Pass the event's profile flag on to the next stage."""
+    if isinstance(result, dict):
+        result.setdefault('profile', requested)
+    return result
+
+
+def profiled(stage: str) -> Callable[[Callable], Callable]:
+    """Decorate a Lambda handler to profile it on request and save the profile to S3."""
+    def decorate(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]]) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+            requested = profile_requested(event)
+            if not (requested or profiling_enabled()):
+                result = handler(event, context)
+            else:
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError as e:  # another profiler is active in this process
+                    logger.warning("Profiling skipped: %s", str(e))
+                    return _tag(handler(event, context), requested)
+                already_tracing = tracemalloc.is_tracing()
+                if not already_tracing:
+                    tracemalloc.start(TRACEMALLOC_FRAMES)
+                started = time.perf_counter()
+                try:
+                    result = handler(event, context)
+                finally:
+                    profiler.disable()
+                    wall_ms = (time.perf_counter() - started) * 1000
+                    snapshot = tracemalloc.take_snapshot()
+                    _, peak = tracemalloc.get_traced_memory()
+                    if not already_tracing:
+                        tracemalloc.stop()
+                    profiler.create_stats()
+                    memory = {
+                        'stage': stage,
+                        'wallMs': round(wall_ms, 1),
+                        'peakKb': round(peak / 1024, 1),
+                        'topAllocations': top_allocations(snapshot),
+                    }
+                    try:
+                        _upload(profile_prefix(event, stage), marshal.dumps(profiler.stats), memory)
+                    except Exception as e:  # profiling must never fail the invocation
+                        logger.warning("Failed to save profile: %s", str(e))
+            return _tag(result, requested)
+        return wrapper
+    return decorate
@@ -0,0 +1,55 @@
+"""
+Shared document context for stage prompts.
+
+Stages that look at the same resume and job put those documents first, in
+identical cacheable blocks, and append their own instructions afterwards.
+Bedrock can then reuse the cached prefix across stages (for example the
+three ParallelOptimization branches, which all send the tailored resume).
+Any change to the wording here changes every stage's cache prefix, and
+so does anything a stage puts in front of these blocks: handlers build
+their prompts only as build_prompt(document_prefix(...), instructions).
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+import tracing
+from aws_runtime import cached_block, text_block
+
+RESUME_VERSION_SEPARATOR = '\n\n---RESUME VERSION---\n\n'
+
+# Stage-output fields that differ run to run and say nothing about the job
+BOOKKEEPING_KEYS = ('usage', 'traceId', 'profile')
+
+
+def resume_versions_block(resumes: List[str]) -> Dict[str, Any]:
+    """Original resume versions, primary first (analyze_resume, generate_resume)."""
+    return cached_block(
+        "CANDIDATE RESUME VERSIONS (the first one is the primary resume):\n\n"
+        + RESUME_VERSION_SEPARATOR.join(resumes)
+    )
+
+
+def tailored_resume_block(resume: str) -> Dict[str, Any]:
+    """The tailored resume shared by the optimization stages."""
+    return cached_block(f"CANDIDATE RESUME:\n{resume}")
+
+
+def job_requirements_block(parsed_job: Dict[str, Any]) -> Dict[str, Any]:
+    """Structured job requirements from parse_job."""
+    requirements = {key: value for key, value in parsed_job.items() if key not in BOOKKEEPING_KEYS}
+    return cached_block(f"JOB REQUIREMENTS:\n{json.dumps(requirements, indent=2)}")
+
+
+def build_prompt(prefix: List[Dict[str, Any]], instructions: str) -> List[Dict[str, Any]]:
+    """Stable cacheable prefix followed by the stage-specific instructions."""
+    with tracing.span('prompt.build', blocks=len(prefix) + 1):
+        return prefix + [text_block(instructions)]
+
+
+def document_prefix(resume_block: Dict[str, Any],
+                    parsed_job: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Resume block, then job requirements when the stage has them."""
+    prefix = [resume_block]
+    if parsed_job:
+        prefix.append(job_requirements_block(parsed_job))
+    return prefix
@@ -2,17 +2,23 @@
 Refine Resume Lambda Function
 Regenerates resume incorporating critical feedback
 """
-import json
 import logging
-import os
-import boto3
+from aws_runtime import get_bedrock_client, stream_claude
+from metrics import instrumented
+from profiling import profiled
+from tracing import traced
+from response_cache import cache_enabled
+from prompt_context import build_prompt, document_prefix, tailored_resume_block
 from typing import Dict, Any
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-bedrock = boto3.client('bedrock-runtime', region_name='us-east-1')
+bedrock = get_bedrock_client()
 
+@instrumented('refine_resume')
+@traced('refine_resume')
+@profiled('refine_resume')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Refine resume based on critical feedback
@@ -36,13 +42,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         actionable_steps = critical_review.get('actionableSteps', [])
         red_flags = critical_review.get('redFlags', [])
         
-        prompt = f"""You are refining a resume based on critical feedback. Your goal is to address the identified weaknesses while maintaining the candidate's authentic voice and experience.
-
-ORIGINAL RESUME:
-{original_resume}
-
-JOB REQUIREMENTS:
-{json.dumps(parsed_job, indent=2)}
+        instructions = f"""You are refining the candidate's resume above based on critical feedback. Your goal is to address the identified weaknesses while maintaining the candidate's authentic voice and experience.
 
 CRITICAL FEEDBACK TO ADDRESS:
 
@@ -65,38 +65,20 @@ INSTRUCTIONS:
 7. Ensure all claims remain truthful and verifiable
 
 Generate an improved resume in Markdown format that addresses the feedback while staying true to the candidate's actual experience."""
+        prompt = build_prompt(document_prefix(tailored_resume_block(original_resume), parsed_job), instructions)
 
-        # Stream response from Claude
-        response = bedrock.invoke_model_with_response_stream(
-            modelId=os.environ.get('MODEL_ID', 'us.anthropic.claude-opus-4-5-20251101-v1:0'),
-            body=json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 16384,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.7
-            })
-        )
-        
-        # Collect streamed response
-        refined_resume = ""
-        stream = response.get('body')
-        if stream:
-            for event in stream:
-                chunk = event.get('chunk')
-                if chunk:
-                    chunk_obj = json.loads(chunk.get('bytes').decode())
-                    if chunk_obj['type'] == 'content_block_delta':
-                        if chunk_obj['delta']['type'] == 'text_delta':
-                            refined_resume += chunk_obj['delta']['text']
+        # Stream response from Claude, continuing if a long resume hits max_tokens
+        response = stream_claude(prompt, max_tokens=8192, temperature=0.7, client=bedrock,
+                                 cache=cache_enabled('refine_resume'),
+                                 max_continuations=2, max_total_tokens=24576)
+        if response.stop_reason == 'max_tokens':
+            logger.warning("Refined resume still truncated after %d continuation(s)", response.continuations)
         
         return {
             'statusCode': 200,
-            'refinedResumeMarkdown': refined_resume.strip()
+            'refinedResumeMarkdown': response.text.strip(),
+            'promptCache': response.prompt_cache_usage(),
+            'usage': response.usage_record()
         }
         
     except Exception as e:
@@ -0,0 +1,256 @@
+"""
+Content-addressed cache for Claude responses.
+
+Lookups go through an in-process LRU first, then the optional remote tiers
+(DynamoDB results table, then the resume bucket). Keys hash the model ID,
+normalized prompt, system prompt, temperature and max_tokens, so identical
+requests from retries or repeated postings are answered without Bedrock.
+
+Environment:
+    LLM_CACHE_ENABLED: set to "false" to disable caching everywhere
+    LLM_CACHE_STAGES: comma-separated stages that cache; a stage not listed never does
+    LLM_CACHE_TTL_SECONDS: entry lifetime (default 86400)
+    LLM_CACHE_MAX_ENTRIES / LLM_CACHE_MAX_BYTES: in-process LRU bounds
+    LLM_CACHE_TABLE: DynamoDB table for the shared tier (unset = no DynamoDB tier)
+    LLM_CACHE_BUCKET: S3 bucket for entries too large for DynamoDB (unset = no S3 tier)
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 86400
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DYNAMODB_MAX_VALUE_BYTES = 350 * 1024  # stay under the 400 KB item limit
+KEY_PREFIX = 'llm-cache#'
+S3_PREFIX = 'cache/llm/'
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Normalize whitespace that does not change the meaning of a prompt."""
+    lines = prompt.replace('\r\n', '\n').strip().split('\n')
+    return '\n'.join(line.rstrip() for line in lines)
+
+
+def cache_key(model_id: str, prompt: str, temperature: float, max_tokens: int,
+              system: Optional[str] = None, tool: Optional[Dict[str, Any]] = None) -> str:
+    """Build the content-addressed key for a Claude request."""
+    parts: List[Any] = [model_id, normalize_prompt(prompt), normalize_prompt(system or ''),
+                        float(temperature), int(max_tokens)]
+    if tool:
+        parts.append(tool)
+    material = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def cache_enabled(stage: str) -> bool:
+    """Whether a stage should use the response cache (only stages listed in LLM_CACHE_STAGES do)."""
+    if os.environ.get('LLM_CACHE_ENABLED', 'true').lower() in ('false', '0', 'no', 'off'):
+        return False
+    stages = os.environ.get('LLM_CACHE_STAGES', '')
+    return stage in {s.strip() for s in stages.split(',') if s.strip()}
+
+
+class MemoryTier:
+    """Thread-safe LRU bounded by entry count and total payload bytes."""
+
+    name = 'memory'
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, Tuple[float, str]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, key: str, payload: str, expires_at: float) -> None:
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, payload)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+
+class DynamoDBTier:
+    """Cache entries stored as items in the results table, expired by the expiresAt TTL."""
+
+    name = 'dynamodb'
+
+    def __init__(self, table):
+        self.table = table
+
+    def get(self, key: str) -> Optional[str]:
+        item = self.table.get_item(Key={'jobId': KEY_PREFIX + key, 'timestamp': 0}).get('Item')
+        if not item or int(item.get('expiresAt', 0)) <= time.time():
+            return None
+        return item.get('response')
+
+    def put(self, key: str, payload: str, expires_at: float) -> None:
+        if len(payload.encode('utf-8')) > DYNAMODB_MAX_VALUE_BYTES:
+            raise ValueError("Entry too large for DynamoDB tier")
+        self.table.put_item(Item={
+            'jobId': KEY_PREFIX + key,
+            'timestamp': 0,
+            'response': payload,
+            'expiresAt': int(expires_at),
+        })
+
+
+class S3Tier:
+    """Cache entries stored as objects under cache/llm/ in the resume bucket."""
+
+    name = 's3'
+
+    def __init__(self, s3_client, bucket: str):
+        self.s3 = s3_client
+        self.bucket = bucket
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            response = self.s3.get_object(Bucket=self.bucket, Key=S3_PREFIX + key + '.json')
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        expires_at = float(response.get('Metadata', {}).get('expires-at', 0))
+        if expires_at <= time.time():
+            return None
+        return response['Body'].read().decode('utf-8')
+
+    def put(self, key: str, payload: str, expires_at: float) -> None:
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=S3_PREFIX + key + '.json',
+            Body=payload.encode('utf-8'),
+            ContentType='application/json',
+            Metadata={'expires-at': str(int(expires_at))},
+        )
+
+
+class ResponseCache:
+    """Tiered cache of JSON-serializable response records."""
+
+    def __init__(self, memory: MemoryTier, remote_tiers: Optional[List[Any]] = None,
+                 ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.memory = memory
+        self.remote_tiers = remote_tiers or []
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Return (record, tier name) for a hit, or (None, None) for a miss."""
+        payload = self.memory.get(key)
+        if payload is not None:
+            return json.loads(payload), self.memory.name
+
+        for tier in self.remote_tiers:
+            try:
+                payload = tier.get(key)
+            except Exception as e:
+                logger.warning("Response cache %s lookup failed: %s", tier.name, str(e))
+                continue
+            if payload is not None:
+                self.memory.put(key, payload, time.time() + self.ttl_seconds)
+                return json.loads(payload), tier.name
+
+        return None, None
+
+    def put(self, key: str, record: Dict[str, Any]) -> None:
+        """Store a record in memory and in the first remote tier that accepts it."""
+        payload = json.dumps(record, ensure_ascii=False)
+        expires_at = time.time() + self.ttl_seconds
+        self.memory.put(key, payload, expires_at)
+
+        for tier in self.remote_tiers:
+            try:
+                tier.put(key, payload, expires_at)
+                return
+            except Exception as e:
+                logger.warning("Response cache %s write failed: %s", tier.name, str(e))
+
+    def clear(self) -> None:
+        """Clear the in-process tier."""
+        self.memory.clear()
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _build_cache() -> ResponseCache:
+    from aws_runtime import get_dynamodb_resource, get_s3_client
+
+    remote_tiers: List[Any] = []
+    table_name = os.environ.get('LLM_CACHE_TABLE')
+    if table_name:
+        remote_tiers.append(DynamoDBTier(get_dynamodb_resource().Table(table_name)))
+    bucket = os.environ.get('LLM_CACHE_BUCKET')
+    if bucket:
+        remote_tiers.append(S3Tier(get_s3_client(), bucket))
+
+    return ResponseCache(
+        MemoryTier(
+            max_entries=_env_int('LLM_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+            max_bytes=_env_int('LLM_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES),
+        ),
+        remote_tiers,
+        ttl_seconds=_env_int('LLM_CACHE_TTL_SECONDS', DEFAULT_TTL_SECONDS),
+    )
+
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the process-wide response cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = _build_cache()
+    return _cache
+
+
+def reset_response_cache() -> None:
+    """Drop the process-wide cache so it is rebuilt from the environment."""
+    global _cache
+    with _cache_lock:
+        _cache = None
@@ -0,0 +1,78 @@
+"""
+Router Lambda Function
+Hosts every stage in one function: dispatches on the event's stage to that
+stage's handler, so all stages share warm containers, the client pool and
+the in-process response cache
+"""
+import importlib
+import json
+import logging
+import os
+from typing import Dict, Any
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Stage name -> handler module; a stage's module is imported on first use
+STAGES = {
+    'parse_job': 'parse_job',
+    'analyze_resume': 'analyze_resume',
+    'generate_resume': 'generate_resume',
+    'ats_optimize': 'ats_optimize',
+    'cover_letter': 'cover_letter',
+    'critical_review': 'critical_review',
+    'save_results': 'save_results',
+    'refine_resume': 'refine_resume',
+    'notify': 'notify',
+    'convert_to_pdf': 'convert_to_pdf',
+}
+
+
+def stage_model_ids() -> Dict[str, str]:
+    """Per-stage MODEL_ID overrides from STAGE_MODEL_IDS (JSON object)."""
+    raw = os.environ.get('STAGE_MODEL_IDS')
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        logger.warning("Ignoring malformed STAGE_MODEL_IDS")
+        return {}
+
+
+def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    Run one workflow stage
+
+    Input:
+        - stage: Stage name (see STAGES)
+        - input: The stage's own event
+
+    Output:
+        The stage handler's output, unchanged
+    """
+    stage = event.get('stage', '')
+    module_name = STAGES.get(stage)
+    if module_name is None:
+        logger.error("Unknown stage: %r", stage)
+        return {
+            'statusCode': 400,
+            'error': f"Unknown stage: {stage!r}",
+        }
+
+    stage_handler = importlib.import_module(module_name).handler
+
+    # Lambda runs one event at a time per container, so the stage's model
+    # can go in the environment its handler reads
+    model_id = stage_model_ids().get(stage)
+    previous = os.environ.get('MODEL_ID')
+    if model_id:
+        os.environ['MODEL_ID'] = model_id
+    try:
+        return stage_handler(event.get('input', {}), context)
+    finally:
+        if model_id:
+            if previous is None:
+                os.environ.pop('MODEL_ID', None)
+            else:
+                os.environ['MODEL_ID'] = previous
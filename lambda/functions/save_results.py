@@ -5,7 +5,12 @@ Stores all analysis results in DynamoDB
 import json
 import logging
 import os
-import boto3
+from aws_runtime import get_dynamodb_resource
+from claim_check import claim_checked
+from metrics import instrumented
+from profiling import profiled
+from tracing import traced
+from usage_ledger import build_ledger
 from datetime import datetime
 from decimal import Decimal
 from typing import Dict, Any
@@ -13,7 +18,7 @@ from typing import Dict, Any
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource('dynamodb')
+dynamodb = get_dynamodb_resource()
 
 def convert_floats_to_decimal(obj):
     """Recursively convert float values to Decimal for DynamoDB compatibility"""
@@ -25,6 +30,10 @@ def convert_floats_to_decimal(obj):
         return Decimal(str(obj))
     return obj
 
+@instrumented('save_results')
+@traced('save_results')
+@profiled('save_results')
+@claim_checked('save_results')
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Save all workflow results to DynamoDB
@@ -36,14 +45,13 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         - itemId: DynamoDB item identifier
     """
     try:
-        table_name = os.environ['TABLE_NAME']
-        table = dynamodb.Table(table_name)
-        
         job_id = event.get('jobId', '')
         user_id = event.get('userId', 'anonymous')
 
         if not job_id:
             raise ValueError("jobId is required")
+
+        table = dynamodb.Table(os.environ['TABLE_NAME'])
         if user_id == 'anonymous':
             logger.warning("No userId provided, using 'anonymous'")
         
@@ -61,6 +69,16 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         
         # Extract tailored resume info
         tailored_resume = event.get('tailoredResume', {})
+
+        # Token, latency and cost ledger from the stages' usage records
+        ledger = build_ledger([
+            ('parse_job', event.get('parsedJob', {}).get('usage')),
+            ('analyze_resume', analysis_data.get('usage')),
+            ('generate_resume', tailored_resume.get('usage')),
+            ('ats_optimize', ats_result.get('usage')),
+            ('cover_letter', cover_letter_result.get('usage')),
+            ('critical_review', critical_review_result.get('usage')),
+        ])
         
         # Prepare item for DynamoDB (convert floats to Decimal)
         item = convert_floats_to_decimal({
@@ -84,6 +102,7 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             'coverLetterS3Key': cover_letter_result.get('coverLetterS3Key', ''),
             'criticalReview': critical_review_result,
             'overallRating': critical_review_result.get('overallRating', 0),
+            'usageLedger': ledger,
             'createdAt': datetime.utcnow().isoformat(),
             'status': 'completed'
         })
@@ -103,7 +122,8 @@ def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                 'atsScore': item['atsScore'],
                 'overallRating': item['overallRating'],
                 'tailoredResumeS3Key': item['tailoredResumeS3Key'],
-                'coverLetterS3Key': item['coverLetterS3Key']
+                'coverLetterS3Key': item['coverLetterS3Key'],
+                'costUsd': ledger['totals']['costUsd']
             }
         }
         
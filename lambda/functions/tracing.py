@@ -0,0 +1,272 @@
+"""
+Lightweight tracing spans for the Lambda handlers.
+
+Each handler is wrapped with @traced(stage), which opens the stage's root
+span. Code inside it opens child spans with `with span(name, **attributes)`
+(S3 transfers, prompt build, Bedrock calls, JSON extraction). Spans of one
+job share a trace ID carried in the Step Functions payload as `traceId`:
+the first stage takes it from its input, or from the X-Ray trace header,
+or makes a new one, and every stage returns it so later states can pass
+it on.
+
+Finished spans are exported as they end:
+- to the X-Ray daemon as subsegments of the function's segment, over the
+  daemon's UDP socket (no SDK, no synchronous call), when the invocation
+  is sampled (Lambda active tracing);
+- as JSON lines to TRACE_FILE, for offline waterfalls of a job
+  (python -m devtools.traces).
+
+With neither configured, span() does no work.
+"""
+import functools
+import json
+import logging
+import os
+import secrets
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+XRAY_HEADER_ENV = '_X_AMZN_TRACE_ID'
+XRAY_DAEMON_ENV = 'AWS_XRAY_DAEMON_ADDRESS'
+XRAY_PREAMBLE = '{"format": "json", "version": 1}\n'
+
+
+@dataclass
+class Span:
+    """One timed operation; times are epoch seconds."""
+    trace_id: str
+    span_id: str
+    name: str
+    stage: str
+    start: float
+    parent_id: Optional[str] = None
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        """Attach attributes (model, bytes, tokens, ...) to the span."""
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return (self.end - self.start) * 1000 if self.end is not None else None
+
+    def to_record(self) -> Dict[str, Any]:
+        record = asdict(self)
+        record['durationMs'] = round(self.duration_ms or 0.0, 3)
+        return record
+
+
+def new_trace_id() -> str:
+    """A trace ID in X-Ray format, so it can double as an X-Ray root."""
+    return f"1-{int(time.time()):08x}-{secrets.token_hex(12)}"
+
+
+def _new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def xray_header() -> Dict[str, str]:
+    """The invocation's X-Ray trace header (Root, Parent, Sampled), if any."""
+    raw = os.environ.get(XRAY_HEADER_ENV, '')
+    return dict(part.split('=', 1) for part in raw.split(';') if '=' in part)
+
+
+class XRayExporter:
+    """Send finished spans to the X-Ray daemon as subsegments."""
+
+    def __init__(self, address: str):
+        host, _, port = address.rpartition(':')
+        self.address = (host or '127.0.0.1', int(port))
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def export(self, span: Span, header: Dict[str, str]) -> None:
+        if header.get('Sampled') != '1' or not header.get('Root'):
+            return
+        document: Dict[str, Any] = {
+            'type': 'subsegment',
+            'id': span.span_id,
+            'trace_id': header['Root'],
+            'parent_id': span.parent_id or header.get('Parent'),
+            'name': span.name,
+            'start_time': span.start,
+            'end_time': span.end,
+            'annotations': {'stage': span.stage, 'jobTraceId': span.trace_id},
+            'metadata': {'default': span.attributes},
+        }
+        if span.error:
+            document['fault'] = True
+            document['cause'] = {'exceptions': [{'id': _new_span_id(), 'message': span.error}]}
+        payload = XRAY_PREAMBLE + json.dumps(document, default=str)
+        try:
+            self._socket.sendto(payload.encode('utf-8'), self.address)
+        except OSError as e:
+            logger.debug("X-Ray daemon unreachable: %s", str(e))
+
+
+class FileExporter:
+    """Append finished spans to a JSON-lines file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span, header: Dict[str, str]) -> None:
+        line = json.dumps(span.to_record(), default=str) + '\n'
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line)
+
+
+_exporters_lock = threading.Lock()
+_exporters_key: Optional[tuple] = None
+_exporters: list = []
+
+
+def exporters() -> list:
+    """Exporters for the current TRACE_FILE / X-Ray daemon settings."""
+    global _exporters_key, _exporters
+    key = (os.environ.get('TRACE_FILE'), os.environ.get(XRAY_DAEMON_ENV))
+    if key != _exporters_key:
+        with _exporters_lock:
+            if key != _exporters_key:
+                built = []
+                if key[0]:
+                    built.append(FileExporter(key[0]))
+                if key[1]:
+                    built.append(XRayExporter(key[1]))
+                _exporters, _exporters_key = built, key
+    return _exporters
+
+
+def tracing_enabled() -> bool:
+    return bool(exporters())
+
+
+_current: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+# Worker threads do not inherit the context; Lambda runs one invocation per
+# process, so their spans hang off the invocation's root span instead
+_root: Optional[Span] = None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get() or _root
+
+
+def _export(span: Span, header: Dict[str, str]) -> None:
+    for exporter in exporters():
+        try:
+            exporter.export(span, header)
+        except Exception as e:  # tracing must never fail the invocation
+            logger.warning("Failed to export span %s: %s", span.name, str(e))
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time the block as a child of the current span (None when not tracing)."""
+    parent = current_span()
+    if parent is None or not tracing_enabled():
+        yield None
+        return
+    child = Span(parent.trace_id, _new_span_id(), name, parent.stage, time.time(),
+                 parent_id=parent.span_id, attributes=dict(attributes))
+    token = _current.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        child.end = time.time()
+        _export(child, xray_header())
+
+
+def record_span(name: str, start: float, end: float, **attributes: Any) -> None:
+    """Export an already-finished interval (epoch seconds) as a child span."""
+    parent = current_span()
+    if parent is None or not tracing_enabled():
+        return
+    finished = Span(parent.trace_id, _new_span_id(), name, parent.stage, start,
+                    parent_id=parent.span_id, attributes=dict(attributes))
+    finished.end = end
+    _export(finished, xray_header())
+
+
+def trace_id_for(event: Any) -> str:
+    """The job's trace ID: from the payload, else the X-Ray root, else new."""
+    if isinstance(event, dict) and event.get('traceId'):
+        return str(event['traceId'])
+    return xray_header().get('Root') or new_trace_id()
+
+
+def traced(stage: str) -> Callable[[Callable], Callable]:
+    """Decorate a Lambda handler to open the stage's root span and pass traceId on."""
+    def decorate(handler: Callable[[Dict[str, Any], Any], Dict[str, Any]]) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+            global _root
+            trace_id = trace_id_for(event)
+            if not tracing_enabled():
+                result = handler(event, context)
+            else:
+                header = xray_header()
+                root = Span(trace_id, _new_span_id(), stage, stage, time.time())
+                if isinstance(event, dict) and event.get('jobId'):
+                    root.set(jobId=event['jobId'])
+                token = _current.set(root)
+                _root = root
+                try:
+                    result = handler(event, context)
+                    if isinstance(result, dict) and result.get('statusCode', 200) >= 400:
+                        root.error = str(result.get('error', result.get('statusCode')))
+                except Exception as e:
+                    root.error = f"{type(e).__name__}: {e}"
+                    raise
+                finally:
+                    _current.reset(token)
+                    if _root is root:
+                        _root = None
+                    root.end = time.time()
+                    _export(root, header)
+            if isinstance(result, dict):
+                result.setdefault('traceId', trace_id)
+            return result
+        return wrapper
+    return decorate
+
+
+def _aws_call_started(context: Dict[str, Any], **kwargs: Any) -> None:
+    if current_span() is not None and tracing_enabled():
+        context['trace_started'] = time.time()
+
+
+def _aws_call_finished(model: Any, context: Dict[str, Any], **kwargs: Any) -> None:
+    started = context.pop('trace_started', None)
+    if started is None:
+        return
+    attributes: Dict[str, Any] = {}
+    exception = kwargs.get('exception')
+    if exception is not None:
+        attributes['error'] = f"{type(exception).__name__}: {exception}"
+    http_response = kwargs.get('http_response')
+    if http_response is not None:
+        attributes['status'] = getattr(http_response, 'status_code', None)
+    record_span(f"{model.service_model.service_name}.{model.name}", started, time.time(), **attributes)
+
+
+def register_aws_hooks(client: Any) -> Any:
+    """Record a span for every API call made through a boto3 client or resource."""
+    events = getattr(client.meta, 'client', client).meta.events
+    events.register('before-call', _aws_call_started)
+    events.register('after-call', _aws_call_finished)
+    events.register('after-call-error', _aws_call_finished)
+    return client
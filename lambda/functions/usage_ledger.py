@@ -0,0 +1,107 @@
+"""
+Per-job usage ledger.
+
+Each Bedrock-calling stage returns a usage record (ClaudeResult.usage_record).
+save_results folds the records it receives into one ledger for the job:
+tokens, latency and derived cost per stage, plus totals. Latency is
+totalled as stageLatencyMsSum, since the parallel stages overlap. Prices
+come from MODEL_PRICES, the JSON form of MODEL_PRICING in
+lib/model-pricing.ts, in USD per 1M tokens.
+"""
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOKEN_FIELDS = ('inputTokens', 'outputTokens', 'cacheReadInputTokens', 'cacheWriteInputTokens')
+
+# Usage record token field -> price table field
+PRICE_FIELDS = {
+    'inputTokens': 'input',
+    'outputTokens': 'output',
+    'cacheReadInputTokens': 'cacheRead',
+    'cacheWriteInputTokens': 'cacheWrite',
+}
+
+# Cross-region inference profile prefixes; profiles bill as the base model
+INFERENCE_PROFILE_PREFIXES = ('us.', 'eu.', 'apac.', 'global.')
+
+
+def model_prices() -> Dict[str, Dict[str, float]]:
+    """Price table from MODEL_PRICES (JSON object), empty if unset or malformed."""
+    raw = os.environ.get('MODEL_PRICES')
+    if not raw:
+        return {}
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        logger.warning("Ignoring malformed MODEL_PRICES")
+        return {}
+
+
+def price_for(model_id: str, prices: Dict[str, Dict[str, float]]) -> Optional[Dict[str, float]]:
+    """Prices of a model or of the base model behind an inference profile."""
+    if model_id in prices:
+        return prices[model_id]
+    for prefix in INFERENCE_PROFILE_PREFIXES:
+        if model_id.startswith(prefix):
+            return prices.get(model_id[len(prefix):])
+    return None
+
+
+def stage_cost(record: Dict[str, Any], prices: Dict[str, Dict[str, float]]) -> Optional[float]:
+    """USD cost of one usage record, or None when its model has no price."""
+    price = price_for(record.get('model', ''), prices)
+    if price is None:
+        return None
+    return sum(int(record.get(field, 0) or 0) * float(price.get(PRICE_FIELDS[field], 0))
+               for field in TOKEN_FIELDS) / 1_000_000
+
+
+def build_ledger(stages: Iterable[Tuple[str, Optional[Dict[str, Any]]]],
+                 prices: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, Any]:
+    """
+    Aggregate stage usage records into a job ledger
+
+    Args:
+        stages: (stage name, usage record or None) pairs; stages without a
+            record (failed, skipped, or no Bedrock call) are left out
+        prices: Price table (defaults to MODEL_PRICES)
+
+    Returns:
+        {'stages': {stage: record + costUsd}, 'totals': {...}, 'pricingComplete': bool}
+        where costUsd is None for a model missing from the price table
+    """
+    prices = model_prices() if prices is None else prices
+    ledger_stages: Dict[str, Dict[str, Any]] = {}
+    totals: Dict[str, Any] = {field: 0 for field in TOKEN_FIELDS}
+    # Bedrock time summed over stages. The parallel stages overlap, so this
+    # is not the job's wall-clock latency
+    totals['stageLatencyMsSum'] = 0
+    totals['costUsd'] = 0.0
+    complete = True
+
+    for stage, record in stages:
+        if not isinstance(record, dict) or not record.get('model'):
+            continue
+        cost = stage_cost(record, prices)
+        if cost is None:
+            complete = False
+            logger.warning("No price for model %s (stage %s)", record.get('model'), stage)
+        entry = {'model': record['model']}
+        entry.update({field: int(record.get(field, 0) or 0) for field in TOKEN_FIELDS})
+        entry['latencyMs'] = int(record.get('latencyMs', 0) or 0)
+        if record.get('responseCache'):
+            entry['responseCache'] = record['responseCache']
+        entry['costUsd'] = round(cost, 6) if cost is not None else None
+        ledger_stages[stage] = entry
+
+        for field in TOKEN_FIELDS:
+            totals[field] += entry[field]
+        totals['stageLatencyMsSum'] += entry['latencyMs']
+        totals['costUsd'] += cost or 0.0
+
+    totals['costUsd'] = round(totals['costUsd'], 6)
+    return {'stages': ledger_stages, 'totals': totals, 'pricingComplete': complete}
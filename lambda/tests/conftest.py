@@ -0,0 +1,13 @@
+"""
+Shared pytest fixtures for Lambda function tests
+"""
+import pytest
+from response_cache import reset_response_cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_response_cache():
+    """Give every test an empty in-process response cache"""
+    reset_response_cache()
+    yield
+    reset_response_cache()
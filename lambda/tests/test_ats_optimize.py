@@ -3,10 +3,20 @@ Unit tests for ats_optimize Lambda function
 """
 import json
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import patch
 from ats_optimize import handler
 
 
+def _stream_response(text):
+    """Build a mock invoke_model_with_response_stream response"""
+    return {'body': iter([
+        {'chunk': {'bytes': json.dumps({
+            'type': 'content_block_delta',
+            'delta': {'type': 'text_delta', 'text': text}
+        }).encode()}}
+    ])}
+
+
 class TestATSOptimizeHandler:
     """Tests for ATS optimization handler"""
 
@@ -31,12 +41,8 @@ class TestATSOptimizeHandler:
         }
 
         with patch('ats_optimize.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -61,12 +67,8 @@ class TestATSOptimizeHandler:
         }
 
         with patch('ats_optimize.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -91,12 +93,8 @@ class TestATSOptimizeHandler:
 ```'''
 
         with patch('ats_optimize.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': response_text}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(response_text)
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -117,12 +115,8 @@ class TestATSOptimizeHandler:
         }
 
         with patch('ats_optimize.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -137,7 +131,7 @@ class TestATSOptimizeHandler:
         }
 
         with patch('ats_optimize.bedrock') as mock_bedrock:
-            mock_bedrock.invoke_model.side_effect = Exception('Bedrock API Error')
+            mock_bedrock.invoke_model_with_response_stream.side_effect = Exception('Bedrock API Error')
 
             result = handler(event, None)
 
@@ -153,12 +147,8 @@ class TestATSOptimizeHandler:
         }
 
         with patch('ats_optimize.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': 'This is not valid JSON at all'}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response('This is not valid JSON at all')
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -180,12 +170,8 @@ class TestATSOptimizeHandler:
         }
 
         with patch('ats_optimize.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -210,17 +196,13 @@ class TestATSOptimizeHandler:
 
         with patch('ats_optimize.bedrock') as mock_bedrock, \
              patch.dict('os.environ', {'MODEL_ID': 'custom-model-id'}):
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             handler(event, None)
 
-            # Verify invoke_model was called
-            mock_bedrock.invoke_model.assert_called_once()
-            call_args = mock_bedrock.invoke_model.call_args
+            # Verify the streaming call was made
+            mock_bedrock.invoke_model_with_response_stream.assert_called_once()
+            call_args = mock_bedrock.invoke_model_with_response_stream.call_args
             assert call_args.kwargs.get('modelId') == 'custom-model-id' or \
                    (call_args.args and 'custom-model-id' in str(call_args))
@@ -0,0 +1,493 @@
+"""
+Unit tests for aws_runtime module
+"""
+import json
+import os
+import pytest
+from unittest.mock import Mock, patch
+import aws_runtime
+from output_schemas import OUTPUT_TOOLS, output_tool
+from json_stream import StreamingJSONParser
+from aws_runtime import (
+    ClaudeResult,
+    StreamDeadlineExceeded,
+    bedrock_config,
+    build_request_body,
+    cached_block,
+    get_bedrock_client,
+    get_s3_client,
+    invoke_claude,
+    prompt_caching_supported,
+    prompt_text,
+    reset_clients,
+    stream_claude,
+    stream_deadline_seconds,
+    text_block,
+)
+
+
+def _stream_event(obj):
+    return {'chunk': {'bytes': json.dumps(obj).encode()}}
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    reset_clients()
+    yield
+    reset_clients()
+
+
+class TestClients:
+    """Tests for the pooled client getters"""
+
+    def test_clients_are_cached(self):
+        """Test that getters return the same client instance"""
+        with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}):
+            assert get_s3_client() is get_s3_client()
+            assert get_bedrock_client() is get_bedrock_client()
+
+    def test_lazy_init_defers_construction(self):
+        """Test that LAZY_INIT hands out placeholders that build the pooled client on first use"""
+        with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1', 'LAZY_INIT': 'true'}):
+            placeholder = get_s3_client()
+            assert isinstance(placeholder, aws_runtime.LazyClient)
+            assert 's3' not in aws_runtime._clients
+
+            assert placeholder.meta.service_model.service_name == 's3'
+            assert get_s3_client() is aws_runtime._clients['s3']
+
+    def test_lazy_client_follows_swapped_pool(self):
+        """Test that a placeholder resolves to whatever client the pool holds now"""
+        with patch.dict(os.environ, {'LAZY_INIT': 'true'}):
+            placeholder = get_bedrock_client()
+        stand_in = Mock()
+
+        with patch.dict(aws_runtime._clients, {'bedrock-runtime': stand_in}):
+            placeholder.invoke_model(modelId='m')
+
+        stand_in.invoke_model.assert_called_once_with(modelId='m')
+
+    def test_bedrock_config_from_env(self):
+        """Test that pool, timeout and retry settings are tunable via env"""
+        with patch.dict(os.environ, {
+            'BEDROCK_REGION': 'us-west-2',
+            'BEDROCK_READ_TIMEOUT': '120',
+            'AWS_MAX_POOL_CONNECTIONS': '8',
+            'BEDROCK_MAX_ATTEMPTS': '6',
+        }):
+            config = bedrock_config()
+
+        assert config.region_name == 'us-west-2'
+        assert config.read_timeout == 120
+        assert config.max_pool_connections == 8
+        assert config.tcp_keepalive is True
+        assert config.retries == {'mode': 'adaptive', 'max_attempts': 6}
+
+    def test_bedrock_config_ignores_invalid_values(self):
+        """Test that a malformed env value falls back to the default"""
+        with patch.dict(os.environ, {'BEDROCK_READ_TIMEOUT': 'soon'}):
+            assert bedrock_config().read_timeout == 600
+
+    def test_streaming_client_read_timeout_within_deadline(self):
+        """Test that a deadline-bound client reads no longer than the deadline"""
+        assert bedrock_config(read_timeout=300).read_timeout == 300
+        assert bedrock_config(read_timeout=900).read_timeout == 600
+
+        with patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}):
+            streaming = get_bedrock_client(read_timeout=299.5)
+            assert streaming is get_bedrock_client(read_timeout=300)
+            assert streaming is not get_bedrock_client()
+            assert streaming.meta.config.read_timeout == 300
+
+
+class TestInvokeClaude:
+    """Tests for invoke_claude"""
+
+    def test_returns_text_usage_and_stop_reason(self):
+        """Test that the response body is unpacked into a ClaudeResult"""
+        client = Mock()
+        client.invoke_model.return_value = {
+            'body': Mock(read=lambda: json.dumps({
+                'content': [{'type': 'text', 'text': '{"ok": true}'}],
+                'stop_reason': 'end_turn',
+                'usage': {'input_tokens': 12, 'output_tokens': 5}
+            }).encode())
+        }
+
+        result = invoke_claude('hello', model_id='test-model', max_tokens=100,
+                               temperature=0.1, client=client)
+
+        assert result.text == '{"ok": true}'
+        assert result.stop_reason == 'end_turn'
+        assert result.usage == {'input_tokens': 12, 'output_tokens': 5}
+        assert result.model_id == 'test-model'
+        kwargs = client.invoke_model.call_args.kwargs
+        assert kwargs['modelId'] == 'test-model'
+        body = json.loads(kwargs['body'])
+        assert body['max_tokens'] == 100
+        assert body['temperature'] == 0.1
+        assert body['messages'][0]['content'] == 'hello'
+
+    def test_model_id_defaults_to_env(self):
+        """Test that MODEL_ID env var is used when no model is given"""
+        client = Mock()
+        client.invoke_model.return_value = {
+            'body': Mock(read=lambda: json.dumps({'content': [{'text': 'x'}]}).encode())
+        }
+
+        with patch.dict(os.environ, {'MODEL_ID': 'env-model'}):
+            result = invoke_claude('hello', client=client)
+
+        assert client.invoke_model.call_args.kwargs['modelId'] == 'env-model'
+        assert result.text == 'x'
+        assert result.usage == {}
+
+    def test_uses_shared_client_by_default(self):
+        """Test that the shared Bedrock client is used when none is passed"""
+        client = Mock()
+        client.invoke_model.return_value = {
+            'body': Mock(read=lambda: json.dumps({'content': [{'text': 'x'}]}).encode())
+        }
+
+        with patch.object(aws_runtime, 'get_bedrock_client', return_value=client):
+            invoke_claude('hello', model_id='m')
+
+        client.invoke_model.assert_called_once()
+
+    def test_system_prompt(self):
+        """Test that a system prompt is included when given"""
+        body = build_request_body('hi', 10, 0.5, system='be brief')
+        assert body['system'] == 'be brief'
+        assert 'system' not in build_request_body('hi', 10, 0.5)
+
+
+class TestStreamClaude:
+    """Tests for stream_claude"""
+
+    def test_collects_text_and_metadata(self):
+        """Test that deltas are joined and usage/stop reason captured"""
+        client = Mock()
+        client.invoke_model_with_response_stream.return_value = {'body': iter([
+            _stream_event({'type': 'message_start', 'message': {'usage': {'input_tokens': 40}}}),
+            _stream_event({'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': 'Hello '}}),
+            _stream_event({'type': 'content_block_delta', 'delta': {'text': 'world'}}),
+            _stream_event({'type': 'message_delta', 'delta': {'stop_reason': 'max_tokens'},
+                           'usage': {'output_tokens': 2}}),
+        ])}
+        seen = []
+
+        result = stream_claude('hi', model_id='m', client=client, on_text=seen.append)
+
+        assert result.text == 'Hello world'
+        assert seen == ['Hello ', 'world']
+        assert result.stop_reason == 'max_tokens'
+        assert result.usage == {'input_tokens': 40, 'output_tokens': 2}
+        assert result.first_token_ms is not None
+
+    def test_skips_non_text_deltas(self):
+        """Test that non-text deltas are ignored"""
+        client = Mock()
+        client.invoke_model_with_response_stream.return_value = {'body': iter([
+            _stream_event({'type': 'content_block_delta', 'delta': {'type': 'input_json_delta', 'partial_json': '{'}}),
+            _stream_event({'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': 'ok'}}),
+        ])}
+
+        result = stream_claude('hi', model_id='m', client=client)
+
+        assert result.text == 'ok'
+
+    def test_empty_stream(self):
+        """Test handling of a response without a body"""
+        client = Mock()
+        client.invoke_model_with_response_stream.return_value = {}
+
+        result = stream_claude('hi', model_id='m', client=client)
+
+        assert result.text == ''
+        assert result.first_token_ms is None
+
+
+class TestPromptCaching:
+    """Tests for Bedrock prompt-caching support"""
+
+    def test_cache_markers_sent_for_supported_models(self):
+        """Test that cache_control blocks reach Bedrock for Claude 4.x models"""
+        client = Mock()
+        client.invoke_model.return_value = {
+            'body': Mock(read=lambda: json.dumps({
+                'content': [{'text': 'ok'}],
+                'usage': {'input_tokens': 5, 'cache_read_input_tokens': 2048,
+                          'cache_creation_input_tokens': 0}
+            }).encode())
+        }
+        prompt = [cached_block('resume'), text_block('instructions')]
+
+        result = invoke_claude(prompt, model_id='us.anthropic.claude-sonnet-4-5-20250929-v1:0', client=client)
+
+        content = json.loads(client.invoke_model.call_args.kwargs['body'])['messages'][0]['content']
+        assert content[0]['cache_control'] == {'type': 'ephemeral'}
+        assert 'cache_control' not in content[1]
+        assert result.prompt_cache_usage() == {'cacheReadInputTokens': 2048, 'cacheWriteInputTokens': 0}
+
+    def test_cache_markers_stripped_for_unsupported_models(self):
+        """Test that Claude 3 Haiku receives plain text blocks"""
+        body = build_request_body([cached_block('resume')], 10, 0.5, prompt_caching=False)
+
+        assert body['messages'][0]['content'] == [{'type': 'text', 'text': 'resume'}]
+
+    def test_prompt_caching_supported(self):
+        """Test model support detection and the PROMPT_CACHING kill switch"""
+        assert prompt_caching_supported('us.anthropic.claude-opus-4-5-20251101-v1:0')
+        assert not prompt_caching_supported('anthropic.claude-3-haiku-20240307-v1:0')
+        with patch.dict(os.environ, {'PROMPT_CACHING': 'false'}):
+            assert not prompt_caching_supported('us.anthropic.claude-opus-4-5-20251101-v1:0')
+
+    def test_prompt_text_flattens_blocks(self):
+        """Test that block prompts flatten for hashing"""
+        assert prompt_text('plain') == 'plain'
+        assert prompt_text([cached_block('a'), text_block('b')]) == 'a\n\nb'
+
+
+class TestStreamDeadline:
+    """Tests for stream read deadlines and throughput metrics"""
+
+    def test_deadline_exceeded(self):
+        """Test that a stream running past its deadline is aborted"""
+        def slow_stream():
+            yield _stream_event({'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': 'a'}})
+            clock['now'] += 10
+            yield _stream_event({'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': 'b'}})
+
+        clock = {'now': 100.0}
+        client = Mock()
+        client.invoke_model_with_response_stream.return_value = {'body': slow_stream()}
+
+        with patch('aws_runtime.time.perf_counter', side_effect=lambda: clock['now']):
+            with pytest.raises(StreamDeadlineExceeded):
+                stream_claude('hi', model_id='m', client=client, deadline_seconds=5)
+
+    def test_deadline_from_env(self):
+        """Test that STREAM_DEADLINE_SECONDS overrides the handler default"""
+        assert stream_deadline_seconds(300) == 300
+        with patch.dict(os.environ, {'STREAM_DEADLINE_SECONDS': '45'}):
+            assert stream_deadline_seconds(300) == 45
+
+    def test_stage_deadline_overrides_shared(self):
+        """Test that STREAM_DEADLINE_SECONDS_<STAGE> wins over the shared setting"""
+        with patch.dict(os.environ, {'STREAM_DEADLINE_SECONDS': '45',
+                                     'STREAM_DEADLINE_SECONDS_COVER_LETTER': '90'}):
+            assert stream_deadline_seconds(300, 'cover_letter') == 90
+            assert stream_deadline_seconds(540, 'ats_optimize') == 45
+        with patch.dict(os.environ, {'STREAM_DEADLINE_SECONDS_COVER_LETTER': 'soon'}):
+            assert stream_deadline_seconds(300, 'cover_letter') == 300
+
+    def test_stalled_stream_raises_deadline_exceeded(self):
+        """Test that a read timeout on a stalled stream surfaces as StreamDeadlineExceeded"""
+        from botocore.exceptions import ReadTimeoutError
+
+        def stalled_stream():
+            yield _stream_event({'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': 'a'}})
+            raise ReadTimeoutError(endpoint_url='https://bedrock-runtime.us-east-1.amazonaws.com')
+
+        client = Mock()
+        client.invoke_model_with_response_stream.return_value = {'body': stalled_stream()}
+        received = []
+
+        with pytest.raises(StreamDeadlineExceeded, match='stalled after 1 characters'):
+            stream_claude('hi', model_id='m', client=client, deadline_seconds=5, on_text=received.append)
+        assert received == ['a']
+
+    def test_output_tokens_per_second(self):
+        """Test throughput is measured from the first token"""
+        result = ClaudeResult(text='x', model_id='m', usage={'output_tokens': 500},
+                              latency_ms=6000, first_token_ms=1000)
+
+        assert result.output_tokens_per_second == 100
+        assert ClaudeResult(text='x', model_id='m').output_tokens_per_second is None
+
+    def test_usage_record(self):
+        """Test the compact usage record, and that a response-cache hit bills no tokens"""
+        usage = {'input_tokens': 40, 'output_tokens': 9, 'cache_read_input_tokens': 300}
+        live = ClaudeResult(text='x', model_id='m', usage=usage, latency_ms=1234.6)
+        cached = ClaudeResult(text='x', model_id='m', usage=usage, latency_ms=2.0, cache_tier='memory')
+
+        assert live.usage_record() == {'model': 'm', 'inputTokens': 40, 'outputTokens': 9,
+                                       'cacheReadInputTokens': 300, 'cacheWriteInputTokens': 0,
+                                       'latencyMs': 1235}
+        assert cached.usage_record()['inputTokens'] == 0
+        assert cached.usage_record()['responseCache'] == 'memory'
+
+
+def _delta(text):
+    return _stream_event({'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': text}})
+
+
+def _stop(reason, output_tokens):
+    return _stream_event({'type': 'message_delta', 'delta': {'stop_reason': reason},
+                          'usage': {'output_tokens': output_tokens}})
+
+
+class TestContinuation:
+    """Tests for continuing a response that stopped on max_tokens"""
+
+    def test_continues_from_prefill_and_stitches(self):
+        """Test that a max_tokens stop is continued with the text so far as prefill"""
+        client = Mock()
+        client.invoke_model_with_response_stream.side_effect = [
+            {'body': iter([_delta('{"tailoredResume": "# Jane '), _stop('max_tokens', 100)])},
+            {'body': iter([_delta(' Doe"}'), _stop('end_turn', 5)])},
+        ]
+        seen = []
+
+        result = stream_claude('hi', model_id='m', max_tokens=100, client=client,
+                               on_text=seen.append, max_continuations=2)
+
+        assert result.text == '{"tailoredResume": "# Jane Doe"}'
+        assert result.stop_reason == 'end_turn'
+        assert result.continuations == 1
+        assert result.usage == {'output_tokens': 105}
+        assert ''.join(seen) == result.text
+        second = json.loads(client.invoke_model_with_response_stream.call_args_list[1].kwargs['body'])
+        assert second['messages'][1] == {'role': 'assistant', 'content': '{"tailoredResume": "# Jane'}
+
+    @pytest.mark.parametrize('continuation', [
+        ['  ', 'and Co"}'], [' ', ' and Co"}'], [' and Co"}'], ['and Co"}'], ['  and Co"}'], [' ', '', ' ', 'and Co"}'],
+    ])
+    def test_streamed_text_matches_stitched_text(self, continuation):
+        """Test that whitespace trimmed from the prefill reaches on_text once, however the model resends it"""
+        client = Mock()
+        client.invoke_model_with_response_stream.side_effect = [
+            {'body': iter([_delta('{"tailoredResume": "# Jane Doe'), _delta('  '), _stop('max_tokens', 100)])},
+            {'body': iter([_delta(text) for text in continuation] + [_stop('end_turn', 5)])},
+        ]
+        parser = StreamingJSONParser()
+
+        result = stream_claude('hi', model_id='m', max_tokens=100, client=client,
+                               on_text=parser.feed, max_continuations=1)
+
+        assert result.text == parser.text == '{"tailoredResume": "# Jane Doe  and Co"}'
+        assert parser.result() == json.loads(result.text)
+
+    @pytest.mark.parametrize('continuation', [['\nMore'], ['\n', '\n  More'], ['More'], ['\n\n  \n', 'More']])
+    def test_partially_resent_whitespace_kept_once(self, continuation):
+        """Test that the original trailing whitespace is kept once when the model resends only part of it"""
+        client = Mock()
+        client.invoke_model_with_response_stream.side_effect = [
+            {'body': iter([_delta('# Jane Doe\n\n  '), _stop('max_tokens', 100)])},
+            {'body': iter([_delta(text) for text in continuation] + [_stop('end_turn', 5)])},
+        ]
+        seen = []
+
+        result = stream_claude('hi', model_id='m', max_tokens=100, client=client,
+                               on_text=seen.append, max_continuations=1)
+
+        assert result.text == ''.join(seen) == '# Jane Doe\n\n  More'
+
+    def test_stops_at_token_budget(self):
+        """Test that continuation respects the overall output budget"""
+        client = Mock()
+        client.invoke_model_with_response_stream.side_effect = [
+            {'body': iter([_delta('a'), _stop('max_tokens', 100)])},
+            {'body': iter([_delta('b'), _stop('max_tokens', 50)])},
+        ]
+
+        result = stream_claude('hi', model_id='m', max_tokens=100, client=client,
+                               max_continuations=5, max_total_tokens=150)
+
+        assert result.text == 'ab'
+        assert result.stop_reason == 'max_tokens'
+        assert result.continuations == 1
+        second = json.loads(client.invoke_model_with_response_stream.call_args_list[1].kwargs['body'])
+        assert second['max_tokens'] == 50
+
+    def test_no_continuation_by_default(self):
+        """Test that max_tokens is returned as-is unless continuation is requested"""
+        client = Mock()
+        client.invoke_model_with_response_stream.return_value = {
+            'body': iter([_delta('a'), _stop('max_tokens', 100)])
+        }
+
+        result = stream_claude('hi', model_id='m', max_tokens=100, client=client)
+
+        assert result.stop_reason == 'max_tokens'
+        assert client.invoke_model_with_response_stream.call_count == 1
+
+
+class TestStructuredOutput:
+    """Tests for forced tool-use structured output"""
+
+    TOOL = {'name': 'record_result', 'description': 'Record it.',
+            'input_schema': {'type': 'object', 'properties': {'score': {'type': 'number'}}}}
+
+    def test_all_stage_tools_only_ahead_of_a_cached_prefix(self):
+        """Test that the shared tools list is sent only when it keeps a cached prefix stable"""
+        tool = output_tool('analyze_resume')
+        prompt = [cached_block('RESUME'), {'type': 'text', 'text': 'Analyze it'}]
+
+        cached = build_request_body(prompt, 100, 0.5, tool=tool)
+        uncached = build_request_body(prompt, 100, 0.5, prompt_caching=False, tool=tool)
+        plain = build_request_body('Parse this job', 100, 0.5, tool=tool)
+
+        assert cached['tools'] == OUTPUT_TOOLS
+        assert uncached['tools'] == plain['tools'] == [tool]
+        assert cached['tool_choice'] == uncached['tool_choice'] == {'type': 'tool', 'name': 'record_fit_analysis'}
+
+    def test_invoke_returns_tool_input(self):
+        """Test that the forced tool's input is returned already parsed"""
+        client = Mock()
+        client.invoke_model.return_value = {
+            'body': Mock(read=lambda: json.dumps({
+                'content': [{'type': 'tool_use', 'id': 't1', 'name': 'record_result', 'input': {'score': 90}}],
+                'stop_reason': 'tool_use',
+            }).encode())
+        }
+
+        result = invoke_claude('hi', model_id='m', client=client, tool=self.TOOL)
+
+        assert result.tool_input == {'score': 90}
+        assert result.parsed_json() == {'score': 90}
+        assert json.loads(result.text) == {'score': 90}
+        body = json.loads(client.invoke_model.call_args.kwargs['body'])
+        assert body['tools'] == [self.TOOL]
+        assert body['tool_choice'] == {'type': 'tool', 'name': 'record_result'}
+
+    def test_stream_collects_input_json_deltas(self):
+        """Test that streamed tool input reaches on_text and is parsed at the end"""
+        client = Mock()
+        client.invoke_model_with_response_stream.return_value = {'body': iter([
+            _stream_event({'type': 'content_block_delta', 'delta': {'type': 'input_json_delta', 'partial_json': '{"sco'}}),
+            _stream_event({'type': 'content_block_delta', 'delta': {'type': 'input_json_delta', 'partial_json': 're": 7}'}}),
+            _stop('tool_use', 6),
+        ])}
+        seen = []
+
+        result = stream_claude('hi', model_id='m', client=client, on_text=seen.append, tool=self.TOOL)
+
+        assert seen == ['{"sco', 're": 7}']
+        assert result.tool_input == {'score': 7}
+
+    def test_continuation_prefills_partial_tool_input_as_text(self):
+        """Test that a cut-off tool call is continued as text with the same tools offered"""
+        client = Mock()
+        client.invoke_model_with_response_stream.side_effect = [
+            {'body': iter([
+                _stream_event({'type': 'content_block_delta', 'delta': {'type': 'input_json_delta', 'partial_json': '{"score": '}}),
+                _stop('max_tokens', 10),
+            ])},
+            {'body': iter([_delta('8}'), _stop('end_turn', 2)])},
+        ]
+
+        result = stream_claude('hi', model_id='m', max_tokens=10, client=client,
+                               max_continuations=1, tool=self.TOOL)
+
+        assert result.tool_input == {'score': 8}
+        second = json.loads(client.invoke_model_with_response_stream.call_args_list[1].kwargs['body'])
+        assert second['tools'] == [self.TOOL]
+        assert second['tool_choice'] == {'type': 'none'}
+        assert second['messages'][1]['content'] == '{"score":'
+
+    def test_parsed_json_falls_back_to_text(self):
+        """Test that free-text responses are still recovered"""
+        result = ClaudeResult(text='Sure:\n```json\n{"a": 1}\n```', model_id='m')
+
+        assert result.parsed_json() == {'a': 1}
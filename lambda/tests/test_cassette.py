@@ -0,0 +1,209 @@
+"""
+Unit tests for the record/replay cassette layer
+"""
+import json
+import os
+import boto3
+import pytest
+from unittest.mock import patch
+from moto import mock_aws
+from response_cache import reset_response_cache
+from devtools.cassette import (
+    Cassette, CassetteMiss, Scrubber, normalize_request, recording_client, replaying,
+)
+from devtools.clients import patch_clients
+from devtools.fake_bedrock import FakeBedrockRuntime, ModelProfile
+
+MODEL = 'us.anthropic.claude-sonnet-4-5-20250929-v1:0'
+RESUME = b'# Jane Doe\njane.doe@gmail.com | (415) 555-1234 | linkedin.com/in/janedoe\n- Python developer'
+PROFILES = {'': ModelProfile(first_token_ms=200, tokens_per_second=100, output_tokens=(150, 150))}
+
+
+@pytest.fixture(autouse=True)
+def mock_env():
+    with patch.dict(os.environ, {'BUCKET_NAME': 'test-bucket', 'MODEL_ID': MODEL}):
+        yield
+
+
+def _analysis_responder(model_id, body):
+    return {'fitScore': 82, 'matchedSkills': ['Python'], 'missingSkills': [], 'strengths': ['Contact jane.doe@gmail.com'],
+            'gaps': [], 'recommendations': [], 'summary': 'Jane Doe is a strong fit.'}
+
+
+def _record(tmp_path, handler_module, event, responder=None):
+    """Run a handler against moto S3 and the fake Bedrock, recording both."""
+    cassette = Cassette(scrubber=Scrubber(['Jane Doe']))
+    fake = FakeBedrockRuntime(seed=1, profiles=PROFILES, responder=responder, time_scale=0, error_scale=0)
+    with mock_aws():
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='test-bucket')
+        s3.put_object(Bucket='test-bucket', Key='uploads/user-1/resume.md', Body=RESUME)
+        with patch_clients(s3=recording_client(cassette, 's3', s3),
+                           bedrock=recording_client(cassette, 'bedrock', fake)):
+            result = handler_module.handler(event, None)
+    path = tmp_path / 'run.cassette.json'
+    cassette.save(str(path))
+    reset_response_cache()
+    return path, result
+
+
+class TestScrubber:
+    """Tests for PII scrubbing"""
+
+    def test_replaces_pii_consistently(self):
+        scrubber = Scrubber(['Jane Doe'])
+
+        text = scrubber.text('Jane Doe <jane@corp.io>, +1 415-555-1234, https://github.com/jdoe. JANE DOE again')
+
+        assert text == ('Candidate 1 <person1@example.com>, 555-010-0001, https://github.com/person1. '
+                        'Candidate 1 again')
+
+    def test_idempotent(self):
+        scrubber = Scrubber()
+        once = scrubber.text('a@b.com (212) 555-9876 linkedin.com/in/someone')
+
+        assert Scrubber().text(once) == once
+
+    def test_leaves_ids_and_dates_alone(self):
+        text = 'job-1770764725413 in 2021-2024, score 87.5, id 4155551234'
+
+        assert Scrubber().text(text) == text
+
+
+class TestNormalizeRequest:
+    """Tests for request normalization"""
+
+    def test_json_body_key_order_ignored(self):
+        a = normalize_request({'modelId': 'm', 'body': json.dumps({'a': 1, 'b': 2})}, Scrubber())
+        b = normalize_request({'modelId': 'm', 'body': json.dumps({'b': 2, 'a': 1})}, Scrubber())
+
+        assert a == b
+
+    def test_volatile_fields_dropped(self):
+        item = {'Item': {'jobId': 'j', 'createdAt': '2026-01-01T00:00:00', 'expiresAt': 1}}
+
+        assert normalize_request(item, Scrubber()) == {'Item': {'jobId': 'j'}}
+        assert normalize_request({'Key': 'uploads/u/1770764725413-tailored.md'}, Scrubber()) == \
+            {'Key': 'uploads/u/{epochMs}-tailored.md'}
+
+    def test_binary_body_hashed(self):
+        normalized = normalize_request({'Body': b'\xff\xfe binary'}, Scrubber())
+
+        assert set(normalized['Body']) == {'sha256', 'length'}
+
+
+class TestRecordReplay:
+    """Tests that record a handler run and replay it"""
+
+    def test_cassette_contains_no_pii(self, tmp_path):
+        """Test that S3 bodies, prompts and model output are scrubbed"""
+        import analyze_resume
+        event = {'jobId': 'job-1', 'resumeS3Keys': ['uploads/user-1/resume.md'], 'parsedJob': {}}
+
+        path, result = _record(tmp_path, analyze_resume, event, _analysis_responder)
+
+        assert result['statusCode'] == 200
+        text = path.read_text()
+        for pii in ('Jane Doe', 'jane.doe@gmail.com', '555-1234', 'janedoe'):
+            assert pii not in text
+        assert 'person1@example.com' in text
+
+    def test_replay_reproduces_scrubbed_result(self, tmp_path):
+        """Test that replay needs no AWS and matches the recorded run"""
+        import analyze_resume
+        event = {'jobId': 'job-1', 'resumeS3Keys': ['uploads/user-1/resume.md'], 'parsedJob': {}}
+        path, recorded = _record(tmp_path, analyze_resume, event, _analysis_responder)
+        cassette = Cassette.load(str(path))
+
+        with replaying(cassette):
+            replayed = analyze_resume.handler(event, None)
+
+        assert replayed['fitScore'] == 82
+        assert replayed['summary'] == 'Candidate 1 is a strong fit.'
+        assert cassette.misses == []
+        assert cassette.unused() == []
+
+    def test_stream_replayed_with_recorded_timing(self, tmp_path):
+        """Test that a response stream is replayed chunk by chunk at recorded offsets"""
+        import generate_resume
+        event = {'jobId': 'job-1', 'userId': 'user-1', 'resumeS3Keys': ['uploads/user-1/resume.md'],
+                 'parsedJob': {'requiredSkills': ['Python']}, 'analysis': {'fitScore': 85}}
+        path, recorded = _record(tmp_path, generate_resume, event)
+        cassette = Cassette.load(str(path))
+        stream = next(i for i in cassette.interactions if i['operation'] == 'invoke_model_with_response_stream')
+        sleeps = []
+
+        with replaying(cassette, time_scale=1.0, sleep=sleeps.append):
+            replayed = generate_resume.handler(event, None)
+
+        assert replayed['statusCode'] == 200
+        assert replayed['tailoredResumeS3Key'] == recorded['tailoredResumeS3Key']
+        assert len(stream['chunks']) > 3
+        assert sum(sleeps) >= stream['elapsedMs'] / 1000
+        assert {i['operation'] for i in cassette.interactions} >= {'get_object', 'put_object'}
+        assert cassette.misses == []
+
+    def test_zero_latency_replay_does_not_sleep(self, tmp_path):
+        import analyze_resume
+        event = {'jobId': 'job-1', 'resumeS3Keys': ['uploads/user-1/resume.md'], 'parsedJob': {}}
+        path, _ = _record(tmp_path, analyze_resume, event, _analysis_responder)
+        sleeps = []
+
+        with replaying(Cassette.load(str(path)), time_scale=0, sleep=sleeps.append):
+            analyze_resume.handler(event, None)
+
+        assert sleeps == []
+
+    def test_changed_request_is_a_miss(self, tmp_path):
+        """Test that a request that was never recorded fails loudly"""
+        import analyze_resume
+        event = {'jobId': 'job-1', 'resumeS3Keys': ['uploads/user-1/resume.md'], 'parsedJob': {}}
+        path, _ = _record(tmp_path, analyze_resume, event, _analysis_responder)
+        cassette = Cassette.load(str(path))
+
+        with replaying(cassette):
+            result = analyze_resume.handler(dict(event, resumeS3Keys=['uploads/user-1/other.md']), None)
+
+        assert result['statusCode'] == 500
+        assert cassette.misses[0][0] == 's3.get_object'
+        with pytest.raises(CassetteMiss):
+            cassette.replay('s3', 'get_object', {'Bucket': 'x', 'Key': 'y'})
+
+    def test_recorded_errors_replay_as_client_exceptions(self, tmp_path):
+        """Test that client.exceptions.<Code> catches a replayed error"""
+        cassette = Cassette()
+        with mock_aws():
+            s3 = boto3.client('s3', region_name='us-east-1')
+            s3.create_bucket(Bucket='errors-bucket')
+            recorder = recording_client(cassette, 's3', s3)
+            with pytest.raises(s3.exceptions.NoSuchKey):
+                recorder.get_object(Bucket='errors-bucket', Key='missing')
+        cassette.save(str(tmp_path / 'errors.json.gz'))
+
+        with replaying(Cassette.load(str(tmp_path / 'errors.json.gz'))):
+            import aws_runtime
+            replayer = aws_runtime.get_s3_client()
+            with pytest.raises(replayer.exceptions.NoSuchKey):
+                replayer.get_object(Bucket='errors-bucket', Key='missing')
+
+    def test_dynamodb_table_calls_recorded(self, tmp_path):
+        """Test that resource Table calls record the table name and Decimals survive"""
+        from decimal import Decimal
+        cassette = Cassette()
+        with mock_aws():
+            dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+            dynamodb.create_table(TableName='results', KeySchema=[{'AttributeName': 'jobId', 'KeyType': 'HASH'}],
+                                  AttributeDefinitions=[{'AttributeName': 'jobId', 'AttributeType': 'S'}],
+                                  BillingMode='PAY_PER_REQUEST')
+            table = recording_client(cassette, 'dynamodb', dynamodb).Table('results')
+            table.put_item(Item={'jobId': 'j', 'fitScore': Decimal('82.5')})
+            recorded = table.get_item(Key={'jobId': 'j'})
+        cassette.save(str(tmp_path / 'ddb.json'))
+
+        replayed = Cassette.load(str(tmp_path / 'ddb.json'))
+        with replaying(replayed):
+            import aws_runtime
+            item = aws_runtime.get_dynamodb_resource().Table('results').get_item(Key={'jobId': 'j'})['Item']
+
+        assert item == recorded['Item'] == {'jobId': 'j', 'fitScore': Decimal('82.5')}
+        assert cassette.interactions[0]['request']['TableName'] == 'results'
@@ -0,0 +1,189 @@
+"""
+Unit tests for claim-check payloads
+"""
+import json
+import os
+import random
+import string
+from unittest.mock import Mock, patch
+
+import pytest
+
+import claim_check
+from claim_check import (
+    ClaimCheckedEvent, claim_checked, compress_fields, decode, encode, is_encoded, is_reference, offload,
+    payload_compression, resolve, store,
+)
+from devtools.load_test import run_local
+
+RESUME = '# Jane Doe\n' + '- Built Python services on AWS Lambda\n' * 200
+
+
+@pytest.fixture
+def s3():
+    client = Mock()
+    objects = {}
+
+    def put_object(Bucket, Key, Body, **kwargs):
+        objects[Key] = Body
+
+    def get_object(Bucket, Key):
+        return {'Body': Mock(read=Mock(return_value=objects[Key]))}
+
+    client.put_object.side_effect = put_object
+    client.get_object.side_effect = get_object
+    client.objects = objects
+    with patch('claim_check.get_s3_client', return_value=client), \
+            patch.dict(os.environ, {'BUCKET_NAME': 'resume-bucket'}), \
+            patch.object(claim_check, '_cache', None):
+        yield client
+
+
+def _generate(event, context):
+    return {'statusCode': 200, 'jobId': event.get('jobId'), 'tailoredResumeMarkdown': RESUME,
+            'changesApplied': ['Reordered experience'], 'usage': {'inputTokens': 10}}
+
+
+def test_disabled_by_default(s3):
+    with patch.dict(os.environ, {'CLAIM_CHECK_ENABLED': 'false'}):
+        result = claim_checked('generate_resume')(_generate)({'jobId': 'job-1'}, None)
+
+    assert result['tailoredResumeMarkdown'] == RESUME
+    s3.put_object.assert_not_called()
+
+
+def test_large_fields_offloaded_small_and_inline_fields_kept(s3):
+    with patch.dict(os.environ, {'CLAIM_CHECK_ENABLED': 'true'}):
+        result = claim_checked('generate_resume')(_generate)({'jobId': 'job-1'}, None)
+
+    reference = result['tailoredResumeMarkdown']
+    assert is_reference(reference)
+    assert reference['$claimCheck'].startswith('payloads/job-1/')
+    assert reference['bytes'] == len(json.dumps(RESUME).encode('utf-8'))
+    assert result['changesApplied'] == ['Reordered experience']
+    assert result['statusCode'] == 200 and result['usage'] == {'inputTokens': 10}
+    assert json.loads(s3.objects[reference['$claimCheck']]) == RESUME
+
+
+def test_same_document_stored_once(s3):
+    first = store(RESUME, 'job-1')
+    second = store(RESUME, 'job-1')
+
+    assert first == second
+    assert s3.put_object.call_count == 1
+
+
+def test_references_resolved_on_first_read_only(s3):
+    resume_ref = store(RESUME, 'job-1')
+    job_ref = store({'requiredSkills': ['Python']}, 'job-1')
+    claim_check._cache.clear()
+    seen = {}
+
+    def review(event, context):
+        seen['event'] = event
+        seen['resume'] = event.get('tailoredResumeMarkdown')
+        return {'statusCode': 200}
+
+    claim_checked('critical_review')(review)(
+        {'jobId': 'job-1', 'tailoredResumeMarkdown': resume_ref, 'parsedJob': {'parsedJob': job_ref}}, None)
+
+    assert seen['resume'] == RESUME
+    assert s3.get_object.call_count == 1
+    assert json.loads(json.dumps(seen['event']))['parsedJob'] == {'parsedJob': {'requiredSkills': ['Python']}}
+    assert s3.get_object.call_count == 2
+
+
+def test_container_cache_skips_download(s3):
+    reference = store(RESUME, 'job-1')
+
+    assert ClaimCheckedEvent({'resume': reference})['resume'] == RESUME
+    assert ClaimCheckedEvent({'resume': reference})['resume'] == RESUME
+    s3.get_object.assert_not_called()
+
+
+def test_resolve_returns_plain_payload(s3):
+    reference = store({'fitScore': 80}, 'job-1')
+
+    resolved = resolve({'results': [{'analysis': reference}], 'jobId': 'job-1'})
+
+    assert resolved == {'results': [{'analysis': {'fitScore': 80}}], 'jobId': 'job-1'}
+    assert type(resolved['results'][0]) is dict
+
+
+def test_offload_threshold(s3):
+    """Test that fields are offloaded from threshold bytes serialized (quotes included)"""
+    result = offload({'jobId': 'job-1', 'summary': 'x' * 100, 'coverLetter': 'y' * 101}, 'job-1', threshold=103)
+
+    assert result['summary'] == 'x' * 100
+    assert is_reference(result['coverLetter'])
+    assert result['jobId'] == 'job-1'
+
+
+@pytest.mark.parametrize('codec', ['gzip', pytest.param('zstd', marks=pytest.mark.skipif(
+    claim_check._zstd() is None, reason='no compression.zstd or zstandard'))])
+def test_compressed_fields_decoded_by_next_stage(codec):
+    seen = {}
+
+    def review(event, context):
+        seen['resume'] = event['tailoredResumeMarkdown']
+        return {'statusCode': 200}
+
+    with patch.dict(os.environ, {'PAYLOAD_COMPRESSION': codec, 'CLAIM_CHECK_ENABLED': 'false'}):
+        result = claim_checked('generate_resume')(_generate)({'jobId': 'job-1'}, None)
+    envelope = json.loads(json.dumps(result))['tailoredResumeMarkdown']
+    claim_checked('critical_review')(review)({'jobId': 'job-1', 'tailoredResumeMarkdown': envelope}, None)
+
+    assert envelope['$encoding'] == codec and envelope['bytes'] == len(RESUME)
+    assert len(envelope['data']) < len(RESUME) / 3
+    assert result['changesApplied'] == ['Reordered experience']
+    assert seen['resume'] == RESUME
+
+
+def test_compression_keeps_short_and_incompressible_fields():
+    rng = random.Random(0)
+    noise = ''.join(rng.choice(string.printable) for _ in range(3000))
+
+    result = compress_fields({'jobId': 'j' * 3000, 'summary': 'x' * 100, 'noise': noise}, 'gzip', threshold=1024)
+
+    assert result == {'jobId': 'j' * 3000, 'summary': 'x' * 100, 'noise': noise}
+
+
+def test_zstd_falls_back_to_gzip_without_zstd():
+    with patch.dict(os.environ, {'PAYLOAD_COMPRESSION': 'zstd'}), patch('claim_check._zstd', return_value=None):
+        assert payload_compression() == 'gzip'
+        assert encode(RESUME, 'zstd')['$encoding'] == 'gzip'
+    with patch.dict(os.environ, {'PAYLOAD_COMPRESSION': 'none'}):
+        assert payload_compression() is None
+
+
+def test_compressed_envelope_claim_checked_when_still_large(s3):
+    with patch.dict(os.environ, {'PAYLOAD_COMPRESSION': 'gzip', 'CLAIM_CHECK_ENABLED': 'true',
+                                 'CLAIM_CHECK_MIN_BYTES': '128'}):
+        result = claim_checked('generate_resume')(_generate)({'jobId': 'job-1'}, None)
+
+    reference = result['tailoredResumeMarkdown']
+    assert is_reference(reference)
+    assert is_encoded(json.loads(s3.objects[reference['$claimCheck']]))
+    claim_check._cache.clear()
+    assert ClaimCheckedEvent({'resume': reference})['resume'] == RESUME
+    assert resolve({'resume': reference}) == {'resume': RESUME}
+    assert decode(encode('é' * 10, 'gzip')) == 'é' * 10
+
+
+def test_workflow_passes_references_between_states():
+    """Test local runs with claim checks or compression end to end; claim checks shrink state payloads"""
+    job = 'Senior Python engineer to build serverless pipelines on AWS Lambda and DynamoDB. ' * 5
+
+    def largest_payloads(enabled):
+        with patch.dict(os.environ, {'CLAIM_CHECK_ENABLED': enabled, 'CLAIM_CHECK_MIN_BYTES': '512'}), \
+                patch.object(claim_check, '_cache', None):
+            return run_local(1, rate=0, time_scale=0, error_scale=0, resume_text=RESUME, job_text=job).summary()
+
+    inline = largest_payloads('false')
+    checked = largest_payloads('true')
+    with patch.dict(os.environ, {'PAYLOAD_COMPRESSION': 'gzip', 'PAYLOAD_COMPRESSION_MIN_BYTES': '512'}):
+        compressed = largest_payloads('false')
+
+    assert checked['succeeded'] == 1 and checked['stageErrors'] == {}
+    assert compressed['succeeded'] == 1 and compressed['stageErrors'] == {}
+    assert checked['payloadBytes']['SaveResults'] < inline['payloadBytes']['SaveResults'] / 2
@@ -0,0 +1,51 @@
+"""
+Unit tests for the cold-start profiler
+"""
+from devtools.coldstart import (
+    INVOKE_MARKER, by_package, format_comparison, handler_modules, import_subtree, parse_importtime, profile,
+)
+
+IMPORTTIME = f"""import time: self [us] | cumulative | imported package
+import time:       900 |        900 | site
+import time:      3000 |       3000 |     botocore.compat
+import time:      1000 |       4000 |   botocore
+import time:       500 |       4500 | aws_runtime
+import time:     60000 |      64500 | notify
+{INVOKE_MARKER}
+import time:       700 |        700 | botocore.exceptions
+"""
+
+
+def test_parse_importtime_splits_phases():
+    before, after = parse_importtime(IMPORTTIME)
+
+    assert [(r.name, r.depth) for r in before] == [('site', 0), ('botocore.compat', 2), ('botocore', 1),
+                                                  ('aws_runtime', 0), ('notify', 0)]
+    assert after[0].name == 'botocore.exceptions'
+
+
+def test_import_subtree_and_packages():
+    before, _ = parse_importtime(IMPORTTIME)
+
+    rows = import_subtree(before, 'notify')
+
+    assert [r.name for r in rows] == ['notify']
+    assert by_package(import_subtree(before, 'aws_runtime')) == {'botocore': 4.0, 'aws_runtime': 0.5}
+
+
+def test_handler_modules_found():
+    modules = handler_modules()
+
+    assert {'notify', 'parse_job', 'save_results'} <= set(modules)
+    assert 'aws_runtime' not in modules
+
+
+def test_lazy_notify_exits_without_sdk():
+    """Test that the early-exit path in lazy mode never loads botocore"""
+    eager = profile('notify', 'eager', repeat=1)
+    lazy = profile('notify', 'lazy', repeat=1)
+
+    assert eager.sdk_loaded and 'botocore' in eager.packages
+    assert lazy.status == 200
+    assert not lazy.sdk_loaded and 'botocore' not in lazy.packages
+    assert 'notify' in format_comparison([eager, lazy])
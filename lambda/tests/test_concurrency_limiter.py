@@ -0,0 +1,244 @@
+"""
+Unit tests for concurrency_limiter module (DynamoDB via moto)
+"""
+import json
+import os
+import boto3
+import pytest
+from unittest.mock import Mock, patch
+from botocore.exceptions import ClientError
+from moto import mock_aws
+from aws_runtime import invoke_claude
+from concurrency_limiter import (
+    ConcurrencyLimiter,
+    ConcurrencyLimitTimeout,
+    bedrock_slot,
+    is_throttling_error,
+    reset_limiter,
+)
+
+MODEL = 'us.anthropic.claude-opus-4-5-20251101-v1:0'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def _throttle():
+    return ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'slow down'}}, 'InvokeModel')
+
+
+@pytest.fixture
+def table():
+    with mock_aws():
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        yield dynamodb.create_table(
+            TableName='results',
+            KeySchema=[
+                {'AttributeName': 'jobId', 'KeyType': 'HASH'},
+                {'AttributeName': 'timestamp', 'KeyType': 'RANGE'},
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'jobId', 'AttributeType': 'S'},
+                {'AttributeName': 'timestamp', 'AttributeType': 'N'},
+            ],
+            BillingMode='PAY_PER_REQUEST',
+        )
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _limiter(table, clock, **kwargs):
+    return ConcurrencyLimiter(table, sleep=clock.sleep, clock=clock, **kwargs)
+
+
+def _state(table):
+    item = table.get_item(Key={'jobId': 'limiter#' + MODEL, 'timestamp': 0})['Item']
+    return int(item['inFlight']), float(item['limit'])
+
+
+class TestConcurrencyLimiter:
+    """Tests for slot accounting and AIMD adjustment"""
+
+    def test_acquire_and_release(self, table, clock):
+        """Test that a slot is counted while held and returned afterwards"""
+        limiter = _limiter(table, clock, initial_limit=2)
+
+        lease = limiter.acquire(MODEL)
+        assert _state(table)[0] == 1
+
+        limiter.release(lease)
+        assert _state(table)[0] == 0
+
+    def test_waits_when_full(self, table, clock):
+        """Test that acquire times out when every slot is held"""
+        limiter = _limiter(table, clock, initial_limit=1, max_wait_seconds=5)
+        limiter.acquire(MODEL)
+
+        with pytest.raises(ConcurrencyLimitTimeout):
+            limiter.acquire(MODEL)
+        assert clock.now > 1_700_000_000.0 + 5
+
+    def test_additive_increase(self, table, clock):
+        """Test that a full window of successes adds one slot"""
+        limiter = _limiter(table, clock, initial_limit=2)
+
+        for _ in range(2):
+            limiter.release(limiter.acquire(MODEL))
+
+        assert _state(table) == (0, 3.0)
+
+    def test_increase_capped_at_max(self, table, clock):
+        """Test that the limit never exceeds max_limit"""
+        limiter = _limiter(table, clock, initial_limit=2, max_limit=2)
+
+        limiter.release(limiter.acquire(MODEL))
+
+        assert _state(table) == (0, 2.0)
+
+    def test_multiplicative_decrease_once_per_window(self, table, clock):
+        """Test that concurrent throttles at the same limit halve it only once"""
+        limiter = _limiter(table, clock, initial_limit=8)
+        leases = [limiter.acquire(MODEL) for _ in range(3)]
+
+        for lease in leases:
+            limiter.release(lease, throttled=True)
+
+        assert _state(table) == (0, 4.0)
+
+    def test_decrease_floored_at_min(self, table, clock):
+        """Test that the limit never drops below min_limit"""
+        limiter = _limiter(table, clock, initial_limit=1, min_limit=1)
+
+        limiter.release(limiter.acquire(MODEL), throttled=True)
+
+        assert _state(table) == (0, 1.0)
+
+    def test_sdk_retries_count_as_congestion(self, table, clock):
+        """Test that a response that needed SDK retries shrinks the limit"""
+        limiter = _limiter(table, clock, initial_limit=4)
+
+        with limiter.slot(MODEL) as lease:
+            lease.observe({'ResponseMetadata': {'RetryAttempts': 2}})
+
+        assert _state(table) == (0, 2.0)
+
+    def test_slot_releases_on_throttle_exception(self, table, clock):
+        """Test that a throttling error releases the slot and halves the limit"""
+        limiter = _limiter(table, clock, initial_limit=4)
+
+        with pytest.raises(ClientError):
+            with limiter.slot(MODEL):
+                raise _throttle()
+
+        assert _state(table) == (0, 2.0)
+
+    def test_other_failures_do_not_grow_the_limit(self, table, clock):
+        """Test that a call failing for a reason other than throttling releases the slot unchanged"""
+        limiter = _limiter(table, clock, initial_limit=2)
+
+        for _ in range(2):
+            with pytest.raises(TimeoutError):
+                with limiter.slot(MODEL):
+                    raise TimeoutError('stream deadline')
+
+        assert _state(table) == (0, 2.0)
+
+    def test_stale_slots_reclaimed(self, table, clock):
+        """Test that slots leaked by crashed invocations are reclaimed"""
+        limiter = _limiter(table, clock, initial_limit=1, lease_seconds=60, max_wait_seconds=300)
+        limiter.acquire(MODEL)  # never released
+        clock.now += 120
+
+        lease = limiter.acquire(MODEL)
+
+        assert lease.acquired
+        assert _state(table)[0] == 1
+
+    def test_only_expired_leases_reclaimed_under_traffic(self, table, clock):
+        """Test that a leaked slot is reclaimed while others keep the counter busy, and live leases are kept"""
+        limiter = _limiter(table, clock, initial_limit=2, max_limit=2, lease_seconds=60, max_wait_seconds=300)
+        limiter.acquire(MODEL)  # leaked
+        clock.now += 30
+        live = limiter.acquire(MODEL)
+        clock.now += 40         # the leaked lease has expired, the live one has not
+
+        lease = limiter.acquire(MODEL)
+
+        assert lease.acquired
+        assert _state(table)[0] == 2
+        limiter.release(live)
+        limiter.release(lease)
+        assert _state(table)[0] == 0
+
+    def test_reclaimed_lease_released_late_is_not_counted_twice(self, table, clock):
+        """Test that releasing a lease after it was reclaimed leaves the counter alone"""
+        limiter = _limiter(table, clock, initial_limit=1, lease_seconds=60, max_wait_seconds=300)
+        slow = limiter.acquire(MODEL)
+        clock.now += 120
+        lease = limiter.acquire(MODEL)
+
+        limiter.release(slow)
+
+        assert _state(table)[0] == 1
+        limiter.release(lease)
+        assert _state(table)[0] == 0
+
+    def test_fails_open_without_table(self, clock):
+        """Test that a missing table does not block Bedrock calls"""
+        with mock_aws():
+            missing = boto3.resource('dynamodb', region_name='us-east-1').Table('missing')
+            lease = _limiter(missing, clock).acquire(MODEL)
+
+        assert lease.acquired is False
+
+
+class TestIntegration:
+    """Tests for the limiter in the shared invocation path"""
+
+    def test_disabled_without_env(self):
+        """Test that bedrock_slot is a no-op when no table is configured"""
+        reset_limiter()
+        with bedrock_slot(MODEL) as lease:
+            assert lease.acquired is False
+
+    def test_invoke_claude_takes_a_slot(self, table):
+        """Test that invoke_claude acquires and releases through the limiter"""
+        reset_limiter()
+        client = Mock()
+        client.invoke_model.return_value = {
+            'body': Mock(read=lambda: json.dumps({'content': [{'text': 'ok'}]}).encode())
+        }
+        seen = []
+        original_acquire = ConcurrencyLimiter.acquire
+
+        def spy(self, model_id):
+            lease = original_acquire(self, model_id)
+            seen.append(_state(table)[0])
+            return lease
+
+        with patch.dict(os.environ, {'BEDROCK_LIMITER_TABLE': 'results'}), \
+             patch('aws_runtime.get_dynamodb_resource', return_value=boto3.resource('dynamodb', region_name='us-east-1')), \
+             patch.object(ConcurrencyLimiter, 'acquire', spy):
+            invoke_claude('hi', model_id=MODEL, client=client)
+        reset_limiter()
+
+        assert seen == [1]
+        assert _state(table)[0] == 0
+
+    def test_is_throttling_error(self):
+        """Test throttle detection for API and event-stream error codes"""
+        assert is_throttling_error(_throttle())
+        assert is_throttling_error(ClientError({'Error': {'Code': 'throttlingException'}}, 'InvokeModelWithResponseStream'))
+        assert not is_throttling_error(ClientError({'Error': {'Code': 'ValidationException'}}, 'InvokeModel'))
+        assert not is_throttling_error(ValueError('bad'))
@@ -3,10 +3,20 @@ Unit tests for cover_letter Lambda function
 """
 import json
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import patch, MagicMock
 from cover_letter import handler
 
 
+def _stream_response(text):
+    """Build a mock invoke_model_with_response_stream response"""
+    return {'body': iter([
+        {'chunk': {'bytes': json.dumps({
+            'type': 'content_block_delta',
+            'delta': {'type': 'text_delta', 'text': text}
+        }).encode()}}
+    ])}
+
+
 class TestCoverLetterHandler:
     """Tests for cover letter generation handler"""
 
@@ -31,12 +41,8 @@ class TestCoverLetterHandler:
 
         with patch('cover_letter.bedrock') as mock_bedrock, \
              patch('cover_letter.s3') as mock_s3:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -70,18 +76,14 @@ class TestCoverLetterHandler:
 
         with patch('cover_letter.bedrock') as mock_bedrock, \
              patch('cover_letter.s3') as mock_s3:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
             assert result['statusCode'] == 200
             # Verify the prompt included default company name
-            mock_bedrock.invoke_model.assert_called_once()
+            mock_bedrock.invoke_model_with_response_stream.assert_called_once()
 
     @patch.dict('os.environ', {'BUCKET_NAME': 'test-bucket'})
     def test_cover_letter_with_empty_strengths(self):
@@ -102,12 +104,8 @@ class TestCoverLetterHandler:
 
         with patch('cover_letter.bedrock') as mock_bedrock, \
              patch('cover_letter.s3') as mock_s3:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -135,12 +133,8 @@ class TestCoverLetterHandler:
 
         with patch('cover_letter.bedrock') as mock_bedrock, \
              patch('cover_letter.s3') as mock_s3:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': response_text}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(response_text)
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -165,12 +159,8 @@ class TestCoverLetterHandler:
 
         with patch('cover_letter.bedrock') as mock_bedrock, \
              patch('cover_letter.s3') as mock_s3:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -187,7 +177,7 @@ class TestCoverLetterHandler:
         }
 
         with patch('cover_letter.bedrock') as mock_bedrock:
-            mock_bedrock.invoke_model.side_effect = Exception('Bedrock unavailable')
+            mock_bedrock.invoke_model_with_response_stream.side_effect = Exception('Bedrock unavailable')
 
             result = handler(event, None)
 
@@ -213,12 +203,8 @@ class TestCoverLetterHandler:
 
         with patch('cover_letter.bedrock') as mock_bedrock, \
              patch('cover_letter.s3') as mock_s3:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
             mock_s3.put_object.side_effect = Exception('S3 access denied')
 
             result = handler(event, None)
@@ -243,12 +229,8 @@ class TestCoverLetterHandler:
 
         with patch('cover_letter.bedrock') as mock_bedrock, \
              patch('cover_letter.s3') as mock_s3:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -284,12 +266,8 @@ class TestCoverLetterHandler:
         }
 
         with patch('cover_letter.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': 'This is not JSON and has no JSON in it'}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response('This is not JSON and has no JSON in it')
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
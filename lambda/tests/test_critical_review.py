@@ -3,10 +3,20 @@ Unit tests for critical_review Lambda function
 """
 import json
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import patch
 from critical_review import handler
 
 
+def _stream_response(text):
+    """Build a mock invoke_model_with_response_stream response"""
+    return {'body': iter([
+        {'chunk': {'bytes': json.dumps({
+            'type': 'content_block_delta',
+            'delta': {'type': 'text_delta', 'text': text}
+        }).encode()}}
+    ])}
+
+
 class TestCriticalReviewHandler:
     """Tests for critical review handler"""
 
@@ -29,12 +39,8 @@ class TestCriticalReviewHandler:
         }
 
         with patch('critical_review.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -64,18 +70,14 @@ class TestCriticalReviewHandler:
         }
 
         with patch('critical_review.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
             assert result['statusCode'] == 200
             # Verify bedrock was called (meaning fallback worked)
-            mock_bedrock.invoke_model.assert_called_once()
+            mock_bedrock.invoke_model_with_response_stream.assert_called_once()
 
     def test_critical_review_with_low_rating(self):
         """Test critical review with low rating"""
@@ -96,12 +98,8 @@ class TestCriticalReviewHandler:
         }
 
         with patch('critical_review.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -132,12 +130,8 @@ class TestCriticalReviewHandler:
 ```'''
 
         with patch('critical_review.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': response_text}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(response_text)
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -164,12 +158,8 @@ class TestCriticalReviewHandler:
         }
 
         with patch('critical_review.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -186,7 +176,7 @@ class TestCriticalReviewHandler:
         }
 
         with patch('critical_review.bedrock') as mock_bedrock:
-            mock_bedrock.invoke_model.side_effect = Exception('Bedrock service error')
+            mock_bedrock.invoke_model_with_response_stream.side_effect = Exception('Bedrock service error')
 
             result = handler(event, None)
 
@@ -202,12 +192,8 @@ class TestCriticalReviewHandler:
         }
 
         with patch('critical_review.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': 'This response has no valid JSON anywhere'}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response('This response has no valid JSON anywhere')
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -229,12 +215,8 @@ class TestCriticalReviewHandler:
         }
 
         with patch('critical_review.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -266,12 +248,8 @@ class TestCriticalReviewHandler:
         }
 
         with patch('critical_review.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -297,12 +275,8 @@ class TestCriticalReviewHandler:
         }
 
         with patch('critical_review.bedrock') as mock_bedrock:
-            mock_response = {
-                'body': Mock(read=lambda: json.dumps({
-                    'content': [{'text': json.dumps(mock_response_content)}]
-                }).encode())
-            }
-            mock_bedrock.invoke_model.return_value = mock_response
+            mock_response = _stream_response(json.dumps(mock_response_content))
+            mock_bedrock.invoke_model_with_response_stream.return_value = mock_response
 
             result = handler(event, None)
 
@@ -2,7 +2,7 @@
 Unit tests for extract_json module
 """
 import pytest
-from extract_json import extract_json_from_text
+from extract_json import _candidate_spans, extract_json_from_text, repair_truncated_json
 
 
 class TestExtractJsonFromText:
@@ -236,3 +236,119 @@ But here is valid: {"fallback": true}'''
         result = extract_json_from_text(text)
         assert result["path"] == "C:\\Users\\test"
         assert result["url"] == "http://example.com?a=1&b=2"
+
+    # String-aware bracket matching
+    def test_unbalanced_braces_inside_string_values(self):
+        """Test that braces inside string values do not break matching"""
+        text = 'Result: {"tailoredResume": "Built {templating with } and {{ jinja", "changesApplied": ["a"]}'
+        result = extract_json_from_text(text)
+        assert result == {"tailoredResume": "Built {templating with } and {{ jinja", "changesApplied": ["a"]}
+
+    def test_escaped_quotes_and_brackets_in_strings(self):
+        """Test that escaped quotes do not end a string early"""
+        text = 'Output: {"a": "say \\"}\\" now", "b": "back\\\\", "c": "]"} done'
+        result = extract_json_from_text(text)
+        assert result == {"a": 'say "}" now', "b": "back\\", "c": "]"}
+
+    def test_unclosed_brace_in_prose_before_json(self):
+        """Test that a stray { and quote in prose still finds the JSON after it"""
+        text = 'Use {placeholder and "quote then {"a": 1}'
+        result = extract_json_from_text(text)
+        assert result == {"a": 1}
+
+    def test_first_valid_by_position(self):
+        """Test that an array before an object is returned first"""
+        text = 'Items ["x"] and {"y": 1}'
+        result = extract_json_from_text(text)
+        assert result == ["x"]
+
+    def test_deeply_nested_braces_scan_in_linear_time(self):
+        """Test that nested template braces no longer trigger a rescan per brace"""
+        # A rescan per brace would take billions of steps at this depth
+        depth = 50000
+        text = '{' * depth + '}' * depth
+        assert len(list(_candidate_spans(text))) == depth
+        assert extract_json_from_text(text) == {}
+
+
+class TestCandidateSpans:
+    """Tests for the bracket scanner behind strategy 3"""
+
+    def test_nested_spans_ordered_by_start(self):
+        """Test that outer spans come before the spans nested in them"""
+        text = 'x {"a": [1, {"b": 2}]} y'
+        assert [text[s:e] for s, e in _candidate_spans(text)] == [
+            '{"a": [1, {"b": 2}]}', '[1, {"b": 2}]', '{"b": 2}'
+        ]
+
+    def test_mismatched_closer_skipped(self):
+        """Test that a closer of the wrong kind does not pop the stack"""
+        text = '{"a": 1 ]}'
+        assert _candidate_spans(text) == [(0, len(text))]
+
+    def test_brackets_in_strings_ignored_only_when_string_aware(self):
+        """Test the string-aware and plain scanning modes"""
+        text = '{"a": "}"}'
+        assert _candidate_spans(text) == [(0, 10)]
+        assert _candidate_spans(text, string_aware=False) == [(0, 8)]
+
+
+class TestRepairTruncatedJson:
+    """Tests for repair_truncated_json (max_tokens cut-offs)"""
+
+    def test_string_cut_off_is_kept(self):
+        """Test that a cut-off string value keeps the text written so far"""
+        text = '```json\n{"atsScore": 88, "atsOptimizedResume": "# Jane\\n## Exp'
+        value, complete = repair_truncated_json(text)
+        assert value == {"atsScore": 88, "atsOptimizedResume": "# Jane\n## Exp"}
+        assert complete == ["atsScore"]
+
+    def test_nested_containers_closed(self):
+        """Test that open arrays and objects are closed innermost first"""
+        value, complete = repair_truncated_json('{"a": "x", "b": {"c": ["d", "e')
+        assert value == {"a": "x", "b": {"c": ["d", "e"]}}
+        assert complete == ["a"]
+
+    @pytest.mark.parametrize('text', [
+        '{"a": "x", "tailo',        # half-written key
+        '{"a": "x", "b": ',         # key without value
+        '{"a": "x", "b": tru',      # half-written literal
+        '{"a": "x", ',              # trailing comma
+        '{"a": "x", "b": 12',       # number that may have had more digits
+        '{"a": "x", "b": {',        # container opened, nothing in it yet
+    ])
+    def test_incomplete_trailing_element_dropped(self, text):
+        """Test that an element that cannot be completed is dropped"""
+        value, complete = repair_truncated_json(text)
+        assert value == {"a": "x"}
+        assert complete == ["a"]
+
+    def test_value_finished_at_cut_is_complete(self):
+        """Test that a string value closed right before the cut counts as complete"""
+        value, complete = repair_truncated_json('{"a": 1, "b": "done"')
+        assert value == {"a": 1, "b": "done"}
+        assert complete == ["a", "b"]
+
+    def test_partial_escape_dropped(self):
+        """Test that a cut inside an escape sequence does not corrupt the string"""
+        assert repair_truncated_json('{"a": "x\\u00')[0] == {"a": "x"}
+        assert repair_truncated_json('{"a": "x\\')[0] == {"a": "x"}
+
+    def test_complete_json_returned_unchanged(self):
+        """Test that a response that did close parses normally"""
+        assert repair_truncated_json('{"a": 1} trailing') == ({"a": 1}, ["a"])
+
+    def test_array_root(self):
+        """Test repair of a cut-off array, without inventing its unfinished element"""
+        assert repair_truncated_json('[1, 2, {"x": ') == ([1, 2], [])
+        assert repair_truncated_json('[1, 2, 3') == ([1, 2], [])
+
+    @pytest.mark.parametrize('prose', ['Here is the [updated] resume: ', 'Per [1] and {placeholder}: '])
+    def test_closed_brackets_in_prose_skipped(self, prose):
+        """Test that bracketed prose before the cut-off JSON is not taken as the root"""
+        assert repair_truncated_json(prose + '{"a": "b') == ({"a": "b"}, [])
+
+    def test_no_json_raises(self):
+        """Test that text without JSON raises ValueError"""
+        with pytest.raises(ValueError):
+            repair_truncated_json("I ran out of tokens before starting")
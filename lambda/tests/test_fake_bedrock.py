@@ -0,0 +1,149 @@
+"""
+Unit tests for the fake bedrock-runtime client
+"""
+import json
+import os
+import pytest
+from unittest.mock import Mock, patch
+from botocore.exceptions import ClientError
+from aws_runtime import invoke_claude, stream_claude
+from output_schemas import output_tool
+from devtools.fake_bedrock import FakeBedrockRuntime, ModelProfile, install
+
+HAIKU = 'anthropic.claude-3-haiku-20240307-v1:0'
+OPUS = 'us.anthropic.claude-opus-4-5-20251101-v1:0'
+QUIET = {'': ModelProfile(first_token_ms=100, tokens_per_second=50, output_tokens=(200, 200))}
+
+
+def _fake(**kwargs):
+    kwargs.setdefault('error_scale', 0)
+    kwargs.setdefault('time_scale', 0)
+    return FakeBedrockRuntime(**kwargs)
+
+
+class TestFakeBedrockRuntime:
+    """Tests for FakeBedrockRuntime"""
+
+    def test_seeded_runs_are_identical(self):
+        """Test that the same seed gives the same content and timings"""
+        runs = []
+        for _ in range(2):
+            fake = _fake(seed=3)
+            result = stream_claude('Write a resume', model_id=OPUS, client=fake)
+            runs.append((result.text, fake.records()))
+
+        assert runs[0] == runs[1]
+        other = stream_claude('Write a resume', model_id=OPUS, client=_fake(seed=4))
+        assert other.text != runs[0][0]
+
+    def test_repeated_request_varies(self):
+        """Test that resending a body is a new draw, not a replay"""
+        fake = _fake(seed=1)
+
+        first = stream_claude('Same prompt', model_id=HAIKU, client=fake)
+        second = stream_claude('Same prompt', model_id=HAIKU, client=fake)
+
+        assert first.text != second.text
+
+    def test_profiles_by_model(self):
+        """Test that Opus is slower to first token and per token than Haiku"""
+        fake = _fake(seed=0)
+        for _ in range(20):
+            stream_claude('prompt', model_id=HAIKU, client=fake)
+            stream_claude('prompt', model_id=OPUS, client=fake)
+
+        summary = fake.summary()
+        assert summary[OPUS]['p50FirstTokenMs'] > 2 * summary[HAIKU]['p50FirstTokenMs']
+        assert summary[OPUS]['p50Ms'] > summary[HAIKU]['p50Ms']
+
+    def test_stream_is_paced(self):
+        """Test that the stream sleeps for the first token, then per delta"""
+        sleeps = []
+        fake = FakeBedrockRuntime(profiles=QUIET, error_scale=0, time_scale=0.5, sleep=sleeps.append)
+
+        result = stream_claude('prompt', model_id=HAIKU, client=fake)
+
+        record = fake.calls[0]
+        assert result.usage['output_tokens'] == record.output_tokens
+        assert sleeps[0] == pytest.approx(record.first_token_ms / 1000 * 0.5)
+        assert sum(sleeps) == pytest.approx(record.duration_ms / 1000 * 0.5)
+        assert len(sleeps) > 10
+
+    def test_forced_tool_returns_schema_shaped_input(self):
+        """Test structured output through both invoke paths"""
+        tool = output_tool('critical_review')
+        fake = _fake(seed=2)
+
+        invoked = invoke_claude('Review', model_id=HAIKU, client=fake, tool=tool)
+        streamed = stream_claude('Review', model_id=HAIKU, client=fake, tool=tool, max_tokens=8192)
+
+        for result in (invoked, streamed):
+            assert result.stop_reason == 'tool_use'
+            assert set(result.tool_input) == set(tool['input_schema']['properties'])
+            assert isinstance(result.tool_input['overallRating'], int)
+
+    def test_max_tokens_truncates_and_continues(self):
+        """Test that a long output stops on max_tokens and continuation completes it"""
+        profiles = {'': ModelProfile(first_token_ms=100, tokens_per_second=50, output_tokens=(3000, 3000))}
+        tool = output_tool('generate_resume')
+
+        cut = stream_claude('Tailor', model_id=HAIKU, client=_fake(profiles=profiles), tool=tool, max_tokens=1000)
+        full = stream_claude('Tailor', model_id=HAIKU, client=_fake(profiles=profiles), tool=tool,
+                             max_tokens=1000, max_continuations=5)
+
+        assert cut.stop_reason == 'max_tokens'
+        assert full.stop_reason == 'end_turn'
+        assert full.continuations >= 2
+        assert full.text.startswith(cut.text.rstrip())
+        assert set(json.loads(full.text)) == {'tailoredResume', 'changesApplied', 'keywordOptimizations'}
+
+    def test_throttling_raises_client_error(self):
+        """Test that error profiles surface as botocore ClientErrors"""
+        profiles = {'': ModelProfile(first_token_ms=1, tokens_per_second=1000, throttle_rate=1.0)}
+        fake = FakeBedrockRuntime(profiles=profiles, time_scale=0)
+
+        with pytest.raises(ClientError) as exc:
+            invoke_claude('prompt', model_id=HAIKU, client=fake)
+
+        assert exc.value.response['Error']['Code'] == 'ThrottlingException'
+        assert fake.summary()[HAIKU]['errors'] == {'ThrottlingException': 1}
+
+    def test_sdk_retries_reported(self):
+        """Test that emulated SDK retries recover and set RetryAttempts"""
+        profiles = {'': ModelProfile(first_token_ms=1, tokens_per_second=1000, error_rate=0.5)}
+        fake = FakeBedrockRuntime(seed=5, profiles=profiles, time_scale=0, max_attempts=10)
+
+        for _ in range(10):
+            invoke_claude('prompt', model_id=HAIKU, client=fake)
+
+        assert any(record.retry_attempts > 0 for record in fake.calls)
+        assert all(record.error is None for record in fake.calls)
+
+    def test_concurrency_limit_throttles(self):
+        """Test that requests past max_concurrency are throttled while a stream is open"""
+        profiles = {'': ModelProfile(first_token_ms=1, tokens_per_second=1000, max_concurrency=1)}
+        fake = FakeBedrockRuntime(profiles=profiles, time_scale=0)
+
+        open_stream = fake.invoke_model_with_response_stream(modelId=HAIKU, body=json.dumps({'messages': []}))
+        with pytest.raises(ClientError):
+            fake.invoke_model(modelId=HAIKU, body=json.dumps({'messages': []}))
+        list(open_stream['body'])
+        fake.invoke_model(modelId=HAIKU, body=json.dumps({'messages': []}))
+
+    def test_install_drives_a_handler(self):
+        """Test that install() swaps the client used by a handler module"""
+        import generate_resume
+
+        s3 = Mock()
+        s3.get_object.return_value = {'Body': Mock(read=lambda: b'# Resume\nPython Developer')}
+        fake = _fake(seed=9)
+        event = {'jobId': 'job-1', 'userId': 'user-1', 'resumeS3Keys': ['resume.md'],
+                 'parsedJob': {'requiredSkills': ['Python']}, 'analysis': {'fitScore': 85}}
+
+        with patch.dict(os.environ, {'BUCKET_NAME': 'bucket', 'MODEL_ID': OPUS}), \
+                patch('generate_resume.s3', s3), install(fake):
+            result = generate_resume.handler(event, None)
+
+        assert result['statusCode'] == 200
+        assert fake.calls[0].model_id == OPUS
+        assert generate_resume.bedrock is not fake
@@ -0,0 +1,93 @@
+"""
+Unit tests for the profile flame-graph merger
+"""
+import boto3
+from moto import mock_aws
+
+from devtools.flamegraph import download_job, load_profiles, main, merge_job, profile_stacks, to_folded, to_svg
+
+ROOT = ('handler.py', 1, 'handler')
+PARSE = ('parse.py', 10, 'parse')
+HELPER = ('util.py', 5, 'helper')
+SORT = ('~', 0, "<built-in method builtins.sorted>")
+
+# (cc, nc, tt, ct, callers): handler calls parse and helper; parse also calls helper
+STATS = {
+    ROOT: (1, 1, 0.1, 1.0, {}),
+    PARSE: (1, 1, 0.2, 0.6, {ROOT: (1, 1, 0.2, 0.6)}),
+    HELPER: (2, 2, 0.6, 0.7, {ROOT: (1, 1, 0.2, 0.3), PARSE: (1, 1, 0.2, 0.4)}),
+    SORT: (2, 2, 0.1, 0.1, {HELPER: (2, 2, 0.1, 0.1)}),
+}
+
+
+def test_profile_stacks_split_shared_callees_by_edge_time():
+    stacks = profile_stacks(STATS)
+
+    root = 'handler (handler.py:1)'
+    parse = 'parse (parse.py:10)'
+    helper = 'helper (util.py:5)'
+    assert round(stacks[(root,)], 6) == 0.1
+    assert round(stacks[(root, parse)], 6) == 0.2
+    assert round(stacks[(root, helper)], 6) == round(0.6 * 0.3 / 0.7, 6)
+    assert round(stacks[(root, parse, helper)], 6) == round(0.6 * 0.4 / 0.7, 6)
+    assert (root, parse, helper, '<built-in method builtins.sorted>') in stacks
+    assert round(sum(stacks.values()), 6) == 1.0
+
+
+def test_recursion_is_cut():
+    loop = ('a.py', 1, 'loop')
+    stats = {loop: (1, 3, 0.3, 0.3, {loop: (2, 2, 0.2, 0.2)})}
+    assert profile_stacks(stats) == {}  # no root: everything is called by itself
+    stats[('m.py', 1, 'main')] = (1, 1, 0.0, 0.3, {})
+    stats[loop] = (1, 3, 0.3, 0.3, {('m.py', 1, 'main'): (1, 1, 0.3, 0.3), loop: (2, 2, 0.2, 0.2)})
+    assert list(profile_stacks(stats)) == [('main (m.py:1)', 'loop (a.py:1)')]
+
+
+def _write_profile(directory, stage):
+    import cProfile
+    path = directory / stage / '1.prof'
+    path.parent.mkdir(parents=True)
+    profiler = cProfile.Profile()
+    profiler.runcall(lambda: sorted(str(i) for i in range(5000)))
+    profiler.dump_stats(str(path))
+    return path
+
+
+def test_merge_job_prefixes_stage_and_writes_outputs(tmp_path):
+    _write_profile(tmp_path, 'parse_job')
+    _write_profile(tmp_path, 'notify')
+
+    profiles = load_profiles(str(tmp_path))
+    stacks = merge_job(profiles)
+
+    assert set(profiles) == {'parse_job', 'notify'}
+    assert {stack[0] for stack in stacks} == {'parse_job', 'notify'}
+    folded = to_folded(stacks).splitlines()
+    assert folded and all(line.rsplit(' ', 1)[1].isdigit() for line in folded)
+    svg = to_svg(stacks, title='job job-1')
+    assert svg.startswith('<svg') and 'parse_job' in svg and 'notify' in svg
+
+
+@mock_aws
+def test_main_reads_job_profiles_from_bucket(tmp_path, capsys):
+    local = tmp_path / 'local'
+    path = _write_profile(local, 'parse_job')
+    s3 = boto3.client('s3', region_name='us-east-1')
+    s3.create_bucket(Bucket='resume-bucket')
+    s3.upload_file(str(path), 'resume-bucket', 'profiles/job-1/parse_job/1.prof')
+    s3.put_object(Bucket='resume-bucket', Key='profiles/job-1/parse_job/1.tracemalloc.json',
+                  Body=b'{"stage": "parse_job", "wallMs": 12.5, "peakKb": 64.0, "topAllocations": []}')
+    s3.put_object(Bucket='resume-bucket', Key='profiles/job-2/notify/1.prof', Body=b'')
+
+    job_dir = download_job('resume-bucket', 'job-1', str(tmp_path / 'dl'), s3=s3)
+    assert list(load_profiles(job_dir)) == ['parse_job']
+
+    svg = tmp_path / 'job.svg'
+    assert main(['--bucket', 'resume-bucket', '--job', 'job-1', '--svg', str(svg)]) == 0
+    assert 'parse_job' in svg.read_text()
+    out = capsys.readouterr().out
+    assert 'parse_job' in out and '64.0' in out
+
+
+def test_main_without_profiles_fails(tmp_path):
+    assert main(['--dir', str(tmp_path)]) == 1
@@ -3,6 +3,7 @@ Unit tests for generate_resume Lambda function
 """
 import json
 import os
+import threading
 import pytest
 from unittest.mock import Mock, patch
 from generate_resume import handler
@@ -163,3 +164,56 @@ def test_generate_resume_bedrock_error(mock_s3):
 
         assert result['statusCode'] == 500
         assert 'error' in result
+
+def test_generate_resume_uploads_before_stream_ends(mock_s3):
+    """Test that the resume is saved as soon as its field closes"""
+    uploaded = threading.Event()
+    mock_s3.put_object.side_effect = lambda **kwargs: uploaded.set()
+
+    def stream():
+        yield {'chunk': {'bytes': json.dumps({
+            'type': 'content_block_delta',
+            'delta': {'text': '{"tailoredResume": "# Tailored", "changesApplied": ['}
+        }).encode()}}
+        # The model is still writing changesApplied when the upload lands
+        assert uploaded.wait(timeout=5)
+        yield {'chunk': {'bytes': json.dumps({
+            'type': 'content_block_delta',
+            'delta': {'text': '"Added title"]}'}
+        }).encode()}}
+
+    with patch('generate_resume.bedrock') as mock_bedrock:
+        mock_bedrock.invoke_model_with_response_stream.return_value = {'body': stream()}
+
+        result = handler({'jobId': 'test-early', 'userId': 'user-1', 'resumeS3Keys': ['resume.md']}, None)
+
+    assert result['statusCode'] == 200
+    assert result['changesApplied'] == ['Added title']
+    assert mock_s3.put_object.call_count == 2
+
+def test_generate_resume_truncated_response_is_partial(mock_s3):
+    """Test that a resume still cut off after every continuation is returned as partial"""
+    def truncated_stream(**kwargs):
+        body = json.loads(kwargs['body'])
+        text = '- Led' if len(body['messages']) > 1 else '{"tailoredResume": "# Tailored\\n## Experience\\n'
+        return {'body': iter([
+            {'chunk': {'bytes': json.dumps({
+                'type': 'content_block_delta', 'delta': {'text': text}
+            }).encode()}},
+            {'chunk': {'bytes': json.dumps({
+                'type': 'message_delta', 'delta': {'stop_reason': 'max_tokens'},
+                'usage': {'output_tokens': body['max_tokens']}
+            }).encode()}},
+        ])}
+
+    with patch('generate_resume.bedrock') as mock_bedrock:
+        mock_bedrock.invoke_model_with_response_stream.side_effect = truncated_stream
+
+        result = handler({'jobId': 'test-cut', 'userId': 'user-1', 'resumeS3Keys': ['resume.md']}, None)
+
+    assert mock_bedrock.invoke_model_with_response_stream.call_count == 3
+    assert result['statusCode'] == 200
+    assert result['partial'] is True
+    assert result['completeFields'] == []
+    assert result['tailoredResumeMarkdown'] == '# Tailored\n## Experience\n- Led- Led'
+    assert mock_s3.put_object.call_count == 2
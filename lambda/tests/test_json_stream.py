@@ -0,0 +1,135 @@
+"""
+Unit tests for json_stream module
+"""
+import json
+import pytest
+from json_stream import StreamingJSONParser
+from extract_json import extract_json_from_text
+
+DOCUMENT = {
+    'tailoredResume': '# Jane Doe\nBuilt {templating} engine, "quoted" \\ path\n- Python',
+    'changesApplied': ['Added metrics', {'section': 'Skills', 'items': [1, 2]}],
+    'atsScore': 87.5,
+    'passed': True,
+    'notes': None,
+}
+
+
+def _feed(parser, text, size):
+    for i in range(0, len(text), size):
+        parser.feed(text[i:i + size])
+    return parser
+
+
+class TestStreamingJSONParser:
+    """Tests for StreamingJSONParser"""
+
+    @pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 100000])
+    def test_matches_extract_json_for_any_chunking(self, size):
+        """Test that the result does not depend on where chunks split"""
+        text = 'Here is the result:\n```json\n' + json.dumps(DOCUMENT, indent=2) + '\n```\nDone.'
+
+        parser = _feed(StreamingJSONParser(), text, size)
+
+        assert parser.done
+        assert parser.fenced
+        assert parser.result() == DOCUMENT == extract_json_from_text(text)
+
+    def test_fields_surface_as_they_close(self):
+        """Test that a top-level field is emitted before the object closes"""
+        seen = []
+        parser = StreamingJSONParser(on_field=lambda name, value: seen.append((name, value)))
+
+        parser.feed('{"tailoredResume": "# Resume\\nLine ')
+        assert seen == []
+        parser.feed('two", "changesApplied": ["a"')
+        assert seen == [('tailoredResume', '# Resume\nLine two')]
+        assert not parser.done
+        parser.feed('], "score": 9')
+        assert [name for name, _ in seen] == ['tailoredResume', 'changesApplied']
+        parser.feed('0}')
+
+        assert seen[-1] == ('score', 90)
+        assert parser.result() == {'tailoredResume': '# Resume\nLine two', 'changesApplied': ['a'], 'score': 90}
+
+    def test_braces_and_escapes_inside_strings(self):
+        """Test that brackets and escaped quotes in strings do not end values"""
+        parser = _feed(StreamingJSONParser(), '{"a": "} ] \\" {", "b": ["[", "\\\\"]}', 1)
+
+        assert parser.result() == {'a': '} ] " {', 'b': ['[', '\\']}
+
+    @pytest.mark.parametrize('size', [1, 5, 100000])
+    def test_prose_braces_before_json_are_skipped(self, size):
+        """Test that {placeholders} and an empty {} in prose do not become the root"""
+        text = 'Here is the {result} for {} the role: ' + json.dumps(DOCUMENT)
+
+        parser = _feed(StreamingJSONParser(), text, size)
+
+        assert parser.done
+        assert parser.result() == DOCUMENT
+
+    def test_empty_object_response(self):
+        """Test that a bare {} still parses, through the fallback"""
+        assert _feed(StreamingJSONParser(), '{ }', 1).result() == {}
+
+    def test_root_array(self):
+        """Test that a top-level array is parsed at close"""
+        parser = _feed(StreamingJSONParser(), 'Skills: ["Python", {"x": "]"}] trailing', 4)
+
+        assert parser.result() == ['Python', {'x': ']'}]
+
+    def test_text_after_root_is_ignored(self):
+        """Test that trailing prose and further braces are not parsed"""
+        parser = StreamingJSONParser()
+        parser.feed('{"a": 1} and then {"b": 2}')
+
+        assert parser.result() == {'a': 1}
+
+    def test_control_characters_stripped(self):
+        """Test parity with extract_json_from_text on stray control characters"""
+        parser = StreamingJSONParser()
+        parser.feed('{"a": "x\x0by"}')
+
+        assert parser.result() == {'a': 'xy'}
+
+    def test_falls_back_when_stream_is_not_json(self):
+        """Test that malformed structure falls back to extract_json_from_text"""
+        parser = _feed(StreamingJSONParser(), 'See [note} below: {"a": 1}', 3)
+
+        assert not parser.done
+        assert parser.result() == {'a': 1}
+
+    def test_no_json_raises(self):
+        """Test that text without JSON raises ValueError like extract_json_from_text"""
+        parser = StreamingJSONParser()
+        parser.feed('I cannot help with that.')
+
+        with pytest.raises(ValueError):
+            parser.result()
+
+    def test_incomplete_stream_falls_back(self):
+        """Test that a stream cut off mid-object is not reported as done"""
+        parser = StreamingJSONParser()
+        parser.feed('{"a": "unterminated')
+
+        assert not parser.done
+        with pytest.raises(ValueError):
+            parser.result()
+
+    def test_truncated_stream_repaired(self):
+        """Test that a max_tokens cut-off is repaired and flagged partial"""
+        parser = _feed(StreamingJSONParser(), '{"tailoredResume": "# Done", "changesApplied": ["a", "b', 5)
+
+        result = parser.result(truncated=True)
+
+        assert result == {'tailoredResume': '# Done', 'changesApplied': ['a', 'b']}
+        assert parser.partial
+        assert parser.complete_fields == ['tailoredResume']
+
+    def test_closed_stream_not_partial(self):
+        """Test that a response that closed before max_tokens is complete"""
+        parser = _feed(StreamingJSONParser(), '{"a": 1, "b": [2]}', 3)
+
+        assert parser.result(truncated=True) == {'a': 1, 'b': [2]}
+        assert not parser.partial
+        assert parser.complete_fields == ['a', 'b']
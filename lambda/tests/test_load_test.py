@@ -0,0 +1,156 @@
+"""
+Unit tests for the load-test driver
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+from devtools.load_test import (
+    ContainerFleet, LambdaConcurrency, LoadReport, WriteCapacity, format_report, load_model_config,
+    load_model_prices, run_local, sample_from_history, write_units,
+)
+from devtools.state_machine import StatesError
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _event(event_id, kind, seconds, previous=None, **details):
+    event = {'id': event_id, 'type': kind, 'timestamp': T0 + timedelta(seconds=seconds)}
+    if previous is not None:
+        event['previousEventId'] = previous
+    event.update(details)
+    return event
+
+
+class TestLimits:
+    """Tests for the simulated Lambda and DynamoDB limits"""
+
+    def test_lambda_over_concurrency_rejected(self):
+        limits = LambdaConcurrency(1)
+        entered, release = threading.Event(), threading.Event()
+        slow = limits.wrap('parse_job', lambda event, context: entered.set() or release.wait())
+        worker = threading.Thread(target=slow, args=({}, None))
+        worker.start()
+        entered.wait()
+
+        with pytest.raises(StatesError) as exc:
+            limits.wrap('analyze_resume', lambda event, context: {})({}, None)
+
+        release.set()
+        worker.join()
+        assert exc.value.error == 'Lambda.TooManyRequestsException'
+        assert limits.throttles == {'analyze_resume': 1}
+        assert limits.peak == 1
+
+    def test_write_capacity_throttles_after_retries(self):
+        sleeps = []
+        capacity = WriteCapacity(10, time_scale=1.0, max_attempts=3, sleep=sleeps.append)
+
+        assert capacity.write('t', 'PutItem', 8, lambda: 'ok') == 'ok'
+        with pytest.raises(ClientError) as exc:
+            capacity.write('t', 'PutItem', 8, lambda: 'ok')
+
+        assert exc.value.response['Error']['Code'] == 'ProvisionedThroughputExceededException'
+        assert capacity.throttles == {'t': 3}
+        assert len(sleeps) == 2
+
+    def test_fleet_reuses_idle_containers_until_ttl(self):
+        sleeps = []
+        clock = [100.0]
+        fleet = ContainerFleet(cold_start_ms=500, idle_ttl_s=60, time_scale=1.0, sleep=sleeps.append)
+        invoke = fleet.wrap('parse_job', lambda event, context: 'ok')
+
+        with patch('devtools.load_test.time.perf_counter', side_effect=lambda: clock[0]):
+            invoke({}, None)
+            invoke({}, None)
+            clock[0] += 61
+            invoke({}, None)
+
+        assert fleet.cold_starts == {'parse_job': 2}
+        assert sleeps == [0.5, 0.5]
+
+    def test_write_units_count_size_and_index(self):
+        assert write_units({'jobId': 'j'}) == 2
+        assert write_units({'jobDescription': 'x' * 5000}) == 10
+
+
+def test_model_config_matches_stack_modes():
+    models = load_model_config('OPTIMIZED')
+
+    assert models['parse_job'].startswith('us.anthropic.claude-haiku-4-5')
+    assert models['generate_resume'].startswith('us.anthropic.claude-opus-4-5')
+    assert set(models) == {'parse_job', 'analyze_resume', 'generate_resume', 'ats_optimize', 'cover_letter',
+                           'critical_review'}
+
+
+def test_every_configured_model_is_priced():
+    """Test that lib/model-pricing.ts covers every model lib/model-config.ts deploys"""
+    from usage_ledger import price_for
+
+    prices = load_model_prices()
+
+    for mode in ('TESTING', 'OPTIMIZED', 'PREMIUM'):
+        for model in load_model_config(mode).values():
+            assert price_for(model, prices) is not None, model
+
+
+def test_sample_from_history():
+    """Test that stage timings, degraded stages and throttles come from an execution history"""
+    events = [
+        _event(1, 'ExecutionStarted', 0),
+        _event(2, 'TaskStateEntered', 0, 1, stateEnteredEventDetails={'name': 'ParseJobDescription',
+                                                                       'input': '{"jobId": "job-1"}'}),
+        _event(3, 'TaskScheduled', 0, 2),
+        _event(4, 'TaskFailed', 1, 3, taskFailedEventDetails={'error': 'Lambda.TooManyRequestsException',
+                                                                'cause': 'Rate Exceeded.'}),
+        _event(5, 'TaskSucceeded', 4, 4, taskSucceededEventDetails={
+            'output': '{"Payload": {"statusCode": 500, "error": "ThrottlingException from Bedrock"}}'}),
+        _event(6, 'TaskStateExited', 4, 5, stateExitedEventDetails={'name': 'ParseJobDescription',
+                                                                     'output': '{"jobId": "job-1", "parsedJob": {}}'}),
+        _event(7, 'ExecutionSucceeded', 5, 6),
+    ]
+
+    sample, throttles = sample_from_history('load-1', 'SUCCEEDED', 0, events)
+
+    assert sample.stages == {'ParseJobDescription': 4000}
+    assert sample.duration_ms == 5000
+    assert sample.payload_bytes == {'ParseJobDescription': 35}
+    assert [stage for stage, _ in sample.stage_errors] == ['ParseJobDescription', 'ParseJobDescription']
+    assert throttles == {'lambda': 1, 'bedrock': 1}
+
+
+def test_local_run_reports_every_stage():
+    """Test a small local run end to end without simulated waits"""
+    report = run_local(3, rate=0, time_scale=0, error_scale=0, resume_text='# Jane Doe\n- Built Python services',
+                       job_text='Senior Python engineer to build serverless pipelines on AWS Lambda and DynamoDB.')
+    summary = report.summary()
+
+    assert summary['succeeded'] == 3
+    assert summary['stageErrors'] == {}
+    assert summary['endToEndMs']['count'] == 3
+    assert {'ParseJobDescription', 'ATSOptimization', 'SaveResults'} <= set(summary['stagesMs'])
+    assert summary['bottleneck'] is None
+    assert summary['payloadBytes']['SaveResults'] > summary['payloadBytes']['ParseJobDescription']
+    assert 'end to end' in format_report(summary)
+    assert 'max payload bytes' in format_report(summary)
+
+
+def test_bottleneck_is_largest_throttle_source():
+    report = LoadReport(target='local', executions=0, rate_per_s=1,
+                        throttles={'bedrock': {'opus': 3}, 'lambda': {'parse_job': 5}, 'dynamodb': {}})
+
+    assert report.bottleneck() == 'lambda'
+
+
+def test_router_topology_shares_one_fleet():
+    """Test that every stage runs through the router and cold starts count against one function"""
+    report = run_local(2, rate=0, time_scale=0, error_scale=0, topology='router',
+                       resume_text='# Jane Doe\n- Built Python services',
+                       job_text='Senior Python engineer to build serverless pipelines on AWS Lambda and DynamoDB.')
+    summary = report.summary()
+
+    assert summary['succeeded'] == 2
+    assert summary['stageErrors'] == {}
+    assert set(summary['coldStarts']) == {'router'}
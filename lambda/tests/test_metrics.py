@@ -0,0 +1,138 @@
+"""
+Unit tests for metrics module
+"""
+import io
+import json
+import os
+
+import boto3
+from moto import mock_aws
+from unittest.mock import Mock, patch
+
+import metrics
+from aws_runtime import invoke_claude
+from metrics import InvocationMetrics, instrumented, record, register_s3_hooks
+
+
+def _bedrock_client(usage):
+    client = Mock()
+    client.invoke_model.return_value = {
+        'body': Mock(read=lambda: json.dumps({
+            'content': [{'type': 'text', 'text': '{"ok": true}'}],
+            'stop_reason': 'end_turn',
+            'usage': usage,
+        }).encode())
+    }
+    return client
+
+
+def _run(handler, event):
+    """Invoke a decorated handler and return its result and EMF documents"""
+    out = io.StringIO()
+    with patch.dict(os.environ, {'METRICS_ENABLED': 'true', 'METRICS_NAMESPACE': 'Test'}), \
+            patch('metrics.sys.stdout', out):
+        result = handler(event, Mock(aws_request_id='req-1'))
+    return result, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+class TestInstrumented:
+    """Tests for the handler decorator"""
+
+    def test_flushes_one_emf_document(self):
+        """Test that one invocation prints one EMF line with its stage, properties and metrics"""
+        @instrumented('parse_job')
+        def handler(event, context):
+            return {'statusCode': 200, 'jobId': event['jobId']}
+
+        result, documents = _run(handler, {'jobId': 'job-1'})
+
+        assert result == {'statusCode': 200, 'jobId': 'job-1'}
+        assert len(documents) == 1
+        emf = documents[0]
+        directive = emf['_aws']['CloudWatchMetrics'][0]
+        assert directive['Namespace'] == 'Test'
+        assert directive['Dimensions'] == [['Stage']]
+        assert {m['Name'] for m in directive['Metrics']} >= {'Duration', 'PayloadBytesIn', 'PayloadBytesOut', 'Errors'}
+        assert emf['Stage'] == 'parse_job'
+        assert emf['jobId'] == 'job-1'
+        assert emf['requestId'] == 'req-1'
+        assert emf['Errors'] == 0
+        assert emf['PayloadBytesIn'] == len(json.dumps({'jobId': 'job-1'}))
+
+    def test_bedrock_call_recorded_with_model_dimension(self):
+        """Test that tokens and latency from invoke_claude land on the invocation"""
+        client = _bedrock_client({'input_tokens': 120, 'output_tokens': 30, 'cache_read_input_tokens': 100})
+
+        @instrumented('analyze_resume')
+        def handler(event, context):
+            invoke_claude('hello', model_id='haiku', client=client).parsed_json()
+            return {'statusCode': 200}
+
+        _, [emf] = _run(handler, {})
+
+        assert emf['ModelId'] == 'haiku'
+        assert ['Stage', 'ModelId'] in emf['_aws']['CloudWatchMetrics'][0]['Dimensions']
+        assert emf['InputTokens'] == 120
+        assert emf['OutputTokens'] == 30
+        assert emf['CacheReadInputTokens'] == 100
+        assert emf['BedrockCalls'] == 1
+        assert emf['ResponseCacheHits'] == 0
+        assert emf['BedrockLatency'] >= 0
+        assert 'JsonExtractionTime' in emf
+
+    def test_error_status_counts_as_error(self):
+        @instrumented('notify')
+        def handler(event, context):
+            return {'statusCode': 500, 'error': 'boom'}
+
+        _, [emf] = _run(handler, {})
+
+        assert emf['Errors'] == 1
+        assert emf['statusCode'] == 500
+
+    def test_disabled_outside_lambda(self):
+        """Test that nothing is printed unless metrics are enabled"""
+        @instrumented('notify')
+        def handler(event, context):
+            return {'statusCode': 200}
+
+        out = io.StringIO()
+        with patch.dict(os.environ, {}, clear=True), patch('metrics.sys.stdout', out):
+            handler({}, None)
+
+        assert out.getvalue() == ''
+
+
+def test_record_outside_invocation_is_ignored():
+    record('S3BytesRead', 10, 'Bytes')
+
+    assert metrics.current() is None
+
+
+def test_emf_caps_metric_count():
+    invocation = InvocationMetrics('parse_job')
+    for i in range(150):
+        invocation.add(f"M{i}", i)
+
+    emf = invocation.to_emf('Test', timestamp_ms=0)
+
+    assert len(emf['_aws']['CloudWatchMetrics'][0]['Metrics']) == 100
+    assert emf['_aws']['Timestamp'] == 0
+
+
+@mock_aws
+def test_s3_hooks_count_object_bytes():
+    """Test that S3 reads and writes through a hooked client are counted"""
+    s3 = register_s3_hooks(boto3.client('s3', region_name='us-east-1'))
+    s3.create_bucket(Bucket='bucket')
+
+    @instrumented('convert_to_pdf')
+    def handler(event, context):
+        s3.put_object(Bucket='bucket', Key='a.md', Body='x' * 300)
+        s3.get_object(Bucket='bucket', Key='a.md')['Body'].read()
+        return {'statusCode': 200}
+
+    _, [emf] = _run(handler, {})
+
+    assert emf['S3BytesWritten'] == 300
+    assert emf['S3BytesRead'] == 300
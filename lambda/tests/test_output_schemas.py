@@ -0,0 +1,37 @@
+"""
+Unit tests for output_schemas module
+"""
+import os
+import pytest
+from unittest.mock import patch
+from output_schemas import OUTPUT_TOOLS, STAGE_OUTPUTS, output_tool, request_tools
+
+
+class TestOutputTool:
+    """Tests for the structured-output tool definitions"""
+
+    @pytest.mark.parametrize('stage', sorted(STAGE_OUTPUTS))
+    def test_tool_definition(self, stage):
+        """Test that every stage has a well-formed Bedrock tool"""
+        tool = output_tool(stage)
+
+        assert set(tool) == {'name', 'description', 'input_schema'}
+        schema = tool['input_schema']
+        assert schema['type'] == 'object'
+        assert set(schema['required']) <= set(schema['properties'])
+
+    def test_every_stage_sends_the_same_tools(self):
+        """Test that a stage's tool is sent with all the others, in a fixed order"""
+        assert [tool['name'] for tool in OUTPUT_TOOLS] == [name for name, _, _ in STAGE_OUTPUTS.values()]
+        assert request_tools(output_tool('parse_job')) is request_tools(output_tool('critical_review'))
+        assert request_tools({'name': 'other'}) == [{'name': 'other'}]
+
+    def test_disabled_by_env(self):
+        """Test that STRUCTURED_OUTPUT=false falls back to free-text JSON"""
+        with patch.dict(os.environ, {'STRUCTURED_OUTPUT': 'false'}):
+            assert output_tool('parse_job') is None
+
+    def test_unknown_stage(self):
+        """Test that an unknown stage is a programming error"""
+        with pytest.raises(KeyError):
+            output_tool('not_a_stage')
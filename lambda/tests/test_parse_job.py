@@ -65,3 +65,28 @@ def test_parse_job_bedrock_error():
 
         assert result['statusCode'] == 500
         assert 'error' in result
+
+def test_parse_job_structured_output():
+    """Test that the forced tool call's input is used directly"""
+    event = {
+        'jobId': 'test-456',
+        'jobDescription': 'Staff engineer building data platforms on AWS with Python and Spark. ' * 3
+    }
+
+    with patch('parse_job.bedrock') as mock_bedrock:
+        mock_bedrock.invoke_model.return_value = {
+            'body': Mock(read=lambda: json.dumps({
+                'content': [{
+                    'type': 'tool_use', 'id': 'tool-1', 'name': 'record_parsed_job',
+                    'input': {'requiredSkills': ['Python', 'Spark'], 'keywords': ['AWS']}
+                }],
+                'stop_reason': 'tool_use'
+            }).encode())
+        }
+
+        result = handler(event, None)
+
+    assert result['statusCode'] == 200
+    assert result['requiredSkills'] == ['Python', 'Spark']
+    body = json.loads(mock_bedrock.invoke_model.call_args.kwargs['body'])
+    assert body['tool_choice'] == {'type': 'tool', 'name': 'record_parsed_job'}
@@ -0,0 +1,79 @@
+"""
+Unit tests for the opt-in profiling decorator
+"""
+import json
+import marshal
+import os
+from unittest.mock import Mock, patch
+
+import pytest
+
+from profiling import profile_prefix, profiled
+
+
+@pytest.fixture
+def s3():
+    client = Mock()
+    with patch('profiling.get_s3_client', return_value=client), \
+            patch.dict(os.environ, {'BUCKET_NAME': 'resume-bucket'}):
+        yield client
+
+
+def _work(event, context):
+    return {'statusCode': 200, 'total': sum(len(str(i)) for i in range(2000))}
+
+
+def test_disabled_by_default(s3):
+    with patch.dict(os.environ, {'PROFILING_ENABLED': 'false'}):
+        result = profiled('parse_job')(_work)({'jobId': 'job-1'}, None)
+
+    s3.put_object.assert_not_called()
+    assert result['profile'] is False
+
+
+def test_event_flag_uploads_stats_and_allocations(s3):
+    result = profiled('parse_job')(_work)({'jobId': 'job-1', 'profile': True}, None)
+
+    assert result['profile'] is True
+    keys = [call.kwargs['Key'] for call in s3.put_object.call_args_list]
+    assert len(keys) == 2
+    assert all(key.startswith('profiles/job-1/parse_job/') for key in keys)
+
+    uploads = {call.kwargs['Key']: call.kwargs['Body'] for call in s3.put_object.call_args_list}
+    stats = marshal.loads(next(body for key, body in uploads.items() if key.endswith('.prof')))
+    assert any(func[2] == '_work' for func in stats)
+    memory = json.loads(next(body for key, body in uploads.items() if key.endswith('.tracemalloc.json')))
+    assert memory['stage'] == 'parse_job'
+    assert memory['peakKb'] >= 0
+    assert isinstance(memory['topAllocations'], list)
+
+
+def test_env_var_profiles_without_forwarding_the_flag(s3):
+    with patch.dict(os.environ, {'PROFILING_ENABLED': 'true'}):
+        result = profiled('notify')(_work)({'jobId': 'job-1'}, None)
+
+    assert s3.put_object.call_count == 2
+    assert result['profile'] is False
+
+
+def test_upload_failure_does_not_fail_the_handler(s3):
+    s3.put_object.side_effect = RuntimeError('AccessDenied')
+
+    result = profiled('parse_job')(_work)({'jobId': 'job-1', 'profile': True}, None)
+
+    assert result['statusCode'] == 200
+
+
+def test_handler_exception_still_uploads(s3):
+    def failing(event, context):
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        profiled('parse_job')(failing)({'jobId': 'job-1', 'profile': True}, None)
+    assert s3.put_object.call_count == 2
+
+
+def test_profile_prefix_falls_back_to_trace_id():
+    assert profile_prefix({'jobId': 'job-1'}, 'notify') == 'profiles/job-1/notify'
+    assert profile_prefix({'traceId': 'trace-1'}, 'notify') == 'profiles/trace-1/notify'
+    assert profile_prefix({}, 'notify') == 'profiles/unknown/notify'
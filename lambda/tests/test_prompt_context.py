@@ -0,0 +1,109 @@
+"""
+Unit tests for prompt_context module and the shared prompt prefix
+"""
+import json
+from unittest.mock import Mock, patch
+from prompt_context import build_prompt, document_prefix, resume_versions_block, tailored_resume_block
+import ats_optimize
+import cover_letter
+import critical_review
+
+
+def _bedrock_mock(payload):
+    mock_bedrock = Mock()
+    mock_bedrock.invoke_model_with_response_stream.return_value = {'body': iter([
+        {'chunk': {'bytes': json.dumps({
+            'type': 'content_block_delta',
+            'delta': {'type': 'text_delta', 'text': json.dumps(payload)}
+        }).encode()}}
+    ])}
+    return mock_bedrock
+
+
+def _sent_body(mock_bedrock):
+    return json.loads(mock_bedrock.invoke_model_with_response_stream.call_args.kwargs['body'])
+
+
+class TestPromptContext:
+    """Tests for prefix construction"""
+
+    def test_prefix_blocks_are_cacheable(self):
+        """Test that resume and job blocks carry cache markers and instructions do not"""
+        prompt = build_prompt(document_prefix(tailored_resume_block('# Resume'), {'keywords': ['AWS']}), 'Do it')
+
+        assert [('cache_control' in block) for block in prompt] == [True, True, False]
+        assert prompt[-1]['text'] == 'Do it'
+
+    def test_no_job_block_without_parsed_job(self):
+        """Test that an empty parsedJob adds no block"""
+        assert len(document_prefix(tailored_resume_block('# Resume'), {})) == 1
+
+    def test_job_block_leaves_out_usage(self):
+        """Test that parse_job's per-run usage record stays out of the cached prefix"""
+        parsed_job = {'keywords': ['AWS'], 'usage': {'model': 'm', 'latencyMs': 812}}
+
+        text = document_prefix(tailored_resume_block('# Resume'), parsed_job)[1]['text']
+
+        assert 'AWS' in text
+        assert 'latencyMs' not in text
+
+    def test_resume_versions_keep_primary_first(self):
+        """Test that resume versions are joined with the primary first"""
+        text = resume_versions_block(['primary', 'secondary'])['text']
+        assert text.index('primary') < text.index('secondary')
+
+
+@patch.dict('os.environ', {'BUCKET_NAME': 'test-bucket', 'MODEL_ID': 'us.anthropic.claude-sonnet-4-5-20250929-v1:0'})
+class TestSharedPrefixAcrossStages:
+    """The ParallelOptimization branches must send a byte-identical resume prefix"""
+
+    def test_parallel_branches_share_prefix(self):
+        """Test that ATS, cover letter and critical review start with the same block"""
+        resume = '# Jane Doe\n## Experience\n- Built things'
+        parsed_job = {'keywords': ['Python'], 'requiredSkills': ['Python']}
+
+        ats_bedrock = _bedrock_mock({'atsOptimizedResume': resume, 'atsScore': 90})
+        with patch('ats_optimize.bedrock', ats_bedrock):
+            ats_optimize.handler({'tailoredResumeMarkdown': resume, 'parsedJob': parsed_job}, None)
+
+        cover_bedrock = _bedrock_mock({'coverLetter': 'Dear team'})
+        with patch('cover_letter.bedrock', cover_bedrock), patch('cover_letter.s3'):
+            cover_letter.handler({
+                'tailoredResumeMarkdown': resume,
+                'parsedJob': parsed_job,
+                'jobDescription': 'Python role',
+                'jobId': 'job-1'
+            }, None)
+
+        review_bedrock = _bedrock_mock({'overallRating': 7})
+        with patch('critical_review.bedrock', review_bedrock):
+            result = critical_review.handler({'tailoredResumeMarkdown': resume}, None)
+
+        ats_body, cover_body, review_body = (_sent_body(ats_bedrock), _sent_body(cover_bedrock),
+                                             _sent_body(review_bedrock))
+        ats_content = ats_body['messages'][0]['content']
+        cover_content = cover_body['messages'][0]['content']
+        review_content = review_body['messages'][0]['content']
+
+        assert ats_body['tools'] == cover_body['tools'] == review_body['tools']
+        assert [ats_body['tool_choice']['name'], cover_body['tool_choice']['name'],
+                review_body['tool_choice']['name']] == ['record_ats_result', 'record_cover_letter',
+                                                        'record_critical_review']
+        assert ats_content[0] == cover_content[0] == review_content[0]
+        assert ats_content[0]['cache_control'] == {'type': 'ephemeral'}
+        assert ats_content[1] == cover_content[1]
+        assert result['promptCache'] == {'cacheReadInputTokens': 0, 'cacheWriteInputTokens': 0}
+
+    def test_cover_letter_sends_job_description_once(self):
+        """Test that the posting echoed in the parse_job payload is not repeated in the instructions"""
+        posting = 'Senior Python engineer, serverless pipelines on AWS'
+        parsed_job = {'jobDescription': posting, 'keywords': ['Python']}
+
+        bedrock = _bedrock_mock({'coverLetter': 'Dear team'})
+        with patch('cover_letter.bedrock', bedrock), patch('cover_letter.s3'):
+            cover_letter.handler({'tailoredResumeMarkdown': '# Jane Doe', 'parsedJob': parsed_job,
+                                  'jobDescription': posting, 'jobId': 'job-1'}, None)
+
+        content = _sent_body(bedrock)['messages'][0]['content']
+        assert sum(block['text'].count(posting) for block in content) == 1
+        assert posting in content[1]['text']
@@ -0,0 +1,145 @@
+"""
+Unit tests for the execution replay tool
+"""
+import json
+from datetime import datetime, timedelta, timezone
+
+from claim_check import encode
+from devtools.replay import (
+    bedrock_response, build_fixture, format_report, load_fixture, parse_report, referenced_keys, replay,
+    resolve_claim_checks, save_fixture, stage_runs,
+)
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+FUNCTION = 'arn:aws:lambda:us-east-1:123456789012:function:ResumeTailor-dev-ParseJob'
+PARSED_JOB = {'requiredSkills': ['Python'], 'preferredSkills': ['AWS'], 'keyResponsibilities': ['Build APIs'],
+              'keywords': ['python', 'serverless']}
+JOB_EVENT = {'jobId': 'job-1', 'jobDescription': 'Senior Python engineer, contact jane@corp.com'}
+JOB_OUTPUT = {'statusCode': 200, 'jobId': 'job-1', 'jobDescription': JOB_EVENT['jobDescription'],
+              'parsedJob': PARSED_JOB, 'requiredSkills': ['Python'], 'preferredSkills': ['AWS'],
+              'keyResponsibilities': ['Build APIs'], 'keywords': ['python', 'serverless'],
+              'usage': {'model': 'us.anthropic.claude-haiku-4-5-20251001-v1:0', 'inputTokens': 900,
+                        'outputTokens': 80, 'latencyMs': 1500},
+              'traceId': 'trace-1', 'profile': False}
+
+
+def _event(event_id, kind, seconds, previous=None, **details):
+    event = {'id': event_id, 'type': kind, 'timestamp': T0 + timedelta(seconds=seconds)}
+    if previous is not None:
+        event['previousEventId'] = previous
+    event.update(details)
+    return event
+
+
+def _scheduled(event_id, seconds, previous, function, payload):
+    return _event(event_id, 'TaskScheduled', seconds, previous, taskScheduledEventDetails={
+        'resourceType': 'lambda', 'resource': 'invoke',
+        'parameters': json.dumps({'FunctionName': function, 'Payload': payload})})
+
+
+HISTORY = [
+    _event(1, 'ExecutionStarted', 0),
+    _event(2, 'TaskStateEntered', 0, 1, stateEnteredEventDetails={'name': 'ParseJobDescription'}),
+    _scheduled(3, 0, 2, FUNCTION, JOB_EVENT),
+    _event(4, 'TaskStarted', 0.1, 3),
+    _event(5, 'TaskFailed', 0.5, 4, taskFailedEventDetails={'error': 'Lambda.ServiceException', 'cause': 'oops'}),
+    _scheduled(6, 1, 5, FUNCTION, JOB_EVENT),
+    _event(7, 'TaskStarted', 1.0, 6),
+    _event(8, 'TaskSucceeded', 3.0, 7, taskSucceededEventDetails={'output': json.dumps({
+        'Payload': JOB_OUTPUT, 'SdkResponseMetadata': {'RequestId': 'req-1'}})}),
+    _event(9, 'TaskStateExited', 3.0, 8, stateExitedEventDetails={'name': 'ParseJobDescription'}),
+    _event(10, 'TaskStateEntered', 3.0, 9, stateEnteredEventDetails={'name': 'CriticalReview'}),
+    _scheduled(11, 3.0, 10, 'arn:aws:lambda:us-east-1:123456789012:function:ResumeTailor-dev-Router',
+               {'stage': 'critical_review', 'input': {'jobId': 'job-1', 'tailoredResumeMarkdown': '# Resume'}}),
+    _event(12, 'TaskStarted', 3.1, 11),
+    _event(13, 'TaskTimedOut', 5.0, 12, taskTimedOutEventDetails={'error': 'States.Timeout'}),
+]
+
+
+def test_stage_runs_keep_last_attempt_and_unwrap_router():
+    runs = stage_runs(HISTORY)
+
+    assert [(r['state'], r['module']) for r in runs] == [('ParseJobDescription', 'parse_job'),
+                                                          ('CriticalReview', 'critical_review')]
+    parse = runs[0]
+    assert parse['attempts'] == 2
+    assert parse['function'] == 'ResumeTailor-dev-ParseJob'
+    assert parse['event'] == JOB_EVENT
+    assert parse['output'] == JOB_OUTPUT
+    assert parse['requestId'] == 'req-1'
+    assert parse['endedAt'] - parse['startedAt'] == 2.0
+    assert runs[1]['event'] == {'jobId': 'job-1', 'tailoredResumeMarkdown': '# Resume'}
+    assert runs[1]['error'].startswith('States.Timeout')
+
+
+def test_parse_report():
+    report = parse_report('REPORT RequestId: req-1\tDuration: 2210.50 ms\tBilled Duration: 2211 ms\t'
+                          'Memory Size: 1024 MB\tMax Memory Used: 131 MB\tInit Duration: 812.33 ms\t\n')
+
+    assert report == {'durationMs': 2210.5, 'billedMs': 2211, 'memorySizeMb': 1024, 'maxMemoryMb': 131,
+                      'initMs': 812.33}
+
+
+def test_referenced_keys():
+    runs = [{'event': {'resumeS3Keys': ['uploads/u/a.md', 'uploads/u/b.md'],
+                       'tailoredResume': {'tailoredResumeS3Key': 'tailored/job-1/resume.md'}}},
+            {'event': {'resumeS3Keys': ['uploads/u/a.md']}}]
+
+    assert referenced_keys(runs) == ['uploads/u/a.md', 'uploads/u/b.md', 'tailored/job-1/resume.md']
+
+
+def test_claim_check_documents_fetched_and_resolved():
+    """Test that claim-check documents are pulled, and references and compressed fields unpacked for the fake Bedrock"""
+    reference = {'$claimCheck': 'payloads/job-1/abc.json', 'bytes': 80}
+    runs = [{'module': 'parse_job', 'event': JOB_EVENT, 'output': dict(JOB_OUTPUT, parsedJob=reference)},
+            {'module': 'analyze_resume', 'event': {'parsedJob': {'parsedJob': reference}}}]
+
+    assert referenced_keys(runs) == ['payloads/job-1/abc.json']
+    output = resolve_claim_checks(runs[0]['output'], {'payloads/job-1/abc.json': json.dumps(PARSED_JOB)})
+    assert bedrock_response('parse_job', output) == PARSED_JOB
+    assert resolve_claim_checks({'coverLetter': encode('Dear team,' * 300, 'gzip')}, {}) == \
+        {'coverLetter': 'Dear team,' * 300}
+
+
+def test_bedrock_response_rebuilt_from_output():
+    assert bedrock_response('parse_job', JOB_OUTPUT) == PARSED_JOB
+    assert bedrock_response('generate_resume', {'tailoredResumeMarkdown': '# R', 'changesApplied': ['x']}) == \
+        {'tailoredResume': '# R', 'changesApplied': ['x']}
+    assert bedrock_response('refine_resume', {'refinedResumeMarkdown': '# R'}) == '# R'
+    assert bedrock_response('save_results', {'statusCode': 200}) is None
+
+
+def test_fixture_scrubs_and_uses_report(tmp_path):
+    runs = stage_runs(HISTORY)
+    fixture = build_fixture({'name': 'exec-1', 'status': 'FAILED', 'input': json.dumps(JOB_EVENT)}, runs,
+                            {'uploads/u/a.md': b'# Jane Doe\njane@corp.com'},
+                            reports={'req-1': {'durationMs': 1800.0, 'maxMemoryMb': 131, 'memorySizeMb': 1024}},
+                            scrub_terms=['Jane Doe'])
+    path = tmp_path / 'exec-1.json.gz'
+    save_fixture(fixture, str(path))
+    fixture = load_fixture(str(path))
+
+    text = json.dumps(fixture)
+    assert 'jane@corp.com' not in text and 'Jane Doe' not in text
+    original = fixture['stages'][0]['original']
+    assert original['durationMs'] == 1800.0
+    assert original['handlerMs'] == 300.0
+    assert original['maxMemoryMb'] == 131
+    # Without a REPORT line the history times the stage
+    assert fixture['stages'][1]['original']['durationMs'] == 1900.0
+
+
+def test_replay_runs_current_handler_against_recorded_response():
+    fixture = build_fixture({'name': 'exec-1', 'status': 'SUCCEEDED'}, stage_runs(HISTORY)[:1], {})
+
+    rows = replay(fixture)
+
+    assert len(rows) == 1
+    replayed = rows[0]['replay']
+    assert replayed['sameShape'] is True
+    assert 'error' not in replayed
+    # Original sizes are measured before scrubbing
+    assert replayed['inputBytes'] == len(json.dumps(fixture['stages'][0]['event']))
+    assert abs(replayed['outputBytes'] - rows[0]['original']['outputBytes']) < 200
+    assert replayed['cpuMs'] >= 0 and replayed['peakKb'] > 0
+    assert format_report(rows).splitlines()[1].startswith('ParseJobDescription')
@@ -0,0 +1,230 @@
+"""
+Unit tests for response_cache module
+"""
+import json
+import os
+import time
+import boto3
+from unittest.mock import Mock, patch
+from moto import mock_aws
+from aws_runtime import invoke_claude, stream_claude
+from response_cache import (
+    DynamoDBTier,
+    MemoryTier,
+    ResponseCache,
+    S3Tier,
+    cache_enabled,
+    cache_key,
+)
+
+
+def _bedrock_returning(text, stop_reason='end_turn'):
+    client = Mock()
+    client.invoke_model.side_effect = lambda **kwargs: {
+        'body': Mock(read=lambda: json.dumps({
+            'content': [{'text': text}],
+            'stop_reason': stop_reason,
+            'usage': {'input_tokens': 10, 'output_tokens': 3}
+        }).encode())
+    }
+    return client
+
+
+class TestCacheKey:
+    """Tests for cache key construction"""
+
+    def test_whitespace_normalized(self):
+        """Test that trailing whitespace and line endings do not change the key"""
+        assert cache_key('m', 'a  \r\nb\n\n', 0.3, 100) == cache_key('m', 'a\nb', 0.3, 100)
+
+    def test_request_parameters_change_key(self):
+        """Test that model, temperature and max_tokens are part of the key"""
+        base = cache_key('m', 'prompt', 0.3, 100)
+        assert cache_key('other', 'prompt', 0.3, 100) != base
+        assert cache_key('m', 'prompt', 0.7, 100) != base
+        assert cache_key('m', 'prompt', 0.3, 200) != base
+        assert cache_key('m', 'prompt', 0.3, 100, system='s') != base
+
+
+class TestCacheEnabled:
+    """Tests for per-stage opt-in"""
+
+    def test_off_unless_listed(self):
+        """Test that no stage caches without LLM_CACHE_STAGES"""
+        with patch.dict(os.environ):
+            os.environ.pop('LLM_CACHE_STAGES', None)
+            assert cache_enabled('parse_job') is False
+            assert cache_enabled('generate_resume') is False
+
+    def test_global_kill_switch(self):
+        """Test that LLM_CACHE_ENABLED=false disables every stage"""
+        with patch.dict(os.environ, {'LLM_CACHE_ENABLED': 'false', 'LLM_CACHE_STAGES': 'parse_job'}):
+            assert cache_enabled('parse_job') is False
+
+    def test_stage_list_selects_stages(self):
+        """Test that LLM_CACHE_STAGES selects exactly the listed stages"""
+        with patch.dict(os.environ, {'LLM_CACHE_STAGES': 'cover_letter, analyze_resume'}):
+            assert cache_enabled('cover_letter') is True
+            assert cache_enabled('analyze_resume') is True
+            assert cache_enabled('parse_job') is False
+
+
+class TestMemoryTier:
+    """Tests for the in-process LRU tier"""
+
+    def test_evicts_least_recently_used(self):
+        """Test that the entry bound evicts the oldest unused key"""
+        tier = MemoryTier(max_entries=2)
+        expires = time.time() + 60
+        tier.put('a', '1', expires)
+        tier.put('b', '2', expires)
+        tier.get('a')
+        tier.put('c', '3', expires)
+
+        assert tier.get('a') == '1'
+        assert tier.get('b') is None
+        assert tier.get('c') == '3'
+
+    def test_evicts_by_size(self):
+        """Test that the byte bound evicts entries"""
+        tier = MemoryTier(max_entries=10, max_bytes=10)
+        expires = time.time() + 60
+        tier.put('a', 'x' * 6, expires)
+        tier.put('b', 'y' * 6, expires)
+
+        assert tier.get('a') is None
+        assert tier.get('b') == 'y' * 6
+        tier.put('huge', 'z' * 11, expires)
+        assert tier.get('huge') is None
+
+    def test_expired_entries_are_dropped(self):
+        """Test that entries past their TTL are misses"""
+        tier = MemoryTier()
+        tier.put('a', '1', time.time() - 1)
+
+        assert tier.get('a') is None
+        assert len(tier) == 0
+
+
+@mock_aws
+class TestRemoteTiers:
+    """Tests for the DynamoDB and S3 tiers"""
+
+    def _table(self):
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        return dynamodb.create_table(
+            TableName='results',
+            KeySchema=[
+                {'AttributeName': 'jobId', 'KeyType': 'HASH'},
+                {'AttributeName': 'timestamp', 'KeyType': 'RANGE'},
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'jobId', 'AttributeType': 'S'},
+                {'AttributeName': 'timestamp', 'AttributeType': 'N'},
+            ],
+            BillingMode='PAY_PER_REQUEST',
+        )
+
+    def test_dynamodb_hit_promotes_to_memory(self):
+        """Test that a DynamoDB hit is served and copied into memory"""
+        tier = DynamoDBTier(self._table())
+        writer = ResponseCache(MemoryTier(), [tier])
+        writer.put('k', {'text': 'cached'})
+
+        reader = ResponseCache(MemoryTier(), [tier])
+        record, source = reader.get('k')
+
+        assert record == {'text': 'cached'}
+        assert source == 'dynamodb'
+        assert reader.get('k') == ({'text': 'cached'}, 'memory')
+
+    def test_dynamodb_respects_ttl(self):
+        """Test that expired DynamoDB items are misses"""
+        tier = DynamoDBTier(self._table())
+        tier.put('k', '{"text": "old"}', time.time() - 1)
+
+        assert tier.get('k') is None
+
+    def test_large_entries_fall_through_to_s3(self):
+        """Test that entries too big for DynamoDB are written to S3"""
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='bucket')
+        cache = ResponseCache(MemoryTier(), [DynamoDBTier(self._table()), S3Tier(s3, 'bucket')])
+        cache.put('k', {'text': 'x' * 400_000})
+
+        fresh = ResponseCache(MemoryTier(), cache.remote_tiers)
+        record, source = fresh.get('k')
+
+        assert source == 's3'
+        assert len(record['text']) == 400_000
+
+    def test_s3_miss(self):
+        """Test that a missing S3 object is a miss"""
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='bucket')
+
+        assert S3Tier(s3, 'bucket').get('missing') is None
+
+    def test_remote_errors_fail_open(self):
+        """Test that a broken remote tier does not break lookups"""
+        broken = Mock()
+        broken.name = 'dynamodb'
+        broken.get.side_effect = Exception('throttled')
+        broken.put.side_effect = Exception('throttled')
+        cache = ResponseCache(MemoryTier(), [broken])
+
+        cache.put('k', {'text': 'v'})
+        cache.clear()
+
+        assert cache.get('k') == (None, None)
+
+
+class TestInvokeWithCache:
+    """Tests for cache integration in the Bedrock invocation path"""
+
+    def test_second_call_served_from_cache(self):
+        """Test that an identical request does not reach Bedrock twice"""
+        client = _bedrock_returning('{"ok": true}')
+
+        first = invoke_claude('prompt', model_id='m', client=client, cache=True)
+        second = invoke_claude('prompt', model_id='m', client=client, cache=True)
+
+        assert client.invoke_model.call_count == 1
+        assert first.cache_tier is None
+        assert second.cache_tier == 'memory'
+        assert second.text == '{"ok": true}'
+        assert second.usage == {'input_tokens': 10, 'output_tokens': 3}
+
+    def test_cache_bypass(self):
+        """Test that cache=False always calls Bedrock"""
+        client = _bedrock_returning('x')
+
+        invoke_claude('prompt', model_id='m', client=client)
+        invoke_claude('prompt', model_id='m', client=client)
+
+        assert client.invoke_model.call_count == 2
+
+    def test_truncated_responses_not_cached(self):
+        """Test that max_tokens cut-offs are not stored"""
+        client = _bedrock_returning('{"partial', stop_reason='max_tokens')
+
+        invoke_claude('prompt', model_id='m', client=client, cache=True)
+        invoke_claude('prompt', model_id='m', client=client, cache=True)
+
+        assert client.invoke_model.call_count == 2
+
+    def test_stream_hit_replays_text(self):
+        """Test that a cached streaming response is replayed through on_text"""
+        client = Mock()
+        client.invoke_model_with_response_stream.side_effect = lambda **kwargs: {'body': iter([
+            {'chunk': {'bytes': json.dumps({'type': 'content_block_delta',
+                                            'delta': {'type': 'text_delta', 'text': 'hello'}}).encode()}},
+        ])}
+        seen = []
+
+        stream_claude('prompt', model_id='m', client=client, cache=True)
+        result = stream_claude('prompt', model_id='m', client=client, cache=True, on_text=seen.append)
+
+        assert client.invoke_model_with_response_stream.call_count == 1
+        assert result.text == 'hello'
+        assert seen == ['hello']
@@ -0,0 +1,92 @@
+"""
+Unit tests for the Lambda memory right-sizing harness
+"""
+import json
+
+import pytest
+
+from devtools.replay import save_fixture
+from devtools.rightsizing import (
+    FULL_VCPU_MB, Candidate, Footprint, candidates, cost_per_1k, current_memory_sizes, duration_at, fixture_cases,
+    format_function, measure, recommend,
+)
+
+
+def _footprint(cpu_ms, wait_ms, peak_rss_mb=110.0, init_cpu_ms=300.0):
+    return Footprint(module='generate_resume', cases=len(cpu_ms), import_rss_mb=70.0, peak_rss_mb=peak_rss_mb,
+                     init_cpu_ms=init_cpu_ms, cpu_ms=cpu_ms, wall_ms=cpu_ms, wait_ms=wait_ms)
+
+
+def test_current_memory_sizes_read_from_stack():
+    sizes = current_memory_sizes()
+
+    assert sizes['generate_resume'] == 2048
+    assert sizes['notify'] == 256
+    assert 'router' in sizes
+
+
+def test_duration_scales_cpu_below_one_vcpu_only():
+    assert duration_at(FULL_VCPU_MB, 100, 1000) == 1100
+    assert duration_at(3008, 100, 1000) == 1100
+    assert duration_at(FULL_VCPU_MB // 2, 100, 1000) == pytest.approx(1200, rel=0.01)
+
+
+def test_cost_bills_whole_milliseconds():
+    assert cost_per_1k(1024, 0.2) == pytest.approx(1000 * (0.001 * 0.0000166667 + 0.0000002))
+    assert cost_per_1k(2048, 1000) == pytest.approx(2 * cost_per_1k(1024, 1000) - 1000 * 0.0000002)
+
+
+def test_waiting_function_gets_small_size():
+    rows = candidates(_footprint([20.0, 30.0], [20_000.0, 30_000.0]))
+
+    choice = recommend(rows)
+
+    assert [row.fits for row in rows][:1] == [False]  # 128 MB < 110 MB * 1.25 headroom
+    assert choice.memory_mb == 256
+    assert choice.cost_per_1k < next(row for row in rows if row.memory_mb == 2048).cost_per_1k
+
+
+def test_cpu_bound_function_gets_full_vcpu():
+    choice = recommend(candidates(_footprint([2_000.0], [0.0], init_cpu_ms=0.0)), max_slowdown=0.1, slack_ms=0)
+
+    assert choice.memory_mb == FULL_VCPU_MB
+
+
+def test_nothing_fits():
+    assert recommend([Candidate(128, 10.0, 100.0, 0.01, False)]) is None
+
+
+def test_format_marks_current_and_recommended():
+    footprint = _footprint([20.0], [20_000.0])
+    rows = candidates(footprint)
+    text = format_function(footprint, rows, 2048, recommend(rows))
+
+    assert '2048' in text and '<- current' in text and '<- recommended' in text
+    assert '(below peak RSS + headroom)' in text
+
+
+def test_fixture_cases_skip_failed_stages(tmp_path):
+    path = tmp_path / 'exec.json'
+    save_fixture({'objects': {'uploads/u/a.md': '# A'}, 'stages': [
+        {'state': 'ParseJobDescription', 'module': 'parse_job', 'event': {'jobId': 'j'},
+         'output': {'parsedJob': {'requiredSkills': []}}, 'error': None, 'original': {'bedrockMs': 1500.0}},
+        {'state': 'CriticalReview', 'module': 'critical_review', 'event': {}, 'output': None,
+         'error': 'States.Timeout', 'original': {}},
+    ]}, str(path))
+
+    cases = fixture_cases([str(path)])
+
+    assert list(cases) == ['parse_job']
+    assert cases['parse_job'][0]['response'] == {'requiredSkills': []}
+    assert cases['parse_job'][0]['waitMs'] == 1500.0
+
+
+def test_measure_runs_handler_in_child_interpreter():
+    cases = [{'event': {'jobId': 'job-1', 'userEmail': 'user@example.com'}, 'response': None, 'waitMs': 0.0}]
+
+    footprint = measure('notify', cases, repeat=1)
+
+    assert footprint.cases == 1 and not footprint.errors
+    assert footprint.peak_rss_mb >= footprint.import_rss_mb > 10
+    assert footprint.init_cpu_ms > 0
+    json.dumps(footprint.__dict__)
@@ -0,0 +1,47 @@
+"""
+Unit tests for router Lambda function
+"""
+import json
+import os
+from unittest.mock import patch
+from router import STAGES, handler
+
+
+class TestRouterHandler:
+    """Tests for stage dispatch"""
+
+    def test_dispatches_to_stage_handler(self):
+        """Test that the stage's handler gets the inner input and its output is returned unchanged"""
+        with patch('notify.handler', return_value={'statusCode': 200, 'emailSent': False}) as mock_notify:
+            result = handler({'stage': 'notify', 'input': {'jobId': 'job-1'}}, 'ctx')
+
+        mock_notify.assert_called_once_with({'jobId': 'job-1'}, 'ctx')
+        assert result == {'statusCode': 200, 'emailSent': False}
+
+    def test_unknown_stage(self):
+        """Test that an unknown stage is rejected without calling any handler"""
+        result = handler({'stage': 'format_disk', 'input': {}}, None)
+
+        assert result['statusCode'] == 400
+        assert 'format_disk' in result['error']
+
+    def test_stage_model_applied_for_the_call_only(self):
+        """Test that STAGE_MODEL_IDS sets MODEL_ID while the stage runs"""
+        seen = {}
+
+        def capture(event, context):
+            seen['model'] = os.environ.get('MODEL_ID')
+            return {'statusCode': 200}
+
+        env = {'MODEL_ID': 'default-model', 'STAGE_MODEL_IDS': json.dumps({'parse_job': 'haiku-model'})}
+        with patch.dict(os.environ, env), patch('parse_job.handler', side_effect=capture):
+            handler({'stage': 'parse_job', 'input': {}}, None)
+            assert os.environ['MODEL_ID'] == 'default-model'
+
+        assert seen['model'] == 'haiku-model'
+
+    def test_every_stage_module_has_a_handler(self):
+        import importlib
+
+        for module_name in STAGES.values():
+            assert callable(importlib.import_module(module_name).handler)
@@ -3,6 +3,7 @@ Unit tests for save_results Lambda function
 """
 import os
 import pytest
+from decimal import Decimal
 from unittest.mock import Mock, patch
 from save_results import handler
 
@@ -52,6 +53,28 @@ def test_save_results_with_parallel_results(mock_dynamodb):
     assert result['statusCode'] == 200
     assert mock_dynamodb.put_item.called
 
+def test_save_results_stores_usage_ledger(mock_dynamodb):
+    """Test that stage usage records are aggregated into a priced ledger"""
+    prices = '{"anthropic.claude-haiku-4-5-20251001-v1:0": {"input": 1, "output": 5, "cacheRead": 0.1, "cacheWrite": 1.25}}'
+    usage = {'model': 'us.anthropic.claude-haiku-4-5-20251001-v1:0', 'inputTokens': 1000,
+             'outputTokens': 200, 'cacheReadInputTokens': 0, 'cacheWriteInputTokens': 0, 'latencyMs': 900}
+    event = {
+        'jobId': 'test-123',
+        'userId': 'user-1',
+        'parsedJob': {'requiredSkills': ['Python'], 'usage': usage},
+        'parallelResults': [{'atsScore': 90, 'usage': dict(usage, latencyMs=1500)}, {}, {}]
+    }
+
+    with patch.dict(os.environ, {'MODEL_PRICES': prices}):
+        result = handler(event, None)
+
+    ledger = mock_dynamodb.put_item.call_args.kwargs['Item']['usageLedger']
+    assert set(ledger['stages']) == {'parse_job', 'ats_optimize'}
+    assert ledger['totals']['stageLatencyMsSum'] == 2400
+    assert ledger['totals']['costUsd'] == Decimal('0.004')
+    assert ledger['pricingComplete'] is True
+    assert result['results']['costUsd'] == pytest.approx(0.004)
+
 def test_save_results_dynamodb_error(mock_dynamodb):
     """Test handling of DynamoDB error"""
     mock_dynamodb.put_item.side_effect = Exception('DynamoDB Error')
@@ -0,0 +1,288 @@
+"""
+Unit tests for the local state machine interpreter
+"""
+import json
+import os
+import re
+import threading
+import time
+import pytest
+from devtools.state_machine import (
+    LocalStateMachine, StatesError, format_timings, inline_documents, load_definition, module_for_function,
+    payload_bytes, read_path, render_template, write_path,
+)
+
+STACK_FILE = os.path.join(os.path.dirname(__file__), '..', '..', 'lib', 'resume-tailor-stack.ts')
+
+EXECUTION_INPUT = {
+    'jobId': 'job-1',
+    'userId': 'user-1',
+    'jobDescription': 'Senior Python developer',
+    'resumeS3Keys': ['uploads/user-1/resume.md'],
+    'userEmail': 'user@example.com',
+}
+
+
+def _fake_handlers(calls=None, overrides=None):
+    """Handlers that echo enough of each stage's output for data-flow checks."""
+    calls = calls if calls is not None else []
+
+    def record(name, result):
+        def handler(event, context):
+            calls.append((name, event))
+            return result(event) if callable(result) else result
+        return handler
+
+    handlers = {
+        'parse_job': record('parse_job', {'requiredSkills': ['Python'], 'traceId': 'trace-1',
+                                             'profile': False}),
+        'analyze_resume': record('analyze_resume', {'fitScore': 80}),
+        'generate_resume': record('generate_resume', {'tailoredResumeMarkdown': '# Resume'}),
+        'ats_optimize': record('ats_optimize', {'atsScore': 90}),
+        'cover_letter': record('cover_letter', {'coverLetter': 'Dear team'}),
+        'critical_review': record('critical_review', {'overallRating': 8}),
+        'save_results': record('save_results', lambda event: {'statusCode': 200, 'jobId': event['jobId']}),
+        'notify': record('notify', {'statusCode': 200}),
+    }
+    handlers.update(overrides or {})
+    return handlers
+
+
+def _calls_by_stage(calls):
+    return {name: event for name, event in calls}
+
+
+class TestPaths:
+    """Tests for reference paths and payload templates"""
+
+    def test_read_path(self):
+        data = {'a': {'b': [{'c': 1}]}, 'x y': 2}
+        assert read_path(data, '$') is data
+        assert read_path(data, '$.a.b[0].c') == 1
+        assert read_path(data, "$['x y']") == 2
+        assert read_path(data, '$$.Execution.Name', {'Execution': {'Name': 'run'}}) == 'run'
+
+    def test_read_missing_path_raises(self):
+        with pytest.raises(StatesError) as exc:
+            read_path({'a': 1}, '$.b')
+        assert exc.value.error == 'States.Runtime'
+
+    def test_write_path_does_not_mutate_input(self):
+        data = {'a': {'keep': 1}}
+        assert write_path(data, '$.a.b', 2) == {'a': {'keep': 1, 'b': 2}}
+        assert data == {'a': {'keep': 1}}
+        assert write_path(data, '$', 3) == 3
+        assert write_path(data, None, 3) is data
+
+    def test_render_template(self):
+        template = {'FunctionName': 'f', 'Payload': {'id.$': '$.jobId', 'static': [1, {'n.$': '$$.State.Name'}]}}
+        rendered = render_template(template, {'jobId': 'j'}, {'State': {'Name': 'S'}})
+        assert rendered == {'FunctionName': 'f', 'Payload': {'id': 'j', 'static': [1, {'n': 'S'}]}}
+
+    @pytest.mark.parametrize('ref,module', [
+        ('arn:aws:lambda:us-east-1:123456789012:function:ResumeTailor-ParseJob', 'parse_job'),
+        ('ResumeTailor-dev-ATSOptimize', 'ats_optimize'),
+        ('arn:aws:lambda:us-east-1:1:function:ResumeTailor-CriticalReview:$LATEST', 'critical_review'),
+        ('local:function:save_results.handler', 'save_results'),
+    ])
+    def test_module_for_function(self, ref, module):
+        assert module_for_function(ref) == module
+
+
+class TestWorkflow:
+    """Tests that run the bundled ResumeTailorWorkflow definition"""
+
+    def test_snapshot_matches_cdk_stack(self):
+        """Test that the bundled snapshot has the same tasks as the CDK stack"""
+        with open(STACK_FILE) as f:
+            stack_tasks = set(re.findall(r"new tasks\.LambdaInvoke\(this, '(\w+)'", f.read()))
+        definition = load_definition()
+
+        snapshot_tasks = set()
+        pending = [definition]
+        while pending:
+            machine = pending.pop()
+            for name, state in machine['States'].items():
+                if state['Type'] == 'Task':
+                    snapshot_tasks.add(name)
+                pending.extend(state.get('Branches', []))
+
+        assert snapshot_tasks == stack_tasks
+
+    def test_data_flow(self):
+        """Test that results are threaded through ResultPath and payload templates"""
+        calls = []
+        machine = LocalStateMachine(load_definition(), handlers=_fake_handlers(calls), time_scale=0)
+
+        result = machine.execute(EXECUTION_INPUT)
+
+        assert result.status == 'SUCCEEDED', result.cause
+        events = _calls_by_stage(calls)
+        assert events['parse_job'] == EXECUTION_INPUT
+        assert events['analyze_resume']['parsedJob'] == {'requiredSkills': ['Python'], 'traceId': 'trace-1',
+                                                         'profile': False}
+        assert {events[stage]['traceId'] for stage in ('analyze_resume', 'ats_optimize', 'save_results')} == {
+            'trace-1'}
+        assert events['generate_resume']['analysis'] == {'fitScore': 80}
+        assert events['ats_optimize']['tailoredResumeMarkdown'] == '# Resume'
+        assert events['save_results']['parallelResults'] == [
+            {'atsScore': 90}, {'coverLetter': 'Dear team'}, {'overallRating': 8},
+        ]
+        assert events['notify'] == {'statusCode': 200, 'jobId': 'job-1'}
+        assert result.output == {'statusCode': 200}
+
+    def test_parallel_branches_run_concurrently(self):
+        """Test that the three optimization branches overlap"""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def branch(result):
+            def handler(event, context):
+                barrier.wait()
+                return result
+            return handler
+
+        handlers = _fake_handlers(overrides={
+            'ats_optimize': branch({}), 'cover_letter': branch({}), 'critical_review': branch({}),
+        })
+        result = LocalStateMachine(load_definition(), handlers=handlers, time_scale=0).execute(EXECUTION_INPUT)
+
+        assert result.status == 'SUCCEEDED', result.cause
+        branches = {t.name: t.branch for t in result.timings}
+        assert branches['CriticalReview'] == 'ParallelOptimization[2]'
+        assert branches['SaveResults'] == ''
+
+    def test_timings_recorded_per_state(self):
+        """Test that every state visited has a timing entry"""
+        handlers = _fake_handlers(overrides={
+            'generate_resume': lambda event, context: time.sleep(0.02) or {'tailoredResumeMarkdown': '#'},
+        })
+        result = LocalStateMachine(load_definition(), handlers=handlers, time_scale=0).execute(EXECUTION_INPUT)
+
+        timings = {t.name: t for t in result.timings}
+        assert {'ParseJobDescription', 'ParallelOptimization', 'ATSOptimization', 'SendNotification'} <= set(timings)
+        assert timings['GenerateTailoredResume'].duration_ms >= 20
+        assert timings['ParallelOptimization'].type == 'Parallel'
+        assert timings['ParseJobDescription'].input_bytes == payload_bytes(EXECUTION_INPUT)
+        assert timings['SaveResults'].input_bytes > timings['ParseJobDescription'].input_bytes
+        assert all(t.output_bytes > 0 for t in result.timings)
+        assert json.dumps(result.to_dict())
+        assert 'largest state payload' in format_timings(result)
+
+    def test_inline_documents(self):
+        """Test that large inline strings are found by path"""
+        payload = {'jobId': 'job-1', 'tailoredResume': {'Payload': {'tailoredResumeMarkdown': 'é' * 600}},
+                   'parallelResults': [{'coverLetter': 'x' * 2000}, {'ref': {'$claimCheck': 'payloads/a.json'}}]}
+
+        assert inline_documents(payload, 1024) == {
+            '$.tailoredResume.Payload.tailoredResumeMarkdown': 1200,
+            '$.parallelResults[0].coverLetter': 2000,
+        }
+
+    def test_task_failure_retried_with_backoff(self):
+        """Test that Retry re-runs a failing task and records the delays"""
+        attempts = []
+        sleeps = []
+
+        def flaky(event, context):
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise RuntimeError('Bedrock throttled')
+            return {'requiredSkills': [], 'traceId': 'trace-1', 'profile': False}
+
+        machine = LocalStateMachine(load_definition(), handlers=_fake_handlers(overrides={'parse_job': flaky}),
+                                    sleep=sleeps.append)
+        result = machine.execute(EXECUTION_INPUT)
+
+        assert result.status == 'SUCCEEDED', result.cause
+        timing = next(t for t in result.timings if t.name == 'ParseJobDescription')
+        assert timing.attempts == 3
+        assert sleeps == [5, 10]
+        assert timing.retry_delay_ms == 15000
+
+    def test_retries_exhausted_fails_execution(self):
+        """Test that an error past MaxAttempts fails the execution"""
+        def broken(event, context):
+            raise ValueError('Invalid job description')
+
+        machine = LocalStateMachine(load_definition(), handlers=_fake_handlers(overrides={'parse_job': broken}),
+                                    time_scale=0)
+        result = machine.execute(EXECUTION_INPUT)
+
+        assert result.status == 'FAILED'
+        assert result.error == 'ValueError'
+        assert 'Invalid job description' in result.cause
+        assert next(t for t in result.timings if t.name == 'ParseJobDescription').attempts == 3
+
+    def test_task_timeout(self):
+        """Test that TimeoutSeconds raises States.Timeout"""
+        definition = {
+            'StartAt': 'Slow',
+            'States': {'Slow': {
+                'Type': 'Task', 'Resource': 'arn:aws:states:::lambda:invoke', 'TimeoutSeconds': 1, 'End': True,
+                'Parameters': {'FunctionName': 'ResumeTailor-Slow', 'Payload.$': '$'},
+            }},
+        }
+        machine = LocalStateMachine(definition, handlers={'slow': lambda e, c: time.sleep(0.5)}, time_scale=0.01)
+
+        result = machine.execute({})
+
+        assert result.status == 'FAILED'
+        assert result.error == 'States.Timeout'
+
+    def test_catch_routes_to_handler_state(self):
+        """Test that Catch writes the error to ResultPath and continues"""
+        definition = {
+            'StartAt': 'Work',
+            'States': {
+                'Work': {
+                    'Type': 'Task', 'Resource': 'arn:aws:states:::lambda:invoke', 'Next': 'Done',
+                    'Parameters': {'FunctionName': 'ResumeTailor-Work', 'Payload.$': '$'},
+                    'Catch': [{'ErrorEquals': ['States.ALL'], 'ResultPath': '$.error', 'Next': 'Recovered'}],
+                },
+                'Done': {'Type': 'Succeed'},
+                'Recovered': {'Type': 'Pass', 'Result': 'recovered', 'ResultPath': '$.outcome', 'End': True},
+            },
+        }
+
+        def work(event, context):
+            raise KeyError('jobId')
+
+        result = LocalStateMachine(definition, handlers={'work': work}).execute({'jobId': None})
+
+        assert result.status == 'SUCCEEDED'
+        assert result.output['error']['Error'] == 'KeyError'
+        assert result.output['outcome'] == 'recovered'
+
+    def test_fail_state(self):
+        definition = {'StartAt': 'Stop', 'States': {'Stop': {'Type': 'Fail', 'Error': 'Bad', 'Cause': 'why'}}}
+
+        result = LocalStateMachine(definition).execute({})
+
+        assert (result.status, result.error, result.cause) == ('FAILED', 'Bad', 'why')
+
+
+class TestLoadDefinition:
+    """Tests for loading synthesized CloudFormation templates"""
+
+    def test_template_resolves_functions_to_handlers(self, tmp_path):
+        """Test that Fn::GetAtt references map to the Lambda Handler property"""
+        asl = {'StartAt': 'Parse', 'States': {'Parse': {
+            'Type': 'Task', 'Resource': 'arn:aws:states:::lambda:invoke', 'End': True,
+            'Parameters': {'FunctionName': '__FN__', 'Payload.$': '$'},
+        }}}
+        before, after = json.dumps(asl).split('"__FN__"')
+        template = {'Resources': {
+            'ParseJobFunctionABC': {'Type': 'AWS::Lambda::Function', 'Properties': {'Handler': 'parse_job.handler'}},
+            'ResumeTailorWorkflow123': {'Type': 'AWS::StepFunctions::StateMachine', 'Properties': {
+                'DefinitionString': {'Fn::Join': ['', [before + '"', {'Fn::GetAtt': ['ParseJobFunctionABC', 'Arn']},
+                                                       '"' + after]]},
+            }},
+        }}
+        path = tmp_path / 'template.json'
+        path.write_text(json.dumps(template))
+
+        definition = load_definition(str(path))
+
+        function_name = definition['States']['Parse']['Parameters']['FunctionName']
+        assert function_name == 'local:function:parse_job.handler'
+        assert module_for_function(function_name) == 'parse_job'
@@ -0,0 +1,47 @@
+"""
+Unit tests for the offline trace viewer
+"""
+import json
+
+from devtools.traces import find_trace, format_waterfall, group_traces, load_spans, summarize, to_chrome_trace
+
+
+def _span(name, stage, start, end, span_id, parent_id=None, trace_id='t-1', **attributes):
+    return {'trace_id': trace_id, 'span_id': span_id, 'parent_id': parent_id, 'name': name, 'stage': stage,
+            'start': start, 'end': end, 'attributes': attributes, 'error': None}
+
+
+SPANS = [
+    _span('parse_job', 'parse_job', 100.0, 101.0, 'a', jobId='job-1'),
+    _span('bedrock.invoke_model', 'parse_job', 100.1, 100.9, 'b', 'a'),
+    _span('analyze_resume', 'analyze_resume', 101.0, 103.0, 'c', jobId='job-1'),
+    _span('parse_job', 'parse_job', 200.0, 200.5, 'd', trace_id='t-2', jobId='job-2'),
+]
+
+
+def test_load_and_group(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    path.write_text('\n'.join(json.dumps(s) for s in SPANS) + '\nnot json\n')
+
+    traces = group_traces(load_spans(str(path)))
+
+    assert set(traces) == {'t-1', 't-2'}
+    assert find_trace(traces, 'job-2') == 't-2'
+    assert summarize(traces)[0] == {'traceId': 't-1', 'jobId': 'job-1', 'stages': 2, 'spans': 3, 'errors': 0,
+                                    'durationMs': 3000.0, 'start': 100.0}
+
+
+def test_waterfall_nests_children_under_parents():
+    lines = format_waterfall(group_traces(SPANS)['t-1'], width=30).splitlines()
+
+    assert lines[0].startswith('trace t-1: 3 spans, 3000.0 ms')
+    assert [line.split()[0] for line in lines[1:]] == ['parse_job', 'bedrock.invoke_model', 'analyze_resume']
+    assert lines[2].startswith('  bedrock.invoke_model')
+
+
+def test_chrome_trace_has_a_track_per_stage():
+    events = to_chrome_trace(group_traces(SPANS)['t-1'])['traceEvents']
+
+    assert {e['args']['name'] for e in events if e['ph'] == 'M'} == {'parse_job', 'analyze_resume'}
+    complete = [e for e in events if e['ph'] == 'X']
+    assert complete[0]['dur'] == 1_000_000
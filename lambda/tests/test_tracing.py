@@ -0,0 +1,111 @@
+"""
+Unit tests for tracing module
+"""
+import json
+import os
+import socket
+from unittest.mock import patch
+
+import boto3
+import pytest
+from moto import mock_aws
+
+import tracing
+from tracing import XRayExporter, register_aws_hooks, span, traced
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / 'trace.jsonl'
+    with patch.dict(os.environ, {'TRACE_FILE': str(path)}):
+        yield path
+
+
+def _spans(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestTraced:
+    """Tests for the handler decorator and child spans"""
+
+    def test_spans_nest_under_stage_root(self, trace_file):
+        @traced('analyze_resume')
+        def handler(event, context):
+            with span('load_resumes', count=1):
+                with span('s3.get'):
+                    pass
+            return {'statusCode': 200}
+
+        result = handler({'jobId': 'job-1', 'traceId': 'trace-abc'}, None)
+
+        assert result['traceId'] == 'trace-abc'
+        spans = {s['name']: s for s in _spans(trace_file)}
+        assert set(spans) == {'analyze_resume', 'load_resumes', 's3.get'}
+        assert {s['trace_id'] for s in spans.values()} == {'trace-abc'}
+        assert spans['s3.get']['parent_id'] == spans['load_resumes']['span_id']
+        assert spans['load_resumes']['parent_id'] == spans['analyze_resume']['span_id']
+        assert spans['analyze_resume']['attributes'] == {'jobId': 'job-1'}
+        assert spans['load_resumes']['attributes'] == {'count': 1}
+
+    def test_error_status_and_exceptions_recorded(self, trace_file):
+        @traced('parse_job')
+        def handler(event, context):
+            with pytest.raises(ValueError), span('prompt.build'):
+                raise ValueError('bad prompt')
+            return {'statusCode': 500, 'error': 'boom'}
+
+        handler({}, None)
+
+        spans = {s['name']: s for s in _spans(trace_file)}
+        assert spans['prompt.build']['error'] == 'ValueError: bad prompt'
+        assert spans['parse_job']['error'] == 'boom'
+
+    def test_trace_id_from_xray_header_when_not_in_payload(self):
+        """Test that the first stage adopts the X-Ray root, with tracing export off"""
+        header = 'Root=1-5759e988-bd862e3fe1be46a994272793;Parent=53995c3f42cd8ad8;Sampled=1'
+        with patch.dict(os.environ, {'_X_AMZN_TRACE_ID': header}):
+            result = traced('parse_job')(lambda event, context: {'statusCode': 200})({}, None)
+
+        assert result['traceId'] == '1-5759e988-bd862e3fe1be46a994272793'
+
+    def test_span_is_noop_without_exporter(self):
+        with patch.dict(os.environ, {}, clear=True):
+            with span('anything') as current:
+                assert current is None
+
+
+def test_xray_exporter_sends_subsegment():
+    """Test that a span becomes a subsegment of the Lambda segment named in the trace header"""
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(2)
+    exporter = XRayExporter(f"127.0.0.1:{receiver.getsockname()[1]}")
+    finished = tracing.Span('job-trace', 'a1b2c3d4e5f60718', 'bedrock.invoke_model', 'parse_job', 100.0,
+                            end=101.5, attributes={'model': 'm'})
+
+    exporter.export(finished, {'Root': '1-abc-def', 'Parent': '53995c3f42cd8ad8', 'Sampled': '1'})
+    header, body = receiver.recv(65536).decode().split('\n', 1)
+    receiver.close()
+
+    document = json.loads(body)
+    assert json.loads(header) == {'format': 'json', 'version': 1}
+    assert document['type'] == 'subsegment'
+    assert document['trace_id'] == '1-abc-def'
+    assert document['parent_id'] == '53995c3f42cd8ad8'
+    assert document['annotations'] == {'stage': 'parse_job', 'jobTraceId': 'job-trace'}
+    assert document['end_time'] - document['start_time'] == 1.5
+
+
+@mock_aws
+def test_aws_calls_recorded_as_spans(trace_file):
+    s3 = register_aws_hooks(boto3.client('s3', region_name='us-east-1'))
+    s3.create_bucket(Bucket='bucket')
+
+    @traced('convert_to_pdf')
+    def handler(event, context):
+        s3.put_object(Bucket='bucket', Key='a.md', Body=b'x')
+        return {'statusCode': 200}
+
+    handler({}, None)
+
+    assert [s['name'] for s in _spans(trace_file)] == ['s3.PutObject', 'convert_to_pdf']
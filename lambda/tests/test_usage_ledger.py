@@ -0,0 +1,74 @@
+"""
+Unit tests for usage_ledger module
+"""
+import os
+from unittest.mock import patch
+
+import pytest
+from usage_ledger import build_ledger, model_prices, price_for, stage_cost
+
+PRICES = {
+    'anthropic.claude-opus-4-5-20251101-v1:0': {'input': 5, 'output': 25, 'cacheRead': 0.5, 'cacheWrite': 6.25},
+    'anthropic.claude-haiku-4-5-20251001-v1:0': {'input': 1, 'output': 5, 'cacheRead': 0.1, 'cacheWrite': 1.25},
+}
+
+
+def _record(model, input_tokens=0, output_tokens=0, cache_read=0, cache_write=0, latency_ms=0):
+    return {'model': model, 'inputTokens': input_tokens, 'outputTokens': output_tokens,
+            'cacheReadInputTokens': cache_read, 'cacheWriteInputTokens': cache_write, 'latencyMs': latency_ms}
+
+
+class TestPricing:
+    """Tests for price lookup and per-stage cost"""
+
+    def test_inference_profile_priced_as_base_model(self):
+        assert price_for('us.anthropic.claude-opus-4-5-20251101-v1:0', PRICES) is PRICES[
+            'anthropic.claude-opus-4-5-20251101-v1:0']
+        assert price_for('anthropic.titan-text', PRICES) is None
+
+    def test_cost_covers_every_token_kind(self):
+        """Test that input, output and both prompt-cache counts are billed"""
+        record = _record('us.anthropic.claude-opus-4-5-20251101-v1:0', input_tokens=1_000_000,
+                         output_tokens=100_000, cache_read=2_000_000, cache_write=400_000)
+
+        assert stage_cost(record, PRICES) == pytest.approx(5 + 2.5 + 1 + 2.5)
+
+    def test_prices_from_env(self):
+        with patch.dict(os.environ, {'MODEL_PRICES': '{"m": {"input": 1}}'}):
+            assert model_prices() == {'m': {'input': 1}}
+        with patch.dict(os.environ, {'MODEL_PRICES': 'not json'}):
+            assert model_prices() == {}
+
+
+class TestBuildLedger:
+    """Tests for the per-job ledger"""
+
+    def test_totals_across_stages(self):
+        ledger = build_ledger([
+            ('parse_job', _record('us.anthropic.claude-haiku-4-5-20251001-v1:0', 2000, 500, latency_ms=800)),
+            ('generate_resume', _record('us.anthropic.claude-opus-4-5-20251101-v1:0', 4000, 3000, latency_ms=30000)),
+            ('ats_optimize', None),
+        ], PRICES)
+
+        assert list(ledger['stages']) == ['parse_job', 'generate_resume']
+        assert ledger['stages']['parse_job']['costUsd'] == pytest.approx(0.0045)
+        assert ledger['stages']['generate_resume']['costUsd'] == pytest.approx(0.095)
+        assert ledger['totals']['inputTokens'] == 6000
+        assert ledger['totals']['stageLatencyMsSum'] == 30800
+        assert ledger['totals']['costUsd'] == pytest.approx(0.0995)
+        assert ledger['pricingComplete'] is True
+
+    def test_unpriced_model_marks_ledger_incomplete(self):
+        ledger = build_ledger([('parse_job', _record('anthropic.titan-text', 100, 10))], PRICES)
+
+        assert ledger['stages']['parse_job']['costUsd'] is None
+        assert ledger['totals']['inputTokens'] == 100
+        assert ledger['pricingComplete'] is False
+
+    def test_response_cache_hit_kept(self):
+        record = dict(_record('us.anthropic.claude-haiku-4-5-20251001-v1:0', latency_ms=3), responseCache='memory')
+
+        ledger = build_ledger([('analyze_resume', record)], PRICES)
+
+        assert ledger['stages']['analyze_resume']['responseCache'] == 'memory'
+        assert ledger['totals']['costUsd'] == 0
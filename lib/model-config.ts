@@ -70,10 +70,10 @@ export const MODEL_CONFIGS: Record<DeploymentMode, ModelConfig> = {
 };
 
 /**
- * Cost comparison (approximate per 1M tokens)
+ * Cost comparison (per 1M tokens; see MODEL_PRICING in model-pricing.ts)
  * 
  * Claude Opus 4.5:
- *   Input: $15.00 | Output: $75.00
+ *   Input: $5.00 | Output: $25.00
  * 
  * Claude Sonnet 4.5:
  *   Input: $3.00 | Output: $15.00
@@ -84,9 +84,8 @@ export const MODEL_CONFIGS: Record<DeploymentMode, ModelConfig> = {
  * Claude Haiku 3.0:
  *   Input: $0.25 | Output: $1.25
  * 
- * Estimated savings:
- * - TESTING vs PREMIUM: ~95% cost reduction
- * - OPTIMIZED vs PREMIUM: ~50-60% cost reduction
+ * Actual per-job cost and latency by stage are recorded in each saved
+ * result's usageLedger, so the modes can be compared on real traffic.
  */
 
 /**
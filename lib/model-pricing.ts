@@ -0,0 +1,41 @@
+/**
+ * Model Pricing for Resume Tailor
+ *
+ * On-demand Bedrock prices in USD per 1M tokens, keyed by base model ID
+ * (cross-region inference profiles such as `us.` are priced as the base
+ * model). save_results uses this table, passed in as MODEL_PRICES, to
+ * derive each job's cost from the token usage every stage reports.
+ *
+ * Prompt-cache reads bill at 10% of the input price and cache writes
+ * (5-minute TTL) at 125%. Update this table when Bedrock prices change
+ * or a new model is added to model-config.ts.
+ */
+
+export interface ModelPrice {
+  input: number;
+  output: number;
+  cacheRead: number;
+  cacheWrite: number;
+}
+
+export const MODEL_PRICING: Record<string, ModelPrice> = {
+  // Claude Opus 4.5
+  'anthropic.claude-opus-4-5-20251101-v1:0': {
+    input: 5.00, output: 25.00, cacheRead: 0.50, cacheWrite: 6.25,
+  },
+
+  // Claude Sonnet 4.5
+  'anthropic.claude-sonnet-4-5-20250929-v1:0': {
+    input: 3.00, output: 15.00, cacheRead: 0.30, cacheWrite: 3.75,
+  },
+
+  // Claude Haiku 4.5
+  'anthropic.claude-haiku-4-5-20251001-v1:0': {
+    input: 1.00, output: 5.00, cacheRead: 0.10, cacheWrite: 1.25,
+  },
+
+  // Claude Haiku 3.0 (no prompt caching on Bedrock)
+  'anthropic.claude-3-haiku-20240307-v1:0': {
+    input: 0.25, output: 1.25, cacheRead: 0.25, cacheWrite: 0.25,
+  },
+};
@@ -12,6 +12,7 @@ import * as origins from 'aws-cdk-lib/aws-cloudfront-origins';
 import * as s3deploy from 'aws-cdk-lib/aws-s3-deployment';
 import { Construct } from 'constructs';
 import { getModelConfig } from './model-config';
+import { MODEL_PRICING } from './model-pricing';
 
 export class ResumeTailorStack extends cdk.Stack {
   constructor(scope: Construct, id: string, props?: cdk.StackProps) {
@@ -20,6 +21,11 @@ export class ResumeTailorStack extends cdk.Stack {
     // Get deployment mode from context (default: TESTING)
     const deploymentMode = this.node.tryGetContext('deploymentMode') || 'TESTING';
     const modelConfig = getModelConfig(deploymentMode);
+
+    // Lambda topology from context: one function per stage (default), or
+    // 'router' for a single function hosting every stage (shared warm containers)
+    const topology = this.node.tryGetContext('topology') || 'per-function';
+    const useRouter = topology === 'router';
     
     // Determine if this is the feature stack
     const isFeatureStack = id === 'ResumeTailorFeatureStack';
@@ -153,6 +159,22 @@ export class ResumeTailorStack extends cdk.Stack {
           prefix: 'uploads/',
           expiration: cdk.Duration.days(90),
         },
+        {
+          id: 'ExpireResponseCache',
+          prefix: 'cache/',
+          expiration: cdk.Duration.days(7),
+        },
+        {
+          id: 'ExpireProfiles',
+          prefix: 'profiles/',
+          expiration: cdk.Duration.days(14),
+        },
+        {
+          // Claim-check documents only matter while an execution runs (and for replays)
+          id: 'ExpireClaimCheckPayloads',
+          prefix: 'payloads/',
+          expiration: cdk.Duration.days(14),
+        },
       ],
       removalPolicy: cdk.RemovalPolicy.RETAIN,
     });
@@ -165,6 +187,8 @@ export class ResumeTailorStack extends cdk.Stack {
       billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
       encryption: dynamodb.TableEncryption.AWS_MANAGED,
       pointInTimeRecovery: true,
+      // Expires Claude response cache entries (llm-cache# items)
+      timeToLiveAttribute: 'expiresAt',
       removalPolicy: cdk.RemovalPolicy.RETAIN,
     });
 
@@ -222,6 +246,27 @@ export class ResumeTailorStack extends cdk.Stack {
       BUCKET_NAME: resumeBucket.bucketName,
       TABLE_NAME: resultsTable.tableName,
       BEDROCK_REGION: this.region,
+      LLM_CACHE_TABLE: resultsTable.tableName,
+      LLM_CACHE_BUCKET: resumeBucket.bucketName,
+      // Only stages whose output is a fixed function of their input reuse cached
+      // responses; the generated documents stay fresh on every run
+      LLM_CACHE_STAGES: 'parse_job,analyze_resume',
+      BEDROCK_LIMITER_TABLE: resultsTable.tableName,
+      // Build AWS clients on first use, so early exits skip boto3 entirely
+      LAZY_INIT: 'true',
+      // Per-invocation EMF metrics (lambda/functions/metrics.py), printed to the log stream
+      METRICS_ENABLED: 'true',
+      METRICS_NAMESPACE: `ResumeTailor${suffix}`,
+      // cProfile/tracemalloc for every invocation (lambda/functions/profiling.py);
+      // a single job can opt in with `profile: true` in its execution input
+      PROFILING_ENABLED: 'false',
+      // Large stage output fields go to payloads/ in the resume bucket and the state
+      // machine passes references (lambda/functions/claim_check.py)
+      CLAIM_CHECK_ENABLED: 'true',
+      CLAIM_CHECK_MIN_BYTES: '4096',
+      // String fields of 2 KB or more travel zstd-compressed (stdlib compression.zstd on 3.14)
+      PAYLOAD_COMPRESSION: 'zstd',
+      PAYLOAD_COMPRESSION_MIN_BYTES: '2048',
     };
 
     // Lambda Layer for shared dependencies
@@ -231,7 +276,15 @@ export class ResumeTailorStack extends cdk.Stack {
       description: 'Shared utilities and dependencies',
     });
 
+    // X-Ray segment per invocation; handlers add their spans as subsegments
+    const tracedFunctionProps = {
+      tracing: lambda.Tracing.ACTIVE,
+    };
+
     // Lambda Functions for Step Functions workflow
+    // memorySize: check changes against `python -m devtools.rightsizing`
+    // (lambda/devtools/rightsizing.py), which measures each handler's
+    // peak RSS, CPU and wait time and prices every candidate size
     
     // 1. Parse Job Description
     const parseJobFn = new lambda.Function(this, 'ParseJobFunction', {
@@ -247,6 +300,7 @@ export class ResumeTailorStack extends cdk.Stack {
       timeout: cdk.Duration.minutes(13),
       memorySize: 512,
       layers: [sharedLayer],
+      ...tracedFunctionProps,
     });
 
     // 2. Analyze Resume Fit
@@ -263,6 +317,7 @@ export class ResumeTailorStack extends cdk.Stack {
       timeout: cdk.Duration.minutes(13),
       memorySize: 1024,
       layers: [sharedLayer],
+      ...tracedFunctionProps,
     });
 
     // 3. Generate Tailored Resume
@@ -279,6 +334,7 @@ export class ResumeTailorStack extends cdk.Stack {
       timeout: cdk.Duration.minutes(13),
       memorySize: 2048,
       layers: [sharedLayer],
+      ...tracedFunctionProps,
     });
 
     // 4. ATS Optimization
@@ -295,6 +351,7 @@ export class ResumeTailorStack extends cdk.Stack {
       timeout: cdk.Duration.minutes(13),
       memorySize: 1024,
       layers: [sharedLayer],
+      ...tracedFunctionProps,
     });
 
     // 5. Generate Cover Letter
@@ -311,6 +368,7 @@ export class ResumeTailorStack extends cdk.Stack {
       timeout: cdk.Duration.minutes(13),
       memorySize: 1024,
       layers: [sharedLayer],
+      ...tracedFunctionProps,
     });
 
     // 6. Critical Review
@@ -327,6 +385,7 @@ export class ResumeTailorStack extends cdk.Stack {
       timeout: cdk.Duration.minutes(13),
       memorySize: 1024,
       layers: [sharedLayer],
+      ...tracedFunctionProps,
     });
 
     // 7. Save Results
@@ -336,10 +395,15 @@ export class ResumeTailorStack extends cdk.Stack {
       handler: 'save_results.handler',
       code: lambda.Code.fromAsset('lambda/functions'),
       role: lambdaRole,
-      environment: lambdaEnvironment,
+      environment: {
+        ...lambdaEnvironment,
+        // Per-model prices for the job's usage ledger
+        MODEL_PRICES: JSON.stringify(MODEL_PRICING),
+      },
       timeout: cdk.Duration.minutes(13),
       memorySize: 512,
       layers: [sharedLayer],
+      ...tracedFunctionProps,
     });
 
     // 8. Refine Resume (based on critical feedback)
@@ -356,6 +420,7 @@ export class ResumeTailorStack extends cdk.Stack {
       timeout: cdk.Duration.minutes(13),
       memorySize: 2048,
       layers: [sharedLayer],
+      ...tracedFunctionProps,
     });
 
     // 9. Send Notification (optional)
@@ -369,6 +434,7 @@ export class ResumeTailorStack extends cdk.Stack {
       timeout: cdk.Duration.minutes(13),
       memorySize: 256,
       layers: [sharedLayer],
+      ...tracedFunctionProps,
     });
 
     // Grant SES permissions for notifications
@@ -380,6 +446,59 @@ export class ResumeTailorStack extends cdk.Stack {
       })
     );
 
+    // 10. Router hosting every stage (topology=router)
+    const routerFn = useRouter ? new lambda.Function(this, 'RouterFunction', {
+      functionName: `ResumeTailor${suffix}-Router`,
+      runtime: lambda.Runtime.PYTHON_3_14,
+      handler: 'router.handler',
+      code: lambda.Code.fromAsset('lambda/functions'),
+      role: lambdaRole,
+      environment: {
+        ...lambdaEnvironment,
+        STAGE_MODEL_IDS: JSON.stringify({
+          parse_job: modelConfig.parseJob,
+          analyze_resume: modelConfig.analyzeResume,
+          generate_resume: modelConfig.generateResume,
+          ats_optimize: modelConfig.atsOptimize,
+          cover_letter: modelConfig.coverLetter,
+          critical_review: modelConfig.criticalReview,
+          refine_resume: modelConfig.generateResume,
+        }),
+        MODEL_PRICES: JSON.stringify(MODEL_PRICING),
+      },
+      timeout: cdk.Duration.minutes(13),
+      // Sized for the largest stage
+      memorySize: 2048,
+      layers: [sharedLayer],
+      ...tracedFunctionProps,
+    }) : undefined;
+
+    routerFn?.addToRolePolicy(
+      new iam.PolicyStatement({
+        effect: iam.Effect.ALLOW,
+        actions: ['ses:SendEmail', 'ses:SendRawEmail'],
+        resources: ['*'],
+      })
+    );
+
+    // Function and payload for a stage's task; with the router the stage's
+    // own payload goes under `input` (the whole state when it has none).
+    // Stages with their own payload run after ParseJobDescription and get
+    // the job's traceId and profile flag from its output
+    const stageInvoke = (stage: string, fn: lambda.IFunction, stagePayload?: { [key: string]: any }) => {
+      const payload = stagePayload && {
+        ...stagePayload,
+        'traceId.$': '$.parsedJob.Payload.traceId',
+        'profile.$': '$.parsedJob.Payload.profile',
+      };
+      return routerFn
+        ? {
+            lambdaFunction: routerFn,
+            payload: sfn.TaskInput.fromObject(payload ? { stage, input: payload } : { stage, 'input.$': '$' }),
+          }
+        : { lambdaFunction: fn, ...(payload ? { payload: sfn.TaskInput.fromObject(payload) } : {}) };
+    };
+
     // Retry configuration for transient Bedrock failures
     const bedrockRetryProps = {
       errors: ['States.TaskFailed', 'States.Timeout'],
@@ -390,15 +509,14 @@ export class ResumeTailorStack extends cdk.Stack {
 
     // Step Functions State Machine
     const parseJobTask = new tasks.LambdaInvoke(this, 'ParseJobDescription', {
-      lambdaFunction: parseJobFn,
+      ...stageInvoke('parse_job', parseJobFn),
       resultPath: '$.parsedJob',
       taskTimeout: sfn.Timeout.duration(cdk.Duration.minutes(13)),
     });
     parseJobTask.addRetry(bedrockRetryProps);
 
     const analyzeResumeTask = new tasks.LambdaInvoke(this, 'AnalyzeResumeFit', {
-      lambdaFunction: analyzeResumeFn,
-      payload: sfn.TaskInput.fromObject({
+      ...stageInvoke('analyze_resume', analyzeResumeFn, {
         'jobId.$': '$.jobId',
         'userId.$': '$.userId',
         'resumeS3Keys.$': '$.resumeS3Keys',
@@ -411,8 +529,7 @@ export class ResumeTailorStack extends cdk.Stack {
     analyzeResumeTask.addRetry(bedrockRetryProps);
 
     const generateResumeTask = new tasks.LambdaInvoke(this, 'GenerateTailoredResume', {
-      lambdaFunction: generateResumeFn,
-      payload: sfn.TaskInput.fromObject({
+      ...stageInvoke('generate_resume', generateResumeFn, {
         'jobId.$': '$.jobId',
         'userId.$': '$.userId',
         'resumeS3Keys.$': '$.resumeS3Keys',
@@ -425,8 +542,8 @@ export class ResumeTailorStack extends cdk.Stack {
     generateResumeTask.addRetry(bedrockRetryProps);
 
     const atsOptimizeTask = new tasks.LambdaInvoke(this, 'ATSOptimization', {
-      lambdaFunction: atsOptimizeFn,
-      payload: sfn.TaskInput.fromObject({
+      ...stageInvoke('ats_optimize', atsOptimizeFn, {
+        'jobId.$': '$.jobId',
         'tailoredResumeMarkdown.$': '$.tailoredResume.Payload.tailoredResumeMarkdown',
         'parsedJob.$': '$.parsedJob.Payload',
       }),
@@ -436,8 +553,7 @@ export class ResumeTailorStack extends cdk.Stack {
     atsOptimizeTask.addRetry(bedrockRetryProps);
 
     const coverLetterTask = new tasks.LambdaInvoke(this, 'GenerateCoverLetter', {
-      lambdaFunction: coverLetterFn,
-      payload: sfn.TaskInput.fromObject({
+      ...stageInvoke('cover_letter', coverLetterFn, {
         'jobId.$': '$.jobId',
         'jobDescription.$': '$.jobDescription',
         'tailoredResumeMarkdown.$': '$.tailoredResume.Payload.tailoredResumeMarkdown',
@@ -450,8 +566,8 @@ export class ResumeTailorStack extends cdk.Stack {
     coverLetterTask.addRetry(bedrockRetryProps);
 
     const criticalReviewTask = new tasks.LambdaInvoke(this, 'CriticalReview', {
-      lambdaFunction: criticalReviewFn,
-      payload: sfn.TaskInput.fromObject({
+      ...stageInvoke('critical_review', criticalReviewFn, {
+        'jobId.$': '$.jobId',
         'tailoredResumeMarkdown.$': '$.tailoredResume.Payload.tailoredResumeMarkdown',
       }),
       outputPath: '$.Payload',
@@ -460,8 +576,7 @@ export class ResumeTailorStack extends cdk.Stack {
     criticalReviewTask.addRetry(bedrockRetryProps);
 
     const saveResultsTask = new tasks.LambdaInvoke(this, 'SaveResults', {
-      lambdaFunction: saveResultsFn,
-      payload: sfn.TaskInput.fromObject({
+      ...stageInvoke('save_results', saveResultsFn, {
         'jobId.$': '$.jobId',
         'userId.$': '$.userId',
         'jobDescription.$': '$.jobDescription',
@@ -480,7 +595,7 @@ export class ResumeTailorStack extends cdk.Stack {
     });
 
     const notifyTask = new tasks.LambdaInvoke(this, 'SendNotification', {
-      lambdaFunction: notifyFn,
+      ...stageInvoke('notify', notifyFn),
       outputPath: '$.Payload',
     });
 